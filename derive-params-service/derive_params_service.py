@@ -0,0 +1,408 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+    from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from derive_common import cache as derive_cache
+from derive_common import derivers
+from derive_common import emitters
+from derive_common import fleet
+from derive_common import nodes
+from derive_common import undercloud
+from derive_common.topology import Topology
+
+DEFAULT_PORT = 8787
+DEFAULT_REFRESH_INTERVAL = 300
+
+
+# Long running derivation service. The undercloud backend (with its
+# authenticated session), the flavor nodes, the introspection data and
+# the parsed CPU topology of the nodes are kept in memory, so that the
+# derive requests are answered without accessing undercloud. The nodes
+# are refreshed in background when they are introspected again.
+class DeriveService(object):
+    def __init__(self, backend, cache=None,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 max_workers=fleet.DEFAULT_MAX_WORKERS):
+        self.backend = backend
+        self.cache = cache
+        self.offline = cache is not None and cache.offline
+        self.refresh_interval = refresh_interval
+        self.max_workers = max_workers
+        self.derivers = dict((name, derivers.load_deriver(name))
+                             for name in derivers.DERIVERS)
+        self.lock = threading.Lock()
+        # flavor name => node UUIDs
+        self.flavors = {}
+        # node UUID => (introspection finished_at, hw_data, topology)
+        self.nodes = {}
+        self.last_refresh = None
+        self.stopped = threading.Event()
+        self.refresh_thread = None
+        # Worker threads are started once and shared by the requests
+        self.pool = ThreadPool(max(1, int(max_workers)))
+
+    def _get_version(self, node_uuid):
+        if self.offline:
+            return None
+        return self.backend.get_introspection_finished_at(node_uuid)
+
+    def _fetch_node_uuids(self, flavor_name):
+        cache = self.cache if self.offline else None
+        return nodes.get_node_uuids(flavor_name, cache, self.backend)
+
+    def _load_node(self, node_uuid, version):
+        hw_data = nodes.get_node_introspection_data(node_uuid, self.cache,
+                                                    self.backend)
+        node = (version, hw_data, Topology.from_introspection(hw_data))
+        with self.lock:
+            self.nodes[node_uuid] = node
+        return node
+
+    # Gets the node UUIDs for flavor name
+    def get_node_uuids(self, flavor_name):
+        with self.lock:
+            node_uuids = self.flavors.get(flavor_name)
+        if node_uuids is None:
+            node_uuids = self._fetch_node_uuids(flavor_name)
+            with self.lock:
+                self.flavors[flavor_name] = node_uuids
+        return node_uuids
+
+    # Gets the (hw_data, topology) of node UUID
+    def get_node(self, node_uuid):
+        with self.lock:
+            node = self.nodes.get(node_uuid)
+        if node is None:
+            node = self._load_node(node_uuid, self._get_version(node_uuid))
+        return node[1], node[2]
+
+    # Derives the parameters with deriver name ('dpdk' or 'sriov') for
+    # the first node matching the flavor, or for all of them in fleet
+    # mode, or for the given node UUID. Returns a list of results with
+    # node_uuid, parameters and hiera_variables (or error) of each node.
+    def derive(self, name, user_input, node_uuid=None, fleet_mode=False):
+        if name not in self.derivers:
+            raise Exception("Invalid deriver '%s'" % name)
+        deriver = self.derivers[name]
+        deriver.vaildate_user_input(user_input, batch_mode=True)
+        if node_uuid:
+            node_uuids = [node_uuid]
+        else:
+            if 'flavor' not in user_input:
+                raise Exception("Flavor is missing in user input!")
+            node_uuids = self.get_node_uuids(user_input['flavor'])
+            if not node_uuids:
+                raise Exception("Unable to determine nodes for flavor "
+                                "'%s'" % user_input['flavor'])
+            if not fleet_mode:
+                node_uuids = node_uuids[:1]
+
+        def derive_node(node_uuid):
+            hw_data, topology = self.get_node(node_uuid)
+            return deriver.derive_hw_data_parameters(hw_data, user_input,
+                                                     topology)
+
+        results = []
+        for node_uuid, result, exc in fleet.run_fleet(node_uuids,
+                                                      derive_node,
+                                                      self.max_workers,
+                                                      self.pool):
+            if exc is not None:
+                if not fleet_mode:
+                    raise exc
+                results.append({'node_uuid': node_uuid, 'error': '%s' % exc})
+                continue
+            parameters, hiera_variables = result
+            results.append({'node_uuid': node_uuid,
+                            'parameters': parameters,
+                            'hiera_variables': hiera_variables})
+        return results
+
+    # Reloads the node if it is introspected again since it was loaded.
+    # Returns True if the node is reloaded.
+    def refresh_node(self, node_uuid):
+        with self.lock:
+            node = self.nodes.get(node_uuid)
+        version = self._get_version(node_uuid)
+        if node is not None and version == node[0]:
+            return False
+        if self.cache is not None and not self.offline:
+            self.cache.invalidate('introspection-' + node_uuid)
+        self._load_node(node_uuid, version)
+        return True
+
+    # Fetches the flavor nodes again and reloads the nodes which are
+    # introspected again, or only the given node UUID. Returns the list
+    # of reloaded node UUIDs.
+    def refresh(self, node_uuid=None):
+        if self.offline:
+            return []
+        if node_uuid:
+            node_uuids = [node_uuid]
+        else:
+            with self.lock:
+                flavor_names = list(self.flavors.keys())
+            for flavor_name in flavor_names:
+                node_uuids = self._fetch_node_uuids(flavor_name)
+                with self.lock:
+                    self.flavors[flavor_name] = node_uuids
+            with self.lock:
+                node_uuids = sorted(self.nodes.keys())
+        refreshed = []
+        for node_uuid, result, exc in fleet.run_fleet(node_uuids,
+                                                      self.refresh_node,
+                                                      self.max_workers,
+                                                      self.pool):
+            if exc is not None:
+                sys.stderr.write('Refresh of node %(node)s failed: %(exc)s\n'
+                                 % {'node': node_uuid, 'exc': exc})
+            elif result:
+                refreshed.append(node_uuid)
+        self.last_refresh = time.time()
+        return refreshed
+
+    def _refresh_loop(self):
+        while not self.stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                sys.stderr.write('Refresh failed: %s\n' % exc)
+
+    # Starts refreshing the nodes in background every refresh interval
+    def start(self):
+        if self.refresh_interval > 0 and not self.offline:
+            self.refresh_thread = threading.Thread(target=self._refresh_loop)
+            self.refresh_thread.daemon = True
+            self.refresh_thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.refresh_thread is not None:
+            self.refresh_thread.join()
+        self.pool.close()
+        self.pool.join()
+        self.backend.close()
+
+    def status(self):
+        with self.lock:
+            return {'status': 'ok',
+                    'backend': self.backend.name,
+                    'offline': self.offline,
+                    'flavors': sorted(self.flavors.keys()),
+                    'nodes': len(self.nodes),
+                    'last_refresh': self.last_refresh}
+
+
+# HTTP API of the derivation service
+#   GET  /status                  service status and cached nodes count
+#   POST /derive/<dpdk|sriov>     derives the parameters, request body is
+#                                 the user input JSON, optional query
+#                                 parameters: node_uuid, fleet=1 and
+#                                 role_name (includes the heat
+#                                 environment in the results)
+#   POST /refresh                 reloads the nodes introspected again,
+#                                 optional query parameter: node_uuid
+class DeriveRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffers the response, so that it is sent at once after the request
+    # is handled instead of a small packet for each header line
+    wbufsize = -1
+
+    # Client address is empty for the Unix socket connections
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _send(self, status, body):
+        payload = (json.dumps(body, sort_keys=True) + '\n').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _query(self):
+        query = parse_qs(urlparse(self.path).query)
+        return dict((key, val[-1]) for key, val in query.items())
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/status':
+            return self._send(200, self.server.service.status())
+        return self._send(404, {'error': 'Not Found'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        query = self._query()
+        service = self.server.service
+        try:
+            body = self._read_body()
+            if path.startswith('/derive/'):
+                results = service.derive(
+                    path[len('/derive/'):], body, query.get('node_uuid'),
+                    query.get('fleet', '').lower() in ('1', 'true', 'yes'))
+                if query.get('role_name'):
+                    for result in results:
+                        if 'parameters' in result:
+                            result['environment'] = emitters.get_environment(
+                                result['parameters'],
+                                result['hiera_variables'],
+                                query['role_name'])
+                return self._send(200, {'results': results})
+            if path == '/refresh':
+                return self._send(200, {'refreshed': service.refresh(
+                    query.get('node_uuid'))})
+        except Exception as exc:
+            return self._send(400, {'error': '%s' % exc})
+        return self._send(404, {'error': 'Not Found'})
+
+
+class DeriveHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, host='127.0.0.1', port=DEFAULT_PORT,
+                 verbose=False):
+        self.service = service
+        self.verbose = verbose
+        HTTPServer.__init__(self, (host, port), DeriveRequestHandler)
+
+
+class DeriveUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, service, path, verbose=False):
+        self.service = service
+        self.verbose = verbose
+        # Removes the socket left by a previous run
+        if os.path.exists(path):
+            os.remove(path)
+        UnixStreamServer.__init__(self, path, DeriveRequestHandler)
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+# Gets the service options from command line arguments
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Derives DPDK and SRIOV parameters as a service')
+    parser.add_argument('--host',
+                        metavar='HOST',
+                        help="""address to listen for the HTTP API.""",
+                        default='127.0.0.1')
+    parser.add_argument('--port',
+                        metavar='PORT',
+                        help="""port to listen for the HTTP API.""",
+                        type=int,
+                        default=DEFAULT_PORT)
+    parser.add_argument('--unix_socket',
+                        metavar='PATH',
+                        help="""listen on the Unix socket path instead of
+                        the TCP port.""",
+                        default='')
+    parser.add_argument('--refresh_interval',
+                        metavar='SECONDS',
+                        help="""seconds between the background checks of
+                        the nodes introspected again, 0 disables the
+                        background refresh.""",
+                        type=int,
+                        default=DEFAULT_REFRESH_INTERVAL)
+    parser.add_argument('--max_workers',
+                        metavar='MAX WORKERS',
+                        help="""maximum number of nodes processed
+                        concurrently.""",
+                        type=int,
+                        default=fleet.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--backend',
+                        metavar='BACKEND',
+                        help="""undercloud access backend: 'rest' uses
+                        the REST APIs in process, 'cli' (default) uses the
+                        openstack CLIs and 'auto' uses 'rest' when the
+                        undercloud credentials are available in the
+                        environment, falling back to 'cli' on REST errors.""",
+                        choices=undercloud.BACKENDS,
+                        default=undercloud.DEFAULT_BACKEND)
+    parser.add_argument('--cache_dir',
+                        metavar='CACHE DIR',
+                        help="""directory to cache the introspection data.""",
+                        default=derive_cache.DEFAULT_CACHE_DIR)
+    parser.add_argument('--offline',
+                        help="""use only the cached data without accessing
+                        undercloud.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--no_cache',
+                        help="""do not cache the introspection data on
+                        disk.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        default=False)
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == '__main__':
+    try:
+        opts = parse_opts(sys.argv)
+        cache = None
+        if not opts.no_cache:
+            # The service revalidates the nodes itself, so the disk cache
+            # is only used to start warm after a restart
+            cache = derive_cache.Cache(opts.cache_dir, 0,
+                                       offline=opts.offline)
+        backend = undercloud.get_backend(opts.backend,
+                                         pool_size=opts.max_workers)
+        service = DeriveService(backend, cache, opts.refresh_interval,
+                                opts.max_workers)
+        if opts.unix_socket:
+            server = DeriveUnixHTTPServer(service, opts.unix_socket,
+                                          opts.verbose)
+            print('Listening on %s' % opts.unix_socket)
+        else:
+            server = DeriveHTTPServer(service, opts.host, opts.port,
+                                      opts.verbose)
+            print('Listening on http://%s:%d' % server.server_address[:2])
+        sys.stdout.flush()
+        service.start()
+        # Stops cleanly on SIGTERM as well as on ^C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        server.server_close()
+        service.stop()
+
+    except Exception as exc:
+        print("Error: %s" % exc)
@@ -0,0 +1,144 @@
+import gzip
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+
+from derive_common import introspection
+
+DEFAULT_PROCESSES = multiprocessing.cpu_count()
+DEFAULT_CHUNKSIZE = 4
+
+
+# Offline batch derivation over the saved introspection data, without
+# accessing undercloud. The introspection data is read from
+#  - a directory of '*.json' or '*.json.gz' files, one node per file,
+#  - a tar archive (optionally compressed) of '*.json' files or
+#  - a JSON lines file, one node introspection data per line.
+#
+# The sources are parsed and derived in a pool of worker processes and
+# the results are yielded in the source order as soon as they are ready.
+
+# Gets the (name, path, text) of each introspection data in path. The
+# files in a directory are read by the workers, so only the text of the
+# tar archive members and JSON lines are passed to the workers.
+def iter_sources(path):
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.json') or name.endswith('.json.gz'):
+                yield name, os.path.join(path, name), None
+    elif tarfile.is_tarfile(path):
+        # Stream mode reads the archive members sequentially
+        archive = tarfile.open(path, 'r|*')
+        try:
+            for member in archive:
+                if not member.isfile() or not (
+                        member.name.endswith('.json') or
+                        member.name.endswith('.json.gz')):
+                    continue
+                data = archive.extractfile(member).read()
+                if member.name.endswith('.gz'):
+                    data = gzip_decompress(data)
+                yield member.name, None, data.decode('utf-8')
+        finally:
+            archive.close()
+    elif path.endswith('.json') or path.endswith('.json.gz'):
+        yield os.path.basename(path), path, None
+    else:
+        with open(path) as lines_file:
+            for index, line in enumerate(lines_file):
+                if line.strip():
+                    yield ('%(path)s:%(line)d' % {
+                        'path': os.path.basename(path), 'line': index + 1},
+                        None, line)
+
+
+# Gets the node name for the source name, without the directory and the
+# '.json' or '.json.gz' extension
+def get_node_name(name):
+    name = os.path.basename(name)
+    for ext in ('.json.gz', '.json'):
+        if name.endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def gzip_decompress(data):
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as gzip_file:
+        return gzip_file.read()
+
+
+# Loads the introspection data fields used for deriving the parameters
+def load_source(path, text):
+    if text is None:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as data_file:
+            return introspection.load(data_file)
+    return introspection.loads(text)
+
+
+def _run_source(args):
+    func, user_input, name, path, text = args
+    try:
+        return name, func(load_source(path, text), user_input), None
+    except Exception as exc:
+        return name, None, '%s' % exc
+
+
+# Runs func(hw_data, user_input) for each source in path using a pool
+# of processes and yields (name, result, error) in the source order.
+# func has to be a module level function, so that it can be passed to
+# the worker processes. Only a bounded window of sources is queued to
+# the workers at a time, to keep the memory flat for large catalogues.
+def run_batch(path, func, user_input, processes=DEFAULT_PROCESSES,
+              chunksize=DEFAULT_CHUNKSIZE):
+    processes = max(1, int(processes))
+    window = processes * chunksize * 4
+    sources = iter_sources(path)
+    pool = multiprocessing.Pool(processes)
+    try:
+        while True:
+            tasks = [(func, user_input, name, source_path, text)
+                     for name, source_path, text in
+                     itertools.islice(sources, window)]
+            if not tasks:
+                break
+            for result in pool.imap(_run_source, tasks, chunksize):
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# Derives the parameters for each source in path and writes a JSON line
+# for each node to output (stdout) as soon as it is derived, along with
+# the environment file of each node when emitter is given. Returns the
+# summary line and the number of failed sources.
+def derive_batch(path, func, user_input, processes=DEFAULT_PROCESSES,
+                 output=None, emitter=None):
+    output = output or sys.stdout
+    start = time.time()
+    derived = 0
+    failed = 0
+    for name, result, error in run_batch(path, func, user_input, processes):
+        if error is not None:
+            failed += 1
+            line = {'source': name, 'error': error}
+        else:
+            derived += 1
+            parameters, hiera_variables = result
+            line = {'source': name, 'parameters': parameters,
+                    'hiera_variables': hiera_variables}
+            if emitter is not None:
+                line['environment_file'] = emitter.emit(
+                    parameters, hiera_variables, get_node_name(name))
+        output.write(json.dumps(line, sort_keys=True) + '\n')
+        output.flush()
+    summary = ('# Batch summary: %(ok)d node(s) derived, %(failed)d failed '
+               'in %(elapsed).1f seconds' % {'ok': derived, 'failed': failed,
+                                             'elapsed': time.time() - start})
+    return summary, failed
@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+
+from derive_common import timings
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'tripleo-derive-params')
+DEFAULT_CACHE_TTL = 3600
+
+
+# On-disk cache for the undercloud data like introspection data.
+# Each entry is stored as a gzip compressed JSON file keyed by name, along
+# with the time it was stored and an optional version (for example the
+# introspection finished_at timestamp of the node).
+# Entries are used as is for ttl seconds. Older versioned entries are
+# revalidated with the version callable and fetched again only if the
+# version has changed, the version read being stored with the fetched
+# data, and older entries without version are fetched again. In refresh
+# mode the cached entries are ignored and in offline mode only the cached
+# entries are used.
+class Cache(object):
+    def __init__(self, cache_dir=None, ttl=DEFAULT_CACHE_TTL,
+                 refresh=False, offline=False):
+        if refresh and offline:
+            raise Exception("Cache refresh and offline modes can not "
+                            "be used together")
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.ttl = ttl
+        self.refresh = refresh
+        self.offline = offline
+
+    def _path(self, key):
+        name = re.sub('[^A-Za-z0-9_.-]', '_', key)
+        return os.path.join(self.cache_dir, name + '.json.gz')
+
+    # Loads the cache entry, returns None if not available or unreadable
+    @timings.timed('cache.read')
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rb') as cache_file:
+                return json.loads(cache_file.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            return None
+
+    # Stores the cache entry atomically, so that concurrent readers never
+    # see a partially written file.
+    @timings.timed('cache.write')
+    def store(self, key, data, version=None):
+        if not os.path.isdir(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                if not os.path.isdir(self.cache_dir):
+                    raise
+        entry = {'stored_at': time.time(), 'version': version, 'data': data}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                with gzip.GzipFile(fileobj=tmp_file, mode='wb') as cache_file:
+                    cache_file.write(json.dumps(entry).encode('utf-8'))
+            os.rename(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # Removes the cache entry
+    def invalidate(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Gets the data for key from cache or using fetch callable.
+    # get_version callable returns the current version of the data and is
+    # used to revalidate the cached entry older than ttl (the cache ttl by
+    # default) without fetching the data. A revalidated entry is stored
+    # again, to be used as is for another ttl seconds.
+    def get(self, key, fetch, get_version=None, ttl=None):
+        entry = None
+        if not self.refresh:
+            entry = self.load(key)
+
+        if self.offline:
+            if entry is None:
+                raise Exception("Cached data for '%s' is not available "
+                                "in offline mode" % key)
+            return entry['data']
+
+        if ttl is None:
+            ttl = self.ttl
+        if (entry is not None and
+                time.time() - entry.get('stored_at', 0) < ttl):
+            return entry['data']
+
+        version = None
+        if get_version is not None:
+            version = get_version()
+            if (entry is not None and version is not None and
+                    entry.get('version') == version):
+                self.store(key, entry['data'], version)
+                return entry['data']
+
+        data = fetch()
+        self.store(key, data, version)
+        return data
@@ -0,0 +1,163 @@
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
+
+
+# Conversions between the CPU (or NUMA node) number lists, the Linux
+# range format like '0-3,8,^2' and the hex masks, shared by the derive
+# and validation scripts.
+#
+# The numbers are held as a bitset (python long integer, bit N set for
+# number N). The bitset is built from and converted back to a '0'/'1'
+# string with int(s, 2) and bin(), and the ranges are found with
+# str.find() over that string, so every conversion is linear in the
+# largest number and none of them scans a python list for membership.
+
+# Hex digits in each comma separated group of the kernel cpumask format
+# like '00000000,0000ffff' (32 bits per group)
+KERNEL_MASK_GROUP_DIGITS = 8
+
+
+def _bits_from_flags(flags):
+    if not flags:
+        return 0
+    return int(flags[::-1].decode('ascii'), 2)
+
+
+# Parses the number list like '1,2,3' or [1, 2, 3] into integers
+def parse_number_list(num_list):
+    try:
+        if isinstance(num_list, string_types):
+            numbers = [int(num) for num in
+                       num_list.strip(' \'"[]').replace('\'', '').split(',')
+                       if num.strip()]
+        else:
+            numbers = [int(num) for num in num_list]
+    except ValueError as exc:
+        raise Exception("Invalid number in number list: %s" % exc)
+    if numbers and min(numbers) < 0:
+        raise Exception("Invalid number in number list: negative "
+                        "number %d" % min(numbers))
+    return numbers
+
+
+def number_list_to_bits(num_list):
+    numbers = parse_number_list(num_list)
+    if not numbers:
+        return 0
+    flags = bytearray(b'0') * (max(numbers) + 1)
+    for num in numbers:
+        flags[num] = 0x31
+    return _bits_from_flags(flags)
+
+
+def bits_to_number_list(bits):
+    return [num for num, bit in enumerate(bin(bits)[:1:-1]) if bit == '1']
+
+
+# Parses the range format like '0-3,8,^2', "'0-3,8'" or "['0-3', '8']"
+# (or the list of range strings) into the bitset. Numbers prefixed with
+# '^' are excluded from the result.
+def range_list_to_bits(range_list):
+    if isinstance(range_list, string_types):
+        range_list = range_list.strip(' \'"[]').split(',')
+    ranges = []
+    excludes = []
+    max_num = -1
+    try:
+        for val in range_list:
+            val = str(val).strip(' \'"')
+            if not val:
+                continue
+            if val.startswith('^'):
+                excludes.append(int(val[1:]))
+            elif '-' in val:
+                range_min, range_max = val.split('-', 1)
+                range_min = int(range_min)
+                range_max = int(range_max)
+                if range_min < 0 or range_max < range_min:
+                    raise ValueError("invalid range '%s'" % val)
+                ranges.append((range_min, range_max))
+                max_num = max(max_num, range_max)
+            else:
+                num = int(val)
+                if num < 0:
+                    raise ValueError("negative number %d" % num)
+                ranges.append((num, num))
+                max_num = max(max_num, num)
+    except ValueError as exc:
+        raise Exception("Invalid number in range list: %s" % exc)
+
+    flags = bytearray(b'0') * (max_num + 1)
+    for range_min, range_max in ranges:
+        flags[range_min:range_max + 1] = b'1' * (range_max - range_min + 1)
+    for num in excludes:
+        if 0 <= num <= max_num:
+            flags[num] = 0x30
+    return _bits_from_flags(flags)
+
+
+# Gets the ranges like ['0-3', '8'] for the consecutive numbers
+def bits_to_range_list(bits):
+    bin_bits = bin(bits)[:1:-1]
+    range_list = []
+    range_min = bin_bits.find('1')
+    while range_min >= 0:
+        range_end = bin_bits.find('0', range_min)
+        if range_end < 0:
+            range_end = len(bin_bits)
+        if range_end - 1 == range_min:
+            range_list.append(str(range_min))
+        else:
+            range_list.append('%d-%d' % (range_min, range_end - 1))
+        range_min = bin_bits.find('1', range_end)
+    return range_list
+
+
+# Parses the hex mask into the bitset. Both the OVS format like
+# '0x30003' or '30003' and the kernel cpumask format with comma
+# separated 32 bit groups like '00000003,00000003' are accepted.
+def mask_to_bits(mask):
+    mask = mask.strip(' \'"\n')
+    if mask[:2].lower() == '0x':
+        mask = mask[2:]
+    groups = mask.split(',')
+    for index, group in enumerate(groups):
+        if len(group) > KERNEL_MASK_GROUP_DIGITS and len(groups) > 1:
+            raise Exception("Invalid mask '%s': group '%s' is longer than "
+                            "32 bits" % (mask, group))
+        if index:
+            groups[index] = group.zfill(KERNEL_MASK_GROUP_DIGITS)
+    try:
+        return int(''.join(groups) or '0', 16)
+    except ValueError:
+        raise Exception("Invalid mask '%s'" % mask)
+
+
+# Gets the hex mask for the bitset, in the kernel cpumask format with
+# comma separated 32 bit groups if kernel_format is set
+def bits_to_mask(bits, kernel_format=False):
+    mask = '%x' % bits
+    if not kernel_format:
+        return mask
+    digits = KERNEL_MASK_GROUP_DIGITS
+    mask = mask.zfill(((len(mask) + digits - 1) // digits) * digits)
+    return ','.join([mask[index:index + digits]
+                     for index in range(0, len(mask), digits)])
+
+
+def number_list_to_range_list(num_list):
+    return bits_to_range_list(number_list_to_bits(num_list))
+
+
+def range_list_to_number_list(range_list):
+    return bits_to_number_list(range_list_to_bits(range_list))
+
+
+def mask_to_number_list(mask):
+    return bits_to_number_list(mask_to_bits(mask))
+
+
+def number_list_to_mask(num_list, kernel_format=False):
+    return bits_to_mask(number_list_to_bits(num_list), kernel_format)
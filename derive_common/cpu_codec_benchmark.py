@@ -0,0 +1,158 @@
+import argparse
+import random
+import sys
+import timeit
+
+from derive_common import cpu_codec
+
+DEFAULT_SIZES = [1024, 2048, 4096, 8192]
+
+
+# Micro-benchmark of the cpu_codec conversions for 1024 to 8192 CPU ids,
+# along with the list scanning helpers which were previously copied in
+# the derive and validation scripts, for comparison.
+#
+# Usage: python -m derive_common.cpu_codec_benchmark [-s 1024 2048] [-l]
+
+
+# Previous convert_number_to_range_list implementation
+def legacy_number_to_range_list(num_list):
+    num_list = [int(num.strip(' '))
+                for num in num_list.split(",")]
+    num_list.sort()
+    range_list = []
+    range_min = num_list[0]
+    for num in num_list:
+        next_val = num + 1
+        if next_val not in num_list:
+            if range_min != num:
+                range_list.append(str(range_min) + '-' + str(num))
+            else:
+                range_list.append(str(range_min))
+            next_index = num_list.index(num) + 1
+            if next_index < len(num_list):
+                range_min = num_list[next_index]
+    return range_list
+
+
+# Previous convert_range_to_number_list implementation
+def legacy_range_to_number_list(range_list):
+    num_list = []
+    exclude_num_list = []
+    for val in range_list.split(','):
+        if '^' in val:
+            exclude_num_list.append(int(val[1:]))
+        elif '-' in val:
+            split_list = val.split("-")
+            num_list.extend(range(int(split_list[0]),
+                                  int(split_list[1]) + 1))
+        else:
+            num_list.append(int(val))
+    return [num for num in num_list if num not in exclude_num_list]
+
+
+# Previous get_cpus_list_from_mask_value implementation
+def legacy_mask_to_number_list(mask_val):
+    cpus_list = []
+    rev_bin_mask_val = bin(int(mask_val, 16))[2:][::-1]
+    thread = 0
+    for bin_val in rev_bin_mask_val:
+        if bin_val == '1':
+            cpus_list.append(thread)
+        thread += 1
+    return cpus_list
+
+
+# Builds the sample data for size CPU ids, leaving out a few random
+# cpus to split the ranges and to exclude them with '^'
+def get_sample(size):
+    rand = random.Random(size)
+    skipped = set(rand.sample(range(size), size // 16))
+    excluded = sorted(rand.sample(range(size), size // 64))
+    numbers = [num for num in range(size) if num not in skipped]
+    num_list = ','.join([str(num) for num in numbers])
+    range_list = ','.join(cpu_codec.number_list_to_range_list(numbers) +
+                          ['^%d' % num for num in excluded])
+    mask = cpu_codec.number_list_to_mask(numbers)
+    kernel_mask = cpu_codec.number_list_to_mask(numbers, kernel_format=True)
+    return num_list, range_list, mask, kernel_mask
+
+
+def get_cases(size, legacy):
+    num_list, range_list, mask, kernel_mask = get_sample(size)
+    cases = [
+        ('number list -> ranges',
+         lambda: cpu_codec.number_list_to_range_list(num_list)),
+        ('ranges -> number list',
+         lambda: cpu_codec.range_list_to_number_list(range_list)),
+        ('hex mask -> number list',
+         lambda: cpu_codec.mask_to_number_list(mask)),
+        ('kernel mask -> number list',
+         lambda: cpu_codec.mask_to_number_list(kernel_mask)),
+        ('number list -> kernel mask',
+         lambda: cpu_codec.number_list_to_mask(num_list, True)),
+    ]
+    if legacy:
+        cases.extend([
+            ('legacy number list -> ranges',
+             lambda: legacy_number_to_range_list(num_list)),
+            ('legacy ranges -> number list',
+             lambda: legacy_range_to_number_list(range_list)),
+            ('legacy hex mask -> number list',
+             lambda: legacy_mask_to_number_list(mask)),
+        ])
+    return cases
+
+
+# Runs each case repeat times and gets the best time per call in
+# microseconds
+def run_benchmark(sizes, repeat=5, number=0, legacy=False):
+    results = []
+    for size in sizes:
+        for name, func in get_cases(size, legacy):
+            calls = number
+            if not calls:
+                # Calibrates the number of calls for about 0.1 second
+                calls = 1
+                while timeit.timeit(func, number=calls) < 0.1:
+                    calls *= 4
+            best = min(timeit.repeat(func, repeat=repeat, number=calls))
+            results.append((size, name, best / calls * 1e6))
+    return results
+
+
+def display_results(results):
+    print('%-8s %-32s %14s' % ('CPUs', 'Conversion', 'usec per call'))
+    for size, name, usec in results:
+        print('%-8d %-32s %14.1f' % (size, name, usec))
+
+
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark of the cpu list, range and mask '
+                    'conversions')
+    parser.add_argument('-s', '--sizes',
+                        metavar='CPUS',
+                        type=int,
+                        nargs='+',
+                        default=DEFAULT_SIZES)
+    parser.add_argument('-r', '--repeat',
+                        type=int,
+                        default=5)
+    parser.add_argument('-n', '--number',
+                        help="""calls per repeat, calibrated if not
+                                given.""",
+                        type=int,
+                        default=0)
+    parser.add_argument('-l', '--legacy',
+                        help="""also runs the previous list scanning
+                                implementations.""",
+                        action='store_true',
+                        default=False)
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == '__main__':
+    opts = parse_opts(sys.argv)
+    display_results(run_benchmark(opts.sizes, opts.repeat, opts.number,
+                                  opts.legacy))
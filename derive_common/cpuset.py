@@ -0,0 +1,112 @@
+from derive_common import cpu_codec
+from derive_common.cpu_codec import string_types
+
+
+# Set of CPU ids backed by a bitset (python long integer), bit N is set
+# when CPU N is in the set. Union, difference, intersection and
+# membership are single integer operations, so building the pin sets for
+# large hosts does not rescan the comma separated cpu strings.
+#
+# A CpuSet is immutable and can be created from a list of CPU ids, a
+# comma separated list or range string like '1-3,8,^2' (optionally
+# quoted or in the "['1-3', '8']" heat array form) or a hex mask, using
+# the cpu_codec conversions.
+# Iterating the set yields the CPU ids in ascending order.
+class CpuSet(object):
+    __slots__ = ('bits',)
+
+    def __init__(self, cpus=None):
+        bits = 0
+        if isinstance(cpus, CpuSet):
+            bits = cpus.bits
+        elif cpus is not None:
+            bits = cpu_codec.number_list_to_bits(cpus)
+        self.bits = bits
+
+    @classmethod
+    def from_bits(cls, bits):
+        cpuset = cls()
+        cpuset.bits = bits
+        return cpuset
+
+    # Parses the range format cpus like '0-3,8,^2' or "['0-3', '8']"
+    @classmethod
+    def from_range_string(cls, range_list):
+        return cls.from_bits(cpu_codec.range_list_to_bits(range_list))
+
+    # Parses the hex mask like 'f0', '0x30003' or '00000003,00000003'
+    @classmethod
+    def from_mask(cls, mask):
+        return cls.from_bits(cpu_codec.mask_to_bits(mask))
+
+    # Creates the set from CpuSet, list of CPU ids or range string
+    @classmethod
+    def parse(cls, cpus):
+        if isinstance(cpus, CpuSet):
+            return cpus
+        if isinstance(cpus, string_types):
+            return cls.from_range_string(cpus)
+        cpus = list(cpus)
+        if any(isinstance(cpu, string_types) for cpu in cpus):
+            return cls.from_range_string(cpus)
+        return cls(cpus)
+
+    def __iter__(self):
+        return iter(cpu_codec.bits_to_number_list(self.bits))
+
+    def __len__(self):
+        return bin(self.bits).count('1')
+
+    def __bool__(self):
+        return self.bits != 0
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, cpu):
+        return cpu >= 0 and (self.bits >> cpu) & 1 == 1
+
+    def __eq__(self, other):
+        return isinstance(other, CpuSet) and self.bits == other.bits
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __or__(self, other):
+        return CpuSet.from_bits(self.bits | CpuSet.parse(other).bits)
+
+    def __and__(self, other):
+        return CpuSet.from_bits(self.bits & CpuSet.parse(other).bits)
+
+    def __sub__(self, other):
+        return CpuSet.from_bits(self.bits & ~CpuSet.parse(other).bits)
+
+    def __xor__(self, other):
+        return CpuSet.from_bits(self.bits ^ CpuSet.parse(other).bits)
+
+    def issubset(self, other):
+        return self.bits & ~CpuSet.parse(other).bits == 0
+
+    def issuperset(self, other):
+        return CpuSet.parse(other).bits & ~self.bits == 0
+
+    def to_list(self):
+        return cpu_codec.bits_to_number_list(self.bits)
+
+    # Gets the ranges like ['0-3', '8'] for the consecutive cpus
+    def to_range_list(self):
+        return cpu_codec.bits_to_range_list(self.bits)
+
+    def to_range_string(self):
+        return ','.join(self.to_range_list())
+
+    def to_mask(self, kernel_format=False):
+        return cpu_codec.bits_to_mask(self.bits, kernel_format)
+
+    def __str__(self):
+        return ','.join([str(cpu) for cpu in self])
+
+    def __repr__(self):
+        return 'CpuSet(%r)' % self.to_range_string()
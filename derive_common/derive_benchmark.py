@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from derive_common import derivers
+from derive_common import topology_generator
+from derive_common.nics import NicIndex
+from derive_common.topology import Topology
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'derive_benchmark_baselines.json')
+# Slowdown percentage over the baseline reported as a regression, the
+# calls slower than the baseline by less than MIN_REGRESSION_USEC are not
+# reported to ignore the timer noise of the fastest calls
+DEFAULT_TOLERANCE = 50
+MIN_REGRESSION_USEC = 2.0
+
+
+# Micro-benchmark of the DPDK derivation steps, and of the end-to-end
+# derivation, on the synthetic topologies of the topology_generator
+# profiles. The times are compared with the baselines stored for the
+# python major version, and the benchmark fails on regressions. The
+# baselines depend on the machine, they are saved again with --save
+# after a change making the derivation faster, or on another machine.
+#
+# Usage: python -m derive_common.derive_benchmark [-p small large] [--save]
+
+
+# Gets the DPDK user input of the profile, with the first NIC having
+# carrier of each NUMA node as DPDK NIC
+def get_user_input(hw_data):
+    nic_index = NicIndex.from_introspection(hw_data)
+    dpdk_nics = []
+    numa_nodes = []
+    for name in nic_index.ordered_nics:
+        numa_node = nic_index.get_numa_node(name)
+        if numa_node not in numa_nodes:
+            numa_nodes.append(numa_node)
+            dpdk_nics.append({'nic': name, 'mtu': 9000})
+    return {'dpdk_nics': dpdk_nics,
+            'num_phy_cores_per_numa_node_for_pmd': 2}
+
+
+def get_cases(profile):
+    deriver = derivers.load_deriver('dpdk')
+    hw_data = topology_generator.generate_profile(profile)
+    topology = Topology.from_introspection(hw_data)
+    user_input = get_user_input(hw_data)
+    dpdk_nics_info = deriver.get_dpdk_nics_numa_info(
+        deriver.get_nic_index(hw_data), user_input['dpdk_nics'])
+    dpdk_cpus = deriver.get_dpdk_core_list(topology, dpdk_nics_info, 2)
+    host_cpus = deriver.get_host_cpus_list(topology)
+    nova_cpus = deriver.get_nova_cpus_list(topology, dpdk_cpus, host_cpus)
+    numa_node = dpdk_nics_info[0]['numa_node']
+    return [
+        ('get_dpdk_core_list',
+         lambda: deriver.get_dpdk_core_list(topology, dpdk_nics_info, 2)),
+        ('get_host_cpus_list',
+         lambda: deriver.get_host_cpus_list(topology)),
+        ('get_nova_cpus_list',
+         lambda: deriver.get_nova_cpus_list(topology, dpdk_cpus, host_cpus)),
+        ('convert_number_to_range_list',
+         lambda: deriver.convert_number_to_range_list(nova_cpus)),
+        ('calculate_node_socket_memory',
+         lambda: deriver.calculate_node_socket_memory(
+             numa_node, dpdk_nics_info, deriver.MBUF_OVERHEAD,
+             deriver.SHARED_POOL_MBUFS, deriver.MINIMUM_SOCKET_MEMORY)),
+        ('end-to-end derive',
+         lambda: deriver.derive_hw_data_parameters(hw_data, user_input)),
+    ]
+
+
+# Runs each case repeat times and gets the best time per call in
+# microseconds
+def run_benchmark(profiles, repeat=5, number=0):
+    results = []
+    for profile in profiles:
+        for name, func in get_cases(profile):
+            calls = number
+            if not calls:
+                # Calibrates the number of calls for about 0.1 second
+                calls = 1
+                while timeit.timeit(func, number=calls) < 0.1:
+                    calls *= 4
+            best = min(timeit.repeat(func, repeat=repeat, number=calls))
+            results.append((profile, name, best / calls * 1e6))
+    return results
+
+
+# Gets the key of the baselines for the running python version, the
+# times of python 2 and 3 are not comparable
+def get_python_key():
+    return 'python%d' % sys.version_info[0]
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baselines_file:
+        return json.load(baselines_file).get(get_python_key(), {})
+
+
+# Saves the results as the baselines of the running python version,
+# keeping the baselines of the other versions and profiles
+def save_baselines(path, results):
+    all_baselines = {}
+    if os.path.exists(path):
+        with open(path) as baselines_file:
+            all_baselines = json.load(baselines_file)
+    baselines = all_baselines.setdefault(get_python_key(), {})
+    for profile, name, usec in results:
+        baselines.setdefault(profile, {})[name] = round(usec, 2)
+    with open(path, 'w') as baselines_file:
+        json.dump(all_baselines, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write('\n')
+
+
+# Gets the (profile, case, usec, baseline usec) of the results slower
+# than their baseline by more than the tolerance percentage
+def get_regressions(results, baselines, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for profile, name, usec in results:
+        baseline = baselines.get(profile, {}).get(name)
+        if baseline is None:
+            continue
+        if (usec > baseline * (100 + tolerance) / 100.0 and
+                usec - baseline > MIN_REGRESSION_USEC):
+            regressions.append((profile, name, usec, baseline))
+    return regressions
+
+
+def display_results(results, baselines):
+    print('%-8s %-30s %14s %14s %8s' % ('Profile', 'Case', 'usec per call',
+                                        'baseline', 'change'))
+    for profile, name, usec in results:
+        baseline = baselines.get(profile, {}).get(name)
+        if baseline:
+            print('%-8s %-30s %14.1f %14.1f %+7.0f%%' % (
+                profile, name, usec, baseline,
+                (usec - baseline) * 100 / baseline))
+        else:
+            print('%-8s %-30s %14.1f %14s %8s' % (profile, name, usec,
+                                                   '-', '-'))
+
+
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark of the DPDK parameters derivation')
+    parser.add_argument('-p', '--profiles',
+                        metavar='PROFILE',
+                        nargs='+',
+                        choices=topology_generator.PROFILE_NAMES,
+                        default=topology_generator.PROFILE_NAMES)
+    parser.add_argument('-r', '--repeat',
+                        type=int,
+                        default=5)
+    parser.add_argument('-n', '--number',
+                        help="""calls per repeat, calibrated if not
+                                given.""",
+                        type=int,
+                        default=0)
+    parser.add_argument('-b', '--baselines',
+                        metavar='BASELINES JSON',
+                        help="""file of the stored baselines.""",
+                        default=DEFAULT_BASELINES)
+    parser.add_argument('-t', '--tolerance',
+                        help="""slowdown percentage over the baseline
+                                reported as a regression.""",
+                        type=int,
+                        default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save',
+                        help="""saves the results as the baselines.""",
+                        action='store_true',
+                        default=False)
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == '__main__':
+    opts = parse_opts(sys.argv)
+    results = run_benchmark(opts.profiles, opts.repeat, opts.number)
+    if opts.save:
+        save_baselines(opts.baselines, results)
+        display_results(results, {})
+        print('Baselines are written to: %s' % opts.baselines)
+        sys.exit(0)
+
+    baselines = load_baselines(opts.baselines)
+    display_results(results, baselines)
+    regressions = get_regressions(results, baselines, opts.tolerance)
+    if regressions:
+        print('')
+        for profile, name, usec, baseline in regressions:
+            print('Regression: %(profile)s %(name)s %(usec).1f usec, '
+                  'baseline %(baseline).1f usec' % {
+                      'profile': profile, 'name': name, 'usec': usec,
+                      'baseline': baseline})
+        sys.exit(1)
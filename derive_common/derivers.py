@@ -0,0 +1,38 @@
+import os
+import sys
+
+# Derive scripts by deriver name, relative to the repository root. The
+# script directories are not python packages, so the scripts are loaded
+# from their path to reuse the derivation functions in process.
+DERIVERS = {'dpdk': ('dpdk-derive-params', 'dpdk_derive_params.py'),
+            'sriov': ('sriov-derive-params', 'sriov_derive_params.py')}
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir)
+
+
+# Loads the python script at path as module_name
+def load_source(module_name, path):
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(module_name, path)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# Loads the derive script module for deriver name ('dpdk' or 'sriov').
+# The module is loaded once and shared by the callers.
+def load_deriver(name):
+    if name not in DERIVERS:
+        raise Exception("Invalid deriver '%s'" % name)
+    script_dir, script_name = DERIVERS[name]
+    module_name = os.path.splitext(script_name)[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    return load_source(module_name,
+                        os.path.join(ROOT_DIR, script_dir, script_name))
@@ -0,0 +1,165 @@
+import json
+import os
+import re
+import tempfile
+
+import yaml
+
+FORMATS = ['text', 'yaml', 'json']
+DEFAULT_FORMAT = 'text'
+DEFAULT_ROLE_NAME = 'Compute'
+EXTENSIONS = {'yaml': '.yaml', 'json': '.json'}
+
+# Heat templates deploying the derived parameters that the overcloud
+# templates do not consume. When the registration is enabled and the
+# parameter is derived, the template is copied next to the environment
+# file and registered as the <RoleName>ExtraConfigPre of the role with a
+# path relative to the environment file. A role has a single
+# ExtraConfigPre, so the registration replaces the ExtraConfigPre of the
+# role registered by another environment file deployed before it.
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'templates')
+EXTRA_CONFIG_TEMPLATES = {
+    'ComputeHugepagesPerNumaNode': 'hugepages-per-numa-node.yaml'}
+
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
+
+
+# Heat environment YAML dumper, which double quotes the strings having
+# single quotes like "'1,2,3'" instead of escaping them
+class EnvironmentDumper(yaml.SafeDumper):
+    def ignore_aliases(self, data):
+        return True
+
+
+def _represent_str(dumper, data):
+    style = '"' if "'" in data else None
+    return dumper.represent_scalar('tag:yaml.org,2002:str', data, style=style)
+
+
+for _string_type in string_types:
+    EnvironmentDumper.add_representer(_string_type, _represent_str)
+
+
+# Gets the value as it is meant to be in the environment file. The heat
+# array values like "['2-21','23-43']" (NovaVcpuPinSet) are converted to
+# lists and the other values are kept as they are displayed.
+def get_environment_value(val):
+    if isinstance(val, string_types) and val.startswith('['):
+        return yaml.safe_load(val)
+    return val
+
+
+# Gets the names of the heat templates deploying the derived parameters
+def get_extra_config_templates(parameters):
+    return [template for key, template in
+            sorted(EXTRA_CONFIG_TEMPLATES.items()) if key in parameters]
+
+
+# Gets the resource registry of the heat templates deploying the derived
+# parameters, with the template paths relative to the environment file
+def get_resource_registry(parameters, role_name=DEFAULT_ROLE_NAME):
+    resource_registry = {}
+    for template in get_extra_config_templates(parameters):
+        resource_registry['OS::TripleO::%sExtraConfigPre' % role_name] = (
+            './' + template)
+    return resource_registry
+
+
+# Gets the heat environment with the derived parameters in the
+# parameter_defaults and the hiera variables in <RoleName>ExtraConfig,
+# and, if extra_config_pre, the heat templates deploying the derived
+# parameters in the resource_registry
+def get_environment(parameters, hiera_variables,
+                    role_name=DEFAULT_ROLE_NAME, extra_config_pre=False):
+    parameter_defaults = {}
+    for key, val in parameters.items():
+        parameter_defaults[key] = get_environment_value(val)
+    extra_config = {}
+    for key, val in hiera_variables.items():
+        extra_config[key] = get_environment_value(val)
+    parameter_defaults[role_name + 'ExtraConfig'] = extra_config
+    environment = {'parameter_defaults': parameter_defaults}
+    resource_registry = {}
+    if extra_config_pre:
+        resource_registry = get_resource_registry(parameters, role_name)
+    if resource_registry:
+        environment['resource_registry'] = resource_registry
+    return environment
+
+
+def format_environment(environment, output_format):
+    if output_format == 'json':
+        return json.dumps(environment, indent=2, sort_keys=True,
+                          separators=(',', ': ')) + '\n'
+    return yaml.dump(environment, Dumper=EnvironmentDumper,
+                     default_flow_style=False)
+
+
+# Writes the file atomically
+def write_file(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as tmp_file:
+            tmp_file.write(content)
+        os.rename(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Writes the derived parameters of each role or node as heat
+# environment files (YAML or JSON) to the output directory. The files
+# are named '<name>-<suffix>.<yaml|json>', where name is the role name
+# or the node UUID in fleet mode or the source name in batch mode. With
+# extra_config_pre, the heat templates deploying the derived parameters
+# are copied to the output directory and registered in the environment
+# files.
+class Emitter(object):
+    def __init__(self, output_format, output_dir,
+                 role_name=DEFAULT_ROLE_NAME, suffix='',
+                 extra_config_pre=False):
+        if output_format not in EXTENSIONS:
+            raise Exception("Invalid output format '%s'" % output_format)
+        if not output_dir:
+            raise Exception("Output directory is required for '%s' "
+                            "output format" % output_format)
+        self.output_format = output_format
+        self.output_dir = output_dir
+        self.role_name = role_name
+        self.suffix = suffix
+        self.extra_config_pre = extra_config_pre
+
+    def get_path(self, name=None):
+        name = name or self.role_name
+        if self.suffix:
+            name += '-' + self.suffix
+        name = re.sub('[^A-Za-z0-9_.-]', '_', name)
+        return os.path.join(self.output_dir,
+                            name + EXTENSIONS[self.output_format])
+
+    # Copies the heat templates registered in the environment file next
+    # to it
+    def copy_templates(self, parameters):
+        for template in get_extra_config_templates(parameters):
+            with open(os.path.join(TEMPLATES_DIR, template)) as source:
+                write_file(os.path.join(self.output_dir, template),
+                           source.read())
+
+    # Writes the environment file atomically and returns its path
+    def emit(self, parameters, hiera_variables, name=None):
+        environment = get_environment(parameters, hiera_variables,
+                                      self.role_name, self.extra_config_pre)
+        content = format_environment(environment, self.output_format)
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+        if self.extra_config_pre:
+            self.copy_templates(parameters)
+        path = self.get_path(name)
+        write_file(path, content)
+        return path
@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import time
+
+from derive_common import fake_undercloud
+from derive_common import undercloud
+
+# Fake openstack, ironic, nova and mistral CLIs serving the canned data of
+# fake_undercloud, for the commands used by the CLI backend. The scripts
+# running it are written by 'fake_undercloud --bin_dir', the data file,
+# latency, failure rate and seed are read from the FAKE_UNDERCLOUD_DATA,
+# FAKE_UNDERCLOUD_LATENCY, FAKE_UNDERCLOUD_FAILURE_RATE and
+# FAKE_UNDERCLOUD_SEED environment variables.
+#
+# Usage: python -m derive_common.fake_cli openstack flavor show compute
+
+
+class CommandError(Exception):
+    pass
+
+
+def load_data():
+    path = os.environ.get('FAKE_UNDERCLOUD_DATA')
+    if not path:
+        raise CommandError("FAKE_UNDERCLOUD_DATA is not set")
+    with open(path) as data_file:
+        return json.load(data_file), os.path.dirname(path)
+
+
+# Formats the fields like the openstack CLI table output
+def format_table(fields):
+    width = max([len(key) for key, val in fields] + [len('Field')])
+    value_width = max([len(val) for key, val in fields] + [len('Value')])
+    border = '+-%s-+-%s-+' % ('-' * width, '-' * value_width)
+    lines = [border, '| %s | %s |' % ('Field'.ljust(width),
+                                      'Value'.ljust(value_width)), border]
+    for key, val in fields:
+        lines.append('| %s | %s |' % (key.ljust(width),
+                                      val.ljust(value_width)))
+    lines.append(border)
+    return '\n'.join(lines)
+
+
+def flavor_show(data, data_dir, name):
+    for flavor in data.get('flavors', []):
+        if name in (flavor['name'], flavor['id']):
+            properties = ', '.join(["%s='%s'" % (key, val) for key, val in
+                                    sorted(flavor.get('extra_specs',
+                                                      {}).items())])
+            return format_table([('id', flavor['id']),
+                                 ('name', flavor['name']),
+                                 ('properties', properties)])
+    raise CommandError("No flavor with a name or ID of '%s' exists." % name)
+
+
+def profiles_list(data, data_dir):
+    return json.dumps(undercloud.get_profiles_list_from_nodes(
+        data.get('nodes', [])))
+
+
+def get_introspection(data, node_uuid):
+    node = data.get('introspection', {}).get(node_uuid)
+    if node is None:
+        raise CommandError("Introspection data not found for node %s, "
+                           "HTTP 404" % node_uuid)
+    return node
+
+
+def introspection_status(data, data_dir, node_uuid):
+    node = get_introspection(data, node_uuid)
+    return json.dumps({'finished': True, 'error': None,
+                       'finished_at': node.get('finished_at')})
+
+
+# Prints the node introspection data, read from the separate node file
+# written by fake_undercloud when it is not in the canned data
+def introspection_data_save(data, data_dir, node_uuid):
+    node = get_introspection(data, node_uuid)
+    if 'data' in node:
+        return json.dumps(node['data'])
+    with open(os.path.join(data_dir, 'introspection',
+                           node_uuid + '.json')) as node_file:
+        return node_file.read()
+
+
+def node_list(data, data_dir):
+    return json.dumps([{'uuid': node['uuid'],
+                        'name': node.get('name'),
+                        'instance_uuid': node.get('instance_uuid'),
+                        'power_state': node.get('power_state'),
+                        'provision_state': node.get('provision_state'),
+                        'maintenance': node.get('maintenance', False)}
+                       for node in data.get('nodes', [])])
+
+
+def server_show(data, data_dir, server_id):
+    for server in data.get('servers', []):
+        if server['id'] == server_id:
+            fields = [('id', server['id'])]
+            for network, addresses in sorted(
+                    server.get('addresses', {}).items()):
+                fields.append(('%s network' % network,
+                               ', '.join([address['addr']
+                                          for address in addresses])))
+            return format_table(fields)
+    raise CommandError("No server with a name or ID of '%s' exists."
+                       % server_id)
+
+
+def server_list(data, data_dir):
+    return json.dumps([{'ID': server['id'],
+                        'Networks': '; '.join([
+                            '%s=%s' % (network, ', '.join([
+                                address['addr'] for address in addresses]))
+                            for network, addresses in sorted(
+                                server.get('addresses', {}).items())])}
+                       for server in data.get('servers', [])])
+
+
+def run_action(data, data_dir, name):
+    if name != 'tripleo.parameters.get':
+        raise CommandError("Action not found [action_name=%s]" % name)
+    return json.dumps({'result': {'mistral_environment_parameters':
+                                  data.get('parameters', {})}})
+
+
+# Commands as the CLI name and arguments (without the output format and
+# column options) with the number of positional arguments following them
+COMMANDS = [
+    (['openstack', 'flavor', 'show'], 1, flavor_show),
+    (['openstack', 'overcloud', 'profiles', 'list'], 0, profiles_list),
+    (['openstack', 'baremetal', 'introspection', 'status'], 1,
+     introspection_status),
+    (['openstack', 'baremetal', 'introspection', 'data', 'save'], 1,
+     introspection_data_save),
+    (['ironic', 'node-list'], 0, node_list),
+    (['nova', 'show'], 1, server_show),
+    (['openstack', 'server', 'list'], 0, server_list),
+    (['mistral', 'run-action'], 1, run_action),
+]
+
+
+# Runs the command, delayed by the latency and failing when it is an
+# injected failure, and gets its output
+def run_command(argv):
+    args = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in ('-f', '--format', '-c', '--column'):
+            skip = True
+        elif arg != '--json':
+            args.append(arg)
+
+    latency = float(os.environ.get('FAKE_UNDERCLOUD_LATENCY') or 0)
+    if latency:
+        time.sleep(latency)
+    if fake_undercloud.is_failure(
+            float(os.environ.get('FAKE_UNDERCLOUD_FAILURE_RATE') or 0),
+            int(os.environ.get('FAKE_UNDERCLOUD_SEED') or 0),
+            ' '.join(argv)):
+        raise CommandError("Service Unavailable (HTTP 503)")
+
+    data, data_dir = load_data()
+    for command, nargs, func in COMMANDS:
+        if (args[:len(command)] == command and
+                len(args) == len(command) + nargs):
+            return func(data, data_dir, *args[len(command):])
+    raise CommandError("Unknown command '%s'" % ' '.join(argv))
+
+
+if __name__ == '__main__':
+    try:
+        print(run_command(sys.argv[1:]))
+    except (CommandError, IOError) as exc:
+        sys.stderr.write('%s\n' % exc)
+        sys.exit(1)
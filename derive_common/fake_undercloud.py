@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+from derive_common import topology_generator
+
+
+# Fake undercloud HTTP server which serves the Keystone, Nova, Ironic,
+# Ironic-inspector and Mistral APIs used by the REST backend from canned
+# data, to exercise the REST backend without a director node.
+#
+# Canned data format:
+# {"flavors": [{"id": "..", "name": "compute",
+#               "extra_specs": {"capabilities:profile": "compute"}}],
+#  "nodes": [{"uuid": "..", "instance_uuid": "..", "maintenance": false,
+#             "provision_state": "active",
+#             "properties": {"capabilities": "profile:compute"}}],
+#  "servers": [{"id": "..", "addresses": {"ctlplane": [{"addr": ".."}]}}],
+#  "introspection": {"<node uuid>": {"finished_at": "..", "data": {..}}},
+#  "parameters": {"OvercloudComputeFlavor": "compute"}}
+#
+# The canned data of N synthetic nodes of a topology_generator profile is
+# generated with --nodes, and the fake openstack, ironic, nova and mistral
+# CLIs serving the same data are written with --bin_dir (see fake_cli).
+# Each API call or CLI command is delayed by --latency seconds and fails
+# for the --failure_rate fraction of the calls, the failing calls are the
+# same for a --seed so that the runs are reproducible.
+
+USERNAME = 'admin'
+PASSWORD = 'password'
+FINISHED_AT = '2017-01-01T00:00:00'
+CLI_NAMES = ['openstack', 'ironic', 'nova', 'mistral']
+
+
+# Generates the canned data of nodes synthetic nodes of the topology
+# profile, all matching the flavor of the role
+def generate_data(nodes, profile='medium', flavor='compute', role='Compute'):
+    data = {'flavors': [{'id': str(uuid.UUID(int=1)), 'name': flavor,
+                         'extra_specs': {
+                             'capabilities:boot_option': 'local',
+                             'capabilities:profile': flavor}}],
+            'nodes': [],
+            'servers': [],
+            'introspection': {},
+            'parameters': {'Overcloud%sFlavor' % role: flavor}}
+    for index in range(nodes):
+        node_uuid = '%08x-0000-4000-8000-%012x' % (index + 1, index + 1)
+        instance_uuid = '%08x-0000-4000-9000-%012x' % (index + 1, index + 1)
+        data['nodes'].append({
+            'uuid': node_uuid,
+            'name': '%s-%d' % (flavor, index),
+            'instance_uuid': instance_uuid,
+            'maintenance': False,
+            'power_state': 'power on',
+            'provision_state': 'active',
+            'properties': {'capabilities': 'profile:%s,boot_option:local'
+                                           % flavor}})
+        data['servers'].append({'id': instance_uuid, 'addresses': {
+            'ctlplane': [{'addr': '192.168.%d.%d' % (24 + index // 200,
+                                                     10 + index % 200)}]}})
+        data['introspection'][node_uuid] = {
+            'finished_at': FINISHED_AT,
+            'data': topology_generator.generate_profile(profile, index)}
+    return data
+
+
+# Checks whether the call fails with the failure rate. The call fails
+# when the hash of the seed and the call is in the failure rate fraction
+# of the hashes, so the same calls fail again with the same seed.
+def is_failure(failure_rate, seed, call):
+    if failure_rate <= 0:
+        return False
+    call_hash = zlib.crc32(('%d %s' % (seed, call)).encode('utf-8'))
+    return (call_hash & 0xffffffff) / float(2 ** 32) < failure_rate
+
+
+# Writes the canned data for the fake CLIs to the bin directory, the
+# introspection data of each node in a separate file read only by the
+# 'introspection data save' of the node, and the fake CLI scripts
+# running fake_cli with the data, latency and failure rate as defaults
+def write_cli_bin(bin_dir, data, latency=0.0, failure_rate=0.0, seed=0):
+    introspection_dir = os.path.join(bin_dir, 'introspection')
+    if not os.path.isdir(introspection_dir):
+        os.makedirs(introspection_dir)
+    cli_data = dict(data)
+    cli_data['introspection'] = {}
+    for node_uuid, node in data.get('introspection', {}).items():
+        with open(os.path.join(introspection_dir,
+                               node_uuid + '.json'), 'w') as node_file:
+            json.dump(node.get('data', {}), node_file)
+        cli_data['introspection'][node_uuid] = {
+            'finished_at': node.get('finished_at')}
+    data_path = os.path.join(os.path.abspath(bin_dir), 'undercloud.json')
+    with open(data_path, 'w') as data_file:
+        json.dump(cli_data, data_file)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for name in CLI_NAMES:
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as script:
+            script.write(
+                '#!/bin/sh\n'
+                'export FAKE_UNDERCLOUD_DATA="${FAKE_UNDERCLOUD_DATA:-'
+                '%(data)s}"\n'
+                'export FAKE_UNDERCLOUD_LATENCY="${FAKE_UNDERCLOUD_LATENCY:-'
+                '%(latency)s}"\n'
+                'export FAKE_UNDERCLOUD_FAILURE_RATE='
+                '"${FAKE_UNDERCLOUD_FAILURE_RATE:-%(failure_rate)s}"\n'
+                'export FAKE_UNDERCLOUD_SEED="${FAKE_UNDERCLOUD_SEED:-'
+                '%(seed)d}"\n'
+                'PYTHONPATH="%(root)s${PYTHONPATH:+:$PYTHONPATH}" exec '
+                '"%(python)s" -m derive_common.fake_cli %(name)s "$@"\n' % {
+                    'data': data_path, 'latency': latency,
+                    'failure_rate': failure_rate, 'seed': seed,
+                    'root': root, 'python': sys.executable, 'name': name})
+        os.chmod(path, 0o755)
+    return data_path
+
+
+class FakeUndercloudHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _send(self, status, body=None, headers=None):
+        payload = b''
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _authorized(self):
+        return self.headers.get('X-Auth-Token') == self.server.token
+
+    # Delays the API call by the server latency and answers it with an
+    # error when it is an injected failure, Keystone calls are delayed only
+    def _inject(self, method):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.path in ('/v2.0/tokens', '/v3/auth/tokens'):
+            return False
+        if is_failure(self.server.failure_rate, self.server.seed,
+                      method + ' ' + self.path):
+            self._send(503, {'error': 'Service Unavailable'})
+            return True
+        return False
+
+    def do_POST(self):
+        body = self._read_body()
+        if self._inject('POST'):
+            return
+        if self.path == '/v2.0/tokens':
+            creds = body.get('auth', {}).get('passwordCredentials', {})
+            if (creds.get('username') != USERNAME or
+                    creds.get('password') != PASSWORD):
+                return self._send(401, {'error': 'Unauthorized'})
+            return self._send(200, {'access': {
+                'token': {'id': self.server.token},
+                'serviceCatalog': self.server.catalog('v2')}})
+        if self.path == '/v3/auth/tokens':
+            user = body.get('auth', {}).get('identity', {}).get(
+                'password', {}).get('user', {})
+            if (user.get('name') != USERNAME or
+                    user.get('password') != PASSWORD):
+                return self._send(401, {'error': 'Unauthorized'})
+            return self._send(201, {'token': {
+                'catalog': self.server.catalog('v3')}},
+                {'X-Subject-Token': self.server.token})
+        if not self._authorized():
+            return self._send(401, {'error': 'Unauthorized'})
+        if self.path == '/mistral/v2/action_executions':
+            if body.get('name') != 'tripleo.parameters.get':
+                return self._send(400, {'error': 'Unknown action'})
+            output = {'result': {'mistral_environment_parameters':
+                                 self.server.data.get('parameters', {})}}
+            return self._send(201, {'state': 'SUCCESS',
+                                    'output': json.dumps(output)})
+        return self._send(404, {'error': 'Not Found'})
+
+    def do_GET(self):
+        if self._inject('GET'):
+            return
+        if not self._authorized():
+            return self._send(401, {'error': 'Unauthorized'})
+        data = self.server.data
+        path = self.path.split('?')[0]
+        if path == '/compute/v2.1/flavors':
+            return self._send(200, {'flavors': [
+                {'id': flavor['id'], 'name': flavor['name']}
+                for flavor in data.get('flavors', [])]})
+        match = re.match('^/compute/v2.1/flavors/([^/]+)/os-extra_specs$',
+                         path)
+        if match:
+            for flavor in data.get('flavors', []):
+                if flavor['id'] == match.group(1):
+                    return self._send(200, {
+                        'extra_specs': flavor.get('extra_specs', {})})
+            return self._send(404, {'error': 'Flavor not found'})
+        if path == '/compute/v2.1/servers/detail':
+            return self._send(200, {'servers': data.get('servers', [])})
+        match = re.match('^/compute/v2.1/servers/([^/]+)$', path)
+        if match:
+            for server in data.get('servers', []):
+                if server['id'] == match.group(1):
+                    return self._send(200, {'server': server})
+            return self._send(404, {'error': 'Server not found'})
+        if path in ('/baremetal/v1/nodes', '/baremetal/v1/nodes/detail'):
+            return self._send(200, {'nodes': data.get('nodes', [])})
+        match = re.match('^/introspection/v1/introspection/([^/]+)(/data)?$',
+                         path)
+        if match:
+            node = data.get('introspection', {}).get(match.group(1))
+            if node is None:
+                return self._send(404, {'error': 'Node not introspected'})
+            if match.group(2):
+                return self._send(200, node.get('data', {}))
+            return self._send(200, {'uuid': match.group(1),
+                                    'finished': True,
+                                    'finished_at': node.get('finished_at'),
+                                    'error': None})
+        return self._send(404, {'error': 'Not Found'})
+
+
+class FakeUndercloudServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data, host='127.0.0.1', port=0, verbose=False,
+                 latency=0.0, failure_rate=0.0, seed=0):
+        HTTPServer.__init__(self, (host, port), FakeUndercloudHandler)
+        self.data = data
+        self.verbose = verbose
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.token = uuid.uuid4().hex
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address[:2]
+
+    def catalog(self, version):
+        services = {'compute': '/compute/v2.1',
+                    'baremetal': '/baremetal',
+                    'baremetal-introspection': '/introspection',
+                    'workflowv2': '/mistral/v2'}
+        catalog = []
+        for service_type, path in services.items():
+            url = self.url + path
+            if version == 'v2':
+                endpoints = [{'region': 'regionOne', 'publicURL': url,
+                              'internalURL': url, 'adminURL': url}]
+            else:
+                endpoints = [{'region_id': 'regionOne', 'interface': iface,
+                              'url': url}
+                             for iface in ('public', 'internal', 'admin')]
+            catalog.append({'type': service_type, 'endpoints': endpoints})
+        return catalog
+
+    # Gets the stackrc like environment variables for this server
+    def get_env(self, version='v3'):
+        auth_url = self.url + ('/v2.0' if version == 'v2' else '/v3')
+        return {'OS_AUTH_URL': auth_url,
+                'OS_USERNAME': USERNAME,
+                'OS_PASSWORD': PASSWORD,
+                'OS_PROJECT_NAME': 'admin',
+                'OS_TENANT_NAME': 'admin'}
+
+
+# Starts the fake undercloud server in a background thread
+def start_server(data, host='127.0.0.1', port=0, verbose=False,
+                 latency=0.0, failure_rate=0.0, seed=0):
+    server = FakeUndercloudServer(data, host, port, verbose, latency,
+                                  failure_rate, seed)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Fake undercloud REST API server')
+    parser.add_argument('-d', '--data',
+                        metavar='DATA FILE',
+                        help="""canned undercloud data in JSON format.""",
+                        default='')
+    parser.add_argument('-n', '--nodes',
+                        help="""number of synthetic nodes generated when
+                        the canned data is not given.""",
+                        type=int,
+                        default=0)
+    parser.add_argument('--profile',
+                        metavar='PROFILE',
+                        help="""topology profile of the synthetic nodes:
+                        %s.""" % ', '.join(topology_generator.PROFILE_NAMES),
+                        choices=topology_generator.PROFILE_NAMES,
+                        default='medium')
+    parser.add_argument('--flavor',
+                        metavar='FLAVOR',
+                        help="""flavor of the synthetic nodes.""",
+                        default='compute')
+    parser.add_argument('--latency',
+                        metavar='SECONDS',
+                        help="""delay of each API call or CLI command.""",
+                        type=float,
+                        default=0.0)
+    parser.add_argument('--failure_rate',
+                        metavar='RATE',
+                        help="""fraction (0 to 1) of the API calls or CLI
+                        commands failing.""",
+                        type=float,
+                        default=0.0)
+    parser.add_argument('--seed',
+                        help="""seed selecting the failing calls.""",
+                        type=int,
+                        default=0)
+    parser.add_argument('--bin_dir',
+                        metavar='BIN DIR',
+                        help="""writes the fake openstack, ironic, nova and
+                        mistral CLIs serving the data to the directory,
+                        to be added to PATH, instead of serving the REST
+                        APIs.""",
+                        default='')
+    parser.add_argument('--host',
+                        metavar='HOST',
+                        default='127.0.0.1')
+    parser.add_argument('-p', '--port',
+                        metavar='PORT',
+                        type=int,
+                        default=5000)
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        default=False)
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == '__main__':
+    opts = parse_opts(sys.argv)
+    if opts.data:
+        with open(opts.data) as data_file:
+            data = json.load(data_file)
+    elif opts.nodes > 0:
+        data = generate_data(opts.nodes, opts.profile, opts.flavor)
+    else:
+        print("Error: canned data file or number of nodes is required")
+        sys.exit(1)
+    if opts.bin_dir:
+        data_path = write_cli_bin(opts.bin_dir, data, opts.latency,
+                                  opts.failure_rate, opts.seed)
+        print('Fake CLIs data is written to: %s' % data_path)
+        print('export PATH=%s:$PATH' % os.path.abspath(opts.bin_dir))
+        sys.exit(0)
+    server = FakeUndercloudServer(data, opts.host, opts.port, opts.verbose,
+                                  opts.latency, opts.failure_rate, opts.seed)
+    for key, val in sorted(server.get_env().items()):
+        print('export %(key)s=%(val)s' % {'key': key, 'val': val})
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,232 @@
+import time
+from multiprocessing.pool import ThreadPool
+
+from derive_common import nodes
+from derive_common import timings
+
+DEFAULT_MAX_WORKERS = 8
+
+
+# Runs func for each node UUID using a bounded pool of worker threads.
+# Returns the list of (node_uuid, result, error) tuples in the same order
+# as node_uuids, so that output is deterministic regardless of which
+# node finishes first. A long running caller can pass its own pool,
+# which is kept open, instead of starting the worker threads each time.
+def run_fleet(node_uuids, func, max_workers=DEFAULT_MAX_WORKERS, pool=None):
+    if not node_uuids:
+        return []
+    workers = max(1, min(int(max_workers), len(node_uuids)))
+
+    def run_node(node_uuid):
+        try:
+            with timings.span('fleet.node', node=node_uuid):
+                return node_uuid, func(node_uuid), None
+        except Exception as exc:
+            return node_uuid, None, exc
+
+    if workers == 1:
+        return [run_node(node_uuid) for node_uuid in node_uuids]
+    if pool is not None:
+        return pool.map(run_node, node_uuids, chunksize=1)
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(run_node, node_uuids, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+# Runs func for each node UUID using a bounded pool of worker threads
+# like run_fleet, but yields the (node_uuid, result, error) tuples as
+# soon as each node is done, so that the results can be streamed
+def iter_fleet(node_uuids, func, max_workers=DEFAULT_MAX_WORKERS):
+    if not node_uuids:
+        return
+    workers = max(1, min(int(max_workers), len(node_uuids)))
+
+    def run_node(node_uuid):
+        try:
+            with timings.span('fleet.node', node=node_uuid):
+                return node_uuid, func(node_uuid), None
+        except Exception as exc:
+            return node_uuid, None, exc
+
+    if workers == 1:
+        for node_uuid in node_uuids:
+            yield run_node(node_uuid)
+        return
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap_unordered(run_node, node_uuids):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+# Groups the nodes by value for every parameter and returns only the
+# parameters which are not derived identically on all the nodes.
+# node_results is a list of (node_uuid, parameters) tuples.
+# Returns {parameter: [(value, [node_uuid, ...]), ...]}
+def get_fleet_differences(node_results):
+    values = {}
+    keys = []
+    for node_uuid, parameters in node_results:
+        for key in parameters.keys():
+            if key not in values:
+                values[key] = []
+                keys.append(key)
+    for key in keys:
+        for node_uuid, parameters in node_results:
+            val = parameters.get(key)
+            for item in values[key]:
+                if item[0] == val:
+                    item[1].append(node_uuid)
+                    break
+            else:
+                values[key].append((val, [node_uuid]))
+
+    differences = {}
+    for key in keys:
+        if len(values[key]) > 1:
+            differences[key] = values[key]
+    return differences
+
+
+# Displays the summary of nodes which derived different values
+def display_fleet_summary(node_results, failed_nodes, elapsed):
+    print('# Fleet summary: %(ok)d node(s) derived, %(failed)d failed '
+          'in %(elapsed).1f seconds' % {'ok': len(node_results),
+                                        'failed': len(failed_nodes),
+                                        'elapsed': elapsed})
+    for node_uuid, exc in failed_nodes:
+        print('# Node %(node)s failed: %(exc)s' % {'node': node_uuid,
+                                                    'exc': exc})
+    differences = get_fleet_differences(node_results)
+    if not differences:
+        if node_results:
+            print('# All nodes derived identical parameters.')
+        print('')
+        return
+    print('# Parameters differing between nodes:')
+    for key in sorted(differences.keys()):
+        print('%s:' % key)
+        for val, nodes in differences[key]:
+            print('  %(val)s => %(count)d node(s): %(nodes)s'
+                  % {'val': val, 'count': len(nodes),
+                     'nodes': ', '.join(nodes)})
+    print('')
+
+
+# Derives the parameters of all the nodes matching the flavor of the
+# user inputs concurrently with the derive_hw_data_parameters function of
+# the deriver, outputs the parameters of each node with the details of
+# its derivation with the output_parameters function and displays a summary of the differences
+# between the nodes. name is the derived parameters name, like 'DPDK'.
+def derive_fleet_parameters(name, user_input, derive_hw_data_parameters,
+                            output_parameters,
+                            max_workers=DEFAULT_MAX_WORKERS, cache=None,
+                            backend=None, emitter=None):
+    start = time.time()
+    node_uuids = nodes.get_node_uuids(user_input['flavor'], cache, backend)
+    if not node_uuids:
+        raise Exception("Unable to determine nodes for flavor "
+                        "'%s'" % user_input['flavor'])
+    print("Deriving %(name)s parameters for %(count)d node(s) based on "
+          "flavor: %(flavor)s" % {"name": name, "count": len(node_uuids),
+                                  "flavor": user_input['flavor']})
+
+    def derive_node(node_uuid):
+        details = {}
+        parameters, hiera_variables = derive_hw_data_parameters(
+            nodes.get_node_introspection_data(node_uuid, cache, backend),
+            user_input, details=details)
+        return parameters, hiera_variables, details
+
+    node_results = []
+    failed_nodes = []
+    for node_uuid, result, exc in run_fleet(node_uuids, derive_node,
+                                            max_workers):
+        if exc:
+            failed_nodes.append((node_uuid, exc))
+            continue
+        parameters, hiera_variables, details = result
+        print('# Node: %s' % node_uuid)
+        output_parameters(parameters, hiera_variables, emitter, node_uuid,
+                          details)
+        node_results.append((node_uuid, parameters))
+    display_fleet_summary(node_results, failed_nodes, time.time() - start)
+
+
+# Validation messages of a valid parameter, any other message fails the
+# validation of the parameter
+VALID_MESSAGES = ['valid.', 'enabled.']
+
+
+# Gets the checks failed in the validation messages of a node
+def get_failed_checks(checks, messages):
+    return [check for check in checks
+            if messages[check].strip() not in VALID_MESSAGES]
+
+
+# Displays the validation verdict of a node as soon as it is validated,
+# with the messages of the failed checks
+def display_node_verdict(checks, node_uuid, host_ip, messages, error):
+    if error is not None:
+        print('# Node %(node)s: ERROR %(error)s' % {'node': node_uuid,
+                                                   'error': error})
+        return
+    failed = get_failed_checks(checks, messages)
+    if not failed:
+        print('# Node %(node)s (%(ip)s): PASS' % {'node': node_uuid,
+                                                  'ip': host_ip})
+        return
+    print('# Node %(node)s (%(ip)s): FAIL %(checks)s' % {
+        'node': node_uuid, 'ip': host_ip, 'checks': ', '.join(failed)})
+    for check in failed:
+        print('#   %(check)s: %(msg)s' % {
+            'check': check,
+            'msg': ' '.join(messages[check].split())})
+
+
+# Displays the pass/fail matrix of the nodes (rows) and checks (columns)
+# in the nodes order, followed by the number of nodes passing each check.
+# node_results is a list of (node_uuid, host_ip, messages, error) tuples.
+def display_validation_matrix(checks, node_results, elapsed):
+    passed = 0
+    errors = 0
+    check_passed = dict((check, 0) for check in checks)
+    rows = []
+    for node_uuid, host_ip, messages, error in node_results:
+        if error is not None:
+            errors += 1
+            rows.append([node_uuid, host_ip or '-'] +
+                        ['-' for check in checks] + ['ERROR'])
+            continue
+        failed = get_failed_checks(checks, messages)
+        if not failed:
+            passed += 1
+        for check in checks:
+            if check not in failed:
+                check_passed[check] += 1
+        rows.append([node_uuid, host_ip] +
+                    ['FAIL' if check in failed else 'pass'
+                     for check in checks] +
+                    ['FAIL' if failed else 'PASS'])
+    rows.append(['Passed', ''] +
+                ['%d/%d' % (check_passed[check], len(node_results))
+                 for check in checks] +
+                ['%d/%d' % (passed, len(node_results))])
+
+    print('# Fleet validation: %(passed)d node(s) passed, %(failed)d '
+          'failed, %(errors)d error(s) in %(elapsed).1f seconds' % {
+              'passed': passed, 'failed': len(node_results) - passed - errors,
+              'errors': errors, 'elapsed': elapsed})
+    header = ['Node', 'Host IP'] + checks + ['Verdict']
+    widths = [max([len(row[index]) for row in rows + [header]])
+              for index in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join([val.ljust(width)
+                         for val, width in zip(row, widths)]).rstrip())
+    print('')
+    return passed == len(node_results)
@@ -0,0 +1,210 @@
+import codecs
+import json
+import re
+
+from derive_common import timings
+
+# Introspection data fields used to derive the parameters
+FIELDS = (('inventory', 'interfaces'),
+          ('inventory', 'memory', 'physical_mb'),
+          ('inventory', 'cpu'),
+          ('numa_topology',))
+
+CHUNK_SIZE = 65536
+
+# Containers nested up to this depth are skipped with a single match
+SKIP_DEPTH = 3
+
+_STRING_PATTERN = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_PLAIN_PATTERN = r'[^"\[\]{}]*'
+
+
+def _skip_pattern(depth):
+    # Plain text and strings, and the complete containers up to depth.
+    # The plain text runs are always maximal, so that the match does not
+    # backtrack exponentially on the incomplete containers.
+    tokens = _STRING_PATTERN
+    for index in range(depth):
+        tokens = (r'%(string)s|[\[{]%(plain)s(?:(?:%(tokens)s)%(plain)s)*'
+                  r'[\]}]' % {'string': _STRING_PATTERN,
+                               'plain': _PLAIN_PATTERN, 'tokens': tokens})
+    return r'%(plain)s(?:(?:%(tokens)s)%(plain)s)*' % {
+        'plain': _PLAIN_PATTERN, 'tokens': tokens}
+
+
+# JSON string, possibly unterminated at the end of the buffer
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*("|\\?\Z)', re.S)
+# Everything up to the next bracket of a container deeper than
+# SKIP_DEPTH or of the enclosing container
+_SKIP = re.compile(_skip_pattern(SKIP_DEPTH), re.S)
+_SCALAR = re.compile(r'[^,}\]\s]*')
+_WHITESPACE = re.compile(r'\s*')
+
+
+# Incremental parser which extracts only the selected fields of the
+# introspection data from a stream, without building the whole object
+# graph. The values outside of the selected fields are skipped with
+# regular expressions over a sliding buffer and only the text of the
+# selected subtrees is decoded with json. The result is a dictionary
+# with the same layout as the introspection data, holding only the
+# selected fields which are available.
+class FieldParser(object):
+    def __init__(self, read, fields=FIELDS, chunk_size=CHUNK_SIZE):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.fields = set(tuple(field) for field in fields)
+        self.prefixes = set()
+        for field in self.fields:
+            for index in range(len(field)):
+                self.prefixes.add(tuple(field[:index]))
+        self.buf = ''
+        self.pos = 0
+        self.mark = None
+        self.eof = False
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def _fill(self):
+        if self.eof:
+            raise Exception('Unexpected end of introspection data')
+        # Drops the consumed text unless a selected value is being read
+        start = self.pos if self.mark is None else self.mark
+        if start:
+            self.buf = self.buf[start:]
+            self.pos -= start
+            if self.mark is not None:
+                self.mark = 0
+        chunk = self.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        if isinstance(chunk, bytes) and not isinstance(chunk, str):
+            # Multibyte characters may be split between the chunks
+            chunk = self.decoder.decode(chunk, self.eof)
+        self.buf += chunk
+
+    def _peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self._fill()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise Exception("Invalid introspection data: expected '%s' "
+                            "at offset %d" % (char, self.pos))
+        self.pos += 1
+
+    def _read_string(self):
+        while True:
+            match = _STRING.match(self.buf, self.pos)
+            if match is None:
+                raise Exception('Invalid introspection data: expected '
+                                'string at offset %d' % self.pos)
+            if match.group(1) == '"':
+                self.pos = match.end()
+                return match.group(0)
+            self._fill()
+
+    def _skip_value(self):
+        char = self._peek()
+        if not char:
+            raise Exception('Unexpected end of introspection data')
+        if char == '"':
+            self._read_string()
+        elif char in '[{':
+            self.pos += 1
+            depth = 1
+            while True:
+                self.pos = _SKIP.match(self.buf, self.pos).end()
+                if self.pos >= len(self.buf) or (
+                        self.buf[self.pos] == '"'):
+                    # Partial string at the end of the buffer
+                    self._fill()
+                    continue
+                if self.buf[self.pos] in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                self.pos += 1
+                if depth == 0:
+                    return
+        else:
+            while True:
+                end = _SCALAR.match(self.buf, self.pos).end()
+                if end < len(self.buf) or self.eof:
+                    if end == self.pos:
+                        raise Exception('Invalid introspection data at '
+                                        'offset %d' % self.pos)
+                    self.pos = end
+                    return
+                self._fill()
+
+    def _read_value(self):
+        self._peek()
+        self.mark = self.pos
+        try:
+            self._skip_value()
+            return json.loads(self.buf[self.mark:self.pos])
+        finally:
+            self.mark = None
+
+    def _parse(self, path):
+        if path in self.fields:
+            return self._read_value()
+        if path not in self.prefixes or self._peek() != '{':
+            self._skip_value()
+            return None
+        result = {}
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return result
+        while True:
+            self._peek()
+            key = json.loads(self._read_string())
+            self._expect(':')
+            value = self._parse(path + (key,))
+            if value is not None or path + (key,) in self.fields:
+                result[key] = value
+            char = self._peek()
+            self.pos += 1
+            if char == '}':
+                return result
+            if char != ',':
+                raise Exception("Invalid introspection data: expected ',' "
+                                "or '}' at offset %d" % (self.pos - 1))
+
+    def parse(self):
+        result = self._parse(())
+        if result is None:
+            raise Exception('Invalid introspection data: expected an '
+                            'object')
+        return result
+
+
+# Loads the selected fields of the introspection data from a file like
+# object (or anything having read(size)), like the CLI process stdout or
+# the raw HTTP response
+@timings.timed('introspection.parse')
+def load(stream, fields=FIELDS, chunk_size=CHUNK_SIZE):
+    return FieldParser(stream.read, fields, chunk_size).parse()
+
+
+# Loads the selected fields of the introspection data from the text
+@timings.timed('introspection.parse')
+def loads(text, fields=FIELDS):
+    if isinstance(text, bytes) and not isinstance(text, str):
+        text = text.decode('utf-8')
+    chunks = [text]
+    return FieldParser(lambda size: chunks.pop() if chunks else '',
+                       fields).parse()
+
+
+# Loads the selected fields of the introspection data from an iterable
+# of text or bytes chunks
+@timings.timed('introspection.parse')
+def load_chunks(chunks, fields=FIELDS):
+    chunks = iter(chunks)
+    return FieldParser(lambda size: next(chunks, ''), fields).parse()
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import time
+
+from derive_common import nodes as derive_nodes
+from derive_common import timings
+from derive_common import undercloud
+
+# Inventory index of the deployed nodes of a role, mapping the role to its
+# flavor, the flavor to its profile and nodes, and each node to its
+# instance and ctlplane ip address. It is built with a few bulk undercloud
+# calls (deployment parameters, flavor, profiles list, node list and
+# servers list) instead of the calls per node, so that the hosts of all
+# the nodes of the role are then looked up in memory.
+#
+# The index of each role is stored in the on-disk cache and revalidated
+# on each run with the version of the node list, a single undercloud call,
+# so that it is built again when a node is added, removed or redeployed.
+# The undercloud errors are raised and no index is stored on failure. In
+# cache offline mode only the stored index is used.
+#
+# Index format:
+# {"built_at": 1500000000.0,
+#  "roles": {"ComputeOvsDpdk": "compute"},
+#  "flavors": {"compute": {"profile": "compute", "nodes": ["<node uuid>"]}},
+#  "nodes": {"<node uuid>": {"instance_uuid": "..",
+#                            "host_ip": "192.168.24.10"}}}
+
+CACHE_KEY = 'inventory-'
+
+
+# Gets the version of the node list, changed when a node is added,
+# removed or deployed with another instance
+def get_node_list_version(node_list):
+    node_instances = sorted([node['uuid'], (node['instance_uuid'] or '').strip()]
+                            for node in node_list)
+    return hashlib.sha1(
+        json.dumps(node_instances).encode('utf-8')).hexdigest()
+
+
+# Builds the inventory index of the role with the bulk undercloud calls
+@timings.timed('inventory.build')
+def build_index(backend, role_name, node_list=None):
+    flavor_name = undercloud.get_flavor_name_from_parameters(
+        backend.get_parameters(), role_name)
+    if not flavor_name:
+        raise Exception("Unable to determine flavor for role '%s'" %
+                        role_name)
+    profile_name = backend.get_profile_name(flavor_name)
+    node_uuids = [profile['Node UUID'].strip()
+                  for profile in backend.get_profiles_list()
+                  if profile['Current Profile'] == profile_name]
+    if node_list is None:
+        node_list = backend.get_node_list()
+    instance_uuids = dict((node['uuid'], (node['instance_uuid'] or '').strip())
+                          for node in node_list)
+    host_ips = backend.get_host_ips()
+
+    nodes = {}
+    for node_uuid in node_uuids:
+        instance_uuid = instance_uuids.get(node_uuid, '')
+        nodes[node_uuid] = {
+            'instance_uuid': instance_uuid,
+            'host_ip': (host_ips.get(instance_uuid) or '').strip()}
+    return {'built_at': time.time(), 'roles': {role_name: flavor_name},
+            'flavors': {flavor_name: {'profile': profile_name,
+                                      'nodes': node_uuids}},
+            'nodes': nodes}
+
+
+# Lookups of the inventory index
+class Inventory(object):
+    def __init__(self, index):
+        self.built_at = index.get('built_at', 0)
+        self.roles = index.get('roles', {})
+        self.flavors = index.get('flavors', {})
+        self.nodes = index.get('nodes', {})
+        self.host_ips = dict((node['instance_uuid'], node['host_ip'])
+                             for node in self.nodes.values()
+                             if node['instance_uuid'])
+
+    def has_role(self, role_name):
+        return role_name in self.roles
+
+    # Gets the flavor name for role name
+    def get_flavor_name(self, role_name):
+        return self.roles.get(role_name, '')
+
+    # Gets all the matching node UUIDs for flavor name
+    def get_node_uuids(self, flavor_name):
+        return list(self.flavors.get(flavor_name, {}).get('nodes', []))
+
+    # Gets the first matching node UUID for flavor name
+    def get_node_uuid(self, flavor_name):
+        node_uuids = self.get_node_uuids(flavor_name)
+        return node_uuids[0] if node_uuids else ''
+
+    # Gets the instance UUID by node UUID
+    def get_instance_uuid(self, node_uuid):
+        return self.nodes.get(node_uuid, {}).get('instance_uuid', '')
+
+    # Gets the ctlplane ip address from instance UUID
+    def get_host_ip(self, instance_uuid):
+        return self.host_ips.get(instance_uuid, '')
+
+    # Gets the node UUID and instance UUID of all the deployed nodes
+    # matching the flavor name
+    def get_deployed_nodes(self, flavor_name):
+        return [(node_uuid, self.get_instance_uuid(node_uuid))
+                for node_uuid in self.get_node_uuids(flavor_name)
+                if self.get_instance_uuid(node_uuid)]
+
+
+# Gets the inventory of the role, from the cache when the node list has
+# not changed or built with the backend. It is built each time without
+# cache.
+def get_inventory(backend, role_name, cache=None):
+    if cache is None:
+        return Inventory(build_index(backend, role_name))
+    # Listed once for both the cache revalidation and the build
+    node_lists = []
+
+    def get_node_list():
+        if not node_lists:
+            node_lists.append(backend.get_node_list())
+        return node_lists[0]
+
+    def fetch():
+        return build_index(backend, role_name, get_node_list())
+
+    # Revalidated on each run whatever the cache ttl, with the single node
+    # list call, so that the redeployed nodes are never missed
+    return Inventory(cache.get(CACHE_KEY + role_name, fetch,
+                               lambda: get_node_list_version(get_node_list()),
+                               ttl=0))
+
+
+# Drops the cached inventory of the role
+def invalidate(role_name, cache):
+    cache.invalidate(CACHE_KEY + role_name)
+
+
+# Gets the flavor of the role and the node UUID and host IP address of
+# all its deployed nodes, from the cached inventory index or, without
+# cache, with the role lookups and a single servers listing
+def get_deployed_hosts(role_name, backend, cache=None):
+    if cache is not None:
+        inventory = get_inventory(backend, role_name, cache)
+        flavor = inventory.get_flavor_name(role_name)
+        return flavor, [(node_uuid, inventory.get_host_ip(instance_uuid))
+                        for node_uuid, instance_uuid in
+                        inventory.get_deployed_nodes(flavor)]
+    flavor = derive_nodes.get_flavor_name(role_name, backend)
+    deployed_nodes = derive_nodes.get_deployed_nodes(flavor, backend)
+    host_ips = backend.get_host_ips()
+    return flavor, [(node_uuid, (host_ips.get(instance_uuid) or '').strip())
+                    for node_uuid, instance_uuid in deployed_nodes]
@@ -0,0 +1,106 @@
+import re
+
+# NIC name prefixes of the embedded NICs, numbered before the other NICs
+# like os-net-config does
+EMBEDDED_NIC_PREFIXES = ('em', 'eth', 'eno')
+
+NUMBER_RE = re.compile('([0-9]+)')
+
+
+def natural_sort_key(s):
+    return [int(text) if text.isdigit() else text
+            for text in NUMBER_RE.split(s)]
+
+
+def is_embedded_nic(nic):
+    return nic.startswith(EMBEDDED_NIC_PREFIXES)
+
+
+# Sorting the NIC's like os-net-config logic
+def ordered_nics(names):
+    embedded_nics = []
+    nics = []
+    for nic in names:
+        if is_embedded_nic(nic):
+            embedded_nics.append(nic)
+        else:
+            nics.append(nic)
+    return (sorted(embedded_nics, key=natural_sort_key) +
+            sorted(nics, key=natural_sort_key))
+
+
+# NIC index of a node built once from its interfaces, so that the NICs
+# are looked up by name, 'nicN' alias or MAC address without rescanning
+# the interfaces. The 'nicN' aliases number the NICs having carrier in
+# the os-net-config order. The interfaces are dicts with the 'name' and
+# optionally 'mac_address', 'pci_address', 'has_carrier' and 'numa_node'
+# keys, like the introspection inventory.interfaces, and the NUMA nodes
+# can be given separately as the introspection numa_topology.nics.
+class NicIndex(object):
+    __slots__ = ('names', 'ordered_nics', 'numa_nodes', 'macs',
+                 'pci_addresses', 'carriers', 'mac_names')
+
+    def __init__(self, interfaces, numa_nics=None):
+        self.names = []
+        self.numa_nodes = {}
+        self.macs = {}
+        self.pci_addresses = {}
+        self.carriers = {}
+        self.mac_names = {}
+        for iface in interfaces:
+            name = iface.get('name', '')
+            self.names.append(name)
+            self.carriers[name] = bool(iface.get('has_carrier', False))
+            if iface.get('mac_address'):
+                self.macs[name] = iface['mac_address']
+                self.mac_names[iface['mac_address'].lower()] = name
+            if iface.get('pci_address'):
+                self.pci_addresses[name] = iface['pci_address']
+            if iface.get('numa_node') is not None:
+                self.numa_nodes[name] = int(iface['numa_node'])
+        for nic in numa_nics or []:
+            self.numa_nodes[nic['name']] = int(nic['numa_node'])
+        self.ordered_nics = ordered_nics([name for name in self.names
+                                          if self.carriers[name]])
+
+    # Builds the NIC index from the introspection data
+    @classmethod
+    def from_introspection(cls, hw_data):
+        return cls(hw_data.get('inventory', {}).get('interfaces', []),
+                   hw_data.get('numa_topology', {}).get('nics', []))
+
+    # Checks whether the NIC is given as a 'nicN' alias
+    @staticmethod
+    def is_alias(nic):
+        return nic.startswith('nic') and nic[3:].isdigit()
+
+    # Gets the interface name of the 'nicN' alias, None if there is no
+    # such NIC, or the given name if it is not an alias
+    def get_name(self, nic):
+        if self.is_alias(nic):
+            number = int(nic[3:])
+            if number > 0:
+                if number > len(self.ordered_nics):
+                    return None
+                return self.ordered_nics[number - 1]
+        return nic
+
+    # Gets the NUMA node of the NIC (name or alias), None if unknown
+    def get_numa_node(self, nic):
+        return self.numa_nodes.get(self.get_name(nic))
+
+    # Gets the MAC address of the NIC (name or alias), None if unknown
+    def get_mac(self, nic):
+        return self.macs.get(self.get_name(nic))
+
+    # Gets the PCI address of the NIC (name or alias), None if unknown
+    def get_pci_address(self, nic):
+        return self.pci_addresses.get(self.get_name(nic))
+
+    # Checks whether the NIC (name or alias) has carrier
+    def has_carrier(self, nic):
+        return self.carriers.get(self.get_name(nic), False)
+
+    # Gets the interface name for the MAC address, None if unknown
+    def get_name_by_mac(self, mac):
+        return self.mac_names.get(mac.lower())
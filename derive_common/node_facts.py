@@ -0,0 +1,263 @@
+import re
+import time
+import uuid
+
+from derive_common import timings
+
+# Facts of a deployed node collected by the post deployment validations
+# in a single SSH round trip. The fact commands are run by remote shell
+# scripts, each output being framed by marker lines, and the outputs
+# are parsed into a NodeFacts snapshot which the validations read
+# instead of running a command per value. The config files are
+# collected without their comment lines, and the values are grepped
+# from the snapshot like the commands did on the node.
+#
+# The fact commands are split on up to max_channels scripts run
+# concurrently on their own channels of the SSH transport, so that the
+# slow commands overlap with the fast ones. All the channels are opened
+# before their outputs are read as they complete, polling the channels
+# without a thread per channel in the validation process. The outputs are
+# merged by fact name and a failed channel is reported with its facts in
+# the channels order.
+#
+# The exit status of each fact command is framed with its output, and
+# the script exits with the status of the first failing fact command. A
+# channel fails when the script exit status is not explained by a failed
+# fact command (the script could not run or was killed), when facts are
+# missing in the output, or when a required fact command failed (like
+# when sudo is not allowed on the node). The other fact commands may fail,
+# like the config files missing on a containers based deployment.
+
+DEFAULT_MAX_CHANNELS = 4
+
+# Seconds between the polls of the channels
+POLL_INTERVAL = 0.01
+RECV_SIZE = 32768
+
+# Slow fact commands, each one run on its own channel when there are
+# enough channels
+SLOW_FACTS = ['memory_sizes', 'ovs_interfaces']
+
+# Fact commands which succeed on every node
+REQUIRED_FACTS = ['lscpu_cpus', 'lscpu', 'cmdline']
+
+# Fact names with their commands
+FACT_COMMANDS = {
+    'lscpu_cpus': 'sudo lscpu -p=NODE,CORE,CPU | grep -v ^#',
+    'lscpu': 'sudo lscpu',
+    'memory_sizes': "sudo dmidecode --type memory | grep 'Size' | "
+                    "grep '[0-9]'",
+    'rhosp_release': 'sudo cat /etc/rhosp-release | grep -v ^#',
+    'tuned_active': 'sudo tuned-adm active',
+    'kolla_config_files': 'ls -d /var/lib/kolla/config_files/',
+    'ovs_interfaces': 'sudo ovs-vsctl '
+                      '--columns=name,type,admin_state,mac_in_use,mtu,status '
+                      '--format=json list interface',
+    'ovs_pmd_cpu_mask': 'sudo ovs-vsctl --no-wait get Open_vSwitch . '
+                        'other_config:pmd-cpu-mask',
+    'ovs_dpdk_lcore_mask': 'sudo ovs-vsctl --no-wait get Open_vSwitch . '
+                           'other_config:dpdk-lcore-mask',
+    'ovs_dpdk_socket_mem': 'sudo ovs-vsctl --no-wait get Open_vSwitch . '
+                           'other_config:dpdk-socket-mem',
+    'ovs_dpdk_extra': 'sudo ovs-vsctl --no-wait get Open_vSwitch . '
+                      'other_config:dpdk-extra',
+    'dpdk_mapping': 'sudo cat /var/lib/os-net-config/dpdk_mapping.yaml',
+    'nova_conf': 'sudo cat /etc/nova/nova.conf | grep -v ^#',
+    'nova_libvirt_conf': 'sudo cat /var/lib/config-data/nova_libvirt/etc/'
+                         'nova/nova.conf | grep -v ^#',
+    'hiera_json': 'sudo cat /etc/puppet/hieradata/service_configs.json',
+    'hiera_yaml': 'sudo cat /etc/puppet/hieradata/service_configs.yaml | '
+                  'grep -v ^#',
+    'tuned_variables': 'sudo cat /etc/tuned/cpu-partitioning-variables.conf '
+                       '| grep -v ^#',
+    'grub': 'sudo cat /etc/default/grub | grep -v ^#',
+    'cmdline': 'sudo cat /proc/cmdline | grep -v ^#',
+}
+
+
+# Snapshot of the facts of a node, as the standard output, error and
+# exit status of each fact command
+class NodeFacts(object):
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def get(self, name):
+        if name not in self.outputs:
+            raise Exception("Node fact '%s' is not collected" % name)
+        return self.outputs[name]
+
+    def get_output(self, name):
+        return self.get(name)[0]
+
+    def get_error(self, name):
+        return self.get(name)[1]
+
+    def get_status(self, name):
+        return self.get(name)[2]
+
+    # Gets the output lines containing the text, like grep
+    def grep(self, name, text):
+        lines = [line for line in self.get_output(name).split('\n')
+                 if text in line]
+        return ''.join([line + '\n' for line in lines])
+
+
+# Gets the shell script running the fact commands, with the standard
+# output, error and exit status of each command between the marker lines.
+# The script exits with the status of the first failing command.
+def get_script(names, marker):
+    lines = ['err=$(mktemp) || exit', 'status=0']
+    for name in names:
+        lines.extend([
+            "echo '%(marker)s out %(name)s'" % {'marker': marker,
+                                                'name': name},
+            '{ %s; } 2>"$err"' % FACT_COMMANDS[name],
+            'rc=$?',
+            '[ "$status" -ne 0 ] || status=$rc',
+            "printf '\\n%(marker)s err %(name)s\\n'" % {'marker': marker,
+                                                      'name': name},
+            'cat "$err"',
+            "printf '\\n%(marker)s end %(name)s %%d\\n' \"$rc\"" % {
+                'marker': marker, 'name': name}])
+    lines.extend(['rm -f "$err"', 'exit "$status"'])
+    return '\n'.join(lines) + '\n'
+
+
+# Parses the script output into the (stdout, stderr, exit status) of
+# each fact
+def parse_output(output, marker):
+    marker = re.escape(marker)
+    fact_re = re.compile('^%(marker)s out ([a-z_]+)\n(.*?)\n%(marker)s err '
+                         '\\1\n(.*?)\n%(marker)s end \\1 ([0-9]+)$' % {
+                             'marker': marker}, re.M | re.S)
+    outputs = {}
+    for match in fact_re.finditer(output):
+        outputs[match.group(1)] = (match.group(2), match.group(3),
+                                   int(match.group(4)))
+    return outputs
+
+
+# Splits the fact names on the channels, the slow facts first, one per
+# channel, and then the other facts round-robin on the remaining channels
+def get_channel_facts(names, max_channels=DEFAULT_MAX_CHANNELS):
+    channels = max(1, min(int(max_channels), len(names)))
+    channel_facts = [[] for channel in range(channels)]
+    slow_facts = [name for name in names if name in SLOW_FACTS]
+    for index, name in enumerate(slow_facts):
+        channel_facts[index % channels].append(name)
+    first = len(slow_facts) if len(slow_facts) < channels else 0
+    fast_facts = [name for name in names if name not in SLOW_FACTS]
+    for index, name in enumerate(fast_facts):
+        channel_facts[first + index % (channels - first)].append(name)
+    return [facts for facts in channel_facts if facts]
+
+
+def _decode(output):
+    if not isinstance(output, str):
+        output = output.decode('utf-8', 'replace')
+    return output
+
+
+# Starts the script collecting the facts on its own channel, returns the
+# marker and the output streams of the channel
+def start_channel(client, names):
+    marker = 'NODE-FACT-%s' % uuid.uuid4().hex
+    stdin, stdout, stderr = client.exec_command(get_script(names, marker))
+    return marker, stdout, stderr
+
+
+# Reads the output of the channel as it is received, until the script
+# exits. Returns None while the script is running.
+def poll_channel(stdout, stderr, buffers):
+    chan = stdout.channel
+    while chan.recv_ready():
+        buffers[0].append(chan.recv(RECV_SIZE))
+    while chan.recv_stderr_ready():
+        buffers[1].append(chan.recv_stderr(RECV_SIZE))
+    if not chan.exit_status_ready():
+        return None
+    buffers[0].append(stdout.read())
+    buffers[1].append(stderr.read())
+    return [b''.join(buffers[0]), b''.join(buffers[1])]
+
+
+# Gets the facts from the output of the channel once the script exited
+# with exit_status. Fails when the exit status is not the one of a
+# failed fact command, when facts are missing or when a required fact
+# command failed.
+def get_channel_outputs(names, marker, output, error, exit_status):
+    output = _decode(output)
+    outputs = parse_output(output, marker)
+    statuses = [outputs[name][2] for name in names
+                if name in outputs and outputs[name][2] != 0]
+    if exit_status != (statuses[0] if statuses else 0):
+        raise Exception("Node facts script exited with status %(status)d: "
+                        "%(error)s" % {'status': exit_status,
+                                       'error': _decode(error).strip()})
+    missing = [name for name in names if name not in outputs]
+    if missing:
+        raise Exception("Unable to collect the node facts: %s" %
+                        ', '.join(missing))
+    for name in names:
+        if name in REQUIRED_FACTS and outputs[name][2] != 0:
+            raise Exception("Node fact '%(name)s' command failed with "
+                            "status %(status)d: %(error)s" % {
+                                'name': name, 'status': outputs[name][2],
+                                'error': outputs[name][1].strip()})
+    return outputs
+
+
+# Reads the facts from the output of the channel once the script exits
+def read_channel(names, marker, stdout, stderr):
+    output = stdout.read()
+    exit_status = stdout.channel.recv_exit_status()
+    return get_channel_outputs(names, marker, output, stderr.read(),
+                               exit_status)
+
+
+# Collects the facts with a single SSH command, on its own channel
+def collect_channel(client, names):
+    marker, stdout, stderr = start_channel(client, names)
+    return read_channel(names, marker, stdout, stderr)
+
+
+# Collects the facts of the node on up to max_channels concurrent
+# channels of the SSH connection, reading the channels as they complete
+@timings.timed('node_facts.collect')
+def collect(client, names, max_channels=DEFAULT_MAX_CHANNELS):
+    channel_facts = get_channel_facts(names, max_channels)
+    if len(channel_facts) == 1:
+        return NodeFacts(collect_channel(client, channel_facts[0]))
+
+    results = [None] * len(channel_facts)
+    pending = {}
+    for index, names in enumerate(channel_facts):
+        try:
+            pending[index] = (start_channel(client, names), [[], []])
+        except Exception as exc:
+            results[index] = (None, exc)
+    while pending:
+        completed = False
+        for index in sorted(pending):
+            (marker, stdout, stderr), buffers = pending[index]
+            try:
+                received = poll_channel(stdout, stderr, buffers)
+                if received is None:
+                    continue
+                results[index] = (get_channel_outputs(
+                    channel_facts[index], marker, received[0], received[1],
+                    stdout.channel.recv_exit_status()), None)
+            except Exception as exc:
+                results[index] = (None, exc)
+            del pending[index]
+            completed = True
+        if pending and not completed:
+            time.sleep(POLL_INTERVAL)
+    outputs = {}
+    for names, (channel_outputs, error) in zip(channel_facts, results):
+        if error is not None:
+            raise Exception("Unable to collect the node facts %(names)s: "
+                            "%(error)s" % {'names': ', '.join(names),
+                                           'error': error})
+        outputs.update(channel_outputs)
+    return NodeFacts(outputs)
@@ -0,0 +1,117 @@
+import hashlib
+import json
+
+from derive_common import undercloud
+
+# Undercloud lookups of the nodes matching a flavor and of their
+# introspection data, shared by the derive scripts, the multi role
+# derivation and the derive parameters service, with the optional
+# on-disk cache, and of the flavor of a role and its deployed nodes,
+# shared by the post deployment validations.
+
+
+# Gets the version of the flavor nodes, changed when the profile of the
+# flavor changes or when a node is added, removed or tagged with another
+# profile
+def get_nodes_version(profile_name, profiles_list):
+    profiles = sorted([profile["Node UUID"].strip(),
+                       profile["Current Profile"]]
+                      for profile in profiles_list)
+    return hashlib.sha1(
+        json.dumps([profile_name, profiles]).encode('utf-8')).hexdigest()
+
+
+# Gets all the matching node UUIDs for flavor name
+def get_node_uuids(flavor_name, cache=None, backend=None):
+    backend = backend or undercloud.CliBackend()
+    # Looked up once for both the cache revalidation and the fetch
+    lookups = {}
+
+    def get_profile_name():
+        if 'profile' not in lookups:
+            lookups['profile'] = backend.get_profile_name(flavor_name)
+        return lookups['profile']
+
+    def get_profiles_list():
+        if 'profiles' not in lookups:
+            lookups['profiles'] = backend.get_profiles_list()
+        return lookups['profiles']
+
+    def fetch():
+        profile_name = get_profile_name()
+        return [profile["Node UUID"].strip()
+                for profile in get_profiles_list()
+                if profile["Current Profile"] == profile_name]
+
+    if cache is None:
+        return fetch()
+    # Cached nodes are invalidated when the flavor or nodes profiles change
+    return cache.get('nodes-' + flavor_name, fetch,
+                     lambda: get_nodes_version(get_profile_name(),
+                                               get_profiles_list()))
+
+
+# Gets the first matching node UUID for flavor name
+def get_node_uuid(flavor_name, cache=None, backend=None):
+    node_uuids = get_node_uuids(flavor_name, cache, backend)
+    if node_uuids:
+        return node_uuids[0]
+    return ''
+
+
+# Gets the hardware data for the first matching node of flavor name
+def get_introspection_data(flavor_name, cache=None, backend=None):
+    node_uuid = get_node_uuid(flavor_name, cache, backend)
+    return get_node_introspection_data(node_uuid, cache, backend)
+
+
+# Gets the hardware data for the give node UUID
+def get_node_introspection_data(node_uuid, cache=None, backend=None):
+    backend = backend or undercloud.CliBackend()
+
+    def fetch():
+        return backend.get_introspection_data(node_uuid)
+
+    if cache is None:
+        return fetch()
+    # Cached data is invalidated when the node is introspected again
+    return cache.get('introspection-' + node_uuid, fetch,
+                     lambda: backend.get_introspection_finished_at(node_uuid))
+
+
+# Gets the flavor name for role name
+def get_flavor_name(role_name, backend=None):
+    backend = backend or undercloud.CliBackend()
+    result = backend.get_parameters()
+    return undercloud.get_flavor_name_from_parameters(result, role_name)
+
+
+# Gets the instance UUID by node UUID
+def get_instance_uuid(node_uuid, backend=None):
+    backend = backend or undercloud.CliBackend()
+    for node in backend.get_node_list():
+        if node["uuid"] == node_uuid:
+            return (node["instance_uuid"] or '').strip()
+    return ''
+
+
+# Gets the host ip address from instance UUID
+def get_host_ip(instance_uuid, backend=None):
+    backend = backend or undercloud.CliBackend()
+    return backend.get_host_ip(instance_uuid)
+
+
+# Gets the node UUID and instance UUID of all the deployed nodes
+# matching the flavor name
+def get_deployed_nodes(flavor_name, backend=None):
+    backend = backend or undercloud.CliBackend()
+    profile_name = backend.get_profile_name(flavor_name)
+    instance_uuids = dict((node["uuid"], (node["instance_uuid"] or '').strip())
+                          for node in backend.get_node_list())
+    deployed_nodes = []
+    for profile in backend.get_profiles_list():
+        node_uuid = profile["Node UUID"].strip()
+        if (profile["Current Profile"] == profile_name and
+                instance_uuids.get(node_uuid)):
+            deployed_nodes.append((node_uuid, instance_uuids[node_uuid]))
+    return deployed_nodes
@@ -0,0 +1,159 @@
+from derive_common import batch
+from derive_common import cache as derive_cache
+from derive_common import emitters
+from derive_common import fleet
+from derive_common import timings
+from derive_common import undercloud
+
+# Command line options shared by the derive scripts, the multi role
+# derivation and the post deployment validations.
+
+
+def add_user_input_argument(parser):
+    parser.add_argument('user_input',
+                        metavar='USER INPUT JSON',
+                        help="""user inputs in JSON format.""",
+                        nargs='?',
+                        default='')
+
+
+def add_fleet_options(parser):
+    parser.add_argument('--fleet',
+                        help="""derive parameters for all the nodes
+                        matching the flavor.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--max_workers',
+                        metavar='MAX WORKERS',
+                        help="""maximum number of nodes processed
+                        concurrently in fleet mode.""",
+                        type=int,
+                        default=fleet.DEFAULT_MAX_WORKERS)
+
+
+def add_batch_options(parser):
+    parser.add_argument('--batch',
+                        metavar='PATH',
+                        help="""derive parameters offline for each saved
+                        introspection data in the directory, tar archive
+                        or JSON lines file and write them as JSON
+                        lines.""",
+                        default='')
+    parser.add_argument('--processes',
+                        metavar='PROCESSES',
+                        help="""number of worker processes in batch
+                        mode.""",
+                        type=int,
+                        default=batch.DEFAULT_PROCESSES)
+
+
+# Adds the output format options, with the role name option of the
+# single role scripts
+def add_output_options(parser, role_name=True):
+    parser.add_argument('--output_format',
+                        metavar='FORMAT',
+                        help="""'text' displays the parameters, 'yaml' and
+                        'json' write them as heat environment files with
+                        parameter_defaults and <RoleName>ExtraConfig to
+                        the output directory.""",
+                        choices=emitters.FORMATS,
+                        default=emitters.DEFAULT_FORMAT)
+    parser.add_argument('--extra_config_pre',
+                        help="""copies the heat templates deploying the
+                        derived parameters not consumed by the overcloud
+                        templates (ComputeHugepagesPerNumaNode) to the
+                        output directory and registers them as the
+                        <RoleName>ExtraConfigPre of the role in the
+                        environment files, replacing the ExtraConfigPre
+                        registered by another environment file.""",
+                        action='store_true',
+                        default=False)
+    if not role_name:
+        parser.add_argument('--output_dir',
+                            metavar='OUTPUT DIR',
+                            help="""directory to write the environment
+                            files, one per role.""",
+                            default='')
+        return
+    parser.add_argument('--output_dir',
+                        metavar='OUTPUT DIR',
+                        help="""directory to write the environment files,
+                        one per role, or per node in fleet and batch
+                        modes.""",
+                        default='')
+    parser.add_argument('--role_name',
+                        metavar='ROLE NAME',
+                        help="""role name for the <RoleName>ExtraConfig
+                        section of the environment files.""",
+                        default=emitters.DEFAULT_ROLE_NAME)
+
+
+# Adds the undercloud backend option, with the short option of the
+# validations like '-b'
+def add_backend_option(parser, short_option=None):
+    flags = [short_option] if short_option else []
+    parser.add_argument(*(flags + ['--backend']),
+                        metavar='BACKEND',
+                        help="""undercloud access backend: 'rest' uses
+                        the REST APIs in process, 'cli' (default) uses the
+                        openstack CLIs and 'auto' uses 'rest' when the
+                        undercloud credentials are available in the
+                        environment, falling back to 'cli' on REST errors.""",
+                        choices=undercloud.BACKENDS,
+                        default=undercloud.DEFAULT_BACKEND)
+
+
+# Adds the on-disk cache options of the cached data, like 'introspection
+# data', without the ttl option when the cached data is revalidated on
+# each run
+def add_cache_options(parser, cached_data='introspection data', ttl=True):
+    parser.add_argument('--cache_dir',
+                        metavar='CACHE DIR',
+                        help="""directory to cache the %s.""" % cached_data,
+                        default=derive_cache.DEFAULT_CACHE_DIR)
+    if ttl:
+        parser.add_argument('--cache_ttl',
+                            metavar='CACHE TTL',
+                            help="""seconds the cached data is used as
+                            is, the older introspection data and flavor
+                            nodes are revalidated with undercloud.""",
+                            type=int,
+                            default=derive_cache.DEFAULT_CACHE_TTL)
+    parser.add_argument('--refresh',
+                        help="""ignore the cached data and fetch it again
+                        from undercloud.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--offline',
+                        help="""use only the cached data without accessing
+                        undercloud.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--no_cache',
+                        help="""do not cache the %s.""" % cached_data,
+                        action='store_true',
+                        default=False)
+
+
+# Adds the timings options, stages being the timed stages like
+# 'derivation stages'
+def add_timings_options(parser, stages='derivation stages'):
+    parser.add_argument('--timings',
+                        help="""displays the latency summary of the
+                        undercloud calls and %s, and writes them to the
+                        trace file.""" % stages,
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--trace_file',
+                        metavar='TRACE FILE',
+                        help="""Chrome trace event file written with
+                        --timings.""",
+                        default=timings.DEFAULT_TRACE_FILE)
+
+
+# Gets the on-disk cache of the cache options, None with --no_cache
+def get_cache(opts):
+    if opts.no_cache:
+        return None
+    ttl = getattr(opts, 'cache_ttl', derive_cache.DEFAULT_CACHE_TTL)
+    return derive_cache.Cache(opts.cache_dir, ttl, opts.refresh, opts.offline)
@@ -0,0 +1,139 @@
+import atexit
+import threading
+import time
+
+from derive_common import timings
+
+# Pool of the authenticated SSH connections of the overcloud nodes,
+# keyed by host and user name, shared by the validations run in the
+# process (the DPDK and SRIOV validations run by
+# post-deployment-validation/validate_params.py, repeated runs from a long
+# running process). A connection is reused while its transport is active, and
+# the transports are kept alive with keepalive messages. The connections
+# not used for the idle timeout are evicted and closed when a connection
+# is acquired or released, and all of them are closed at exit.
+#
+# The paramiko SSH channels are multiplexed on the transport, so that a
+# connection is used by several threads at once.
+
+DEFAULT_USERNAME = 'heat-admin'
+# Keepalive interval and idle timeout in seconds, 0 disables them
+DEFAULT_KEEPALIVE = 30
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+class PooledConnection(object):
+    def __init__(self, client):
+        self.client = client
+        self.users = 0
+        self.last_used = time.time()
+
+
+class SSHPool(object):
+    def __init__(self, keepalive=DEFAULT_KEEPALIVE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def configure(self, keepalive=DEFAULT_KEEPALIVE,
+                  idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+
+    def _is_active(self, client):
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _connect(self, host, username):
+        import paramiko
+        client = timings.get_ssh_client(paramiko.SSHClient())
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.load_system_host_keys()
+        client.connect(host, username=username)
+        if self.keepalive:
+            client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    # Gets the SSH client of the host, connecting it when it is not in
+    # the pool or when its transport is not active anymore. The client
+    # is released to the pool after use instead of being closed.
+    def acquire(self, host, username=DEFAULT_USERNAME):
+        if not host:
+            raise Exception("Unable to connect to the node, the host "
+                            "address is missing")
+        key = (host, username)
+        self.evict_idle()
+        with self.lock:
+            conn = self.connections.get(key)
+            if conn is not None and self._is_active(conn.client):
+                conn.users += 1
+                conn.last_used = time.time()
+                return conn.client
+            stale = self.connections.pop(key, None)
+        if stale is not None:
+            stale.client.close()
+
+        client = self._connect(host, username)
+        with self.lock:
+            conn = self.connections.get(key)
+            # Connected by another thread in the meantime
+            if conn is not None and self._is_active(conn.client):
+                duplicate, client = client, conn.client
+            else:
+                duplicate = None
+                conn = PooledConnection(client)
+                self.connections[key] = conn
+            conn.users += 1
+            conn.last_used = time.time()
+        if duplicate is not None:
+            duplicate.close()
+        return client
+
+    # Releases the client of the host to the pool, and closes the other
+    # connections not used for the idle timeout
+    def release(self, host, username=DEFAULT_USERNAME):
+        with self.lock:
+            conn = self.connections.get((host, username))
+            if conn is not None:
+                conn.users = max(0, conn.users - 1)
+                conn.last_used = time.time()
+        self.evict_idle()
+
+    # Closes the connections not used for the idle timeout
+    def evict_idle(self, now=None):
+        if not self.idle_timeout:
+            return []
+        now = now or time.time()
+        with self.lock:
+            idle = [key for key, conn in self.connections.items()
+                    if not conn.users and
+                    now - conn.last_used > self.idle_timeout]
+            evicted = [self.connections.pop(key) for key in idle]
+        for conn in evicted:
+            conn.client.close()
+        return sorted(idle)
+
+    def close(self):
+        with self.lock:
+            connections = list(self.connections.values())
+            self.connections.clear()
+        for conn in connections:
+            conn.client.close()
+
+
+POOL = SSHPool()
+atexit.register(POOL.close)
+
+
+def configure(keepalive=DEFAULT_KEEPALIVE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    POOL.configure(keepalive, idle_timeout)
+
+
+def acquire(host, username=DEFAULT_USERNAME):
+    return POOL.acquire(host, username)
+
+
+def release(host, username=DEFAULT_USERNAME):
+    POOL.release(host, username)
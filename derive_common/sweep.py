@@ -0,0 +1,531 @@
+import csv
+import itertools
+import json
+import math
+import sys
+
+# numpy is optional, the sweep falls back to plain python loops (same
+# results, slower for large grids) when it is not installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# What-if sweep of the DPDK derivation inputs over a fleet. Each node is
+# reduced once to a summary of the inputs of the derivation formulas (the
+# threads of the PMD cores, the memory and the DPDK NIC's of each NUMA
+# node), and the derived values are then computed for all the nodes and
+# all the grid points together, as arrays of nodes x hugepage allocation
+# percentages x PMD cores x MTUs x NUMA nodes. The model of the deriver
+# gives the constants of the socket memory model (shared or per port) and
+# the hugepage allocation mode (global or per NUMA node).
+#
+# A node is infeasible at a grid point when a NUMA node has less cores
+# than the PMD cores, or with the per NUMA node hugepages when the socket
+# memory of a NUMA node exceeds its memory. The infeasible nodes are
+# counted apart and excluded from the ranges of the derived values and
+# from the fitting nodes. A node fits when the hugepages of each NUMA node
+# (the hugepages spread evenly on the NUMA nodes by the kernel in global
+# mode) hold its socket memory.
+SWEEP_KEYS = ['huge_page_allocation_percentage',
+              'num_phy_cores_per_numa_node_for_pmd', 'mtu']
+
+SWEEP_FORMATS = ['table', 'csv']
+DEFAULT_SWEEP_FORMAT = 'table'
+
+SWEEP_COLUMNS = ['huge_page_allocation_percentage',
+                 'num_phy_cores_per_numa_node_for_pmd', 'mtu', 'nodes',
+                 'pmd_threads_min', 'pmd_threads_max', 'vcpus_min',
+                 'vcpus_max', 'hugepages_min', 'hugepages_max',
+                 'hugepage_size', 'socket_memory_max', 'fit_nodes',
+                 'infeasible_nodes']
+
+TABLE_COLUMNS = [('hugepage %', 'huge_page_allocation_percentage', None),
+                 ('pmd cores', 'num_phy_cores_per_numa_node_for_pmd', None),
+                 ('mtu', 'mtu', None),
+                 ('nodes', 'nodes', None),
+                 ('pmd threads', 'pmd_threads_min', 'pmd_threads_max'),
+                 ('vcpus', 'vcpus_min', 'vcpus_max'),
+                 ('hugepages', 'hugepages_min', 'hugepages_max'),
+                 ('page size', 'hugepage_size', None),
+                 ('socket mem MB', 'socket_memory_max', None),
+                 ('fit', 'fit_nodes', None),
+                 ('infeasible', 'infeasible_nodes', None)]
+
+MB = 1024 * 1024
+
+
+# Gets the list of values for a sweep input, given as a list of values,
+# a single value or a 'start-stop' or 'start-stop:step' string range
+# (stop included)
+def parse_sweep_values(key, values):
+    if isinstance(values, list):
+        result = values
+    elif isinstance(values, int):
+        result = [values]
+    else:
+        try:
+            bounds, _, step = ('%s' % values).partition(':')
+            start, _, stop = bounds.partition('-')
+            result = list(range(int(start), int(stop or start) + 1,
+                                int(step or 1)))
+        except ValueError:
+            raise Exception("Invalid sweep range '%(values)s' for "
+                            "%(key)s" % {'values': values, 'key': key})
+    if not result:
+        raise Exception("Sweep values are missing for %s" % key)
+    for value in result:
+        if type(value) is not int or value < 1:
+            raise Exception("Invalid sweep value '%(value)s' for "
+                            "%(key)s" % {'value': value, 'key': key})
+    return result
+
+
+# Gets the sweep values of each input from the JSON sweep spec, like
+# {"huge_page_allocation_percentage": "40-80:10",
+#  "num_phy_cores_per_numa_node_for_pmd": [1, 2, 4], "mtu": [1500, 9000]}.
+# The inputs not swept keep the user input value, and the MTU of each
+# DPDK NIC is kept when the MTU is not swept ([None]).
+def parse_sweep(spec, user_input):
+    if not isinstance(spec, dict):
+        spec = json.loads(spec)
+    for key in spec.keys():
+        if key not in SWEEP_KEYS:
+            raise Exception("Invalid sweep input '%(key)s', expected one "
+                            "of: %(keys)s" % {'key': key,
+                                              'keys': ', '.join(SWEEP_KEYS)})
+    defaults = {'huge_page_allocation_percentage':
+                user_input.get('huge_page_allocation_percentage', 50),
+                'num_phy_cores_per_numa_node_for_pmd':
+                user_input.get('num_phy_cores_per_numa_node_for_pmd', 1),
+                'mtu': None}
+    sweep = {}
+    for key in SWEEP_KEYS:
+        if key in spec:
+            sweep[key] = parse_sweep_values(key, spec[key])
+        else:
+            sweep[key] = [defaults[key]]
+    for value in sweep['huge_page_allocation_percentage']:
+        if value > 100:
+            raise Exception("Invalid sweep value '%s' for "
+                            "huge_page_allocation_percentage" % value)
+    return sweep
+
+
+# Gets the sweep summary of a node. The NUMA nodes are the NUMA nodes of
+# the node memory and of the NICs. numa_thread_counts are the threads of
+# each physical core that can be used for PMD on each NIC NUMA node (all
+# the cores but the host core, in the PMD core order), numa_pmd tells the
+# NIC NUMA nodes getting PMD cores and socket memory, numa_dpdk the ones
+# having DPDK NICs, numa_memory_mb is the memory of each NUMA node (None
+# when unknown) and numa_nics are the DPDK NICs of each NUMA node as
+# [mtu, rx mbufs, tx descriptors] (numa_nics gives the NICs by NUMA node).
+# vcpu_base is the count of threads that are not host threads,
+# page_size_mb is the hugepage size in MB (1024, or 2 when the CPU does
+# not support 1GB hugepages) and memory_mb is the total memory.
+def get_node_summary(topology, numa_nics, host_threads_count, page_size_mb,
+                     memory_mb, nodes_memory):
+    summary = {'numa_thread_counts': [],
+               'numa_pmd': [],
+               'numa_dpdk': [],
+               'numa_memory_mb': [],
+               'numa_nics': [],
+               'vcpu_base': len(topology.threads) - host_threads_count,
+               'page_size_mb': page_size_mb,
+               'memory_mb': memory_mb}
+    for node in sorted(set(nodes_memory.keys()) |
+                       set(topology.nic_numa_nodes)):
+        thread_counts = []
+        if node in topology.nic_numa_nodes:
+            host_core = topology.node_host_cores[node]
+            thread_counts = [len(topology.core_threads[core])
+                             for core in topology.node_cores[node]
+                             if core != host_core]
+        summary['numa_thread_counts'].append(thread_counts)
+        summary['numa_pmd'].append(node in topology.nic_numa_nodes)
+        summary['numa_dpdk'].append(bool(numa_nics.get(node)))
+        summary['numa_memory_mb'].append(nodes_memory.get(node))
+        summary['numa_nics'].append([list(nic)
+                                     for nic in numa_nics.get(node, [])])
+    return summary
+
+
+# Gets the hugepage size label like '1G' or '2M' of the kernel args
+def get_hugepage_size_label(page_size_mb):
+    if page_size_mb % 1024 == 0:
+        return '%dG' % (page_size_mb // 1024)
+    return '%dM' % page_size_mb
+
+
+def _roundup_mtu(mtu):
+    return (mtu + 1023) // 1024 * 1024
+
+
+# Gets the socket memory of a NUMA node with DPDK NICs for the MTU (the
+# MTU of each NIC when None), an mbuf pool for each distinct MTU with the
+# per NIC mbufs of the model, rounded up to the hugepage size
+def _get_socket_memory(nics, model, page_size_mb, mtu, pmd_threads):
+    memory = model['minimum_socket_memory']
+    if nics:
+        pool_mtus = []
+        pools_bytes = 0
+        for nic_mtu, rx_mbufs, tx_descriptors in nics:
+            if mtu is not None:
+                nic_mtu = mtu
+            mbuf_size = _roundup_mtu(nic_mtu) + model['mbuf_overhead']
+            if nic_mtu not in pool_mtus:
+                pool_mtus.append(nic_mtu)
+                pools_bytes += model['pool_mbufs'] * mbuf_size
+            pools_bytes += mbuf_size * (rx_mbufs +
+                                        tx_descriptors * (pmd_threads + 1))
+        memory = float(pools_bytes) / MB + model['socket_memory_margin']
+    return int(math.ceil(float(memory) / page_size_mb)) * page_size_mb
+
+
+# Gets the values of a node for a grid point with plain python, as
+# (feasible, fits, pmd_threads, vcpus, hugepages, socket_memory)
+def _get_node_values(summary, model, perc, cores, mtu):
+    page_size_mb = summary['page_size_mb']
+    pages_per_gb = 1024 // page_size_mb
+    feasible = True
+    pmd_threads = 0
+    for counts, pmd, dpdk in zip(summary['numa_thread_counts'],
+                                 summary['numa_pmd'], summary['numa_dpdk']):
+        if not pmd:
+            continue
+        count = cores if dpdk else 1
+        if count > len(counts):
+            feasible = False
+        pmd_threads += sum(counts[:count])
+    socket_memory = [_get_socket_memory(nics, model, page_size_mb, mtu,
+                                        pmd_threads) if pmd else 0
+                     for nics, pmd in zip(summary['numa_nics'],
+                                          summary['numa_pmd'])]
+
+    memory_nodes = len([memory_mb for memory_mb in summary['numa_memory_mb']
+                        if memory_mb is not None]) or 1
+    numa_hugepages = []
+    if model['hugepage_mode'] == 'per_numa_node':
+        host_memory_gb = float(model['host_memory_gb']) / memory_nodes
+        for memory_mb, node_socket_memory in zip(summary['numa_memory_mb'],
+                                                 socket_memory):
+            if memory_mb is None:
+                numa_hugepages.append(0)
+                continue
+            memory_gb = memory_mb / 1024.0 - host_memory_gb
+            node_hugepages = int(memory_gb * (float(perc) / float(100)) *
+                                 pages_per_gb)
+            socket_memory_pages = node_socket_memory // page_size_mb
+            if socket_memory_pages > memory_gb * pages_per_gb:
+                feasible = False
+            numa_hugepages.append(max(node_hugepages, socket_memory_pages))
+        hugepages = sum(numa_hugepages)
+    else:
+        hugepages = int(float((summary['memory_mb'] // 1024) -
+                              model['host_memory_gb']) *
+                        (float(perc) / float(100)) * pages_per_gb)
+        numa_hugepages = [0 if memory_mb is None
+                          else hugepages // memory_nodes
+                          for memory_mb in summary['numa_memory_mb']]
+    fits = not [pmd for pmd, node_hugepages, node_socket_memory in
+                zip(summary['numa_pmd'], numa_hugepages, socket_memory)
+                if pmd and node_hugepages * page_size_mb < node_socket_memory]
+    return (feasible, fits, pmd_threads, summary['vcpu_base'] - pmd_threads,
+            hugepages, sum(socket_memory))
+
+
+# Gets the values of the nodes over the grid with plain python loops, as
+# lists of nodes x percentages x PMD cores x MTUs for each value name
+def _compute_python(summaries, sweep, model):
+    names = ['feasible', 'fits', 'pmd_threads', 'vcpus', 'hugepages',
+             'socket_memory']
+    values = dict((name, []) for name in names)
+    for summary in summaries:
+        node_values = dict((name, []) for name in names)
+        for perc in sweep['huge_page_allocation_percentage']:
+            perc_values = dict((name, []) for name in names)
+            for cores in sweep['num_phy_cores_per_numa_node_for_pmd']:
+                points = [_get_node_values(summary, model, perc, cores, mtu)
+                          for mtu in sweep['mtu']]
+                for index, name in enumerate(names):
+                    perc_values[name].append([point[index]
+                                              for point in points])
+            for name in names:
+                node_values[name].append(perc_values[name])
+        for name in names:
+            values[name].append(node_values[name])
+    return values
+
+
+# Gets the values of the nodes over the grid as numpy arrays of nodes x
+# percentages x PMD cores x MTUs, with the per NUMA node inputs of the
+# summaries padded to the same shape (nodes x NUMA nodes x cores or NICs)
+def _compute_numpy(summaries, sweep, model):
+    numa_count = max([len(summary['numa_pmd']) for summary in summaries])
+    cores_count = max([len(counts) for summary in summaries
+                       for counts in summary['numa_thread_counts']] + [0])
+    nics_count = max([len(nics) for summary in summaries
+                      for nics in summary['numa_nics']] + [1])
+
+    def numa_array(rows, dtype, fill):
+        return numpy.array([list(row) + [fill] * (numa_count - len(row))
+                            for row in rows], dtype=dtype)
+
+    cumulative = numpy.zeros((len(summaries), numa_count, cores_count + 1),
+                             dtype=numpy.int64)
+    available = numpy.zeros((len(summaries), numa_count), dtype=numpy.int64)
+    nics = numpy.zeros((len(summaries), numa_count, nics_count, 3),
+                       dtype=numpy.int64)
+    valid = numpy.zeros((len(summaries), numa_count, nics_count), dtype=bool)
+    for index, summary in enumerate(summaries):
+        for numa, counts in enumerate(summary['numa_thread_counts']):
+            cumulative[index, numa, 1:len(counts) + 1] = numpy.cumsum(counts)
+            available[index, numa] = len(counts)
+        for numa, numa_nics in enumerate(summary['numa_nics']):
+            if numa_nics:
+                nics[index, numa, :len(numa_nics)] = numa_nics
+                valid[index, numa, :len(numa_nics)] = True
+    pmd = numa_array([summary['numa_pmd'] for summary in summaries], bool,
+                     False)
+    dpdk = numa_array([summary['numa_dpdk'] for summary in summaries], bool,
+                      False)
+    has_memory = numa_array([[memory_mb is not None for memory_mb in
+                              summary['numa_memory_mb']]
+                             for summary in summaries], bool, False)
+    memory_mb = numa_array([[memory_mb or 0 for memory_mb in
+                             summary['numa_memory_mb']]
+                            for summary in summaries], numpy.int64, 0)
+    page_size = numpy.array([summary['page_size_mb']
+                             for summary in summaries], dtype=numpy.int64)
+    pages_per_gb = 1024 // page_size
+    vcpu_base = numpy.array([summary['vcpu_base'] for summary in summaries],
+                            dtype=numpy.int64)
+
+    # PMD threads (nodes x cores), infeasible when a NUMA node has less
+    # cores than requested
+    pmd_cores = numpy.array(sweep['num_phy_cores_per_numa_node_for_pmd'],
+                            dtype=numpy.int64)
+    requested = numpy.where(dpdk[:, :, None], pmd_cores[None, None, :], 1)
+    requested = numpy.where(pmd[:, :, None], requested, 0)
+    short_cores = (requested > available[:, :, None]).any(axis=1)
+    cores = numpy.minimum(requested, available[:, :, None])
+    node_index = numpy.arange(len(summaries))[:, None, None]
+    numa_index = numpy.arange(numa_count)[None, :, None]
+    pmd_threads = cumulative[node_index, numa_index, cores].sum(axis=1)
+
+    # Mbuf pools bytes (nodes x MTUs x NUMA nodes), with an mbuf pool for
+    # the first NIC of each distinct MTU
+    swept = numpy.array([mtu or 0 for mtu in sweep['mtu']],
+                        dtype=numpy.int64)
+    not_swept = numpy.array([mtu is None for mtu in sweep['mtu']])
+    mtus = numpy.where(not_swept[None, :, None, None],
+                       nics[:, None, :, :, 0],
+                       swept[None, :, None, None])
+    mbuf_size = (mtus + 1023) // 1024 * 1024 + model['mbuf_overhead']
+    earlier = numpy.tril(numpy.ones((nics_count, nics_count), dtype=bool),
+                         -1)
+    pooled = ((mtus[..., :, None] == mtus[..., None, :]) &
+              valid[:, None, :, None, :] & earlier).any(axis=-1)
+    first = valid[:, None] & ~pooled
+    fixed_bytes = (first * model['pool_mbufs'] * mbuf_size +
+                   valid[:, None] * mbuf_size *
+                   nics[:, None, :, :, 1]).sum(axis=-1)
+    tx_bytes = (valid[:, None] * mbuf_size *
+                nics[:, None, :, :, 2]).sum(axis=-1)
+
+    # Socket memory (nodes x cores x MTUs x NUMA nodes)
+    memory = ((fixed_bytes[:, None] + tx_bytes[:, None] *
+               (pmd_threads[:, :, None, None] + 1)).astype(numpy.float64) /
+              MB + model['socket_memory_margin'])
+    memory = numpy.where(valid.any(axis=-1)[:, None, None, :], memory,
+                         float(model['minimum_socket_memory']))
+    sizes = page_size[:, None, None, None]
+    socket_memory = numpy.ceil(memory / sizes).astype(numpy.int64) * sizes
+    socket_memory = numpy.where(pmd[:, None, None, :], socket_memory, 0)
+
+    # Hugepages (nodes x percentages x cores x MTUs x NUMA nodes)
+    percs = numpy.array(sweep['huge_page_allocation_percentage'],
+                        dtype=numpy.float64) / float(100)
+    memory_nodes = numpy.maximum(has_memory.sum(axis=1), 1)
+    short_memory = numpy.zeros(socket_memory.shape[:3], dtype=bool)
+    if model['hugepage_mode'] == 'per_numa_node':
+        memory_gb = (memory_mb / 1024.0 -
+                     (float(model['host_memory_gb']) / memory_nodes)[:, None])
+        node_hugepages = numpy.trunc(
+            memory_gb[:, None, :] * percs[None, :, None] *
+            pages_per_gb[:, None, None]).astype(numpy.int64)
+        socket_pages = socket_memory // sizes
+        short_memory = (has_memory[:, None, None, :] &
+                        (socket_pages > (memory_gb * pages_per_gb[:, None])
+                         [:, None, None, :])).any(axis=-1)
+        numa_hugepages = numpy.where(
+            has_memory[:, None, None, None, :],
+            numpy.maximum(node_hugepages[:, :, None, None, :],
+                          socket_pages[:, None]), 0)
+        hugepages = numa_hugepages.sum(axis=-1)
+    else:
+        total_memory = numpy.array([summary['memory_mb']
+                                    for summary in summaries],
+                                   dtype=numpy.int64)
+        total_hugepages = numpy.trunc(
+            ((total_memory // 1024) - model['host_memory_gb']).astype(
+                numpy.float64)[:, None] * percs[None, :] *
+            pages_per_gb[:, None]).astype(numpy.int64)
+        numa_hugepages = numpy.where(
+            has_memory[:, None, None, None, :],
+            (total_hugepages // memory_nodes[:, None])[:, :, None, None,
+                                                       None], 0)
+        hugepages = total_hugepages[:, :, None, None]
+
+    shape = (len(summaries), len(percs), len(pmd_cores), len(sweep['mtu']))
+    fits = (~pmd[:, None, None, None, :] |
+            (numa_hugepages * page_size[:, None, None, None, None] >=
+             socket_memory[:, None])).all(axis=-1)
+    feasible = ~short_cores[:, None, :, None] & ~short_memory[:, None]
+    pmd_threads = numpy.broadcast_to(pmd_threads[:, None, :, None], shape)
+    return {'feasible': numpy.broadcast_to(feasible, shape),
+            'fits': numpy.broadcast_to(fits, shape),
+            'pmd_threads': pmd_threads,
+            'vcpus': vcpu_base[:, None, None, None] - pmd_threads,
+            'hugepages': numpy.broadcast_to(hugepages, shape),
+            'socket_memory': numpy.broadcast_to(
+                socket_memory.sum(axis=-1)[:, None], shape)}
+
+
+# Gets the (min, max) of the values of the feasible nodes for each grid
+# point, (None, None) when no node is feasible
+def _range_numpy(values, feasible):
+    count = feasible.sum(axis=0)
+    low = numpy.where(feasible, values, numpy.iinfo(numpy.int64).max)
+    high = numpy.where(feasible, values, numpy.iinfo(numpy.int64).min)
+    low = low.min(axis=0)
+    high = high.max(axis=0)
+
+    def get_range(point):
+        if not count[point]:
+            return None, None
+        return low[point], high[point]
+    return get_range
+
+
+def _range_python(values, feasible):
+    def get_range(point):
+        perc, cores, mtu = point
+        node_values = [node[perc][cores][mtu]
+                       for node, node_feasible in zip(values, feasible)
+                       if node_feasible[perc][cores][mtu]]
+        if not node_values:
+            return None, None
+        return min(node_values), max(node_values)
+    return get_range
+
+
+# Evaluates the sweep grid for the node summaries with the deriver model
+# and returns a row for each combination of the swept values, with the
+# min and max of the derived values over the feasible nodes. The model
+# gives the hugepage allocation mode ('global' or 'per_numa_node'), the
+# hugepages reserved for the host (host_memory_gb), and the socket memory
+# model as the mbufs of each mbuf pool (pool_mbufs), the bytes added to
+# the MTU for each mbuf (mbuf_overhead), the socket memory added to the
+# pools (socket_memory_margin) and the socket memory of the NUMA nodes
+# without DPDK NICs (minimum_socket_memory). The hugepages are counted in
+# pages of the hugepage size of each node (hugepage_size lists the sizes
+# of the nodes).
+def evaluate(summaries, sweep, model):
+    hugepage_percs = sweep['huge_page_allocation_percentage']
+    pmd_cores = sweep['num_phy_cores_per_numa_node_for_pmd']
+    mtus = sweep['mtu']
+    rows = []
+    if not summaries:
+        return rows
+
+    page_sizes = [summary['page_size_mb'] for summary in summaries]
+    hugepage_size = '/'.join([get_hugepage_size_label(page_size)
+                              for page_size in sorted(set(page_sizes),
+                                                      reverse=True)])
+    if numpy is not None:
+        values = _compute_numpy(summaries, sweep, model)
+        feasible = values['feasible']
+        feasible_count = feasible.sum(axis=0)
+        fit_count = (feasible & values['fits']).sum(axis=0)
+        get_range = _range_numpy
+    else:
+        values = _compute_python(summaries, sweep, model)
+        feasible = values['feasible']
+        points = itertools.product(range(len(hugepage_percs)),
+                                   range(len(pmd_cores)), range(len(mtus)))
+        feasible_count = {}
+        fit_count = {}
+        for point in points:
+            perc, cores, mtu = point
+            feasible_count[point] = sum([
+                1 for node in feasible if node[perc][cores][mtu]])
+            fit_count[point] = sum([
+                1 for node, fits in zip(feasible, values['fits'])
+                if node[perc][cores][mtu] and fits[perc][cores][mtu]])
+        get_range = _range_python
+    pmd_range = get_range(values['pmd_threads'], feasible)
+    vcpu_range = get_range(values['vcpus'], feasible)
+    hugepage_range = get_range(values['hugepages'], feasible)
+    socket_range = get_range(values['socket_memory'], feasible)
+
+    for point in itertools.product(range(len(hugepage_percs)),
+                                   range(len(pmd_cores)), range(len(mtus))):
+        perc, cores, mtu = point
+        pmd_min, pmd_max = pmd_range(point)
+        vcpus_min, vcpus_max = vcpu_range(point)
+        hugepages_min, hugepages_max = hugepage_range(point)
+        rows.append({
+            'huge_page_allocation_percentage': hugepage_percs[perc],
+            'num_phy_cores_per_numa_node_for_pmd': pmd_cores[cores],
+            'mtu': mtus[mtu] if mtus[mtu] is not None else '-',
+            'nodes': len(summaries),
+            'pmd_threads_min': _to_int(pmd_min),
+            'pmd_threads_max': _to_int(pmd_max),
+            'vcpus_min': _to_int(vcpus_min),
+            'vcpus_max': _to_int(vcpus_max),
+            'hugepages_min': _to_int(hugepages_min),
+            'hugepages_max': _to_int(hugepages_max),
+            'hugepage_size': hugepage_size,
+            'socket_memory_max': _to_int(socket_range(point)[1]),
+            'fit_nodes': _to_int(fit_count[point]),
+            'infeasible_nodes': len(summaries) -
+            _to_int(feasible_count[point])})
+    return rows
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    return int(value)
+
+
+def _format_range(row, min_key, max_key):
+    if row[min_key] is None:
+        return '-'
+    if max_key is None or row[min_key] == row[max_key]:
+        return '%s' % row[min_key]
+    return '%(min)s-%(max)s' % {'min': row[min_key], 'max': row[max_key]}
+
+
+# Writes the sweep rows to output (stdout) as an aligned table, or as
+# CSV with the min and max columns
+def write_rows(rows, output_format=DEFAULT_SWEEP_FORMAT, output=None):
+    output = output or sys.stdout
+    if output_format == 'csv':
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerow(SWEEP_COLUMNS)
+        for row in rows:
+            writer.writerow(['' if row[key] is None else row[key]
+                             for key in SWEEP_COLUMNS])
+        return
+
+    lines = [[title for title, _, _ in TABLE_COLUMNS]]
+    for row in rows:
+        lines.append([_format_range(row, min_key, max_key)
+                      for _, min_key, max_key in TABLE_COLUMNS])
+    widths = [max([len(line[index]) for line in lines])
+              for index in range(len(TABLE_COLUMNS))]
+    for line in lines:
+        output.write('  '.join([value.rjust(width) for value, width
+                                in zip(line, widths)]).rstrip() + '\n')
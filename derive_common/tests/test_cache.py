@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from derive_common import cache as derive_cache
+from derive_common import nodes
+
+
+# Data source counting the fetches and the version lookups
+class Source(object):
+    def __init__(self, data='data', version='v1'):
+        self.data = data
+        self.version = version
+        self.fetches = 0
+        self.versions = 0
+
+    def fetch(self):
+        self.fetches += 1
+        return self.data
+
+    def get_version(self):
+        self.versions += 1
+        return self.version
+
+
+# Backend with the flavor profiles and the nodes profiles list
+class NodesBackend(object):
+    def __init__(self):
+        self.profiles = {'compute': 'compute'}
+        self.profiles_list = [
+            {'Node UUID': 'node-1', 'Current Profile': 'compute'},
+            {'Node UUID': 'node-2', 'Current Profile': 'dpdk'}]
+        self.calls = []
+
+    def get_profile_name(self, flavor_name):
+        self.calls.append('get_profile_name')
+        return self.profiles[flavor_name]
+
+    def get_profiles_list(self):
+        self.calls.append('get_profiles_list')
+        return self.profiles_list
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def get_cache(self, **kwargs):
+        return derive_cache.Cache(self.cache_dir, **kwargs)
+
+
+class CacheTest(CacheTestCase):
+    def test_fetch_and_store(self):
+        source = Source({'a': [1, 2]})
+        cache = self.get_cache()
+        self.assertEqual({'a': [1, 2]}, cache.get('key', source.fetch,
+                                                  source.get_version))
+        self.assertEqual(1, source.fetches)
+        entry = cache.load('key')
+        self.assertEqual('v1', entry['version'])
+        self.assertEqual({'a': [1, 2]}, entry['data'])
+
+    # Entries younger than the ttl are used without revalidation
+    def test_fresh_entry(self):
+        source = Source()
+        cache = self.get_cache()
+        cache.get('key', source.fetch, source.get_version)
+        source.version = 'v2'
+        self.assertEqual('data', cache.get('key', source.fetch,
+                                           source.get_version))
+        self.assertEqual(1, source.fetches)
+        self.assertEqual(1, source.versions)
+
+    # Older versioned entries are revalidated and used for another ttl
+    def test_revalidated_entry(self):
+        source = Source()
+        self.get_cache(ttl=0).get('key', source.fetch, source.get_version)
+        stored_at = self.get_cache().load('key')['stored_at']
+        cache = self.get_cache(ttl=0)
+        self.assertEqual('data', cache.get('key', source.fetch,
+                                           source.get_version))
+        self.assertEqual(1, source.fetches)
+        self.assertEqual(2, source.versions)
+        self.assertTrue(cache.load('key')['stored_at'] >= stored_at)
+        self.get_cache().get('key', source.fetch, source.get_version)
+        self.assertEqual(2, source.versions)
+
+    def test_changed_version(self):
+        source = Source()
+        cache = self.get_cache(ttl=0)
+        cache.get('key', source.fetch, source.get_version)
+        source.data = 'new data'
+        source.version = 'v2'
+        self.assertEqual('new data', cache.get('key', source.fetch,
+                                               source.get_version))
+        self.assertEqual(2, source.fetches)
+        self.assertEqual('v2', cache.load('key')['version'])
+
+    # The ttl of the call overrides the cache ttl
+    def test_ttl_argument(self):
+        source = Source()
+        cache = self.get_cache()
+        cache.get('key', source.fetch, source.get_version)
+        cache.get('key', source.fetch, source.get_version, ttl=0)
+        self.assertEqual(2, source.versions)
+
+    def test_expired_entry_without_version(self):
+        source = Source()
+        cache = self.get_cache(ttl=0)
+        cache.get('key', source.fetch)
+        cache.get('key', source.fetch)
+        self.assertEqual(2, source.fetches)
+        self.assertEqual(0, source.versions)
+
+    def test_refresh(self):
+        source = Source()
+        self.get_cache().get('key', source.fetch, source.get_version)
+        self.get_cache(refresh=True).get('key', source.fetch,
+                                         source.get_version)
+        self.assertEqual(2, source.fetches)
+
+    def test_offline(self):
+        source = Source()
+        cache = self.get_cache(offline=True)
+        self.assertRaises(Exception, cache.get, 'key', source.fetch)
+        self.get_cache().get('key', source.fetch, source.get_version)
+        source.version = 'v2'
+        self.assertEqual('data', self.get_cache(ttl=0, offline=True).get(
+            'key', source.fetch, source.get_version))
+        self.assertEqual(1, source.fetches)
+        self.assertEqual(1, source.versions)
+        self.assertRaises(Exception, derive_cache.Cache, self.cache_dir,
+                          refresh=True, offline=True)
+
+    def test_invalidate(self):
+        source = Source()
+        cache = self.get_cache()
+        cache.get('key/with:chars', source.fetch)
+        cache.invalidate('key/with:chars')
+        self.assertIsNone(cache.load('key/with:chars'))
+        cache.invalidate('key/with:chars')
+
+    def test_unreadable_entry(self):
+        cache = self.get_cache()
+        cache.store('key', 'data')
+        path = [name for name in os.listdir(self.cache_dir)][0]
+        with open(os.path.join(self.cache_dir, path), 'wb') as entry:
+            entry.write(b'not gzip')
+        self.assertIsNone(cache.load('key'))
+
+
+class NodeUuidsTest(CacheTestCase):
+    def test_node_uuids(self):
+        backend = NodesBackend()
+        self.assertEqual(['node-1'], nodes.get_node_uuids('compute', None,
+                                                          backend))
+        self.assertEqual(['node-1'], nodes.get_node_uuids(
+            'compute', self.get_cache(), backend))
+
+    # Revalidation and fetch share the lookups
+    def test_revalidation_lookups(self):
+        backend = NodesBackend()
+        nodes.get_node_uuids('compute', self.get_cache(ttl=0), backend)
+        self.assertEqual(['get_profile_name', 'get_profiles_list'],
+                         sorted(backend.calls))
+        backend.calls = []
+        nodes.get_node_uuids('compute', self.get_cache(), backend)
+        self.assertEqual([], backend.calls)
+
+    def test_changed_flavor_profile(self):
+        backend = NodesBackend()
+        nodes.get_node_uuids('compute', self.get_cache(), backend)
+        backend.profiles['compute'] = 'dpdk'
+        self.assertEqual(['node-2'], nodes.get_node_uuids(
+            'compute', self.get_cache(ttl=0), backend))
+
+    def test_changed_node_profile(self):
+        backend = NodesBackend()
+        nodes.get_node_uuids('compute', self.get_cache(), backend)
+        backend.profiles_list[1]['Current Profile'] = 'compute'
+        self.assertEqual(['node-1', 'node-2'], nodes.get_node_uuids(
+            'compute', self.get_cache(ttl=0), backend))
+
+    def test_nodes_version(self):
+        profiles_list = NodesBackend().profiles_list
+        version = nodes.get_nodes_version('compute', profiles_list)
+        self.assertEqual(version, nodes.get_nodes_version(
+            'compute', list(reversed(profiles_list))))
+        self.assertNotEqual(version, nodes.get_nodes_version(
+            'dpdk', profiles_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+from derive_common import cpu_codec
+
+
+class NumberListTest(unittest.TestCase):
+    def test_parse_number_list(self):
+        self.assertEqual([1, 2, 3], cpu_codec.parse_number_list('1,2,3'))
+        self.assertEqual([4, 5], cpu_codec.parse_number_list("'4, 5'"))
+        self.assertEqual([6, 7], cpu_codec.parse_number_list("['6', '7']"))
+        self.assertEqual([8, 0], cpu_codec.parse_number_list([8, '0']))
+        self.assertEqual([], cpu_codec.parse_number_list(''))
+
+    def test_parse_invalid_number_list(self):
+        self.assertRaises(Exception, cpu_codec.parse_number_list, '1,a')
+        self.assertRaises(Exception, cpu_codec.parse_number_list, [-1])
+
+    def test_bits(self):
+        self.assertEqual(0b100101, cpu_codec.number_list_to_bits([0, 2, 5]))
+        self.assertEqual(0, cpu_codec.number_list_to_bits([]))
+        self.assertEqual([0, 2, 5], cpu_codec.bits_to_number_list(0b100101))
+        self.assertEqual([], cpu_codec.bits_to_number_list(0))
+
+    def test_large_numbers(self):
+        numbers = [0, 63, 64, 1023, 4095]
+        self.assertEqual(numbers, cpu_codec.bits_to_number_list(
+            cpu_codec.number_list_to_bits(numbers)))
+
+
+class RangeListTest(unittest.TestCase):
+    def test_range_list_to_number_list(self):
+        self.assertEqual([0, 1, 3, 8],
+                         cpu_codec.range_list_to_number_list('0-3,8,^2'))
+        self.assertEqual([1, 2, 3, 8],
+                         cpu_codec.range_list_to_number_list("'1-3,8'"))
+        self.assertEqual([1, 2, 3, 8],
+                         cpu_codec.range_list_to_number_list(
+                             "['1-3', '8']"))
+        self.assertEqual([1, 2, 3, 8],
+                         cpu_codec.range_list_to_number_list(['1-3', 8]))
+        self.assertEqual([], cpu_codec.range_list_to_number_list(''))
+
+    # Excluded numbers out of the ranges are ignored
+    def test_excludes(self):
+        self.assertEqual([], cpu_codec.range_list_to_number_list('^4'))
+        self.assertEqual([0, 1], cpu_codec.range_list_to_number_list(
+            '0-1,^9'))
+
+    def test_invalid_range_list(self):
+        for range_list in ['3-1', '1-x', '-1', 'a', '1-']:
+            self.assertRaises(Exception, cpu_codec.range_list_to_bits,
+                              range_list)
+
+    def test_number_list_to_range_list(self):
+        self.assertEqual(['0-3', '8', '10-11'],
+                         cpu_codec.number_list_to_range_list(
+                             [11, 0, 1, 2, 3, 8, 10]))
+        self.assertEqual(['5'], cpu_codec.number_list_to_range_list([5]))
+        self.assertEqual([], cpu_codec.number_list_to_range_list([]))
+
+    def test_round_trip(self):
+        for numbers in [[0], [1, 2], [0, 2, 4, 6], list(range(0, 128, 3)),
+                        list(range(100)) + [200]]:
+            range_list = cpu_codec.number_list_to_range_list(numbers)
+            self.assertEqual(numbers,
+                             cpu_codec.range_list_to_number_list(range_list))
+            self.assertEqual(numbers, cpu_codec.range_list_to_number_list(
+                ','.join(range_list)))
+
+
+class MaskTest(unittest.TestCase):
+    def test_mask_to_number_list(self):
+        self.assertEqual([4, 5, 6, 7], cpu_codec.mask_to_number_list('f0'))
+        self.assertEqual([0, 1, 16, 17],
+                         cpu_codec.mask_to_number_list('0x30003'))
+        self.assertEqual([0, 1, 32, 33],
+                         cpu_codec.mask_to_number_list('00000003,00000003'))
+        self.assertEqual([0, 32], cpu_codec.mask_to_number_list('1,1'))
+        self.assertEqual([], cpu_codec.mask_to_number_list('"0"\n'))
+
+    def test_invalid_mask(self):
+        self.assertRaises(Exception, cpu_codec.mask_to_bits, 'xyz')
+        self.assertRaises(Exception, cpu_codec.mask_to_bits,
+                          '100000000,1')
+
+    def test_number_list_to_mask(self):
+        self.assertEqual('30003', cpu_codec.number_list_to_mask(
+            [0, 1, 16, 17]))
+        self.assertEqual('00000003,00000003', cpu_codec.number_list_to_mask(
+            [0, 1, 32, 33], kernel_format=True))
+        self.assertEqual('00000001', cpu_codec.number_list_to_mask(
+            [0], kernel_format=True))
+        self.assertEqual('0', cpu_codec.number_list_to_mask([]))
+
+    def test_round_trip(self):
+        numbers = [0, 5, 31, 32, 63, 64, 127, 1000]
+        for kernel_format in (False, True):
+            mask = cpu_codec.number_list_to_mask(numbers, kernel_format)
+            self.assertEqual(numbers, cpu_codec.mask_to_number_list(mask))
+
+
+if __name__ == '__main__':
+    unittest.main()
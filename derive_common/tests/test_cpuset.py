@@ -0,0 +1,65 @@
+import unittest
+
+from derive_common.cpuset import CpuSet
+
+
+class CpuSetTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual([0, 1, 3, 8], CpuSet.parse('0-3,8,^2').to_list())
+        self.assertEqual([1, 2, 8], CpuSet.parse("['1-2', '8']").to_list())
+        self.assertEqual([2, 4], CpuSet.parse([4, 2]).to_list())
+        self.assertEqual([2, 4, 5], CpuSet.parse(['2', '4-5']).to_list())
+        self.assertEqual([], CpuSet.parse('').to_list())
+        cpus = CpuSet([1])
+        self.assertIs(cpus, CpuSet.parse(cpus))
+
+    def test_from_mask(self):
+        self.assertEqual([0, 1, 16, 17], CpuSet.from_mask('0x30003').to_list())
+        self.assertEqual([0, 32],
+                         CpuSet.from_mask('00000001,00000001').to_list())
+
+    def test_format(self):
+        cpus = CpuSet([0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(['0-3', '8', '10-11'], cpus.to_range_list())
+        self.assertEqual('0-3,8,10-11', cpus.to_range_string())
+        self.assertEqual('0,1,2,3,8,10,11', str(cpus))
+        self.assertEqual("CpuSet('0-3,8,10-11')", repr(cpus))
+        self.assertEqual('d0f', cpus.to_mask())
+        self.assertEqual('00000d0f', cpus.to_mask(kernel_format=True))
+
+    def test_round_trip(self):
+        for cpus in [[], [0], [0, 1, 2], [1, 3, 5, 64], list(range(0, 256, 7)),
+                     list(range(40)) + list(range(44, 88))]:
+            cpuset = CpuSet(cpus)
+            self.assertEqual(cpuset, CpuSet.parse(cpuset.to_range_string()))
+            self.assertEqual(cpuset, CpuSet.parse(cpuset.to_range_list()))
+            self.assertEqual(cpuset, CpuSet.parse(str(cpuset)))
+            self.assertEqual(cpuset, CpuSet.from_mask(cpuset.to_mask()))
+            self.assertEqual(cpuset, CpuSet.from_mask(
+                cpuset.to_mask(kernel_format=True)))
+            self.assertEqual(cpus, list(cpuset))
+
+    def test_set_operations(self):
+        cpus = CpuSet.parse('0-7')
+        others = CpuSet.parse('4-11')
+        self.assertEqual(CpuSet.parse('0-11'), cpus | others)
+        self.assertEqual(CpuSet.parse('4-7'), cpus & others)
+        self.assertEqual(CpuSet.parse('0-3'), cpus - others)
+        self.assertEqual(CpuSet.parse('0-3,8-11'), cpus ^ others)
+        self.assertTrue(CpuSet.parse('1-2').issubset(cpus))
+        self.assertTrue(cpus.issuperset(CpuSet([7])))
+        self.assertFalse(cpus.issubset(others))
+
+    def test_container(self):
+        cpus = CpuSet([3, 1])
+        self.assertEqual(2, len(cpus))
+        self.assertIn(3, cpus)
+        self.assertNotIn(2, cpus)
+        self.assertTrue(cpus)
+        self.assertFalse(CpuSet())
+        self.assertEqual(hash(CpuSet([1, 3])), hash(cpus))
+        self.assertNotEqual(CpuSet([1]), cpus)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+import copy
+import sys
+import unittest
+
+from derive_common import derivers
+from derive_common import topology_generator
+from derive_common.topology import Topology
+
+dpdk = derivers.load_deriver('dpdk')
+
+# Medium profile: 2 NUMA nodes of 22 cores with 2 threads and 64GB of
+# memory each, nic4 (p1p1) on NUMA node 0 and nic6 (p2p1) on NUMA node 1
+HW_DATA = topology_generator.generate_profile('medium')
+
+
+def get_nics_info(dpdk_nics, hw_data=HW_DATA):
+    return dpdk.get_dpdk_nics_numa_info(dpdk.get_nic_index(hw_data),
+                                        dpdk_nics)
+
+
+class PmdSizingTest(unittest.TestCase):
+    def setUp(self):
+        self.topology = Topology.from_introspection(HW_DATA)
+
+    def get_cores(self, dpdk_nics, **kwargs):
+        pmd_sizing = dpdk.get_pmd_sizing(self.topology,
+                                         get_nics_info(dpdk_nics), **kwargs)
+        return [node_sizing['cores'] for node_sizing in pmd_sizing]
+
+    def test_frame_bits(self):
+        self.assertEqual(672.0, dpdk.get_frame_bits(64))
+        self.assertEqual((84 * 7 + 590 * 4 + 1538) * 8 / 12.0,
+                         dpdk.get_frame_bits(dpdk.IMIX_FRAME_SIZES))
+
+    def test_nic_target_mpps(self):
+        self.assertEqual(5.0, dpdk.get_nic_target_mpps(
+            {'nic_id': 'nic4', 'target_mpps': 5, 'speed_gbps': 100}))
+        self.assertAlmostEqual(10000 / 672.0, dpdk.get_nic_target_mpps(
+            {'nic_id': 'nic4', 'speed_gbps': 25, 'target_gbps': 10,
+             'frame_size': 64}))
+        self.assertAlmostEqual(
+            25000 / dpdk.get_frame_bits(dpdk.IMIX_FRAME_SIZES),
+            dpdk.get_nic_target_mpps({'nic_id': 'nic4', 'speed_gbps': 25}))
+        self.assertRaises(Exception, dpdk.get_nic_target_mpps,
+                          {'nic_id': 'nic4'})
+
+    # The cores keep the load below 80% of 4 Mpps per core, exact
+    # multiples of the usable capacity included, and the NUMA nodes
+    # without DPDK NICs get one core
+    def test_cores(self):
+        self.assertEqual([3, 1], self.get_cores(
+            [{'nic': 'nic4', 'mtu': 1500, 'target_mpps': 7}]))
+        self.assertEqual([2, 1], self.get_cores(
+            [{'nic': 'nic4', 'mtu': 1500, 'target_mpps': 6.4}]))
+        self.assertEqual([1, 2], self.get_cores(
+            [{'nic': 'nic6', 'mtu': 1500, 'target_mpps': 3},
+             {'nic': 'nic7', 'mtu': 1500, 'target_mpps': 3}]))
+        self.assertEqual([4, 1], self.get_cores(
+            [{'nic': 'nic4', 'mtu': 1500, 'target_mpps': 7}],
+            core_capacity_mpps=2.0, max_load_perc=100))
+
+    def test_headroom(self):
+        pmd_sizing = dpdk.get_pmd_sizing(self.topology, get_nics_info(
+            [{'nic': 'nic4', 'mtu': 1500, 'target_mpps': 7}]))
+        self.assertEqual(['nic4'], pmd_sizing[0]['nics'])
+        self.assertEqual(12.0, pmd_sizing[0]['capacity_mpps'])
+        self.assertAlmostEqual(100 * 5 / 12.0,
+                               pmd_sizing[0]['headroom_percentage'])
+
+    # The sizing fails instead of using less cores than needed, one core
+    # of each NUMA node being kept for the host
+    def test_not_enough_cores(self):
+        self.assertEqual([21, 1], self.get_cores(
+            [{'nic': 'nic4', 'mtu': 1500, 'target_mpps': 21 * 3.2}]))
+        self.assertRaises(Exception, self.get_cores,
+                          [{'nic': 'nic4', 'mtu': 1500,
+                            'target_mpps': 21 * 3.2 + 0.1}])
+
+    # The PMD cores of the derived parameters follow the sizing
+    def test_derived_core_list(self):
+        details = {}
+        parameters, _ = dpdk.derive_hw_data_parameters(
+            HW_DATA, {'dpdk_nics': [{'nic': 'nic4', 'mtu': 1500,
+                                     'target_mpps': 7}]}, details=details)
+        self.assertEqual([3, 1], [node_sizing['cores'] for node_sizing
+                                  in details['pmd_sizing']])
+        self.assertEqual(8, len(details['dpdk_cpus']))
+        nodes = [self.topology.core_numa_nodes[
+            self.topology.get_thread_core(thread)]
+            for thread in details['dpdk_cpus']]
+        self.assertEqual([6, 2], [nodes.count(node) for node in [0, 1]])
+        self.assertIsNone(dpdk.get_user_pmd_sizing(
+            self.topology, get_nics_info([{'nic': 'nic4', 'mtu': 1500}]),
+            {'dpdk_nics': [{'nic': 'nic4', 'mtu': 1500}]}))
+
+
+class SocketMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.topology = Topology.from_introspection(HW_DATA)
+        # Two MTU 1500 NICs sharing a pool on NUMA node 0 and a MTU 9000
+        # NIC with 8 queues on NUMA node 1
+        self.nics_info = get_nics_info(
+            [{'nic': 'nic4', 'mtu': 1500},
+             {'nic': 'nic5', 'mtu': 1500, 'rx_queues': 2,
+              'rx_descriptors': 1024},
+             {'nic': 'nic6', 'mtu': 9000, 'rx_queues': 8,
+              'rx_descriptors': 4096, 'tx_descriptors': 4096}])
+
+    def get_breakdown(self, memory_model, page_size_mb=dpdk.HUGEPAGE_SIZE_1G,
+                      nics_info=None):
+        return dpdk.get_socket_memory_breakdown(
+            self.topology, nics_info or self.nics_info, memory_model, 4,
+            page_size_mb=page_size_mb)
+
+    # The per port pools have the mbufs of the rx and tx descriptors of
+    # the queues, a tx queue for each of the 4 PMD threads and the non PMD
+    # thread, and the rx bursts
+    def test_per_port_pools(self):
+        breakdown = self.get_breakdown('per_port')
+        pools = [node_memory['pools'] for node_memory in breakdown]
+        self.assertEqual([[1500], [9000]],
+                         [[pool['mtu'] for pool in node_pools]
+                          for node_pools in pools])
+        self.assertEqual(['nic4', 'nic5'], pools[0][0]['nics'])
+        nic4_mbufs = 2048 + 5 * 2048 + 32
+        nic5_mbufs = 2 * 1024 + 5 * 2048 + 2 * 32
+        nic6_mbufs = 8 * 4096 + 5 * 4096 + 8 * 32
+        self.assertEqual(dpdk.MIN_POOL_MBUFS + nic4_mbufs + nic5_mbufs,
+                         pools[0][0]['mbufs'])
+        self.assertEqual(dpdk.MIN_POOL_MBUFS + nic6_mbufs,
+                         pools[1][0]['mbufs'])
+        self.assertEqual([2048 + 800, 9216 + 800],
+                         [node_pools[0]['mbuf_size'] for node_pools in pools])
+        self.assertAlmostEqual(
+            pools[1][0]['mbufs'] * 10016 / (1024 * 1024.0),
+            pools[1][0]['size_mb'])
+
+    # The socket memory of the pools and the margin is rounded up to the
+    # hugepage size, 1180 MB on NUMA node 1 in the per port model
+    def test_per_port_socket_memory(self):
+        self.assertEqual([1024, 2048], [
+            node_memory['socket_memory']
+            for node_memory in self.get_breakdown('per_port')])
+        self.assertEqual([624, 1180], [
+            node_memory['socket_memory']
+            for node_memory in self.get_breakdown('per_port',
+                                                  dpdk.HUGEPAGE_SIZE_2M)])
+
+    # The shared pools have 256K mbufs whatever the queues
+    def test_shared_socket_memory(self):
+        breakdown = self.get_breakdown('shared')
+        self.assertEqual([dpdk.SHARED_POOL_MBUFS] * 2,
+                         [node_memory['pools'][0]['mbufs']
+                          for node_memory in breakdown])
+        self.assertEqual([2048, 3072], [node_memory['socket_memory']
+                                        for node_memory in breakdown])
+        self.assertEqual("'2048,3072'", dpdk.format_socket_memory(breakdown))
+
+    # The NUMA nodes without DPDK NICs get the minimum socket memory
+    def test_minimum_socket_memory(self):
+        nics_info = get_nics_info([{'nic': 'nic4', 'mtu': 1500}])
+        for memory_model in dpdk.SOCKET_MEMORY_MODELS:
+            self.assertEqual([], self.get_breakdown(
+                memory_model, nics_info=nics_info)[1]['pools'])
+            self.assertEqual(2048, self.get_breakdown(
+                memory_model, nics_info=nics_info)[1]['socket_memory'])
+            self.assertEqual(1500, self.get_breakdown(
+                memory_model, dpdk.HUGEPAGE_SIZE_2M,
+                nics_info)[1]['socket_memory'])
+
+    # The per port socket memory grows with the PMD threads of the derived
+    # core list
+    def test_derived_socket_memory(self):
+        user_input = {'socket_memory_model': 'per_port',
+                      'dpdk_nics': [{'nic': 'nic6', 'mtu': 9000}]}
+        parameters, _ = dpdk.derive_hw_data_parameters(HW_DATA, user_input)
+        self.assertEqual("'2048,1024'", parameters['NeutronDpdkSocketMemory'])
+        user_input['num_phy_cores_per_numa_node_for_pmd'] = 20
+        parameters, _ = dpdk.derive_hw_data_parameters(HW_DATA, user_input)
+        self.assertEqual("'2048,2048'", parameters['NeutronDpdkSocketMemory'])
+
+
+# Gets the medium profile with the memory of each NUMA node in GB
+def get_numa_memory_hw_data(nodes_memory_gb):
+    hw_data = copy.deepcopy(HW_DATA)
+    hw_data['numa_topology']['ram'] = [
+        {'numa_node': node, 'size_kb': memory_gb * 1024 * 1024}
+        for node, memory_gb in enumerate(nodes_memory_gb)]
+    return hw_data
+
+
+class NumaHugepagesTest(unittest.TestCase):
+    def get_numa_hugepages(self, hw_data, perc, nodes_socket_memory=None,
+                           page_size_mb=dpdk.HUGEPAGE_SIZE_1G):
+        return dpdk.get_numa_hugepages(
+            hw_data, Topology.from_introspection(hw_data), perc,
+            nodes_socket_memory or {}, page_size_mb)
+
+    # The hugepages of each NUMA node are the percentage of its memory
+    # less its 2GB share of the host memory
+    def test_node_memory(self):
+        self.assertEqual([(0, 31), (1, 31)],
+                         self.get_numa_hugepages(HW_DATA, 50))
+        self.assertEqual([(0, 15), (1, 47)], self.get_numa_hugepages(
+            get_numa_memory_hw_data([32, 96]), 50))
+        self.assertEqual([(0, 15 * 512), (1, 47 * 512)],
+                         self.get_numa_hugepages(
+                             get_numa_memory_hw_data([32, 96]), 50,
+                             page_size_mb=dpdk.HUGEPAGE_SIZE_2M))
+
+    # Without the NUMA nodes memory, the total memory is split evenly
+    def test_total_memory(self):
+        hw_data = copy.deepcopy(HW_DATA)
+        del hw_data['numa_topology']['ram']
+        self.assertEqual({0: 65536, 1: 65536}, dpdk.get_numa_nodes_memory(
+            hw_data, Topology.from_introspection(hw_data)))
+        self.assertEqual([(0, 31), (1, 31)],
+                         self.get_numa_hugepages(hw_data, 50))
+
+    # Each NUMA node has at least the hugepages of its socket memory, and
+    # fails when its memory can not hold them
+    def test_socket_memory(self):
+        self.assertEqual([(0, 2), (1, 3)], self.get_numa_hugepages(
+            HW_DATA, 1, {0: 2048, 1: 3072}))
+        self.assertEqual([(0, 1), (1, 2)], self.get_numa_hugepages(
+            get_numa_memory_hw_data([4, 4]), 10, {0: 1024, 1: 2048}))
+        self.assertRaises(Exception, self.get_numa_hugepages,
+                          get_numa_memory_hw_data([4, 4]), 10,
+                          {0: 1024, 1: 3072})
+
+    # The kernel args have the total of the NUMA nodes hugepages, and the
+    # unit sets the NUMA nodes getting less hugepages first
+    def test_derived_hugepages(self):
+        details = {}
+        parameters, _ = dpdk.derive_hw_data_parameters(
+            get_numa_memory_hw_data([32, 96]),
+            {'dpdk_nics': [{'nic': 'nic6', 'mtu': 9000}],
+             'hugepage_allocation_mode': 'per_numa_node'}, details=details)
+        self.assertEqual([(0, 15), (1, 47)], details['numa_hugepages'])
+        self.assertEqual("'0:15,1:47'",
+                         parameters['ComputeHugepagesPerNumaNode'])
+        self.assertIn(' hugepages=62 ', parameters['ComputeKernelArgs'])
+        unit = dpdk.get_numa_hugepages_unit([(0, 47), (1, 15)])
+        self.assertTrue(unit.index('node1/') < unit.index('node0/'))
+        self.assertIn("'echo 47 > /sys/devices/system/node/node0/hugepages/"
+                      "hugepages-1048576kB/nr_hugepages'", unit)
+
+        parameters, _ = dpdk.derive_hw_data_parameters(
+            HW_DATA, {'dpdk_nics': [{'nic': 'nic6', 'mtu': 9000}]})
+        self.assertNotIn('ComputeHugepagesPerNumaNode', parameters)
+        self.assertIn(' hugepages=62 ', parameters['ComputeKernelArgs'])
+
+
+# Output recording the warnings
+class Output(object):
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+
+class HugepageSizeTest(unittest.TestCase):
+    def setUp(self):
+        self.hw_data = copy.deepcopy(HW_DATA)
+        self.hw_data['inventory']['cpu']['flags'].remove('pdpe1gb')
+        self.stderr = sys.stderr
+        sys.stderr = Output()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def test_hugepage_size(self):
+        self.assertEqual(dpdk.HUGEPAGE_SIZE_1G,
+                         dpdk.get_hugepage_size(HW_DATA))
+        self.assertEqual(dpdk.HUGEPAGE_SIZE_2M,
+                         dpdk.get_hugepage_size(self.hw_data))
+        self.assertEqual(dpdk.HUGEPAGE_SIZE_2M,
+                         dpdk.get_hugepage_size({}))
+
+    # Without pdpe1gb, the same memory is derived in 2MB hugepages with a
+    # warning, and the socket memory is rounded up to 2MB
+    def test_derived_2mb_hugepages(self):
+        user_input = {'dpdk_nics': [{'nic': 'nic6', 'mtu': 9000}]}
+        parameters, _ = dpdk.derive_hw_data_parameters(HW_DATA, user_input)
+        self.assertEqual([], sys.stderr.data)
+        self.assertEqual('default_hugepagesz=1GB hugepagesz=1G hugepages=62 '
+                         'intel_iommu=on', parameters['ComputeKernelArgs'])
+        self.assertEqual("'2048,3072'", parameters['NeutronDpdkSocketMemory'])
+
+        details = {}
+        parameters, _ = dpdk.derive_hw_data_parameters(
+            self.hw_data, user_input, details=details)
+        self.assertEqual(1, len(sys.stderr.data))
+        self.assertIn('no pdpe1gb CPU flag', sys.stderr.data[0])
+        self.assertEqual(dpdk.HUGEPAGE_SIZE_2M, details['page_size_mb'])
+        self.assertEqual('default_hugepagesz=2M hugepagesz=2M '
+                         'hugepages=%d intel_iommu=on' % (62 * 512),
+                         parameters['ComputeKernelArgs'])
+        self.assertEqual("'1500,3016'", parameters['NeutronDpdkSocketMemory'])
+
+    def test_derived_2mb_numa_hugepages(self):
+        parameters, _ = dpdk.derive_hw_data_parameters(
+            self.hw_data, {'dpdk_nics': [{'nic': 'nic6', 'mtu': 9000}],
+                           'hugepage_allocation_mode': 'per_numa_node'})
+        self.assertEqual("'0:%(pages)d,1:%(pages)d'" % {'pages': 31 * 512},
+                         parameters['ComputeHugepagesPerNumaNode'])
+        unit = dpdk.get_numa_hugepages_unit([(0, 2)], dpdk.HUGEPAGE_SIZE_2M)
+        self.assertIn('Reserve 2MB hugepages', unit)
+        self.assertIn('/hugepages-2048kB/nr_hugepages', unit)
+
+    # The SRIOV derivation falls back to 2MB hugepages too
+    def test_sriov_2mb_hugepages(self):
+        sriov = derivers.load_deriver('sriov')
+        parameters, _ = sriov.derive_hw_data_parameters(self.hw_data, {})
+        self.assertEqual('default_hugepagesz=2M hugepagesz=2M '
+                         'hugepages=%d intel_iommu=on' % (62 * 512),
+                         parameters['ComputeKernelArgs'])
+        self.assertEqual(1, len(sys.stderr.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from derive_common import emitters
+
+PARAMETERS = {'NeutronDpdkCoreList': "'1,13,25,37'",
+              'NovaVcpuPinSet': "['2-12','14-24']",
+              'NeutronDpdkMemoryChannels': 4,
+              'ComputeKernelArgs': 'default_hugepagesz=1GB hugepagesz=1G '
+                                   'hugepages=11 intel_iommu=on'}
+HIERA_VARIABLES = {'nova::compute::vcpu_pin_set': "['2-12','14-24']",
+                   'vswitch::dpdk::socket_mem': "'1024,1024'"}
+NUMA_PARAMETERS = dict(PARAMETERS,
+                       ComputeHugepagesPerNumaNode="'0:3,1:8'")
+
+
+class EmitterTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def emit(self, output_format, parameters=PARAMETERS, **kwargs):
+        emitter = emitters.Emitter(output_format, self.output_dir,
+                                   'ComputeOvsDpdk', 'dpdk', **kwargs)
+        path = emitter.emit(parameters, HIERA_VARIABLES)
+        with open(path) as env_file:
+            content = env_file.read()
+        return path, content
+
+    def test_yaml(self):
+        path, content = self.emit('yaml')
+        self.assertEqual(os.path.join(self.output_dir,
+                                      'ComputeOvsDpdk-dpdk.yaml'), path)
+        self.assertIn('''NeutronDpdkCoreList: "'1,13,25,37'"''', content)
+        self.assertEqual({'parameter_defaults': {
+            'NeutronDpdkCoreList': "'1,13,25,37'",
+            'NovaVcpuPinSet': ['2-12', '14-24'],
+            'NeutronDpdkMemoryChannels': 4,
+            'ComputeKernelArgs': PARAMETERS['ComputeKernelArgs'],
+            'ComputeOvsDpdkExtraConfig': {
+                'nova::compute::vcpu_pin_set': ['2-12', '14-24'],
+                'vswitch::dpdk::socket_mem': "'1024,1024'"}}},
+            yaml.safe_load(content))
+
+    def test_json(self):
+        path, content = self.emit('json')
+        self.assertTrue(path.endswith('ComputeOvsDpdk-dpdk.json'))
+        self.assertEqual(yaml.safe_load(self.emit('yaml')[1]),
+                         json.loads(content))
+
+    # The per NUMA node hugepages template is registered only on demand,
+    # copied next to the environment file
+    def test_extra_config_pre(self):
+        environment = yaml.safe_load(self.emit('yaml', NUMA_PARAMETERS)[1])
+        self.assertNotIn('resource_registry', environment)
+        self.assertEqual(['ComputeOvsDpdk-dpdk.yaml'],
+                         os.listdir(self.output_dir))
+
+        environment = yaml.safe_load(self.emit(
+            'yaml', NUMA_PARAMETERS, extra_config_pre=True)[1])
+        self.assertEqual({'OS::TripleO::ComputeOvsDpdkExtraConfigPre':
+                          './hugepages-per-numa-node.yaml'},
+                         environment['resource_registry'])
+        with open(os.path.join(self.output_dir,
+                               'hugepages-per-numa-node.yaml')) as copy:
+            with open(os.path.join(emitters.TEMPLATES_DIR,
+                                   'hugepages-per-numa-node.yaml')) as tmpl:
+                self.assertEqual(tmpl.read(), copy.read())
+
+        environment = yaml.safe_load(self.emit(
+            'yaml', extra_config_pre=True)[1])
+        self.assertNotIn('resource_registry', environment)
+
+    def test_path(self):
+        emitter = emitters.Emitter('yaml', self.output_dir)
+        self.assertEqual(os.path.join(self.output_dir, 'Compute.yaml'),
+                         emitter.get_path())
+        self.assertEqual(os.path.join(self.output_dir, 'node_1.yaml'),
+                         emitter.get_path('node/1'))
+
+    def test_invalid(self):
+        self.assertRaises(Exception, emitters.Emitter, 'text',
+                          self.output_dir)
+        self.assertRaises(Exception, emitters.Emitter, 'yaml', '')
+
+
+if __name__ == '__main__':
+    unittest.main()
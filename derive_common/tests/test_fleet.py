@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+
+from derive_common import fleet
+
+NODE_UUIDS = ['node-%d' % index for index in range(6)]
+
+
+# Node function recording the threads running concurrently, the first
+# nodes being the slowest, failing for the nodes in failing
+class NodeFunc(object):
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, node_uuid):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(0.02 * (len(NODE_UUIDS) - NODE_UUIDS.index(node_uuid)))
+            if node_uuid in self.failing:
+                raise Exception('%s failed' % node_uuid)
+            return node_uuid.upper()
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class RunFleetTest(unittest.TestCase):
+    # The results are in the node UUIDs order whichever node finishes
+    # first, with the errors of the failed nodes
+    def test_results(self):
+        results = fleet.run_fleet(NODE_UUIDS, NodeFunc(['node-2']), 3)
+        self.assertEqual(NODE_UUIDS, [node for node, _, _ in results])
+        self.assertEqual(['NODE-0', 'NODE-1', None, 'NODE-3', 'NODE-4',
+                          'NODE-5'], [result for _, result, _ in results])
+        self.assertEqual('node-2 failed', str(results[2][2]))
+        self.assertEqual(1, len([error for _, _, error in results if error]))
+
+    def test_max_workers(self):
+        func = NodeFunc()
+        fleet.run_fleet(NODE_UUIDS, func, 2)
+        self.assertEqual(2, func.max_running)
+        func = NodeFunc()
+        fleet.run_fleet(NODE_UUIDS, func, 1)
+        self.assertEqual(1, func.max_running)
+
+    # The pool of the caller is used and kept open
+    def test_pool(self):
+        pool = ThreadPool(2)
+        try:
+            for _ in range(2):
+                results = fleet.run_fleet(NODE_UUIDS, NodeFunc(), pool=pool)
+                self.assertEqual([node.upper() for node in NODE_UUIDS],
+                                 [result for _, result, _ in results])
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_no_nodes(self):
+        self.assertEqual([], fleet.run_fleet([], NodeFunc()))
+        self.assertEqual([], list(fleet.iter_fleet([], NodeFunc())))
+
+    # The results are yielded as the nodes complete, the fastest first
+    def test_iter_fleet(self):
+        results = list(fleet.iter_fleet(NODE_UUIDS, NodeFunc(['node-0']),
+                                        len(NODE_UUIDS)))
+        self.assertEqual(list(reversed(NODE_UUIDS)),
+                         [node for node, _, _ in results])
+        self.assertEqual('node-0 failed', str(results[-1][2]))
+
+
+class FleetDifferencesTest(unittest.TestCase):
+    def test_differences(self):
+        node_results = [('node-0', {'A': 1, 'B': 'x'}),
+                        ('node-1', {'A': 1, 'B': 'y'}),
+                        ('node-2', {'A': 1, 'B': 'x', 'C': 2})]
+        self.assertEqual({'B': [('x', ['node-0', 'node-2']),
+                                ('y', ['node-1'])],
+                          'C': [(None, ['node-0', 'node-1']),
+                                (2, ['node-2'])]},
+                         fleet.get_fleet_differences(node_results))
+        self.assertEqual({}, fleet.get_fleet_differences(node_results[:1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
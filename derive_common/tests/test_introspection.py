@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from derive_common import introspection
+
+# Introspection data with the selected fields among skipped values
+# nested deeper than SKIP_DEPTH, with brackets and escaped quotes in the
+# strings and non ascii characters
+DATA = {
+    'extra': {'system': [{'product': {'vendor': [[['x"]}', {'y': '\\'}]]]}}],
+              'note': '}]"[{'},
+    'inventory': {
+        'cpu': {'model_name': u'Intel® Xeon™ "Gold" \\ 6130',
+                'flags': ['pdpe1gb', 'vmx']},
+        'memory': {'physical_mb': 65536, 'total': 68719476736},
+        'interfaces': [{'name': 'em1', 'has_carrier': True,
+                        'mac_address': 'aa:bb:cc:00:00:01'}],
+        'disks': [[[[[['deep', {'"': '{'}]]]]]]},
+    'numa_topology': {
+        'cpus': [{'cpu': 0, 'numa_node': 0, 'thread_siblings': [0, 1]}],
+        'nics': [{'name': 'em1', 'numa_node': 0}],
+        'ram': [{'numa_node': 0, 'size_kb': 67108864}]},
+    'logs': [1, 2.5e3, True, None, u'éè', {'"x"': ['\\"']}]}
+
+EXPECTED = {
+    'inventory': {
+        'cpu': DATA['inventory']['cpu'],
+        'memory': {'physical_mb': 65536},
+        'interfaces': DATA['inventory']['interfaces']},
+    'numa_topology': DATA['numa_topology']}
+
+
+def get_text(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def get_bytes(data):
+    text = get_text(data)
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return text
+
+
+def split(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+class LoadChunksTest(unittest.TestCase):
+    def test_selected_fields(self):
+        self.assertEqual(EXPECTED, introspection.load_chunks(
+            [get_bytes(DATA)]))
+
+    # Multibyte characters are split between the chunks of every size
+    def test_utf8_split_across_chunks(self):
+        data = get_bytes(DATA)
+        for size in range(1, 8):
+            self.assertEqual(EXPECTED, introspection.load_chunks(
+                split(data, size)), 'chunk size %d' % size)
+
+    def test_text_chunks(self):
+        text = get_text(DATA)
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        for size in (1, 3, 64):
+            self.assertEqual(EXPECTED, introspection.load_chunks(
+                split(text, size)))
+
+    def test_escaped_quotes(self):
+        data = {'inventory': {'cpu': {'model_name': 'a \\"b\\" "c" \\\\'}},
+                'skip\\"ped': {'"}': '\\\\"', 'v': ['"]', '\\']}}
+        for size in (1, 2, 5):
+            self.assertEqual(
+                {'inventory': {'cpu': data['inventory']['cpu']}},
+                introspection.load_chunks(split(get_bytes(data), size)))
+
+    # Skipped containers deeper than SKIP_DEPTH and strings with brackets
+    def test_nested_skips(self):
+        nested = ['"]}[{', {'k': '\\"}'}]
+        for depth in range(introspection.SKIP_DEPTH * 3):
+            nested = [nested, {'n%d' % depth: nested, 's': ']}'}]
+        data = {'skipped': nested, 'numa_topology': {'nics': []},
+                'after': {'x': [[[[]]]]}}
+        for size in (1, 7, 4096):
+            self.assertEqual(
+                {'numa_topology': {'nics': []}},
+                introspection.load_chunks(split(get_bytes(data), size)))
+
+    def test_matches_json_with_whitespace(self):
+        text = json.dumps(DATA, indent=4, separators=(' , ', ' : '))
+        self.assertEqual(
+            json.loads(json.dumps(EXPECTED)),
+            introspection.load_chunks(split(text.encode('utf-8'), 13)))
+
+    def test_missing_fields(self):
+        self.assertEqual({}, introspection.load_chunks([b'{}']))
+        self.assertEqual({'inventory': {}}, introspection.load_chunks(
+            [b'{"inventory": {"boot": {"pxe": "em1"}}}']))
+
+    def test_truncated_data(self):
+        data = get_bytes(DATA)
+        self.assertRaises(Exception, introspection.load_chunks,
+                          split(data[:len(data) // 2], 16))
+
+    def test_invalid_data(self):
+        self.assertRaises(Exception, introspection.load_chunks, [b'[]'])
+        self.assertRaises(Exception, introspection.load_chunks,
+                          [b'{"inventory" {}}'])
+
+
+if __name__ == '__main__':
+    unittest.main()
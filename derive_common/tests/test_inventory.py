@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from derive_common import cache as derive_cache
+from derive_common import fake_undercloud
+from derive_common import inventory
+from derive_common import undercloud
+
+ROLE_NAME = 'ComputeOvsDpdk'
+NODES_COUNT = 3
+
+
+# CLI backend recording the CLI commands run
+class RecordingBackend(undercloud.CliBackend):
+    def __init__(self):
+        self.commands = []
+
+    def _run(self, cmd):
+        self.commands.append(cmd)
+        return super(RecordingBackend, self)._run(cmd)
+
+
+class FailingBackend(RecordingBackend):
+    def get_host_ips(self):
+        raise Exception('Service Unavailable (HTTP 503)')
+
+
+# Inventory lookups with the fake CLIs serving the fake undercloud data
+class InventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.tmp_dir, 'bin')
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.environ = dict(os.environ)
+        self.data = fake_undercloud.generate_data(
+            NODES_COUNT, flavor='compute', role=ROLE_NAME)
+        # Role of another flavor which is not available
+        self.data['parameters']['OvercloudControllerFlavor'] = 'control'
+        self.write_data()
+        os.environ['PATH'] = self.bin_dir + os.pathsep + os.environ['PATH']
+        os.environ['FAKE_UNDERCLOUD_DATA'] = os.path.join(self.bin_dir,
+                                                          'undercloud.json')
+        for name in ['FAKE_UNDERCLOUD_LATENCY',
+                     'FAKE_UNDERCLOUD_FAILURE_RATE']:
+            os.environ.pop(name, None)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.tmp_dir)
+
+    def write_data(self):
+        fake_undercloud.write_cli_bin(self.bin_dir, self.data)
+
+    def get_cache(self, **kwargs):
+        return derive_cache.Cache(self.cache_dir, **kwargs)
+
+    def get_inventory(self, backend=None, cache=None):
+        return inventory.get_inventory(backend or RecordingBackend(),
+                                       ROLE_NAME, cache)
+
+    def test_build_index(self):
+        backend = RecordingBackend()
+        index = inventory.build_index(backend, ROLE_NAME)
+        self.assertEqual({ROLE_NAME: 'compute'}, index['roles'])
+        node_uuids = [node['uuid'] for node in self.data['nodes']]
+        self.assertEqual({'compute': {'profile': 'compute',
+                                      'nodes': node_uuids}},
+                         index['flavors'])
+        self.assertEqual(5, len(backend.commands))
+
+    def test_lookups(self):
+        inv = self.get_inventory()
+        node = self.data['nodes'][0]
+        self.assertEqual('compute', inv.get_flavor_name(ROLE_NAME))
+        self.assertEqual('', inv.get_flavor_name('Controller'))
+        self.assertEqual(node['uuid'], inv.get_node_uuid('compute'))
+        self.assertEqual('', inv.get_node_uuid('control'))
+        self.assertEqual(node['instance_uuid'],
+                         inv.get_instance_uuid(node['uuid']))
+        self.assertEqual('192.168.24.10',
+                         inv.get_host_ip(node['instance_uuid']))
+        self.assertEqual([(node['uuid'], node['instance_uuid'])
+                          for node in self.data['nodes']],
+                         inv.get_deployed_nodes('compute'))
+
+    # Nodes without instance are not deployed
+    def test_deployed_nodes(self):
+        self.data['nodes'][1]['instance_uuid'] = None
+        self.write_data()
+        inv = self.get_inventory()
+        self.assertEqual([self.data['nodes'][0]['uuid'],
+                          self.data['nodes'][2]['uuid']],
+                         [node_uuid for node_uuid, _ in
+                          inv.get_deployed_nodes('compute')])
+
+    # The deployed hosts are the same with and without the cached index,
+    # the node lookups of the validations being used without cache
+    def test_deployed_hosts(self):
+        self.data['nodes'][1]['instance_uuid'] = None
+        self.write_data()
+        hosts = ('compute', [(self.data['nodes'][0]['uuid'], '192.168.24.10'),
+                             (self.data['nodes'][2]['uuid'], '192.168.24.12')])
+        self.assertEqual(hosts, inventory.get_deployed_hosts(
+            ROLE_NAME, RecordingBackend()))
+        self.assertEqual(hosts, inventory.get_deployed_hosts(
+            ROLE_NAME, RecordingBackend(), self.get_cache()))
+
+    def test_unknown_role(self):
+        self.assertRaises(Exception, inventory.get_inventory,
+                          RecordingBackend(), 'Unknown', self.get_cache())
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    # The cached index is revalidated with the node list only
+    def test_cached_index(self):
+        cache = self.get_cache()
+        backend = RecordingBackend()
+        inv = self.get_inventory(backend, cache)
+        self.assertEqual(5, len(backend.commands))
+        backend = RecordingBackend()
+        cached_inv = self.get_inventory(backend, cache)
+        self.assertEqual(['ironic --json node-list'], backend.commands)
+        self.assertEqual(inv.get_deployed_nodes('compute'),
+                         cached_inv.get_deployed_nodes('compute'))
+
+    def test_rebuilt_on_node_list_change(self):
+        cache = self.get_cache()
+        self.get_inventory(cache=cache)
+        removed = self.data['nodes'].pop()
+        self.write_data()
+        backend = RecordingBackend()
+        inv = self.get_inventory(backend, cache)
+        self.assertEqual(5, len(backend.commands))
+        self.assertEqual(NODES_COUNT - 1,
+                         len(inv.get_deployed_nodes('compute')))
+        self.assertEqual('', inv.get_instance_uuid(removed['uuid']))
+
+    def test_rebuilt_on_redeploy(self):
+        cache = self.get_cache()
+        self.get_inventory(cache=cache)
+        self.data['nodes'][0]['instance_uuid'] = 'new-instance'
+        self.data['servers'][0]['id'] = 'new-instance'
+        self.write_data()
+        inv = self.get_inventory(cache=cache)
+        self.assertEqual('192.168.24.10', inv.get_host_ip('new-instance'))
+
+    # No index is cached when the build fails
+    def test_build_failure(self):
+        cache = self.get_cache()
+        self.assertRaises(Exception, self.get_inventory, FailingBackend(),
+                          cache)
+        self.assertIsNone(cache.load(inventory.CACHE_KEY + ROLE_NAME))
+        backend = RecordingBackend()
+        self.get_inventory(backend, cache)
+        self.assertEqual(5, len(backend.commands))
+
+    def test_offline(self):
+        self.assertRaises(Exception, self.get_inventory,
+                          cache=self.get_cache(offline=True))
+        self.get_inventory(cache=self.get_cache())
+        backend = RecordingBackend()
+        inv = self.get_inventory(backend, self.get_cache(offline=True))
+        self.assertEqual([], backend.commands)
+        self.assertEqual('compute', inv.get_flavor_name(ROLE_NAME))
+
+    def test_refresh(self):
+        self.get_inventory(cache=self.get_cache())
+        backend = RecordingBackend()
+        self.get_inventory(backend, self.get_cache(refresh=True))
+        self.assertEqual(5, len(backend.commands))
+
+    def test_invalidate(self):
+        cache = self.get_cache()
+        self.get_inventory(cache=cache)
+        inventory.invalidate(ROLE_NAME, cache)
+        self.assertIsNone(cache.load(inventory.CACHE_KEY + ROLE_NAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+
+from derive_common import derivers
+from derive_common import topology_generator
+from derive_common.topology import Topology
+
+multi_role = derivers.load_source(
+    'multi_role_derive_params',
+    os.path.join(derivers.ROOT_DIR, 'multi-role-derive-params',
+                 'multi_role_derive_params.py'))
+
+
+# Inventory of a single node for all the flavors
+class NodeInventory(object):
+    def __init__(self, hw_data):
+        self.node = (hw_data, Topology.from_introspection(hw_data))
+
+    def get_node_uuids(self, flavor_name):
+        return ['node-1']
+
+    def get_node(self, node_uuid):
+        return self.node
+
+
+# Output recording the warnings
+class Output(object):
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+
+def get_role(dpdk=None, sriov=None):
+    role = {'name': 'ComputeOvsDpdkSriov', 'flavor': 'compute'}
+    if dpdk is not None:
+        role['dpdk'] = dict(dpdk, dpdk_nics=[{'nic': 'nic1', 'mtu': 1500}])
+    if sriov is not None:
+        role['sriov'] = sriov
+    return role
+
+
+class MultiRoleTest(unittest.TestCase):
+    def setUp(self):
+        self.inventory = NodeInventory(
+            topology_generator.generate_profile('medium'))
+        self.stderr = sys.stderr
+        sys.stderr = Output()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+
+    def derive(self, role):
+        multi_role.vaildate_user_input({'roles': [role]})
+        return multi_role.derive_role_parameters(role, self.inventory)[1]
+
+    def get_hugepages(self, parameters):
+        return [arg for arg in parameters['ComputeKernelArgs'].split()
+                if arg.startswith('hugepages=')]
+
+    def test_conflicting_percentage(self):
+        role = get_role({'huge_page_allocation_percentage': 50},
+                        {'huge_page_allocation_percentage': 60})
+        self.assertRaises(Exception, multi_role.vaildate_user_input,
+                          {'roles': [role]})
+
+    # The percentage given for SRIOV only is used by DPDK too
+    def test_shared_percentage(self):
+        sriov_only = self.derive(get_role({}, {
+            'huge_page_allocation_percentage': 60}))
+        dpdk_only = self.derive(get_role({
+            'huge_page_allocation_percentage': 60}))
+        default = self.derive(get_role({}, {}))
+        self.assertEqual(self.get_hugepages(dpdk_only),
+                         self.get_hugepages(sriov_only))
+        self.assertNotEqual(self.get_hugepages(default),
+                            self.get_hugepages(sriov_only))
+
+    # The DPDK kernel args are kept, each kernel arg once
+    def test_merged_kernel_args(self):
+        parameters = self.derive(get_role(
+            {'hugepage_allocation_mode': 'per_numa_node'}, {}))
+        dpdk = self.derive(get_role(
+            {'hugepage_allocation_mode': 'per_numa_node'}))
+        self.assertEqual(dpdk['ComputeKernelArgs'],
+                         parameters['ComputeKernelArgs'])
+        self.assertEqual(
+            ['abc', 'abc=2 intel_iommu=on iommu=pt'],
+            [multi_role.merge_kernel_args(['abc']),
+             multi_role.merge_kernel_args(['abc=2 intel_iommu=on',
+                                           'abc=3 iommu=pt'])])
+
+    def test_ignored_flavor(self):
+        self.derive(get_role({}, {'flavor': 'computesriov'}))
+        self.assertEqual(1, len(sys.stderr.data))
+        self.assertIn("SRIOV flavor 'computesriov'", sys.stderr.data[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
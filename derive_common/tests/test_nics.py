@@ -0,0 +1,66 @@
+import unittest
+
+from derive_common import nics
+from derive_common.nics import NicIndex
+
+# Interfaces in introspection order, em2 without carrier and p1p1 with its
+# NUMA node in numa_topology.nics only
+INTERFACES = [
+    {'name': 'p2p1', 'mac_address': '52:54:00:00:00:04',
+     'pci_address': '0000:05:00.0', 'has_carrier': True, 'numa_node': 1},
+    {'name': 'em2', 'mac_address': '52:54:00:00:00:02', 'has_carrier': False},
+    {'name': 'p1p1', 'mac_address': '52:54:00:00:00:03', 'has_carrier': True},
+    {'name': 'em1', 'mac_address': '52:54:00:00:00:01', 'has_carrier': True,
+     'numa_node': 0},
+    {'name': 'p1p10', 'has_carrier': True}]
+NUMA_NICS = [{'name': 'p1p1', 'numa_node': 1}, {'name': 'em1', 'numa_node': 0}]
+
+
+class NicIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NicIndex(INTERFACES, NUMA_NICS)
+
+    # The NICs having carrier are numbered like os-net-config, the
+    # embedded NICs first, in natural order
+    def test_aliases(self):
+        self.assertEqual(['em1', 'p1p1', 'p1p10', 'p2p1'],
+                         self.index.ordered_nics)
+        self.assertEqual('em1', self.index.get_name('nic1'))
+        self.assertEqual('p2p1', self.index.get_name('nic4'))
+        self.assertIsNone(self.index.get_name('nic5'))
+        self.assertEqual('nic0', self.index.get_name('nic0'))
+        self.assertEqual('em2', self.index.get_name('em2'))
+        self.assertTrue(NicIndex.is_alias('nic12'))
+        self.assertFalse(NicIndex.is_alias('nicx'))
+
+    def test_lookups(self):
+        self.assertEqual(1, self.index.get_numa_node('nic2'))
+        self.assertEqual(1, self.index.get_numa_node('p2p1'))
+        self.assertIsNone(self.index.get_numa_node('p1p10'))
+        self.assertIsNone(self.index.get_numa_node('nic5'))
+        self.assertEqual('52:54:00:00:00:04', self.index.get_mac('nic4'))
+        self.assertEqual('0000:05:00.0', self.index.get_pci_address('p2p1'))
+        self.assertIsNone(self.index.get_pci_address('em1'))
+        self.assertTrue(self.index.has_carrier('nic1'))
+        self.assertFalse(self.index.has_carrier('em2'))
+        self.assertFalse(self.index.has_carrier('unknown'))
+        self.assertEqual('em2', self.index.get_name_by_mac(
+            '52:54:00:00:00:02'.upper()))
+        self.assertIsNone(self.index.get_name_by_mac('52:54:00:00:00:09'))
+
+    def test_from_introspection(self):
+        index = NicIndex.from_introspection({
+            'inventory': {'interfaces': INTERFACES},
+            'numa_topology': {'nics': NUMA_NICS}})
+        self.assertEqual(self.index.ordered_nics, index.ordered_nics)
+        self.assertEqual(self.index.numa_nodes, index.numa_nodes)
+        self.assertEqual([], NicIndex.from_introspection({}).ordered_nics)
+
+    def test_ordered_nics(self):
+        self.assertEqual(['eno1', 'eth2', 'ens3f1', 'ens10'],
+                         nics.ordered_nics(['ens10', 'eth2', 'ens3f1',
+                                            'eno1']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+import subprocess
+import unittest
+
+from derive_common import node_facts
+
+MARKER = 'NODE-FACT-0123'
+
+# Fact commands run by the local shell instead of the node
+FACT_COMMANDS = {
+    'lines': "printf 'a\\nb c\\n'",
+    'no_newline': "printf 'x'",
+    'empty': 'true',
+    'error': "echo 'no such file' >&2; false",
+    'marker_like': "echo 'NODE-FACT-9999 end lines'",
+    'failed': "sh -c 'exit 3'",
+    'lscpu': "echo 'sudo: a password is required' >&2; false",
+}
+
+
+# Channel whose script exits after the given number of polls, with the
+# output received in two parts
+class FakeChannel(object):
+    def __init__(self, client, out, err, status, polls):
+        self.client = client
+        self.parts = [out[:len(out) // 2], out[len(out) // 2:]]
+        self.err = err
+        self.status = status
+        self.polls = polls
+
+    def recv_ready(self):
+        return len(self.parts) > 1
+
+    def recv(self, size):
+        return self.parts.pop(0)
+
+    def recv_stderr_ready(self):
+        return False
+
+    def exit_status_ready(self):
+        self.polls -= 1
+        if self.polls < 0:
+            self.client.completed.append(self)
+            return True
+        return False
+
+    def recv_exit_status(self):
+        return self.status
+
+
+class FakeStream(object):
+    def __init__(self, channel, data):
+        self.channel = channel
+        self.data = data
+
+    def read(self):
+        data = self.data()
+        return data
+
+
+# SSH client running the scripts with the local shell, with the exit
+# status of the scripts forced by exit_status. The script of each channel
+# exits after the polls of the channel.
+class FakeClient(object):
+    def __init__(self, exit_status=None, truncate=False, polls=None):
+        self.exit_status = exit_status
+        self.truncate = truncate
+        self.polls = polls or []
+        self.commands = []
+        self.channels = []
+        self.completed = []
+
+    def exec_command(self, command):
+        self.commands.append(command)
+        proc = subprocess.Popen(['/bin/sh', '-c', command],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        status = proc.returncode
+        if self.exit_status is not None:
+            status = self.exit_status
+            err = b'sudo: a password is required\n'
+        if self.truncate:
+            out = out[:len(out) // 2]
+        polls = 0
+        if len(self.channels) < len(self.polls):
+            polls = self.polls[len(self.channels)]
+        channel = FakeChannel(self, out, err, status, polls)
+        self.channels.append(channel)
+        return (None,
+                FakeStream(channel, lambda: b''.join(channel.parts)),
+                FakeStream(channel, lambda: channel.err))
+
+
+def run_script(names):
+    proc = subprocess.Popen(['/bin/sh', '-c',
+                             node_facts.get_script(names, MARKER)],
+                            stdout=subprocess.PIPE)
+    output = proc.communicate()[0]
+    return output.decode('utf-8'), proc.returncode
+
+
+class NodeFactsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fact_commands = dict(node_facts.FACT_COMMANDS)
+        node_facts.FACT_COMMANDS.update(FACT_COMMANDS)
+
+    def tearDown(self):
+        node_facts.FACT_COMMANDS.clear()
+        node_facts.FACT_COMMANDS.update(self.fact_commands)
+
+
+class ParseOutputTest(NodeFactsTestCase):
+    def test_parse_output(self):
+        output = ('%(m)s out lines\na\nb c\n\n%(m)s err lines\n\n'
+                  '%(m)s end lines 0\n'
+                  '%(m)s out error\n\n%(m)s err error\nfailed\n\n'
+                  '%(m)s end error 2\n' % {'m': MARKER})
+        self.assertEqual({'lines': ('a\nb c\n', '', 0),
+                          'error': ('', 'failed\n', 2)},
+                         node_facts.parse_output(output, MARKER))
+
+    def test_script_output(self):
+        output = run_script(['lines', 'no_newline', 'empty', 'error',
+                             'marker_like'])[0]
+        self.assertEqual({'lines': ('a\nb c\n', '', 0),
+                          'no_newline': ('x', '', 0),
+                          'empty': ('', '', 0),
+                          'error': ('', 'no such file\n', 1),
+                          'marker_like': ('NODE-FACT-9999 end lines\n', '',
+                                          0)},
+                         node_facts.parse_output(output, MARKER))
+
+    # The script exits with the status of the first failing command
+    def test_script_status(self):
+        self.assertEqual(0, run_script(['lines', 'empty'])[1])
+        self.assertEqual(1, run_script(['lines', 'error', 'failed'])[1])
+        self.assertEqual(3, run_script(['failed', 'error'])[1])
+
+    # Facts with an incomplete frame are left out
+    def test_truncated_output(self):
+        output = run_script(['lines', 'empty'])[0]
+        outputs = node_facts.parse_output(
+            output[:output.index('%s end empty' % MARKER)], MARKER)
+        self.assertEqual(['lines'], list(outputs))
+
+    def test_other_marker(self):
+        self.assertEqual({}, node_facts.parse_output(
+            run_script(['lines'])[0], 'NODE-FACT-4567'))
+
+
+class CollectTest(NodeFactsTestCase):
+    def test_channel_facts(self):
+        names = ['lines', 'memory_sizes', 'empty', 'ovs_interfaces',
+                 'error']
+        self.assertEqual([['memory_sizes'], ['ovs_interfaces'],
+                          ['lines', 'error'], ['empty']],
+                         node_facts.get_channel_facts(names, 4))
+        self.assertEqual([['memory_sizes', 'ovs_interfaces', 'lines', 'empty',
+                           'error']],
+                         node_facts.get_channel_facts(names, 1))
+        self.assertEqual([['memory_sizes', 'lines', 'error'],
+                          ['ovs_interfaces', 'empty']],
+                         node_facts.get_channel_facts(names, 2))
+
+    def test_collect(self):
+        client = FakeClient()
+        names = ['lines', 'no_newline', 'empty', 'error', 'marker_like']
+        facts = node_facts.collect(client, names, max_channels=3)
+        self.assertEqual(3, len(client.commands))
+        self.assertEqual('a\nb c\n', facts.get_output('lines'))
+        self.assertEqual('no such file\n', facts.get_error('error'))
+        self.assertEqual('b c\n', facts.grep('lines', 'c'))
+        self.assertRaises(Exception, facts.get, 'cmdline')
+
+        self.assertEqual(1, facts.get_status('error'))
+        self.assertEqual(0, facts.get_status('lines'))
+
+    # The channels are read as their scripts complete
+    def test_completion_order(self):
+        client = FakeClient(polls=[3, 0, 1])
+        facts = node_facts.collect(client, ['lines', 'empty', 'no_newline'],
+                                   max_channels=3)
+        self.assertEqual([client.channels[1], client.channels[2],
+                          client.channels[0]], client.completed)
+        self.assertEqual('a\nb c\n', facts.get_output('lines'))
+
+    # A failed channel is reported in the channels order
+    def test_failed_channel_order(self):
+        client = FakeClient(truncate=True, polls=[2, 0])
+        try:
+            node_facts.collect(client, ['lines', 'empty'], max_channels=2)
+        except Exception as exc:
+            self.assertIn('node facts lines:', str(exc))
+        else:
+            self.fail('Missing facts are not reported')
+
+    # Exit status not explained by a failed fact command
+    def test_exit_status(self):
+        for max_channels in (1, 2):
+            client = FakeClient(exit_status=1)
+            try:
+                node_facts.collect(client, ['lines', 'empty'],
+                                   max_channels=max_channels)
+            except Exception as exc:
+                self.assertIn('exited with status 1', str(exc))
+                self.assertIn('a password is required', str(exc))
+            else:
+                self.fail('Exit status is not reported')
+
+    def test_required_fact(self):
+        client = FakeClient()
+        try:
+            node_facts.collect(client, ['lines', 'lscpu'], max_channels=2)
+        except Exception as exc:
+            self.assertIn("Node fact 'lscpu' command failed with status 1",
+                          str(exc))
+            self.assertIn('a password is required', str(exc))
+        else:
+            self.fail('Required fact failure is not reported')
+
+    def test_missing_facts(self):
+        client = FakeClient(truncate=True)
+        try:
+            node_facts.collect(client, ['lines', 'empty'], max_channels=1)
+        except Exception as exc:
+            self.assertIn('Unable to collect the node facts', str(exc))
+        else:
+            self.fail('Missing facts are not reported')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import itertools
+import re
+import sys
+import unittest
+
+from derive_common import derivers
+from derive_common import sweep
+from derive_common import topology_generator
+from derive_common.topology import Topology
+
+USER_INPUT = {'dpdk_nics': [{'nic': 'nic1', 'mtu': 1500},
+                            {'nic': 'nic2', 'mtu': 9000, 'rx_queues': 2}]}
+
+SWEEP = {'huge_page_allocation_percentage': [5, 60],
+         'num_phy_cores_per_numa_node_for_pmd': [1, 2, 4],
+         'mtu': [None, 1500, 9000]}
+
+
+# Nodes of the fleet: a single NUMA node with 3 PMD cores, two NUMA nodes
+# with 2MB hugepages (no pdpe1gb flag), and two NUMA nodes with 4GB of
+# memory each
+def get_fleet():
+    small = topology_generator.generate_profile('small')
+    no_pdpe1gb = topology_generator.generate_profile('medium', seed=1)
+    no_pdpe1gb['inventory']['cpu']['flags'].remove('pdpe1gb')
+    low_memory = topology_generator.generate_introspection(
+        2, 8, nics=4, memory_gb=8, seed=2)
+    return [small, no_pdpe1gb, low_memory]
+
+
+# Gets the values of the node for the grid point with the DPDK deriver,
+# as (feasible, fits, pmd_threads, vcpus, hugepages, socket_memory)
+def derive_point(deriver, hw_data, user_input, perc, cores, mtu):
+    user_input = dict(user_input, huge_page_allocation_percentage=perc,
+                      num_phy_cores_per_numa_node_for_pmd=cores)
+    if mtu is not None:
+        user_input['dpdk_nics'] = [dict(dpdk_nic, mtu=mtu)
+                                   for dpdk_nic in user_input['dpdk_nics']]
+    topology = Topology.from_introspection(hw_data)
+    dpdk_numa_nodes = [dpdk_nic['numa_node'] for dpdk_nic in
+                       deriver.get_dpdk_nics_numa_info(
+                           deriver.get_nic_index(hw_data),
+                           user_input['dpdk_nics'])]
+    feasible = not [node for node in topology.nic_numa_nodes
+                    if len(topology.node_cores[node]) - 1 <
+                    (cores if node in dpdk_numa_nodes else 1)]
+    details = {}
+    try:
+        parameters, _ = deriver.derive_hw_data_parameters(
+            hw_data, user_input, details=details)
+    except Exception:
+        return (False, False, None, None, None, None)
+    page_size_mb = details['page_size_mb']
+    hugepages = int(re.search(' hugepages=([0-9]+)',
+                              parameters['ComputeKernelArgs']).group(1))
+    if details['numa_hugepages'] is not None:
+        numa_hugepages = dict(details['numa_hugepages'])
+    else:
+        nodes_memory = deriver.get_numa_nodes_memory(hw_data, topology)
+        numa_hugepages = dict((node, hugepages // len(nodes_memory))
+                              for node in nodes_memory)
+    fits = not [node_memory for node_memory in details['socket_memory']
+                if numa_hugepages.get(node_memory['numa_node'], 0) *
+                page_size_mb < node_memory['socket_memory']]
+    return (feasible, fits, len(details['dpdk_cpus']),
+            len(details['nova_cpus']), hugepages,
+            sum([node_memory['socket_memory']
+                 for node_memory in details['socket_memory']]))
+
+
+# Gets the expected sweep rows from the values derived by the deriver
+# for each node and grid point
+def get_expected_rows(deriver, fleet, user_input):
+    rows = []
+    for perc, cores, mtu in itertools.product(
+            *[SWEEP[key] for key in sweep.SWEEP_KEYS]):
+        points = [derive_point(deriver, hw_data, user_input, perc, cores,
+                               mtu) for hw_data in fleet]
+        feasible = [point for point in points if point[0]]
+
+        def get_range(index):
+            values = [point[index] for point in feasible]
+            if not values:
+                return None, None
+            return min(values), max(values)
+        rows.append({
+            'huge_page_allocation_percentage': perc,
+            'num_phy_cores_per_numa_node_for_pmd': cores,
+            'mtu': mtu if mtu is not None else '-',
+            'pmd_threads': get_range(2),
+            'vcpus': get_range(3),
+            'hugepages': get_range(4),
+            'socket_memory_max': get_range(5)[1],
+            'fit_nodes': len([point for point in feasible if point[1]]),
+            'infeasible_nodes': len(points) - len(feasible)})
+    return rows
+
+
+# Output discarding the 2MB hugepages warnings of the deriver
+class NullOutput(object):
+    def write(self, data):
+        pass
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.deriver = derivers.load_deriver('dpdk')
+        self.fleet = get_fleet()
+        self.numpy = sweep.numpy
+        self.stderr = sys.stderr
+        sys.stderr = NullOutput()
+
+    def tearDown(self):
+        sweep.numpy = self.numpy
+        sys.stderr = self.stderr
+
+    def evaluate(self, user_input):
+        summaries = [self.deriver.get_sweep_node(hw_data, user_input)
+                     for hw_data in self.fleet]
+        rows = sweep.evaluate(summaries, SWEEP,
+                              self.deriver.get_sweep_model(user_input))
+        return [{'huge_page_allocation_percentage':
+                 row['huge_page_allocation_percentage'],
+                 'num_phy_cores_per_numa_node_for_pmd':
+                 row['num_phy_cores_per_numa_node_for_pmd'],
+                 'mtu': row['mtu'],
+                 'pmd_threads': (row['pmd_threads_min'],
+                                 row['pmd_threads_max']),
+                 'vcpus': (row['vcpus_min'], row['vcpus_max']),
+                 'hugepages': (row['hugepages_min'], row['hugepages_max']),
+                 'socket_memory_max': row['socket_memory_max'],
+                 'fit_nodes': row['fit_nodes'],
+                 'infeasible_nodes': row['infeasible_nodes']}
+                for row in rows]
+
+    # The sweep rows match the deriver for both socket memory models and
+    # hugepage allocation modes, with numpy and with the python loops
+    def check_models(self):
+        for memory_model, hugepage_mode in itertools.product(
+                ['shared', 'per_port'], ['global', 'per_numa_node']):
+            user_input = dict(USER_INPUT, socket_memory_model=memory_model,
+                              hugepage_allocation_mode=hugepage_mode)
+            expected = get_expected_rows(self.deriver, self.fleet,
+                                         user_input)
+            self.assertEqual(expected, self.evaluate(user_input))
+
+    @unittest.skipIf(sweep.numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        self.check_models()
+
+    def test_python(self):
+        sweep.numpy = None
+        self.check_models()
+
+    # More PMD cores than available or socket memory above the NUMA node
+    # memory make the node infeasible instead of being capped
+    def test_infeasible_nodes(self):
+        rows = self.evaluate(dict(USER_INPUT,
+                                  hugepage_allocation_mode='per_numa_node'))
+        infeasible = dict(((row['num_phy_cores_per_numa_node_for_pmd'],
+                            row['mtu']), row['infeasible_nodes'])
+                          for row in rows)
+        self.assertEqual(0, infeasible[(1, 1500)])
+        self.assertEqual(1, infeasible[(4, 1500)])
+        self.assertEqual(1, infeasible[(1, 9000)])
+        self.assertEqual(2, infeasible[(4, 9000)])
+
+    # The global hugepages are spread on the NUMA nodes. At 5%, the NUMA
+    # node of the DPDK NICs of the 2MB hugepages node does not hold their
+    # two mbuf pools although the total hugepage memory does.
+    def test_fit_per_numa_node(self):
+        rows = self.evaluate(USER_INPUT)
+        fits = dict(((row['huge_page_allocation_percentage'],
+                      row['num_phy_cores_per_numa_node_for_pmd'],
+                      row['mtu']), row['fit_nodes']) for row in rows)
+        self.assertEqual(0, fits[(5, 1, '-')])
+        self.assertEqual(2, fits[(5, 1, 1500)])
+        self.assertEqual(2, fits[(60, 1, '-')])
+
+    def test_no_summaries(self):
+        self.assertEqual([], sweep.evaluate(
+            [], SWEEP, self.deriver.get_sweep_model(USER_INPUT)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from derive_common import topology_generator
+from derive_common.topology import Topology
+
+# Two NUMA nodes, the cores in introspection order are not sorted by
+# thread, and the thread ids 4 and 5 are not used
+CPUS = [{'cpu': 1, 'numa_node': 0, 'thread_siblings': [2, 8]},
+        {'cpu': 0, 'numa_node': 0, 'thread_siblings': [0, 6]},
+        {'cpu': 0, 'numa_node': 1, 'thread_siblings': [7, 1]},
+        {'cpu': 1, 'numa_node': 1, 'thread_siblings': [3, 9]}]
+NICS = [{'name': 'p1p1', 'numa_node': 1}, {'name': 'p1p2', 'numa_node': 1}]
+
+
+class TopologyTest(unittest.TestCase):
+    def setUp(self):
+        self.topology = Topology(CPUS, NICS)
+
+    def test_cores(self):
+        self.assertEqual([0, 1], self.topology.numa_nodes)
+        self.assertEqual([1], self.topology.nic_numa_nodes)
+        self.assertEqual({0: [0, 1], 1: [2, 3]},
+                         dict((node, list(cores)) for node, cores in
+                              self.topology.node_cores.items()))
+        self.assertEqual(((2, 8), (0, 6), (7, 1), (3, 9)),
+                         self.topology.core_threads)
+        self.assertEqual([1, 0], self.topology.get_node_cpu_ids(0))
+        self.assertEqual([], self.topology.get_node_cpu_ids(2))
+
+    # The host core of each NUMA node has its least thread
+    def test_host_cores(self):
+        self.assertEqual({0: 0, 1: 1}, self.topology.node_min_threads)
+        self.assertEqual({0: 1, 1: 2}, self.topology.node_host_cores)
+
+    def test_threads(self):
+        self.assertEqual(2, self.topology.get_thread_core(1))
+        self.assertEqual((7, 1), self.topology.get_thread_siblings(7))
+        for thread in [4, 5, 10, -1]:
+            self.assertIsNone(self.topology.get_thread_core(thread))
+            self.assertEqual((), self.topology.get_thread_siblings(thread))
+
+    def test_from_introspection(self):
+        hw_data = topology_generator.generate_introspection(2, 4, nics=2)
+        topology = Topology.from_introspection(hw_data)
+        self.assertEqual([0, 1], topology.numa_nodes)
+        self.assertEqual(16, len(topology.threads))
+        self.assertEqual(
+            sorted(topology.threads),
+            sorted([thread for threads in topology.core_threads
+                    for thread in threads]))
+
+    def test_no_cpus(self):
+        self.assertRaises(Exception, Topology, [])
+        self.assertRaises(Exception, Topology.from_introspection, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from derive_common import fake_undercloud
+from derive_common import undercloud
+
+WORKERS = 8
+
+
+# REST backend counting the authentications
+class CountingBackend(undercloud.RestBackend):
+    def __init__(self, *args, **kwargs):
+        super(CountingBackend, self).__init__(*args, **kwargs)
+        self.authentications = 0
+
+    def _authenticate(self):
+        self.authentications += 1
+        super(CountingBackend, self)._authenticate()
+
+
+# REST lookups served by the fake undercloud server
+class RestBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.data = fake_undercloud.generate_data(2, flavor='compute')
+        self.server = fake_undercloud.start_server(self.data)
+        self.backend = CountingBackend.from_env(self.server.get_env())
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_workers(self, call):
+        errors = []
+
+        def worker():
+            try:
+                call()
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_lookups(self):
+        node = self.data['nodes'][0]
+        self.assertEqual([item['uuid'] for item in self.data['nodes']],
+                         [item['uuid'] for item in
+                          self.backend.get_node_list()])
+        self.assertEqual('compute', self.backend.get_profile_name('compute'))
+        self.assertEqual('192.168.24.10',
+                         self.backend.get_host_ip(node['instance_uuid']))
+        self.assertEqual(1, self.backend.authentications)
+
+    # The concurrent first lookups share one authentication
+    def test_concurrent_authentication(self):
+        self.assertEqual([], self.run_workers(self.backend.get_node_list))
+        self.assertEqual(1, self.backend.authentications)
+
+    # The threads getting 401 with the expired token authenticate again
+    # only once, and no request is sent without a token
+    def test_concurrent_token_expiry(self):
+        self.backend.get_node_list()
+        self.server.token = 'renewed-token'
+        self.assertEqual([], self.run_workers(self.backend.get_node_list))
+        self.assertEqual(2, self.backend.authentications)
+        self.assertEqual('renewed-token', self.backend.token)
+
+    def test_missing_endpoint(self):
+        self.backend.get_node_list()
+        del self.backend.endpoints['compute']
+        self.assertRaises(Exception, self.backend.get_host_ips)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+# Opt-in timings (--timings) of the external calls (undercloud CLIs and
+# REST APIs, SSH connect and commands, cache reads and writes) and of the
+# derivation and validation stages. Each call is recorded as a span with
+# its phase name, start time, duration and thread. A per-phase latency
+# summary is displayed at the end of the run and the spans are written
+# as a Chrome trace event file, to be opened with chrome://tracing or
+# https://ui.perfetto.dev to inspect the fleet runs on a timeline.
+#
+# The spans are recorded only when the timings are enabled, otherwise
+# span() and timed() add a single check to the timed calls. The spans of
+# the batch mode worker processes are not recorded.
+
+DEFAULT_TRACE_FILE = 'timings_trace.json'
+
+
+class Timings(object):
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self.start = time.time()
+        self.spans = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def enable(self, trace_file=DEFAULT_TRACE_FILE):
+        self.enabled = True
+        self.trace_file = trace_file
+        self.start = time.time()
+        del self.spans[:]
+
+    # Records the span of the phase started at start (time.time())
+    def record(self, name, start, args=None):
+        end = time.time()
+        thread = threading.current_thread()
+        with self.lock:
+            if thread.ident not in self.threads:
+                self.threads[thread.ident] = (len(self.threads) + 1,
+                                              thread.name)
+            self.spans.append((name, start, end - start,
+                               self.threads[thread.ident][0], args))
+
+
+TIMINGS = Timings()
+
+
+# Context manager recording the span of the phase
+class Span(object):
+    def __init__(self, name, args=None):
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        TIMINGS.record(self.name, self.start, self.args)
+        return False
+
+
+# Context manager doing nothing when the timings are disabled
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def enable(trace_file=DEFAULT_TRACE_FILE):
+    TIMINGS.enable(trace_file)
+
+
+def is_enabled():
+    return TIMINGS.enabled
+
+
+# Gets the context manager recording the span of the phase, with the
+# optional args displayed in the trace
+def span(name, **args):
+    if not TIMINGS.enabled:
+        return NULL_SPAN
+    return Span(name, args or None)
+
+
+# Decorator recording the span of each call of the function
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TIMINGS.enabled:
+                return func(*args, **kwargs)
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TIMINGS.record(name, start)
+        return wrapper
+    return decorator
+
+
+# Gets the nearest rank percentile of the sorted values
+def get_percentile(values, percentile):
+    index = int(math.ceil(percentile / 100.0 * len(values))) - 1
+    return values[max(0, index)]
+
+
+# Gets the (phase, count, total, p50, p95, max) of each phase in seconds,
+# in the order of the first span of each phase
+def get_summary(spans=None):
+    if spans is None:
+        spans = TIMINGS.spans
+    phases = []
+    durations = {}
+    for name, start, duration, tid, args in sorted(spans,
+                                                   key=lambda s: s[1]):
+        if name not in durations:
+            phases.append(name)
+            durations[name] = []
+        durations[name].append(duration)
+    summary = []
+    for name in phases:
+        values = sorted(durations[name])
+        summary.append((name, len(values), sum(values),
+                        get_percentile(values, 50),
+                        get_percentile(values, 95), values[-1]))
+    return summary
+
+
+def display_summary(summary):
+    print('# Timings: %(count)d call(s) in %(elapsed).1f seconds' % {
+        'count': sum([count for _, count, _, _, _, _ in summary]),
+        'elapsed': time.time() - TIMINGS.start})
+    width = max([len(item[0]) for item in summary] + [len('Phase')])
+    print('%-*s %7s %10s %10s %10s %10s' % (width, 'Phase', 'Count',
+                                            'Total s', 'p50 ms', 'p95 ms',
+                                            'Max ms'))
+    for name, count, total, p50, p95, maximum in summary:
+        print('%-*s %7d %10.3f %10.1f %10.1f %10.1f' % (
+            width, name, count, total, p50 * 1000, p95 * 1000,
+            maximum * 1000))
+
+
+# Writes the spans as complete ('X') Chrome trace events, in microseconds
+# from the start of the run, with the name of each thread
+def write_trace(path, spans=None):
+    if spans is None:
+        spans = TIMINGS.spans
+    pid = os.getpid()
+    events = []
+    for tid, thread_name in sorted(TIMINGS.threads.values()):
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                       'tid': tid, 'args': {'name': thread_name}})
+    for name, start, duration, tid, args in spans:
+        event = {'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                 'ts': int((start - TIMINGS.start) * 1e6),
+                 'dur': int(duration * 1e6), 'pid': pid, 'tid': tid}
+        if args:
+            event['args'] = args
+        events.append(event)
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                  trace_file)
+
+
+# Displays the timings summary and writes the trace file when the
+# timings are enabled
+def report():
+    if not TIMINGS.enabled:
+        return
+    display_summary(get_summary())
+    if TIMINGS.trace_file:
+        write_trace(TIMINGS.trace_file)
+        print('Trace is written to: %s' % TIMINGS.trace_file)
+
+
+# Standard output of a timed SSH command, recording the span of the
+# command from exec_command to the end of the output read
+class TimedChannelFile(object):
+    def __init__(self, channel_file, name, start, command):
+        self.channel_file = channel_file
+        self.name = name
+        self.start = start
+        self.command = command
+
+    def read(self, *args):
+        try:
+            return self.channel_file.read(*args)
+        finally:
+            if self.start is not None:
+                TIMINGS.record(self.name, self.start,
+                               {'command': self.command})
+                self.start = None
+
+    def __getattr__(self, name):
+        return getattr(self.channel_file, name)
+
+
+# SSH client recording the span of each command, the other methods are
+# the ones of the wrapped paramiko SSHClient
+class TimedSSHClient(object):
+    def __init__(self, client):
+        self.client = client
+
+    def connect(self, hostname, *args, **kwargs):
+        with span('ssh.connect', host=hostname):
+            return self.client.connect(hostname, *args, **kwargs)
+
+    def exec_command(self, command, *args, **kwargs):
+        start = time.time()
+        stdin, stdout, stderr = self.client.exec_command(command, *args,
+                                                         **kwargs)
+        return stdin, TimedChannelFile(stdout, 'ssh.exec_command', start,
+                                       command), stderr
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+# Gets the SSH client recording the commands spans when the timings are
+# enabled, or the client itself
+def get_ssh_client(client):
+    if not TIMINGS.enabled:
+        return client
+    return TimedSSHClient(client)
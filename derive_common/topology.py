@@ -0,0 +1,88 @@
+from array import array
+
+from derive_common import timings
+
+
+# CPU topology index built once from the introspection numa_topology (or
+# the lscpu output on the deployed node) and shared by all the derivation
+# functions, instead of rescanning the cpus list in each of them.
+#
+# Physical cores are identified by their index in the cpus list and kept
+# in the introspection order, which decides the cores picked for PMD and
+# host cpus. Per core NUMA node and cpu id are array backed, the threads
+# of each core are kept as tuples and thread_cores maps each thread to its
+# core index (-1 for the unused thread ids).
+class Topology(object):
+    __slots__ = ('numa_nodes', 'nic_numa_nodes', 'core_numa_nodes',
+                 'core_ids', 'core_threads', 'node_cores',
+                 'node_min_threads', 'node_host_cores', 'thread_cores',
+                 'threads')
+
+    def __init__(self, cpus, nics=None):
+        if not cpus:
+            raise Exception('Introspection data does not '
+                            'have numa_topology.cpus')
+        self.core_numa_nodes = array('i')
+        self.core_ids = array('i')
+        self.core_threads = []
+        self.node_cores = {}
+        self.node_min_threads = {}
+        self.threads = array('i')
+        max_thread = 0
+        for index, cpu in enumerate(cpus):
+            node = int(cpu['numa_node'])
+            threads = tuple(int(thread) for thread in cpu['thread_siblings'])
+            self.core_numa_nodes.append(node)
+            self.core_ids.append(int(cpu['cpu']))
+            self.core_threads.append(threads)
+            self.threads.extend(threads)
+            self.node_cores.setdefault(node, array('i')).append(index)
+            node_min = min(threads)
+            if (node not in self.node_min_threads or
+                    node_min < self.node_min_threads[node]):
+                self.node_min_threads[node] = node_min
+            max_thread = max(max_thread, max(threads))
+        self.core_threads = tuple(self.core_threads)
+        self.numa_nodes = sorted(self.node_cores.keys())
+
+        self.thread_cores = array('i', [-1]) * (max_thread + 1)
+        for index, threads in enumerate(self.core_threads):
+            for thread in threads:
+                self.thread_cores[thread] = index
+
+        # Core having the least thread in each NUMA node
+        self.node_host_cores = {}
+        for node, min_thread in self.node_min_threads.items():
+            self.node_host_cores[node] = self.thread_cores[min_thread]
+
+        nic_numa_nodes = set()
+        for nic in nics or []:
+            nic_numa_nodes.add(nic['numa_node'])
+        self.nic_numa_nodes = sorted(nic_numa_nodes)
+
+    # Builds the topology from the introspection data
+    @classmethod
+    @timings.timed('topology.from_introspection')
+    def from_introspection(cls, hw_data):
+        numa_topology = hw_data.get('numa_topology', {})
+        return cls(numa_topology.get('cpus', []),
+                   numa_topology.get('nics', []))
+
+    # Gets the core index of the thread, None if thread is not available
+    def get_thread_core(self, thread):
+        if 0 <= thread < len(self.thread_cores):
+            core = self.thread_cores[thread]
+            if core >= 0:
+                return core
+        return None
+
+    # Gets the thread siblings of the thread including the thread itself
+    def get_thread_siblings(self, thread):
+        core = self.get_thread_core(thread)
+        if core is None:
+            return ()
+        return self.core_threads[core]
+
+    # Gets the cpu ids of the NUMA node in introspection order
+    def get_node_cpu_ids(self, node):
+        return [self.core_ids[core] for core in self.node_cores.get(node, [])]
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import sys
+
+# Synthetic introspection data generator, for benchmarking and testing
+# the derivation without real hardware. The generated data has the
+# numa_topology (cpus, nics and ram) and inventory (cpu, memory and
+# interfaces) fields used by the derivation, like the introspection data
+# saved with 'openstack baremetal introspection data save'.
+#
+# The CPU thread ids are numbered like the Linux kernel does, the first
+# threads of all the cores before their siblings, either socket by
+# socket or interleaved between the sockets. With gaps, a few thread ids
+# are left out (like offline CPUs) and the core ids of each socket are
+# not contiguous, like on most Intel servers.
+#
+# Usage: python -m derive_common.topology_generator -p large -o node.json
+#        python -m derive_common.topology_generator -p medium -c 16 -d dir
+
+MIN_SOCKETS = 1
+MAX_SOCKETS = 8
+MIN_THREADS = 8
+MAX_THREADS = 1024
+MIN_NICS = 2
+MAX_NICS = 64
+
+# Embedded NICs, numbered first by os-net-config, the other NICs are
+# the ports of the PCI slots
+EMBEDDED_NICS = 4
+PORTS_PER_SLOT = 2
+
+PROFILES = {
+    'small': dict(sockets=1, cores_per_socket=4, threads_per_core=2,
+                  nics=2),
+    'medium': dict(sockets=2, cores_per_socket=22, threads_per_core=2,
+                   nics=8),
+    'nosmt': dict(sockets=2, cores_per_socket=32, threads_per_core=1,
+                  nics=6, gaps=True),
+    'large': dict(sockets=4, cores_per_socket=28, threads_per_core=2,
+                  nics=16, interleaved=True),
+    'xlarge': dict(sockets=8, cores_per_socket=64, threads_per_core=2,
+                   nics=64, interleaved=True, gaps=True),
+}
+PROFILE_NAMES = ['small', 'medium', 'nosmt', 'large', 'xlarge']
+
+
+# Validates the topology size
+def validate_profile(sockets, cores_per_socket, threads_per_core, nics):
+    if not MIN_SOCKETS <= sockets <= MAX_SOCKETS:
+        raise Exception("Invalid sockets %(sockets)d, expected %(min)d to "
+                        "%(max)d" % {'sockets': sockets, 'min': MIN_SOCKETS,
+                                     'max': MAX_SOCKETS})
+    if threads_per_core not in [1, 2]:
+        raise Exception("Invalid threads per core %d, expected 1 (SMT off) "
+                        "or 2 (SMT on)" % threads_per_core)
+    threads = sockets * cores_per_socket * threads_per_core
+    if not MIN_THREADS <= threads <= MAX_THREADS:
+        raise Exception("Invalid threads count %(threads)d, expected "
+                        "%(min)d to %(max)d" % {'threads': threads,
+                                                'min': MIN_THREADS,
+                                                'max': MAX_THREADS})
+    if not MIN_NICS <= nics <= MAX_NICS:
+        raise Exception("Invalid NICs count %(nics)d, expected %(min)d to "
+                        "%(max)d" % {'nics': nics, 'min': MIN_NICS,
+                                     'max': MAX_NICS})
+
+
+# Every GAP_INTERVAL thread id is left out with gaps, the generated data
+# is the same with every python version
+GAP_INTERVAL = 32
+
+
+# Gets the thread ids of each (socket, core index) as a list of the
+# thread siblings
+def get_thread_ids(sockets, cores_per_socket, threads_per_core,
+                   interleaved, gaps):
+    cores = [(socket, core) for socket in range(sockets)
+             for core in range(cores_per_socket)]
+    if interleaved:
+        cores.sort(key=lambda item: (item[1], item[0]))
+    thread_ids = {}
+    thread = 0
+    for sibling in range(threads_per_core):
+        for socket_core in cores:
+            if gaps and thread % GAP_INTERVAL == GAP_INTERVAL - 1:
+                thread += 1
+            thread_ids.setdefault(socket_core, []).append(thread)
+            thread += 1
+    return thread_ids
+
+
+# Gets the NIC names in the os-net-config order: the embedded NICs and
+# the ports of each PCI slot
+def get_nic_names(nics):
+    names = ['em%d' % (index + 1) for index in range(min(nics,
+                                                         EMBEDDED_NICS))]
+    slot = 1
+    while len(names) < nics:
+        for port in range(PORTS_PER_SLOT):
+            if len(names) < nics:
+                names.append('p%(slot)dp%(port)d' % {'slot': slot,
+                                                     'port': port + 1})
+        slot += 1
+    return names
+
+
+# Generates the introspection data of a synthetic node. The embedded
+# NICs are on the first NUMA node and the PCI slots are spread on the
+# NUMA nodes, the last embedded NIC has no carrier.
+def generate_introspection(sockets, cores_per_socket, threads_per_core=2,
+                           nics=4, interleaved=False, gaps=False,
+                           memory_gb=None, seed=0):
+    validate_profile(sockets, cores_per_socket, threads_per_core, nics)
+    thread_ids = get_thread_ids(sockets, cores_per_socket, threads_per_core,
+                                interleaved, gaps)
+    cpus = []
+    for socket in range(sockets):
+        core_id = 0
+        for core in range(cores_per_socket):
+            cpus.append({'cpu': core_id, 'numa_node': socket,
+                         'thread_siblings': thread_ids[(socket, core)]})
+            core_id += 1
+            # Non contiguous core ids, like the Intel servers
+            if gaps and core % 8 == 4:
+                core_id += 3
+
+    nic_names = get_nic_names(nics)
+    numa_nics = []
+    interfaces = []
+    for index, name in enumerate(nic_names):
+        if index < EMBEDDED_NICS:
+            numa_node = 0
+        else:
+            numa_node = ((index - EMBEDDED_NICS) // PORTS_PER_SLOT) % sockets
+        numa_nics.append({'name': name, 'numa_node': numa_node})
+        interfaces.append({
+            'name': name,
+            'mac_address': '52:54:%02x:%02x:%02x:%02x' % (
+                seed // 256 % 256, seed % 256, index // 256, index % 256),
+            'has_carrier': nics < 3 or index != min(nics, EMBEDDED_NICS) - 1,
+            'ipv4_address': None})
+
+    if memory_gb is None:
+        memory_gb = 64 * sockets
+    node_memory_kb = memory_gb * 1024 * 1024 // sockets
+    threads = sockets * cores_per_socket * threads_per_core
+    return {
+        'numa_topology': {
+            'cpus': cpus,
+            'nics': numa_nics,
+            'ram': [{'numa_node': socket, 'size_kb': node_memory_kb}
+                    for socket in range(sockets)]},
+        'inventory': {
+            'cpu': {'model_name': 'Intel(R) Xeon(R) CPU E5-2699 v4 @ 2.20GHz',
+                    'count': threads,
+                    'architecture': 'x86_64',
+                    'flags': ['fpu', 'vme', 'pse', 'pdpe1gb', 'sse4_2',
+                              'avx2']},
+            'memory': {'physical_mb': memory_gb * 1024,
+                       'total': memory_gb * 1024 * 1024 * 1024},
+            'interfaces': interfaces}}
+
+
+# Generates the introspection data of the named profile
+def generate_profile(name, seed=0):
+    if name not in PROFILES:
+        raise Exception("Invalid profile '%(name)s', expected one of: "
+                        "%(names)s" % {'name': name,
+                                       'names': ', '.join(PROFILE_NAMES)})
+    return generate_introspection(seed=seed, **PROFILES[name])
+
+
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Generates synthetic introspection data')
+    parser.add_argument('-p', '--profile',
+                        metavar='PROFILE',
+                        help="""topology profile: %s.""" %
+                        ', '.join(PROFILE_NAMES),
+                        choices=PROFILE_NAMES)
+    parser.add_argument('--sockets', type=int, default=2)
+    parser.add_argument('--cores_per_socket', type=int, default=8)
+    parser.add_argument('--threads_per_core', type=int, default=2)
+    parser.add_argument('--nics', type=int, default=4)
+    parser.add_argument('--interleaved',
+                        help="""interleave the thread ids between the
+                        sockets.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--gaps',
+                        help="""leave gaps in the thread and core ids.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--memory_gb', type=int, default=None)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-c', '--count',
+                        help="""number of nodes, written to the output
+                        directory.""",
+                        type=int,
+                        default=1)
+    parser.add_argument('-d', '--output_dir',
+                        metavar='OUTPUT DIR',
+                        help="""directory to write '<name>-<n>.json' files,
+                        one per node.""",
+                        default='')
+    parser.add_argument('-o', '--output',
+                        metavar='OUTPUT FILE',
+                        help="""file to write the node introspection data,
+                        stdout by default.""",
+                        default='')
+    return parser.parse_args(argv[1:])
+
+
+if __name__ == '__main__':
+    try:
+        opts = parse_opts(sys.argv)
+        for index in range(opts.count):
+            seed = opts.seed + index
+            if opts.profile:
+                hw_data = generate_profile(opts.profile, seed)
+            else:
+                hw_data = generate_introspection(
+                    opts.sockets, opts.cores_per_socket,
+                    opts.threads_per_core, opts.nics, opts.interleaved,
+                    opts.gaps, opts.memory_gb, seed)
+            if opts.output_dir:
+                path = os.path.join(opts.output_dir, '%(name)s-%(index)d.json'
+                                    % {'name': opts.profile or 'node',
+                                       'index': index})
+                with open(path, 'w') as output_file:
+                    json.dump(hw_data, output_file)
+            elif opts.output:
+                with open(opts.output, 'w') as output_file:
+                    json.dump(hw_data, output_file)
+            else:
+                print(json.dumps(hw_data))
+    except Exception as exc:
+        print("Error: %s" % exc)
+        sys.exit(1)
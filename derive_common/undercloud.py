@@ -0,0 +1,498 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from derive_common import introspection
+from derive_common import timings
+
+BACKENDS = ['auto', 'rest', 'cli']
+DEFAULT_BACKEND = 'cli'
+
+
+# Parses the ironic node capabilities string like
+# 'profile:compute,boot_option:local' into a dictionary
+def parse_capabilities(capabilities):
+    caps = {}
+    if isinstance(capabilities, dict):
+        return capabilities
+    for item in (capabilities or '').split(','):
+        if ':' in item:
+            key, val = item.split(':', 1)
+            caps[key.strip()] = val.strip()
+    return caps
+
+
+# Gets the 'overcloud profiles list' like entries from ironic nodes
+def get_profiles_list_from_nodes(nodes):
+    profiles_list = []
+    for node in nodes:
+        if node.get('maintenance'):
+            continue
+        caps = parse_capabilities(
+            node.get('properties', {}).get('capabilities', ''))
+        possible_profiles = [key[:-len('_profile')]
+                             for key, val in caps.items()
+                             if key.endswith('_profile') and
+                             val.lower() == 'true']
+        profiles_list.append({
+            'Node UUID': node['uuid'],
+            'Node Name': node.get('name') or '',
+            'Provision State': node.get('provision_state'),
+            'Current Profile': caps.get('profile'),
+            'Possible Profiles': sorted(possible_profiles)})
+    return profiles_list
+
+
+# Gets the environment parameters from the deployment parameters
+def get_environment_parameters(result):
+    env = {}
+    if result and result.get('result', {}):
+        env = result.get('result', {}).get('mistral_environment_parameters', {})
+        if not env:
+            env = result.get('result', {}).get('environment_parameters', {})
+    return env or {}
+
+
+# Gets the flavor name for role name from the deployment parameters
+def get_flavor_name_from_parameters(result, role_name):
+    param_key = 'Overcloud' + role_name + 'Flavor'
+    return get_environment_parameters(result).get(param_key, '')
+
+
+# Gets the ctlplane ip address from the 'openstack server list' networks
+# field, either 'ctlplane=192.168.24.10; external=..' or a dictionary of
+# the addresses of each network
+def get_ctlplane_ip_from_networks(networks):
+    if isinstance(networks, dict):
+        addresses = networks.get('ctlplane') or []
+        if not isinstance(addresses, list):
+            addresses = [addresses]
+        return addresses[0].strip() if addresses else ''
+    for network in (networks or '').split(';'):
+        if '=' in network:
+            name, addresses = network.split('=', 1)
+            if name.strip() == 'ctlplane':
+                return addresses.split(',')[0].strip()
+    return ''
+
+
+# Undercloud lookups using the openstack, ironic, nova and mistral CLIs.
+# Each lookup spawns a CLI process.
+class CliBackend(object):
+    name = 'cli'
+
+    def _run(self, cmd):
+        return subprocess.check_output(cmd, shell=True,
+                                       universal_newlines=True)
+
+    # Gets the profile name for flavor name
+    @timings.timed('cli.get_profile_name')
+    def get_profile_name(self, flavor_name):
+        output = self._run("openstack flavor show " + flavor_name)
+        properties = ''
+        for line in output.split('\n'):
+            if 'properties' in line:
+                properties = line
+        profile = ''
+        if properties:
+            profile_index = properties.index('capabilities:profile=')
+            if profile_index >= 0:
+                profile_start_index = (profile_index +
+                                       len('capabilities:profile=') + 1)
+                profile_end_index = properties.index('\'', profile_start_index,
+                                                     len(properties))
+                profile = properties[profile_start_index:profile_end_index]
+        return profile
+
+    # Gets the profile name for each of the flavor names
+    def get_profile_names(self, flavor_names):
+        return dict((flavor_name, self.get_profile_name(flavor_name))
+                    for flavor_name in flavor_names)
+
+    # Gets the 'overcloud profiles list' entries
+    @timings.timed('cli.get_profiles_list')
+    def get_profiles_list(self):
+        output = self._run("openstack overcloud profiles list -f json")
+        return json.loads(output)
+
+    # Gets the introspection data fields used for deriving the parameters
+    # for node UUID, parsed from the CLI output as it is streamed
+    @timings.timed('cli.get_introspection_data')
+    def get_introspection_data(self, node_uuid):
+        cmd = "openstack baremetal introspection data save " + node_uuid
+        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
+        hw_data = None
+        error = None
+        try:
+            hw_data = introspection.load(proc.stdout)
+        except Exception as exc:
+            error = exc
+        proc.stdout.close()
+        # Command failure is reported rather than the incomplete output
+        retcode = proc.wait()
+        if retcode:
+            raise subprocess.CalledProcessError(retcode, cmd)
+        if error is not None:
+            raise error
+        return hw_data
+
+    # Gets the introspection finished timestamp for node UUID
+    @timings.timed('cli.get_introspection_finished_at')
+    def get_introspection_finished_at(self, node_uuid):
+        output = self._run("openstack baremetal introspection status "
+                           "-f json " + node_uuid)
+        return json.loads(output).get('finished_at') or ''
+
+    # Gets the ironic nodes list with uuid and instance_uuid
+    @timings.timed('cli.get_node_list')
+    def get_node_list(self):
+        output = self._run("ironic --json node-list")
+        return json.loads(output)
+
+    # Gets the ctlplane ip address of the instance
+    @timings.timed('cli.get_host_ip')
+    def get_host_ip(self, instance_uuid):
+        output = self._run('nova show ' + instance_uuid +
+                           ' | grep "ctlplane network"')
+        return output.replace('ctlplane network', '').strip(' |\n')
+
+    # Gets the ctlplane ip address of all the instances with a single
+    # servers listing
+    @timings.timed('cli.get_host_ips')
+    def get_host_ips(self):
+        output = self._run("openstack server list -f json -c ID -c Networks")
+        return dict((server['ID'],
+                     get_ctlplane_ip_from_networks(server.get('Networks')))
+                    for server in json.loads(output))
+
+    # Gets the deployment parameters of the overcloud plan
+    @timings.timed('cli.get_parameters')
+    def get_parameters(self):
+        output = self._run("mistral run-action tripleo.parameters.get")
+        return json.loads(output)
+
+    def close(self):
+        pass
+
+
+# Undercloud lookups using the Keystone, Ironic, Ironic-inspector, Nova
+# and Mistral REST APIs from the same process. A single authenticated
+# session is shared by all the lookups and the connections are kept alive
+# in a pool, so it can be used by the concurrent fleet workers.
+class RestBackend(object):
+    name = 'rest'
+
+    def __init__(self, auth_url, username, password, project_name,
+                 user_domain_name='Default', project_domain_name='Default',
+                 interface='public', region_name=None, verify=True,
+                 pool_size=16, timeout=120):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.auth_url = auth_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.project_name = project_name
+        self.user_domain_name = user_domain_name
+        self.project_domain_name = project_domain_name
+        self.interface = interface
+        self.region_name = region_name
+        self.timeout = timeout
+        self.token = None
+        self.endpoints = {}
+        # Guards the token and the endpoints shared by the threads
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    # Creates the backend from the stackrc environment variables
+    @classmethod
+    def from_env(cls, environ=None, **kwargs):
+        environ = environ or os.environ
+        verify = True
+        if environ.get('OS_INSECURE', '').lower() in ('1', 'true', 'yes'):
+            verify = False
+        elif environ.get('OS_CACERT'):
+            verify = environ['OS_CACERT']
+        return cls(environ['OS_AUTH_URL'],
+                   environ['OS_USERNAME'],
+                   environ['OS_PASSWORD'],
+                   environ.get('OS_PROJECT_NAME',
+                               environ.get('OS_TENANT_NAME', 'admin')),
+                   environ.get('OS_USER_DOMAIN_NAME', 'Default'),
+                   environ.get('OS_PROJECT_DOMAIN_NAME', 'Default'),
+                   environ.get('OS_INTERFACE', 'public').replace('URL', ''),
+                   environ.get('OS_REGION_NAME'),
+                   verify, **kwargs)
+
+    @timings.timed('rest.authenticate')
+    def _authenticate(self):
+        if self.auth_url.endswith('v2.0'):
+            body = {'auth': {'tenantName': self.project_name,
+                             'passwordCredentials': {
+                                 'username': self.username,
+                                 'password': self.password}}}
+            resp = self.session.post(self.auth_url + '/tokens', json=body,
+                                     timeout=self.timeout)
+            resp.raise_for_status()
+            access = resp.json()['access']
+            self.token = access['token']['id']
+            self.endpoints = self._parse_v2_catalog(
+                access.get('serviceCatalog', []))
+        else:
+            url = self.auth_url
+            if not url.endswith('v3'):
+                url += '/v3'
+            body = {'auth': {
+                'identity': {'methods': ['password'],
+                             'password': {'user': {
+                                 'name': self.username,
+                                 'domain': {'name': self.user_domain_name},
+                                 'password': self.password}}},
+                'scope': {'project': {
+                    'name': self.project_name,
+                    'domain': {'name': self.project_domain_name}}}}}
+            resp = self.session.post(url + '/auth/tokens', json=body,
+                                     timeout=self.timeout)
+            resp.raise_for_status()
+            self.token = resp.headers['X-Subject-Token']
+            self.endpoints = self._parse_v3_catalog(
+                resp.json()['token'].get('catalog', []))
+
+    def _parse_v2_catalog(self, catalog):
+        endpoints = {}
+        for service in catalog:
+            for endpoint in service.get('endpoints', []):
+                if (self.region_name and
+                        endpoint.get('region') != self.region_name):
+                    continue
+                url = endpoint.get(self.interface + 'URL')
+                if url:
+                    endpoints[service['type']] = url.rstrip('/')
+                    break
+        return endpoints
+
+    def _parse_v3_catalog(self, catalog):
+        endpoints = {}
+        for service in catalog:
+            for endpoint in service.get('endpoints', []):
+                if endpoint.get('interface') != self.interface:
+                    continue
+                if (self.region_name and
+                        endpoint.get('region_id',
+                                     endpoint.get('region')) !=
+                        self.region_name):
+                    continue
+                endpoints[service['type']] = endpoint['url'].rstrip('/')
+                break
+        return endpoints
+
+    # Gets the token and the endpoint of the service type, authenticating
+    # first when there is no token. Only one thread authenticates, the
+    # others wait for its token.
+    def _get_auth(self, service_type):
+        with self.lock:
+            if self.token is None:
+                self._authenticate()
+            token = self.token
+            endpoints = self.endpoints
+        if service_type not in endpoints:
+            raise Exception("Unable to determine '%s' endpoint from the "
+                            "service catalog" % service_type)
+        return token, endpoints[service_type]
+
+    # Drops the expired token, unless another thread already replaced it
+    def _expire_token(self, token):
+        with self.lock:
+            if self.token == token:
+                self.token = None
+
+    # Sends the request and authenticates again once if token is expired
+    def _send(self, method, service_type, path, **kwargs):
+        headers = kwargs.pop('headers', {})
+        for attempt in range(2):
+            token, endpoint = self._get_auth(service_type)
+            headers['X-Auth-Token'] = token
+            resp = self.session.request(method, endpoint + path,
+                                        headers=headers,
+                                        timeout=self.timeout, **kwargs)
+            if resp.status_code == 401 and attempt == 0:
+                resp.close()
+                self._expire_token(token)
+                continue
+            resp.raise_for_status()
+            return resp
+
+    def _request(self, method, service_type, path, **kwargs):
+        return self._send(method, service_type, path, **kwargs).json()
+
+    # Gets the profile name for flavor name
+    def get_profile_name(self, flavor_name):
+        return self.get_profile_names([flavor_name])[flavor_name]
+
+    # Gets the profile name for each of the flavor names, with a single
+    # flavors listing
+    @timings.timed('rest.get_profile_names')
+    def get_profile_names(self, flavor_names):
+        flavors = self._request('GET', 'compute', '/flavors')
+        profile_names = {}
+        for flavor_name in flavor_names:
+            for flavor in flavors.get('flavors', []):
+                if flavor_name in (flavor['name'], flavor['id']):
+                    extra_specs = self._request(
+                        'GET', 'compute',
+                        '/flavors/%s/os-extra_specs' % flavor['id'])
+                    profile_names[flavor_name] = extra_specs.get(
+                        'extra_specs', {}).get('capabilities:profile', '')
+                    break
+            else:
+                raise Exception("Flavor '%s' is not found" % flavor_name)
+        return profile_names
+
+    # Gets the 'overcloud profiles list' entries
+    @timings.timed('rest.get_profiles_list')
+    def get_profiles_list(self):
+        return get_profiles_list_from_nodes(self._get_nodes())
+
+    def _get_nodes(self):
+        nodes = self._request('GET', 'baremetal', '/v1/nodes/detail')
+        return nodes.get('nodes', [])
+
+    # Gets the introspection data fields used for deriving the parameters
+    # for node UUID, parsed from the response body as it is streamed
+    @timings.timed('rest.get_introspection_data')
+    def get_introspection_data(self, node_uuid):
+        resp = self._send('GET', 'baremetal-introspection',
+                          '/v1/introspection/%s/data' % node_uuid,
+                          stream=True)
+        try:
+            return introspection.load_chunks(
+                resp.iter_content(introspection.CHUNK_SIZE))
+        finally:
+            resp.close()
+
+    # Gets the introspection finished timestamp for node UUID
+    @timings.timed('rest.get_introspection_finished_at')
+    def get_introspection_finished_at(self, node_uuid):
+        status = self._request('GET', 'baremetal-introspection',
+                               '/v1/introspection/%s' % node_uuid)
+        return status.get('finished_at') or ''
+
+    # Gets the ironic nodes list with uuid and instance_uuid
+    @timings.timed('rest.get_node_list')
+    def get_node_list(self):
+        return [{'uuid': node['uuid'],
+                 'name': node.get('name'),
+                 'instance_uuid': node.get('instance_uuid') or '',
+                 'power_state': node.get('power_state'),
+                 'provision_state': node.get('provision_state'),
+                 'maintenance': node.get('maintenance')}
+                for node in self._get_nodes()]
+
+    # Gets the ctlplane ip address of the instance
+    @timings.timed('rest.get_host_ip')
+    def get_host_ip(self, instance_uuid):
+        server = self._request('GET', 'compute',
+                               '/servers/%s' % instance_uuid)
+        addresses = server.get('server', {}).get('addresses', {})
+        for address in addresses.get('ctlplane', []):
+            return address['addr']
+        return ''
+
+    # Gets the ctlplane ip address of all the instances with a single
+    # servers listing
+    @timings.timed('rest.get_host_ips')
+    def get_host_ips(self):
+        servers = self._request('GET', 'compute', '/servers/detail')
+        host_ips = {}
+        for server in servers.get('servers', []):
+            addresses = server.get('addresses', {}).get('ctlplane', [])
+            host_ips[server['id']] = addresses[0]['addr'] if addresses else ''
+        return host_ips
+
+    # Gets the deployment parameters of the overcloud plan
+    @timings.timed('rest.get_parameters')
+    def get_parameters(self):
+        body = {'name': 'tripleo.parameters.get',
+                'input': json.dumps({}),
+                'params': json.dumps({'save_result': False,
+                                      'run_sync': True})}
+        execution = self._request('POST', 'workflowv2',
+                                  '/action_executions', json=body)
+        return json.loads(execution.get('output') or '{}')
+
+    def close(self):
+        self.session.close()
+
+
+# Undercloud lookups using the REST backend, falling back to the CLI
+# backend for this and all the later lookups when a REST lookup fails,
+# for example when the REST APIs are not reachable from the host.
+class AutoBackend(object):
+    METHODS = ['get_profile_name', 'get_profile_names', 'get_profiles_list',
+               'get_introspection_data', 'get_introspection_finished_at',
+               'get_node_list', 'get_host_ip', 'get_host_ips',
+               'get_parameters']
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def _fallback(self, failed, exc):
+        with self.lock:
+            if self.backend is failed:
+                sys.stderr.write("REST undercloud backend failed (%s), "
+                                 "using the CLI backend\n" % exc)
+                failed.close()
+                self.backend = CliBackend()
+            return self.backend
+
+    def _call(self, method, *args):
+        backend = self.backend
+        if backend.name == 'cli':
+            return getattr(backend, method)(*args)
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as exc:
+            return getattr(self._fallback(backend, exc), method)(*args)
+
+    def __getattr__(self, method):
+        if method not in self.METHODS:
+            raise AttributeError(method)
+        return lambda *args: self._call(method, *args)
+
+    def close(self):
+        self.backend.close()
+
+
+# Gets the undercloud backend. 'auto' uses the REST backend when the
+# undercloud credentials (stackrc) are available in the environment,
+# falling back to the CLI backend on REST errors, and the CLI backend
+# otherwise. The backend chosen by 'auto' is reported on stderr.
+def get_backend(name=DEFAULT_BACKEND, **kwargs):
+    if name not in BACKENDS:
+        raise Exception("Invalid undercloud backend '%s'" % name)
+    if name == 'auto':
+        backend = CliBackend()
+        if os.environ.get('OS_AUTH_URL') and os.environ.get('OS_PASSWORD'):
+            try:
+                import requests  # noqa
+                backend = AutoBackend(RestBackend.from_env(**kwargs))
+            except ImportError:
+                pass
+        sys.stderr.write("Using the %s undercloud backend\n" %
+                         backend.name.upper())
+        return backend
+    if name == 'rest':
+        return RestBackend.from_env(**kwargs)
+    return CliBackend()
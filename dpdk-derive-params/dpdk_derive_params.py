@@ -1,173 +1,132 @@
+import argparse
 import json
 import math
-import re
-import subprocess
+import os
 import sys
+import time
 import yaml
 
-# Gets the profile name for flavor name
-def get_profile_name(flavor_name):
-    cmd = "openstack flavor show " + flavor_name
-    output = subprocess.check_output(cmd,shell=True)
-    properties = ''
-    for line in output.split('\n'):
-        if 'properties' in line:
-            properties = line
-    profile = ''
-    if properties:
-        profile_index = properties.index('capabilities:profile=')
-        if profile_index >=0:
-            profile_start_index = profile_index + len('capabilities:profile=') + 1
-            profile_end_index = properties.index('\'', profile_start_index, len(properties))
-            profile = properties[profile_start_index:profile_end_index]
-    return profile
-
-
-# Gets the first matching node UUID for flavor name
-def get_node_uuid(flavor_name):
-    node_uuid = ''
-    profile_name = get_profile_name(flavor_name)
-    cmd = "openstack overcloud profiles list -f json"
-    output = subprocess.check_output(cmd,shell=True)
-    profiles_list = json.loads(output)
-    for profile in profiles_list:
-        if profile["Current Profile"] == profile_name:
-            node_uuid = profile["Node UUID"]
-            break
-    return node_uuid.strip()
-
-
-# Gets the hardware data for the give node UUID
-def get_introspection_data(flavor_name):
-    node_uuid = get_node_uuid(flavor_name)
-    cmd = "openstack baremetal introspection data save " + node_uuid
-    output = subprocess.check_output(cmd,shell=True)
-    hw_data = json.loads(output)
-    return hw_data
-
-
-def natural_sort_key(s):
-    nsre = re.compile('([0-9]+)')
-    return [int(text) if text.isdigit() else text
-            for text in re.split(nsre, s)]
-
-
-def is_embedded_nic(nic):
-    if (nic.startswith('em') or nic.startswith('eth') or
-        nic.startswith('eno')):
-        return True
-    return False
-
-
-# Sorting the NIC's like os-net-config logic
-def ordered_nics(interfaces):
-    embedded_nics = []
-    nics = []
-    for iface in interfaces:
-        nic = iface.get('name', '')
-        if is_embedded_nic(nic):
-             embedded_nics.append(nic)
-        else:
-            nics.append(nic)
-    active_nics = (sorted(
-        embedded_nics, key=natural_sort_key) +
-        sorted(nics, key=natural_sort_key))
-    return active_nics
-
-# Gets the ordered active interfaces list
-def get_interfaces_list(hw_data):
-    interfaces = hw_data.get('inventory', {}).get('interfaces', [])
-    # Checks whether inventory interfaces information is not available
-    # in introspection data.
-    if not interfaces:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from derive_common import batch
+from derive_common import cpu_codec
+from derive_common import emitters
+from derive_common import fleet
+from derive_common import nodes
+from derive_common import options
+from derive_common import sweep
+from derive_common import timings
+from derive_common import undercloud
+from derive_common.cpuset import CpuSet
+from derive_common.nics import NicIndex
+from derive_common.topology import Topology
+
+# Throughput-driven PMD core sizing defaults. The capacity is the packet
+# rate a physical core (with its thread siblings) forwards with the PMD
+# threads, and the cores are sized to stay below the maximum load.
+DEFAULT_PMD_CORE_CAPACITY_MPPS = 4.0
+DEFAULT_PMD_MAX_LOAD_PERCENTAGE = 80
+# Simple IMIX frame size mix as [frame size in bytes, parts]
+IMIX_FRAME_SIZES = [[64, 7], [570, 4], [1518, 1]]
+# Preamble, start of frame delimiter and inter frame gap bytes per frame
+ETHERNET_FRAME_OVERHEAD = 20
+# DPDK NIC user inputs for the throughput-driven sizing
+DPDK_NIC_THROUGHPUT_KEYS = ['speed_gbps', 'target_gbps', 'target_mpps',
+                            'frame_size']
+
+# Socket memory models. 'shared' sizes a fixed mbuf pool for each MTU of
+# the NUMA node, 'per_port' sizes the mbuf pools from the queues and
+# descriptors of the ports, like the OVS-DPDK per port memory model.
+SOCKET_MEMORY_MODELS = ['shared', 'per_port']
+DEFAULT_SOCKET_MEMORY_MODEL = 'shared'
+SHARED_POOL_MBUFS = 4096 * 64
+# Bytes added to the MTU for each mbuf, socket memory in MB of the NUMA
+# nodes without DPDK NICs, and socket memory in MB added to the mbuf pools
+# of the NUMA nodes with DPDK NICs
+MBUF_OVERHEAD = 800
+MINIMUM_SOCKET_MEMORY = 1500
+SOCKET_MEMORY_MARGIN = 512
+# Per port memory model defaults and constants of OVS-DPDK
+DEFAULT_RX_QUEUES = 1
+DEFAULT_RX_DESCRIPTORS = 2048
+DEFAULT_TX_DESCRIPTORS = 2048
+MAX_BURST = 32
+MIN_POOL_MBUFS = 4096 * 4
+# DPDK NIC user inputs for the per port memory model
+DPDK_NIC_QUEUE_KEYS = ['rx_queues', 'rx_descriptors', 'tx_descriptors']
+
+# Hugepage allocation modes. 'global' derives the hugepages from the total
+# memory and the kernel spreads them evenly on the NUMA nodes,
+# 'per_numa_node' derives the hugepages of each NUMA node from its memory,
+# with at least its DPDK socket memory.
+HUGEPAGE_ALLOCATION_MODES = ['global', 'per_numa_node']
+DEFAULT_HUGEPAGE_ALLOCATION_MODE = 'global'
+HOST_RESERVED_MEMORY_GB = 4
+
+# Hugepage sizes in MB with their default_hugepagesz and hugepagesz
+# kernel args. 2MB hugepages are used when the CPU does not support 1GB
+# hugepages (no pdpe1gb flag), the socket memory is then rounded up to
+# 2MB instead of 1GB.
+HUGEPAGE_SIZE_1G = 1024
+HUGEPAGE_SIZE_2M = 2
+HUGEPAGE_KERNEL_ARGS_SIZES = {HUGEPAGE_SIZE_1G: ('1GB', '1G'),
+                              HUGEPAGE_SIZE_2M: ('2M', '2M')}
+
+
+# Gets the NIC index of the node interfaces. Checks whether inventory
+# interfaces information is available in introspection data.
+@timings.timed('dpdk.get_nic_index')
+def get_nic_index(hw_data):
+    nic_index = NicIndex.from_introspection(hw_data)
+    if not nic_index.names:
         msg = 'Introspection data does not have inventory.interfaces'
         raise Exception(msg)
-    active_interfaces = [iface for iface in interfaces
-                         if iface.get('has_carrier', False)]
-    # Checks whether active interfaces are not available
-    if not active_interfaces:
-        msg = 'Unable to determine active interfaces (has_carrier)'
-        return Exception(msg)    
-    return ordered_nics(active_interfaces)
+    return nic_index
 
 
 # Gets the DPDK PMD core list
 # Find the right logical CPUs to be allocated along with its
-# siblings for the PMD core list
-def get_dpdk_core_list(hw_data, dpdk_nics_numa_info,
-                       dpdk_nic_numa_cores_count):
+# siblings for the PMD core list. node_cores_count gives the physical
+# cores of each NUMA node with the throughput-driven sizing.
+@timings.timed('dpdk.get_dpdk_core_list')
+def get_dpdk_core_list(topology, dpdk_nics_numa_info,
+                       dpdk_nic_numa_cores_count, node_cores_count=None):
     dpdk_core_list = []
-    nics = hw_data.get('numa_topology', {}).get('nics', {})
-    cpus = hw_data.get('numa_topology', {}).get('cpus', {})
     dpdk_nics_numa_nodes = [dpdk_nic['numa_node']
                             for dpdk_nic in dpdk_nics_numa_info]
 
-    if not nics:
+    if not topology.nic_numa_nodes:
        raise Exception('Introspection data does not '
                        'have numa_topology.nics')
-    numa_cores = {}
-    if not cpus:
-       raise Exception('Introspection data does not '
-                       'have numa_topology.cpus')
 
-    numa_nodes = get_numa_nodes(hw_data)
-    for node in numa_nodes:
-        if node in dpdk_nics_numa_nodes:
-            numa_cores[node] = dpdk_nic_numa_cores_count
+    for node in topology.nic_numa_nodes:
+        if node_cores_count is not None:
+            cores_count = node_cores_count[node]
+        elif node in dpdk_nics_numa_nodes:
+            cores_count = dpdk_nic_numa_cores_count
         else:
-            numa_cores[node] = 1
-
-    numa_nodes_threads = {};
-
-    for cpu in cpus:
-        if not cpu['numa_node'] in numa_nodes_threads:
-            numa_nodes_threads[cpu['numa_node']] = []
-        numa_nodes_threads[cpu['numa_node']].extend(cpu['thread_siblings'])
-
-    for node, node_cores_count in numa_cores.items():
-        numa_node_min = min(numa_nodes_threads[node])
-        cores_count = node_cores_count
-        for cpu in cpus:
-            if cpu['numa_node'] == node:
-                # Adds threads from core which is not having least thread
-                if numa_node_min not in cpu['thread_siblings']:
-                    dpdk_core_list.extend(cpu['thread_siblings'])
-                    cores_count -= 1
-                    if cores_count == 0:
-                        break
-    return ','.join([str(thread) for thread in dpdk_core_list])
+            cores_count = 1
+        host_core = topology.node_host_cores[node]
+        for core in topology.node_cores[node]:
+            # Adds threads from core which is not having least thread
+            if core != host_core:
+                dpdk_core_list.extend(topology.core_threads[core])
+                cores_count -= 1
+                if cores_count == 0:
+                    break
+    return CpuSet(dpdk_core_list)
 
 
 # Gets host cpus
-def get_host_cpus_list(hw_data):
+@timings.timed('dpdk.get_host_cpus_list')
+def get_host_cpus_list(topology):
     host_cpus_list = []
-    cpus = hw_data.get('numa_topology', {}).get('cpus', [])
-    # Checks whether numa topology cpus information is not available
-    # in introspection data.
-    if not cpus:
-        msg = 'Introspection data does not have numa_topology.cpus'
-        raise Exception(msg)
+    for node in topology.numa_nodes:
+        # Adds threads from core which is having least thread
+        host_core = topology.node_host_cores[node]
+        host_cpus_list.extend(topology.core_threads[host_core])
 
-    numa_nodes_threads = {}
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        if not cpu['numa_node'] in numa_nodes_threads:
-            numa_nodes_threads[cpu['numa_node']] = []
-        numa_nodes_threads[cpu['numa_node']].extend(
-            cpu['thread_siblings'])
-
-    for numa_node in sorted(numa_nodes_threads.keys()):
-        node = int(numa_node)
-        # Gets least thread in NUMA node
-        numa_node_min = min(numa_nodes_threads[numa_node])
-        for cpu in cpus:
-            if cpu['numa_node'] == node:
-                # Adds threads from core which is having least thread
-                if numa_node_min in cpu['thread_siblings']:
-                    host_cpus_list.extend(cpu['thread_siblings'])
-                    break
-
-    return ','.join([str(thread) for thread in host_cpus_list])
+    return CpuSet(host_cpus_list)
 
 
 # Computes round off MTU value in bytes
@@ -177,10 +136,12 @@ def roundup_mtu_bytes(mtu):
     return (max_div_val * 1024)
 
 
-# Calculates socket memory for a NUMA node
+# Calculates socket memory for a NUMA node, rounded up to the hugepage
+# size
 def calculate_node_socket_memory(numa_node, dpdk_nics_numa_info,
                                  overhead, packet_size_in_buffer,
-                                 minimum_socket_memory):
+                                 minimum_socket_memory,
+                                 page_size_mb=HUGEPAGE_SIZE_1G):
     distinct_mtu_per_node = []
     socket_memory = 0
 
@@ -199,99 +160,157 @@ def calculate_node_socket_memory(numa_node, dpdk_nics_numa_info,
         socket_memory = minimum_socket_memory
     # For DPDK numa node
     else:
-        socket_memory += 512
-
-    socket_memory_in_gb = int(socket_memory / 1024)
-    if socket_memory % 1024 > 0:
-        socket_memory_in_gb += 1
-    return (socket_memory_in_gb * 1024)
-
-
-# Gets the socket memory
-def get_dpdk_socket_memory(hw_data, dpdk_nics_numa_info,
-                           minimum_socket_memory=1500):
-    dpdk_socket_memory_list = []
-    overhead = 800
-    packet_size_in_buffer = 4096 * 64
-    numa_nodes = get_numa_nodes(hw_data)
+        socket_memory += SOCKET_MEMORY_MARGIN
+
+    socket_memory_in_pages = int(socket_memory / page_size_mb)
+    if socket_memory % page_size_mb > 0:
+        socket_memory_in_pages += 1
+    return (socket_memory_in_pages * page_size_mb)
+
+
+# Gets the mbuf pools of the NUMA node, one for each distinct MTU of its
+# DPDK NICs shared by the NICs having that MTU. The 'shared' model pools
+# have a fixed number of mbufs. The 'per_port' model pools have the mbufs
+# for the rx and tx descriptors and the rx bursts of each queue of the
+# NICs, with a tx queue for each PMD thread and the non PMD thread.
+def get_node_mbuf_pools(numa_node, dpdk_nics_numa_info, overhead,
+                        memory_model, pmd_threads):
+    pools = []
+    for nics_info in dpdk_nics_numa_info:
+        if nics_info['numa_node'] != numa_node:
+            continue
+        for pool in pools:
+            if pool['mtu'] == nics_info['mtu']:
+                break
+        else:
+            pool = {'mtu': nics_info['mtu'],
+                    'nics': [],
+                    'mbuf_size': roundup_mtu_bytes(nics_info['mtu']) + overhead,
+                    'mbufs': SHARED_POOL_MBUFS}
+            if memory_model == 'per_port':
+                pool['mbufs'] = MIN_POOL_MBUFS
+            pools.append(pool)
+        pool['nics'].append(nics_info['nic_id'])
+        if memory_model == 'per_port':
+            rx_queues = nics_info.get('rx_queues', DEFAULT_RX_QUEUES)
+            tx_queues = pmd_threads + 1
+            pool['mbufs'] += (
+                rx_queues * nics_info.get('rx_descriptors',
+                                          DEFAULT_RX_DESCRIPTORS) +
+                tx_queues * nics_info.get('tx_descriptors',
+                                          DEFAULT_TX_DESCRIPTORS) +
+                rx_queues * MAX_BURST)
+    for pool in pools:
+        pool['size_mb'] = (float(pool['mbufs']) * pool['mbuf_size'] /
+                           (1024 * 1024))
+    return pools
+
+
+# Gets the socket memory breakdown of each NUMA node with its mbuf pools
+# and the socket memory rounded up to the hugepage size. The NUMA nodes
+# without DPDK NICs get the minimum socket memory.
+@timings.timed('dpdk.get_socket_memory_breakdown')
+def get_socket_memory_breakdown(topology, dpdk_nics_numa_info,
+                                memory_model=DEFAULT_SOCKET_MEMORY_MODEL,
+                                pmd_threads=0,
+                                minimum_socket_memory=MINIMUM_SOCKET_MEMORY,
+                                page_size_mb=HUGEPAGE_SIZE_1G):
+    breakdown = []
+    overhead = MBUF_OVERHEAD
+    for node in topology.nic_numa_nodes:
+        pools = get_node_mbuf_pools(node, dpdk_nics_numa_info, overhead,
+                                    memory_model, pmd_threads)
+        if memory_model == 'shared':
+            socket_memory = calculate_node_socket_memory(
+                node, dpdk_nics_numa_info, overhead, SHARED_POOL_MBUFS,
+                minimum_socket_memory, page_size_mb)
+        elif pools:
+            socket_memory = (sum([pool['size_mb'] for pool in pools]) +
+                             SOCKET_MEMORY_MARGIN)
+            socket_memory = int(math.ceil(
+                socket_memory / page_size_mb)) * page_size_mb
+        else:
+            socket_memory = int(math.ceil(
+                minimum_socket_memory / float(page_size_mb))) * page_size_mb
+        breakdown.append({'numa_node': node,
+                          'pools': pools,
+                          'socket_memory': socket_memory})
+    return breakdown
+
+
+def display_socket_memory_breakdown(breakdown, memory_model):
+    print('Socket memory (%s memory model):' % memory_model)
+    for node_memory in breakdown:
+        for pool in node_memory['pools']:
+            print('NUMA node %(node)d MTU %(mtu)d pool (%(nics)s) => '
+                  '%(mbufs)d mbufs x %(mbuf_size)d bytes = %(size)d MB'
+                  % {"node": node_memory['numa_node'], "mtu": pool['mtu'],
+                     "nics": ', '.join(pool['nics']),
+                     "mbufs": pool['mbufs'],
+                     "mbuf_size": pool['mbuf_size'],
+                     "size": math.ceil(pool['size_mb'])})
+        if node_memory['pools']:
+            print('NUMA node %(node)d => %(pools)d MB pools + %(margin)d MB, '
+                  'socket memory %(mem)d MB'
+                  % {"node": node_memory['numa_node'],
+                     "margin": SOCKET_MEMORY_MARGIN,
+                     "pools": math.ceil(sum([pool['size_mb'] for pool in
+                                             node_memory['pools']])),
+                     "mem": node_memory['socket_memory']})
+        else:
+            print('NUMA node %(node)d (no DPDK NIC\'s) => socket memory '
+                  '%(mem)d MB' % {"node": node_memory['numa_node'],
+                                  "mem": node_memory['socket_memory']})
+    print('')
 
-    for node in numa_nodes:
-        socket_mem = calculate_node_socket_memory(
-            node, dpdk_nics_numa_info, overhead,
-            packet_size_in_buffer,
-            minimum_socket_memory)
-        dpdk_socket_memory_list.append(socket_mem)
 
-    return "\'"+','.join([str(sm) for sm in dpdk_socket_memory_list])+"\'"
+# Gets the NeutronDpdkSocketMemory parameter of the socket memory
+# breakdown, the socket memory of each NUMA node in MB
+def format_socket_memory(breakdown):
+    return "\'" + ','.join([str(node_memory['socket_memory'])
+                            for node_memory in breakdown]) + "\'"
 
 
 # Gets nova cpus
-def get_nova_cpus_list(hw_data, dpdk_cpus, host_cpus):
-    nova_cpus_list = []
-    cpus = hw_data.get('numa_topology', {}).get('cpus', {})
-    threads = []
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        threads.extend(cpu['thread_siblings'])
-    exclude_cpus_list = dpdk_cpus.split(',')
-    exclude_cpus_list.extend(host_cpus.split(','))
-    for thread in threads:
-        if not str(thread) in exclude_cpus_list:
-            nova_cpus_list.append(thread)
-    
-    return ','.join([str(thread) for thread in nova_cpus_list])
+@timings.timed('dpdk.get_nova_cpus_list')
+def get_nova_cpus_list(topology, dpdk_cpus, host_cpus):
+    return CpuSet(topology.threads) - dpdk_cpus - host_cpus
 
 
 # Gets host isolated cpus
 def get_host_isolated_cpus_list(dpdk_cpus, nova_cpus):
-    host_isolated_cpus_list = dpdk_cpus.split(',')
-    host_isolated_cpus_list.extend(nova_cpus.split(','))
-    return ','.join([str(thread) for thread in host_isolated_cpus_list])
+    return dpdk_cpus | nova_cpus
 
 
-def get_physical_iface_name(ordered_nics, nic_name):
-    if nic_name.startswith('nic'):
-         # Nic numbering, find the actual interface name
-         nic_number = int(nic_name.replace('nic', ''))
-         if nic_number > 0:
-             iface_name = ordered_nics[nic_number - 1]
-             return iface_name
-    return nic_name
-
-
-# Gets NUMA info like NIC name, node and MTU for DPDK NICs
-def get_dpdk_nics_numa_info(hw_data, ordered_nics, dpdk_nics_info):
+# Gets NUMA info like NIC name, node and MTU for DPDK NICs, with the
+# NICs looked up by name or 'nicN' alias in the NIC index
+@timings.timed('dpdk.get_dpdk_nics_numa_info')
+def get_dpdk_nics_numa_info(nic_index, dpdk_nics_info):
     dpdk_nics_numa_info = []
-    nics = hw_data.get('numa_topology', {}).get('nics', [])
     for dpdk_nic in dpdk_nics_info:
-        valid_dpdk_nic = False
-        for nic in nics:
-            phy_nic_name = get_physical_iface_name(ordered_nics,
-                                                   dpdk_nic['nic'])
-            if phy_nic_name == nic['name']:
-                valid_dpdk_nic = True
-                dpdk_nic_info = {'nic_id': dpdk_nic['nic'],
-                                 'name': phy_nic_name,
-                                 'numa_node': nic['numa_node'],
-                                 'mtu': dpdk_nic['mtu']}
-                dpdk_nics_numa_info.append(dpdk_nic_info);
-        if not valid_dpdk_nic:
+        if NicIndex.is_alias(dpdk_nic['nic']) and not nic_index.ordered_nics:
+            raise Exception('Unable to determine active interfaces '
+                            '(has_carrier)')
+        phy_nic_name = nic_index.get_name(dpdk_nic['nic'])
+        numa_node = nic_index.get_numa_node(dpdk_nic['nic'])
+        if phy_nic_name is None or numa_node is None:
             raise Exception("Invalid DPDK NIC "
                             "'%(nic)s'" % {'nic': dpdk_nic['nic']})
+        dpdk_nic_info = {'nic_id': dpdk_nic['nic'],
+                         'name': phy_nic_name,
+                         'numa_node': numa_node,
+                         'mtu': dpdk_nic['mtu']}
+        for key in DPDK_NIC_THROUGHPUT_KEYS + DPDK_NIC_QUEUE_KEYS:
+            if key in dpdk_nic:
+                dpdk_nic_info[key] = dpdk_nic[key]
+        dpdk_nics_numa_info.append(dpdk_nic_info)
     return dpdk_nics_numa_info
 
 
-def display_nics_numa_info(hw_data, dpdk_nics_info):
-    cpus = hw_data.get('numa_topology', {}).get('cpus', {})
-    if not cpus:
-       raise Exception('Introspection data does not '
-                       'have numa_topology.cpus')
+def display_nics_numa_info(topology, dpdk_nics_info):
     print('NIC\'s and NUMA node mapping:')
     for dpdk_nic in dpdk_nics_info:
-        numa_node_cpus = []
-        for cpu in cpus:
-            if cpu['numa_node'] == dpdk_nic['numa_node']:
-               numa_node_cpus.append(cpu['cpu'])
+        numa_node_cpus = topology.get_node_cpu_ids(dpdk_nic['numa_node'])
         print('NIC %(nic)s => NUMA node %(node)d, '
               'pCPU\'s: %(cpu)s' % {"nic": dpdk_nic['nic_id'],
                                     "node": dpdk_nic['numa_node'],
@@ -299,33 +318,237 @@ def display_nics_numa_info(hw_data, dpdk_nics_info):
     print('')
 
 
-# Gets distinct NUMA nodes in sorted order
-def get_numa_nodes(hw_data):
-    nics = hw_data.get('numa_topology', {}).get('nics', [])
-    numa_nodes = []
-    for nic in nics:
-        if not nic['numa_node'] in numa_nodes:
-            numa_nodes.append(nic['numa_node'])
-    return sorted(numa_nodes)
+# Checks whether the throughput-driven PMD core sizing is requested,
+# when the throughput of the DPDK NICs is given
+def is_throughput_sizing(user_input):
+    for dpdk_nic in user_input.get('dpdk_nics', []):
+        for key in DPDK_NIC_THROUGHPUT_KEYS:
+            if key in dpdk_nic:
+                return True
+    return False
+
 
+# Gets the average bits on the wire per frame for the frame size, or for
+# the frame size mix like [[64, 7], [570, 4], [1518, 1]]
+def get_frame_bits(frame_size):
+    if not isinstance(frame_size, list):
+        frame_size = [[frame_size, 1]]
+    total_parts = sum([float(parts) for size, parts in frame_size])
+    total_bits = sum([(size + ETHERNET_FRAME_OVERHEAD) * 8.0 * parts
+                      for size, parts in frame_size])
+    return total_bits / total_parts
+
+
+# Gets the target packet rate of the DPDK NIC in Mpps, given directly
+# (target_mpps) or from the target rate or else the line rate (speed) in
+# Gbps for the frame size mix (IMIX by default)
+def get_nic_target_mpps(dpdk_nic):
+    if 'target_mpps' in dpdk_nic:
+        return float(dpdk_nic['target_mpps'])
+    gbps = dpdk_nic.get('target_gbps', dpdk_nic.get('speed_gbps'))
+    if gbps is None:
+        raise Exception("Target packet rate or speed is missing for "
+                        "DPDK NIC '%(nic)s'" % {'nic': dpdk_nic['nic_id']})
+    frame_size = dpdk_nic.get('frame_size', IMIX_FRAME_SIZES)
+    return float(gbps) * 1000 / get_frame_bits(frame_size)
+
+
+# Sizes the PMD physical cores of each NUMA node for the total target
+# packet rate of its DPDK NICs, so that the load of the cores with the
+# given per core capacity stays below the maximum load. The NUMA nodes
+# without DPDK NICs get one core. Returns the sizing of each NUMA node
+# with its NICs, target and capacity packet rates, cores and headroom.
+def get_pmd_sizing(topology, dpdk_nics_numa_info,
+                   core_capacity_mpps=DEFAULT_PMD_CORE_CAPACITY_MPPS,
+                   max_load_perc=DEFAULT_PMD_MAX_LOAD_PERCENTAGE):
+    pmd_sizing = []
+    usable_mpps = core_capacity_mpps * max_load_perc / 100.0
+    for node in topology.nic_numa_nodes:
+        node_nics = [dpdk_nic for dpdk_nic in dpdk_nics_numa_info
+                     if dpdk_nic['numa_node'] == node]
+        target_mpps = sum([get_nic_target_mpps(dpdk_nic)
+                           for dpdk_nic in node_nics])
+        # Rounded to ignore the floating point error on exact multiples
+        cores = max(1, int(math.ceil(round(target_mpps / usable_mpps, 6))))
+        available_cores = len(topology.node_cores[node]) - 1
+        if cores > available_cores:
+            raise Exception("NUMA node %(node)d needs %(cores)d PMD cores "
+                            "for %(mpps).1f Mpps, only %(available)d cores "
+                            "are available" % {"node": node, "cores": cores,
+                                               "mpps": target_mpps,
+                                               "available": available_cores})
+        capacity_mpps = cores * core_capacity_mpps
+        pmd_sizing.append({
+            'numa_node': node,
+            'nics': [dpdk_nic['nic_id'] for dpdk_nic in node_nics],
+            'target_mpps': target_mpps,
+            'cores': cores,
+            'capacity_mpps': capacity_mpps,
+            'headroom_percentage': (100.0 * (capacity_mpps - target_mpps) /
+                                    capacity_mpps)})
+    return pmd_sizing
+
+
+# Gets the throughput-driven PMD core sizing for the user inputs, None
+# if the throughput of the DPDK NICs is not given
+@timings.timed('dpdk.get_user_pmd_sizing')
+def get_user_pmd_sizing(topology, dpdk_nics_info, user_input):
+    if not is_throughput_sizing(user_input):
+        return None
+    return get_pmd_sizing(
+        topology, dpdk_nics_info,
+        float(user_input.get('pmd_core_capacity_mpps',
+                             DEFAULT_PMD_CORE_CAPACITY_MPPS)),
+        float(user_input.get('pmd_max_load_percentage',
+                             DEFAULT_PMD_MAX_LOAD_PERCENTAGE)))
+
+
+# Gets the PMD physical cores of each NUMA node from the sizing
+def get_node_cores_count(pmd_sizing):
+    if pmd_sizing is None:
+        return None
+    return dict((node_sizing['numa_node'], node_sizing['cores'])
+                for node_sizing in pmd_sizing)
+
+
+def display_pmd_sizing(pmd_sizing):
+    print('PMD core sizing based on NIC\'s throughput:')
+    for node_sizing in pmd_sizing:
+        if not node_sizing['nics']:
+            print('NUMA node %(node)d (no DPDK NIC\'s) => %(cores)d PMD '
+                  'core(s)' % {"node": node_sizing['numa_node'],
+                               "cores": node_sizing['cores']})
+            continue
+        nics = ', '.join(node_sizing['nics'])
+        print('NUMA node %(node)d (%(nics)s) => %(target).1f Mpps, '
+              '%(cores)d PMD core(s) with %(capacity).1f Mpps capacity, '
+              '%(headroom).0f%% headroom'
+              % {"node": node_sizing['numa_node'], "nics": nics,
+                 "target": node_sizing['target_mpps'],
+                 "cores": node_sizing['cores'],
+                 "capacity": node_sizing['capacity_mpps'],
+                 "headroom": node_sizing['headroom_percentage']})
+    print('')
 
-# Derives kernel_args parameter
-def get_kernel_args(hw_data, hugepage_alloc_perc):
-    if not is_supported_default_hugepages(hw_data):
-        raise Exception("default huge page size 1GB is not supported")
 
+# Gets the hugepages of the total memory for the allocation percentage,
+# in pages of the hugepage size
+def get_hugepages(hw_data, hugepage_alloc_perc,
+                  page_size_mb=HUGEPAGE_SIZE_1G):
     total_memory = hw_data.get('inventory', {}).get('memory', {}).get('physical_mb', 0)
-    hugepages = int(float((total_memory / 1024) - 4) * (float(hugepage_alloc_perc) / float(100)))
+    return int(float((total_memory // 1024) - 4) * (float(hugepage_alloc_perc) / float(100)) * (HUGEPAGE_SIZE_1G // page_size_mb))
+
+
+# Derives kernel_args parameter, with the given total hugepages if
+# derived per NUMA node. 2MB hugepages are derived when the CPU does not
+# support 1GB hugepages.
+@timings.timed('dpdk.get_kernel_args')
+def get_kernel_args(hw_data, hugepage_alloc_perc, hugepages=None):
+    page_size_mb = get_hugepage_size(hw_data)
+    if hugepages is None:
+        hugepages = get_hugepages(hw_data, hugepage_alloc_perc, page_size_mb)
     iommu_info = ''
     cpu_model = hw_data.get('inventory', {}).get('cpu', '').get('model_name', '')
     if cpu_model.startswith('Intel'):
         iommu_info = ' intel_iommu=on'
-    kernel_args = ('default_hugepagesz=1GB hugepagesz=1G '
-                   'hugepages=%(hugepages)d' % {'hugepages': hugepages})
+    default_size, size = HUGEPAGE_KERNEL_ARGS_SIZES[page_size_mb]
+    kernel_args = ('default_hugepagesz=%(default_size)s hugepagesz=%(size)s '
+                   'hugepages=%(hugepages)d' % {'default_size': default_size,
+                                                'size': size,
+                                                'hugepages': hugepages})
     kernel_args += iommu_info
     return kernel_args
 
 
+# Gets the hugepage size in MB, 1GB when the CPU supports it, else 2MB
+def get_hugepage_size(hw_data):
+    if is_supported_default_hugepages(hw_data):
+        return HUGEPAGE_SIZE_1G
+    return HUGEPAGE_SIZE_2M
+
+
+# Warns about the 2MB hugepages fallback, 512 times more hugepages
+# have to be mapped with the TLB entries, increasing the TLB misses of
+# the PMD threads and the guests
+def display_hugepage_size_warning(page_size_mb):
+    if page_size_mb == HUGEPAGE_SIZE_2M:
+        sys.stderr.write('Warning: default huge page size 1GB is not '
+                         'supported (no pdpe1gb CPU flag), 2MB huge pages '
+                         'are derived instead. 2MB huge pages need 512 '
+                         'times more TLB entries than 1GB huge pages, '
+                         'expect more TLB misses and lower DPDK '
+                         'performance.\n')
+
+
+# Gets the memory in MB of each NUMA node from the introspection
+# numa_topology.ram, or the total memory split evenly on the NUMA nodes
+# when it is not available
+def get_numa_nodes_memory(hw_data, topology):
+    ram = hw_data.get('numa_topology', {}).get('ram', [])
+    nodes_memory = {}
+    for node_ram in ram:
+        nodes_memory[int(node_ram['numa_node'])] = (
+            int(node_ram['size_kb']) // 1024)
+    if nodes_memory:
+        return nodes_memory
+    total_memory = hw_data.get('inventory', {}).get('memory', {}).get(
+        'physical_mb', 0)
+    for node in topology.numa_nodes:
+        nodes_memory[node] = total_memory // len(topology.numa_nodes)
+    return nodes_memory
+
+
+# Gets the hugepages of each NUMA node as a list of (numa_node,
+# hugepages), the percentage of the node memory excluding its share of
+# the host memory, and at least the DPDK socket memory of the node, so
+# that the PMD threads and the guests pinned on the node use NUMA local
+# hugepages
+@timings.timed('dpdk.get_numa_hugepages')
+def get_numa_hugepages(hw_data, topology, hugepage_alloc_perc,
+                       nodes_socket_memory, page_size_mb=HUGEPAGE_SIZE_1G):
+    nodes_memory = get_numa_nodes_memory(hw_data, topology)
+    host_memory_gb = float(HOST_RESERVED_MEMORY_GB) / len(nodes_memory)
+    pages_per_gb = HUGEPAGE_SIZE_1G // page_size_mb
+    numa_hugepages = []
+    for node in sorted(nodes_memory.keys()):
+        memory_gb = nodes_memory[node] / 1024.0 - host_memory_gb
+        hugepages = int(memory_gb * (float(hugepage_alloc_perc) / float(100))
+                        * pages_per_gb)
+        socket_memory_pages = int(math.ceil(
+            nodes_socket_memory.get(node, 0) / float(page_size_mb)))
+        if socket_memory_pages > memory_gb * pages_per_gb:
+            raise Exception("NUMA node %(node)d memory is not enough for "
+                            "the socket memory %(mem)d MB" % {
+                                "node": node,
+                                "mem": nodes_socket_memory[node]})
+        numa_hugepages.append((node, max(hugepages, socket_memory_pages)))
+    return numa_hugepages
+
+
+# Gets the systemd unit reserving the hugepages of each NUMA node at
+# boot. The kernel spreads the hugepages of the kernel args evenly, the
+# nodes getting less hugepages are set first to free the pages taken by
+# the others.
+def get_numa_hugepages_unit(numa_hugepages, page_size_mb=HUGEPAGE_SIZE_1G):
+    lines = ['[Unit]',
+             'Description=Reserve %sB hugepages per NUMA node' %
+             HUGEPAGE_KERNEL_ARGS_SIZES[page_size_mb][1],
+             'DefaultDependencies=no',
+             'Before=openvswitch.service libvirtd.service',
+             '',
+             '[Service]',
+             'Type=oneshot',
+             'RemainAfterExit=yes']
+    for node, hugepages in sorted(numa_hugepages, key=lambda item: item[1]):
+        lines.append("ExecStart=/bin/sh -c 'echo %(hugepages)d > "
+                     "/sys/devices/system/node/node%(node)d/hugepages/"
+                     "hugepages-%(size)dkB/nr_hugepages'" % {
+                         "node": node, "hugepages": hugepages,
+                         "size": page_size_mb * 1024})
+    lines.extend(['', '[Install]', 'WantedBy=sysinit.target'])
+    return '\n'.join(lines) + '\n'
+
+
 # Checks default 1GB hugepages support
 def is_supported_default_hugepages(hw_data):
     flags = hw_data.get('inventory', {}).get('cpu', {}).get('flags', [])
@@ -334,21 +557,7 @@ def is_supported_default_hugepages(hw_data):
 
 # Converts number format cpus into range format
 def convert_number_to_range_list(num_list, array_format = False):
-    num_list = [int(num.strip(' '))
-                for num in num_list.split(",")]
-    num_list.sort()
-    range_list = []
-    range_min = num_list[0]
-    for num in num_list:
-        next_val = num + 1
-        if next_val not in num_list:
-            if range_min != num:
-                range_list.append(str(range_min) + '-' + str(num))
-            else:
-                range_list.append(str(range_min))
-            next_index = num_list.index(num) + 1
-            if next_index < len(num_list):
-                range_min = num_list[next_index]
+    range_list = cpu_codec.number_list_to_range_list(num_list)
 
     if array_format:
         return '['+','.join([("\'"+thread+"\'") for thread in range_list])+']'
@@ -357,10 +566,11 @@ def convert_number_to_range_list(num_list, array_format = False):
 
 
 # Validates the user inputs
-def vaildate_user_input(user_input):
-    print(json.dumps(user_input))
+def vaildate_user_input(user_input, batch_mode=False):
+    if not batch_mode:
+        print(json.dumps(user_input))
 
-    if not 'flavor' in user_input.keys():
+    if not batch_mode and not 'flavor' in user_input.keys():
         raise Exception("Flavor is missing in user input!");
 
     if not 'dpdk_nics' in user_input.keys():
@@ -371,87 +581,411 @@ def vaildate_user_input(user_input):
     for key in user_input.keys():
         if not key in ['flavor', 'dpdk_nics',
                        'num_phy_cores_per_numa_node_for_pmd',
-                       'huge_page_allocation_percentage']:
+                       'huge_page_allocation_percentage',
+                       'pmd_core_capacity_mpps',
+                       'pmd_max_load_percentage',
+                       'socket_memory_model',
+                       'hugepage_allocation_mode']:
             raise Exception("Invalid user input '%(key)s'" % {'key': key})
 
-
-if __name__ == '__main__':
+    if user_input.get('socket_memory_model',
+                      DEFAULT_SOCKET_MEMORY_MODEL) not in SOCKET_MEMORY_MODELS:
+        raise Exception("Invalid socket_memory_model, expected one of: "
+                        "%s" % ', '.join(SOCKET_MEMORY_MODELS))
+    if user_input.get('hugepage_allocation_mode',
+                      DEFAULT_HUGEPAGE_ALLOCATION_MODE) not in \
+            HUGEPAGE_ALLOCATION_MODES:
+        raise Exception("Invalid hugepage_allocation_mode, expected one of: "
+                        "%s" % ', '.join(HUGEPAGE_ALLOCATION_MODES))
+    for dpdk_nic in user_input['dpdk_nics']:
+        for key in DPDK_NIC_QUEUE_KEYS:
+            if key in dpdk_nic and (type(dpdk_nic[key]) is not int or
+                                    dpdk_nic[key] < 1):
+                raise Exception("Invalid %(key)s for DPDK NIC "
+                                "'%(nic)s'" % {'key': key,
+                                               'nic': dpdk_nic['nic']})
+
+    if is_throughput_sizing(user_input):
+        if 'num_phy_cores_per_numa_node_for_pmd' in user_input:
+            raise Exception("num_phy_cores_per_numa_node_for_pmd can not "
+                            "be used with the DPDK NIC's throughput!")
+        for dpdk_nic in user_input['dpdk_nics']:
+            for key in ['speed_gbps', 'target_gbps', 'target_mpps']:
+                if key in dpdk_nic and not dpdk_nic[key] > 0:
+                    raise Exception("Invalid %(key)s for DPDK NIC "
+                                    "'%(nic)s'" % {'key': key,
+                                                   'nic': dpdk_nic['nic']})
+        max_load_perc = user_input.get('pmd_max_load_percentage',
+                                       DEFAULT_PMD_MAX_LOAD_PERCENTAGE)
+        if not 0 < max_load_perc <= 100:
+            raise Exception("Invalid pmd_max_load_percentage!")
+        if not user_input.get('pmd_core_capacity_mpps',
+                              DEFAULT_PMD_CORE_CAPACITY_MPPS) > 0:
+            raise Exception("Invalid pmd_core_capacity_mpps!")
+
+
+# Derives the DPDK parameters and hiera variables for the given
+# node hardware data, CPU topology and DPDK NIC's NUMA info, with the
+# PMD cores of each NUMA node from the throughput-driven sizing if given,
+# the socket memory with the memory model and the hugepages with the
+# hugepage allocation mode. The details dict, if given, is filled with
+# the intermediate values of the derivation: the DPDK cores, the hugepage
+# size, the socket memory breakdown and the hugepages of each NUMA node.
+def derive_dpdk_parameters(hw_data, topology, dpdk_nics_info,
+                           dpdk_nic_numa_cores_count,
+                           hugepage_alloc_perc, pmd_sizing=None,
+                           memory_model=DEFAULT_SOCKET_MEMORY_MODEL,
+                           hugepage_mode=DEFAULT_HUGEPAGE_ALLOCATION_MODE,
+                           details=None):
     parameters = {}
     hiera_variables = {}
+    dpdk_cpus = get_dpdk_core_list(topology, dpdk_nics_info,
+                                   dpdk_nic_numa_cores_count,
+                                   get_node_cores_count(pmd_sizing))
+    host_cpus = get_host_cpus_list(topology)
+    page_size_mb = get_hugepage_size(hw_data)
+    display_hugepage_size_warning(page_size_mb)
+    socket_memory = get_socket_memory_breakdown(
+        topology, dpdk_nics_info, memory_model, len(dpdk_cpus),
+        page_size_mb=page_size_mb)
+    dpdk_socket_memory = format_socket_memory(socket_memory)
+    nova_cpus = get_nova_cpus_list(topology, dpdk_cpus, host_cpus)
+    isol_cpus = get_host_isolated_cpus_list(dpdk_cpus, nova_cpus)
+    mem_channels = 4
+    host_mem = 4096
+    isol_cpus = convert_number_to_range_list(isol_cpus)
+    numa_hugepages = None
+    hugepages = None
+    if hugepage_mode == 'per_numa_node':
+        nodes_socket_memory = dict((node_memory['numa_node'],
+                                    node_memory['socket_memory'])
+                                   for node_memory in socket_memory)
+        numa_hugepages = get_numa_hugepages(hw_data, topology,
+                                            hugepage_alloc_perc,
+                                            nodes_socket_memory,
+                                            page_size_mb)
+        hugepages = sum([count for _, count in numa_hugepages])
+    kernel_args = get_kernel_args(hw_data, hugepage_alloc_perc, hugepages)
+    parameters['NeutronDpdkCoreList'] = ("\'%(dpdk_cpus)s\'" % {"dpdk_cpus": dpdk_cpus})
+    parameters['HostCpusList'] = ("\'%(host_cpus)s\'" % {"host_cpus": host_cpus})
+    parameters['NeutronDpdkSocketMemory'] = dpdk_socket_memory
+    parameters['NeutronDpdkMemoryChannels'] = mem_channels
+    parameters['NovaVcpuPinSet'] = convert_number_to_range_list(nova_cpus, True)
+    parameters['NovaReservedHostMemory'] = host_mem
+    parameters['HostIsolatedCoreList'] = isol_cpus
+    parameters['ComputeKernelArgs'] = kernel_args
+    if numa_hugepages is not None:
+        parameters['ComputeHugepagesPerNumaNode'] = (
+            "\'" + ','.join(['%(node)d:%(hugepages)d' % {
+                "node": node, "hugepages": count}
+                for node, count in numa_hugepages]) + "\'")
+
+    hiera_variables['nova::compute::reserved_host_memory'] = host_mem
+    hiera_variables['nova::compute::vcpu_pin_set'] = parameters['NovaVcpuPinSet']
+    hiera_variables['vswitch::dpdk::core_list'] = parameters['NeutronDpdkCoreList']
+    hiera_variables['vswitch::dpdk::memory_channels'] = mem_channels
+    hiera_variables['vswitch::dpdk::socket_mem'] = dpdk_socket_memory
+    if details is not None:
+        details.update({'dpdk_cpus': dpdk_cpus,
+                        'host_cpus': host_cpus,
+                        'nova_cpus': nova_cpus,
+                        'page_size_mb': page_size_mb,
+                        'socket_memory_model': memory_model,
+                        'socket_memory': socket_memory,
+                        'numa_hugepages': numa_hugepages})
+    return parameters, hiera_variables
+
+
+# Derives the DPDK parameters for the given node introspection data,
+# using the already parsed CPU topology of the node if given. The details
+# dict, if given, is filled with the intermediate values of the
+# derivation, the topology, the DPDK NIC's NUMA info and the PMD sizing
+# included.
+@timings.timed('dpdk.derive_hw_data_parameters')
+def derive_hw_data_parameters(hw_data, user_input, topology=None,
+                              details=None):
+    dpdk_nic_numa_cores_count = user_input.get(
+        "num_phy_cores_per_numa_node_for_pmd", 1)
+    hugepage_alloc_perc = user_input.get(
+        "huge_page_allocation_percentage", 50)
+    if topology is None:
+        topology = Topology.from_introspection(hw_data)
+    dpdk_nics_info = get_dpdk_nics_numa_info(get_nic_index(hw_data),
+                                             user_input['dpdk_nics'])
+    memory_model = user_input.get("socket_memory_model",
+                                  DEFAULT_SOCKET_MEMORY_MODEL)
+    hugepage_mode = user_input.get("hugepage_allocation_mode",
+                                   DEFAULT_HUGEPAGE_ALLOCATION_MODE)
+    pmd_sizing = get_user_pmd_sizing(topology, dpdk_nics_info, user_input)
+    if details is not None:
+        details.update({'topology': topology,
+                        'dpdk_nics_info': dpdk_nics_info,
+                        'pmd_sizing': pmd_sizing})
+    return derive_dpdk_parameters(hw_data, topology, dpdk_nics_info,
+                                  dpdk_nic_numa_cores_count,
+                                  hugepage_alloc_perc, pmd_sizing,
+                                  memory_model, hugepage_mode, details)
+
+
+# Displays the derived DPDK parameters and hiera variables, with the
+# systemd unit reserving the hugepages of each NUMA node from the details
+# of the derivation
+def display_parameters(parameters, hiera_variables, details=None):
+    # prints the derived DPDK parameters
+    for key, val in parameters.items():
+        if key == "NeutronDpdkMemoryChannels":
+            print('# Memory channels recommended value (4) is hard coded here.')
+            print('# Operator can use the memory channels value based on hardware manual.');
+        if key == "NovaVcpuPinSet":
+            print('%(key)s: %(val)s' % {"key": key, "val": val})
+        elif key == "NovaReservedHostMemory":
+             print('%(key)s: %(val)d' % {"key": key, "val": val})
+        else:
+            print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
+    print('')
+
+    # prints the systemd unit reserving the hugepages per NUMA node
+    if details and details.get('numa_hugepages') is not None:
+        print('# Systemd unit reserving the hugepages of each NUMA node at boot')
+        print('# Deployed by the yaml and json output formats, or copy to')
+        print('# /etc/systemd/system/hugepages-numa.service and enable it')
+        sys.stdout.write(get_numa_hugepages_unit(details['numa_hugepages'],
+                                                 details['page_size_mb']))
+        print('')
+
+    # prints overriding role-specific parameters using hiera variables
+    print('# Overrides role-specific parameters using hiera variables')
+    print('# Optional this section, copy if any parameters are needed to override for this role')
+    print('# Copy required parameters to the <RoleName>ExtraConfig section')
+    for key, val in hiera_variables.items():
+        if key == "vswitch::dpdk::memory_channels":
+            print('# Memory channels recommended value (4) is hard coded here.')
+            print('# Operator can use the memory channels value based on hardware manual.');
+        if key == "nova::compute::vcpu_pin_set":
+            print('%(key)s: %(val)s' % {"key": key, "val": val})
+        elif key == "nova::compute::reserved_host_memory":
+             print('%(key)s: %(val)d' % {"key": key, "val": val})
+        else:
+            print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
+    print('')
+
+
+# Displays the derived parameters, or writes them to the heat
+# environment file when a structured output format is used
+def output_parameters(parameters, hiera_variables, emitter=None, name=None,
+                      details=None):
+    if emitter is None:
+        display_parameters(parameters, hiera_variables, details)
+    else:
+        path = emitter.emit(parameters, hiera_variables, name)
+        print('Parameters are written to: %s' % path)
+
+
+# Derives the DPDK parameters for the first node matching the flavor,
+# and displays the NUMA info of the DPDK NIC's, the PMD sizing and the
+# socket memory breakdown from the details of the derivation
+def derive_parameters(user_input, cache=None, backend=None,
+                      emitter=None):
+    hw_data = nodes.get_introspection_data(user_input['flavor'], cache,
+                                           backend)
+    details = {}
+    parameters, hiera_variables = derive_hw_data_parameters(
+        hw_data, user_input, details=details)
+    display_nics_numa_info(details['topology'], details['dpdk_nics_info'])
+    if details['pmd_sizing'] is not None:
+        display_pmd_sizing(details['pmd_sizing'])
+    if "socket_memory_model" in user_input:
+        display_socket_memory_breakdown(details['socket_memory'],
+                                        details['socket_memory_model'])
+
+    print("Deriving DPDK parameters based on "
+          "flavor: %s" % user_input['flavor'])
+    output_parameters(parameters, hiera_variables, emitter,
+                      details=details)
+
+
+# Derives the DPDK parameters for each saved introspection data in
+# the batch path (directory, tar archive or JSON lines file) using a pool
+# of processes, without accessing undercloud. The parameters of each
+# node are written as a JSON line as soon as they are derived, and to
+# the heat environment file of each node with the emitter.
+def derive_batch_parameters(user_input, path, processes, emitter=None):
+    summary, failed = batch.derive_batch(path, derive_hw_data_parameters,
+                                         user_input, processes,
+                                         emitter=emitter)
+    sys.stderr.write(summary + '\n')
+
+
+# Gets the sweep summary of the node, the inputs of the derivation
+# formulas: the PMD core threads and the memory of each NUMA node, and the
+# MTU and mbufs of the DPDK NICs for the socket memory model of the user
+# inputs. The hugepage size is the one of the node.
+def get_sweep_node(hw_data, user_input):
+    topology = Topology.from_introspection(hw_data)
+    if not topology.nic_numa_nodes:
+        raise Exception('Introspection data does not '
+                        'have numa_topology.nics')
+    dpdk_nics_info = get_dpdk_nics_numa_info(get_nic_index(hw_data),
+                                             user_input['dpdk_nics'])
+    memory_model = user_input.get("socket_memory_model",
+                                  DEFAULT_SOCKET_MEMORY_MODEL)
+    numa_nics = {}
+    for dpdk_nic in dpdk_nics_info:
+        rx_mbufs = 0
+        tx_descriptors = 0
+        if memory_model == 'per_port':
+            rx_queues = dpdk_nic.get('rx_queues', DEFAULT_RX_QUEUES)
+            rx_mbufs = rx_queues * (dpdk_nic.get('rx_descriptors',
+                                                 DEFAULT_RX_DESCRIPTORS) +
+                                    MAX_BURST)
+            tx_descriptors = dpdk_nic.get('tx_descriptors',
+                                          DEFAULT_TX_DESCRIPTORS)
+        numa_nics.setdefault(dpdk_nic['numa_node'], []).append(
+            [dpdk_nic['mtu'], rx_mbufs, tx_descriptors])
+    return sweep.get_node_summary(
+        topology, numa_nics, len(get_host_cpus_list(topology)),
+        get_hugepage_size(hw_data),
+        hw_data.get('inventory', {}).get('memory', {}).get('physical_mb', 0),
+        get_numa_nodes_memory(hw_data, topology))
+
+
+# Gets the sweep model of the socket memory model and hugepage allocation
+# mode of the user inputs
+def get_sweep_model(user_input):
+    memory_model = user_input.get("socket_memory_model",
+                                  DEFAULT_SOCKET_MEMORY_MODEL)
+    pool_mbufs = SHARED_POOL_MBUFS
+    if memory_model == 'per_port':
+        pool_mbufs = MIN_POOL_MBUFS
+    return {'hugepage_mode': user_input.get(
+                "hugepage_allocation_mode", DEFAULT_HUGEPAGE_ALLOCATION_MODE),
+            'host_memory_gb': HOST_RESERVED_MEMORY_GB,
+            'pool_mbufs': pool_mbufs,
+            'mbuf_overhead': MBUF_OVERHEAD,
+            'socket_memory_margin': SOCKET_MEMORY_MARGIN,
+            'minimum_socket_memory': MINIMUM_SOCKET_MEMORY}
+
+
+# Evaluates the what-if sweep of the DPDK inputs over the nodes of the
+# batch path (using a pool of processes), or over all the nodes matching
+# the flavor, and writes a row for each combination of the swept values
+# with the derived values aggregated over the nodes
+def derive_sweep_parameters(user_input, sweep_spec, sweep_format,
+                            path=None, processes=batch.DEFAULT_PROCESSES,
+                            max_workers=fleet.DEFAULT_MAX_WORKERS,
+                            cache=None, backend=None):
+    start = time.time()
+    values = sweep.parse_sweep(sweep_spec, user_input)
+    if path:
+        results = batch.run_batch(path, get_sweep_node, user_input,
+                                  processes)
+    else:
+        node_uuids = nodes.get_node_uuids(user_input['flavor'], cache,
+                                          backend)
+        if not node_uuids:
+            raise Exception("Unable to determine nodes for flavor "
+                            "'%s'" % user_input['flavor'])
+        results = fleet.run_fleet(
+            node_uuids, lambda node_uuid: get_sweep_node(
+                nodes.get_node_introspection_data(node_uuid, cache, backend),
+                user_input),
+            max_workers)
+    summaries = []
+    failed = 0
+    for name, summary, error in results:
+        if error is not None:
+            failed += 1
+            sys.stderr.write('# %(name)s: %(error)s\n' % {'name': name,
+                                                           'error': error})
+            continue
+        summaries.append(summary)
+    rows = sweep.evaluate(summaries, values, get_sweep_model(user_input))
+    sweep.write_rows(rows, sweep_format)
+    sys.stderr.write('# Sweep summary: %(rows)d combination(s) over '
+                     '%(nodes)d node(s), %(failed)d failed in '
+                     '%(elapsed).1f seconds\n' % {
+                         'rows': len(rows), 'nodes': len(summaries),
+                         'failed': failed, 'elapsed': time.time() - start})
+
+
+# Gets the user inputs from command line arguments
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Derives DPDK parameters')
+    options.add_user_input_argument(parser)
+    options.add_fleet_options(parser)
+    options.add_batch_options(parser)
+    parser.add_argument('--sweep',
+                        metavar='SWEEP JSON',
+                        help="""evaluate the derived values for all the
+                        combinations of the huge_page_allocation_percentage,
+                        num_phy_cores_per_numa_node_for_pmd and mtu values
+                        in JSON format, over the nodes matching the flavor
+                        or the batch path.""",
+                        default='')
+    parser.add_argument('--sweep_format',
+                        metavar='SWEEP FORMAT',
+                        help="""'table' or 'csv' output of the sweep.""",
+                        choices=sweep.SWEEP_FORMATS,
+                        default=sweep.DEFAULT_SWEEP_FORMAT)
+    options.add_output_options(parser)
+    options.add_backend_option(parser)
+    options.add_cache_options(parser)
+    options.add_timings_options(parser)
+    opts = parser.parse_args(argv[1:])
+    return opts
+
+
+if __name__ == '__main__':
+    backend = None
     try:
-        print("Validating user inputs..")        
-        if len(sys.argv) != 2:
+        opts = parse_opts(sys.argv)
+        if opts.timings:
+            timings.enable(opts.trace_file)
+        emitter = None
+        if opts.output_format != 'text':
+            emitter = emitters.Emitter(opts.output_format, opts.output_dir,
+                                       opts.role_name, 'dpdk',
+                                       opts.extra_config_pre)
+        if opts.batch:
+            user_input = json.loads(opts.user_input or '{}')
+            vaildate_user_input(user_input, batch_mode=True)
+            if opts.sweep:
+                derive_sweep_parameters(user_input, opts.sweep,
+                                        opts.sweep_format, opts.batch,
+                                        opts.processes)
+                sys.exit(0)
+            derive_batch_parameters(user_input, opts.batch, opts.processes,
+                                    emitter)
+            sys.exit(0)
+
+        print("Validating user inputs..")
+        if not opts.user_input:
             raise Exception("Unable to determine params, user "
                             "input JSON data is missing!");
 
-        user_input = json.loads(sys.argv[1])
+        user_input = json.loads(opts.user_input)
         vaildate_user_input(user_input)
 
-        dpdk_nic_numa_cores_count = user_input.get(
-            "num_phy_cores_per_numa_node_for_pmd", 1)
-
-        hugepage_alloc_perc = user_input.get(
-            "huge_page_allocation_percentage", 50)
-
-        hw_data = get_introspection_data(user_input['flavor'])
-        ordered_nics = get_interfaces_list(hw_data)
-        dpdk_nics_info = get_dpdk_nics_numa_info(hw_data, ordered_nics,
-                                                 user_input['dpdk_nics'])
-        display_nics_numa_info(hw_data, dpdk_nics_info)
-
-        print("Deriving DPDK parameters based on "
-              "flavor: %s" % user_input['flavor'])
-        dpdk_cpus = get_dpdk_core_list(hw_data, dpdk_nics_info,
-                                       dpdk_nic_numa_cores_count) 
-        host_cpus = get_host_cpus_list(hw_data)
-        dpdk_socket_memory = get_dpdk_socket_memory(hw_data, dpdk_nics_info)
-        nova_cpus = get_nova_cpus_list(hw_data, dpdk_cpus, host_cpus)
-        isol_cpus = get_host_isolated_cpus_list(dpdk_cpus, nova_cpus)
-        mem_channels = 4
-        host_mem = 4096
-        isol_cpus = convert_number_to_range_list(isol_cpus)
-        kernel_args = get_kernel_args(hw_data, hugepage_alloc_perc)
-        parameters['NeutronDpdkCoreList'] = ("\'%(dpdk_cpus)s\'" % {"dpdk_cpus": dpdk_cpus})
-        parameters['HostCpusList'] = ("\'%(host_cpus)s\'" % {"host_cpus": host_cpus})
-        parameters['NeutronDpdkSocketMemory'] = dpdk_socket_memory
-        parameters['NeutronDpdkMemoryChannels'] = mem_channels
-        parameters['NovaVcpuPinSet'] = convert_number_to_range_list(nova_cpus, True)
-        parameters['NovaReservedHostMemory'] = host_mem
-        parameters['HostIsolatedCoreList'] = isol_cpus
-        parameters['ComputeKernelArgs'] = kernel_args
-        # prints the derived DPDK parameters
-        for key, val in parameters.items():
-            if key == "NeutronDpdkMemoryChannels":
-                print('# Memory channels recommended value (4) is hard coded here.')
-                print('# Operator can use the memory channels value based on hardware manual.');
-            if key == "NovaVcpuPinSet":
-                print('%(key)s: %(val)s' % {"key": key, "val": val})
-            elif key == "NovaReservedHostMemory":
-                 print('%(key)s: %(val)d' % {"key": key, "val": val})
-            else:
-                print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
-        print('')
-
-        hiera_variables['nova::compute::reserved_host_memory'] = host_mem
-        hiera_variables['nova::compute::vcpu_pin_set'] = parameters['NovaVcpuPinSet']
-        hiera_variables['vswitch::dpdk::core_list'] = parameters['NeutronDpdkCoreList']
-        hiera_variables['vswitch::dpdk::memory_channels'] = mem_channels
-        hiera_variables['vswitch::dpdk::socket_mem'] = dpdk_socket_memory
-        # prints overriding role-specific parameters using hiera variables
-        print('# Overrides role-specific parameters using hiera variables')
-        print('# Optional this section, copy if any parameters are needed to override for this role')
-        print('# Copy required parameters to the <RoleName>ExtraConfig section')
-        for key, val in hiera_variables.items():
-            if key == "vswitch::dpdk::memory_channels":
-                print('# Memory channels recommended value (4) is hard coded here.')
-                print('# Operator can use the memory channels value based on hardware manual.');
-            if key == "nova::compute::vcpu_pin_set":
-                print('%(key)s: %(val)s' % {"key": key, "val": val})
-            elif key == "nova::compute::reserved_host_memory":
-                 print('%(key)s: %(val)d' % {"key": key, "val": val})
-            else:
-                print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
-        print('')
-
+        cache = options.get_cache(opts)
+        backend = undercloud.get_backend(opts.backend,
+                                         pool_size=opts.max_workers)
+        if opts.sweep:
+            derive_sweep_parameters(user_input, opts.sweep,
+                                    opts.sweep_format,
+                                    max_workers=opts.max_workers,
+                                    cache=cache, backend=backend)
+        elif opts.fleet:
+            fleet.derive_fleet_parameters('DPDK', user_input,
+                                          derive_hw_data_parameters,
+                                          output_parameters,
+                                          opts.max_workers, cache, backend,
+                                          emitter)
+        else:
+            derive_parameters(user_input, cache, backend, emitter)
     except Exception as exc:
         print("Error: %s" % exc)
+    finally:
+        if backend is not None:
+            backend.close()
+        timings.report()
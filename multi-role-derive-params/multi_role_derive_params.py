@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from derive_common import derivers
+from derive_common import emitters
+from derive_common import nodes
+from derive_common import options
+from derive_common import timings
+from derive_common import undercloud
+from derive_common.topology import Topology
+
+# Derivers run for each role, the parameters of the first deriver are
+# kept for the parameters derived by both (like NovaVcpuPinSet, which
+# has to exclude the DPDK PMD cores), except the kernel args which are
+# merged.
+FEATURES = ['dpdk', 'sriov']
+
+# User inputs of the role used by all its derivers. An input given for a
+# single deriver is used by the other derivers too, the role is rejected
+# when the derivers are given different values.
+SHARED_INPUTS = ['huge_page_allocation_percentage']
+
+
+# Undercloud lookups shared by all the roles. The profiles list is
+# fetched once, the profiles of all the role flavors are looked up
+# together with a single flavors listing when the first one is needed,
+# and the introspection data and CPU topology of each node are loaded
+# once, however many roles use them.
+class SharedInventory(object):
+    def __init__(self, backend, cache=None, flavor_names=None):
+        self.backend = backend
+        self.cache = cache
+        self.flavor_names = list(flavor_names or [])
+        self.profiles_list = None
+        self.profiles = {}
+        self.nodes = {}
+
+    def get_profiles_list(self):
+        if self.profiles_list is None:
+            self.profiles_list = self.backend.get_profiles_list()
+        return self.profiles_list
+
+    def get_profile_name(self, flavor_name):
+        if flavor_name not in self.profiles:
+            flavor_names = set([flavor_name] + self.flavor_names)
+            self.profiles.update(self.backend.get_profile_names(
+                sorted(flavor_names - set(self.profiles.keys()))))
+        return self.profiles[flavor_name]
+
+    # Gets all the matching node UUIDs for flavor name
+    def get_node_uuids(self, flavor_name):
+        def fetch():
+            profile_name = self.get_profile_name(flavor_name)
+            return [profile["Node UUID"].strip()
+                    for profile in self.get_profiles_list()
+                    if profile["Current Profile"] == profile_name]
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get(
+            'nodes-' + flavor_name, fetch,
+            lambda: nodes.get_nodes_version(self.get_profile_name(flavor_name),
+                                            self.get_profiles_list()))
+
+    # Gets the hardware data and CPU topology for node UUID
+    def get_node(self, node_uuid):
+        if node_uuid not in self.nodes:
+            hw_data = nodes.get_node_introspection_data(
+                node_uuid, self.cache, self.backend)
+            self.nodes[node_uuid] = (hw_data,
+                                     Topology.from_introspection(hw_data))
+        return self.nodes[node_uuid]
+
+
+# Validates the user inputs, a list of roles like
+# {"roles": [{"name": "ComputeOvsDpdkSriov", "flavor": "computeovsdpdk",
+#             "dpdk": {"dpdk_nics": [{"nic": "nic5", "mtu": 9000}]},
+#             "sriov": {"huge_page_allocation_percentage": 50}}]}
+def vaildate_user_input(user_input):
+    roles = user_input.get('roles')
+    if not roles or type(roles) is not list:
+        raise Exception("Roles are missing in user input!")
+    for key in user_input.keys():
+        if key != 'roles':
+            raise Exception("Invalid user input '%(key)s'" % {'key': key})
+
+    role_names = []
+    for role in roles:
+        if not role.get('name'):
+            raise Exception("Role name is missing in user input!")
+        if role['name'] in role_names:
+            raise Exception("Duplicate role '%s'" % role['name'])
+        role_names.append(role['name'])
+        if not role.get('flavor'):
+            raise Exception("Flavor is missing for role "
+                            "'%s'!" % role['name'])
+        features = [feature for feature in FEATURES if feature in role]
+        if not features:
+            raise Exception("DPDK or SRIOV user inputs are missing for "
+                            "role '%s'!" % role['name'])
+        for key in role.keys():
+            if key not in ['name', 'flavor'] + FEATURES:
+                raise Exception("Invalid user input '%(key)s' for role "
+                                "'%(role)s'" % {'key': key,
+                                               'role': role['name']})
+        for feature in features:
+            derivers.load_deriver(feature).vaildate_user_input(
+                role[feature], batch_mode=True)
+        for key in SHARED_INPUTS:
+            values = [(feature, role[feature][key]) for feature in features
+                      if key in role[feature]]
+            if len(set([val for _, val in values])) > 1:
+                raise Exception("Conflicting %(key)s for role '%(role)s': "
+                                "%(values)s" % {
+                                    'key': key, 'role': role['name'],
+                                    'values': ', '.join([
+                                        '%s %s' % (feature.upper(), val)
+                                        for feature, val in values])})
+
+
+# Gets the user inputs of each deriver of the role, with the shared inputs
+# given for any of the derivers. Warns about the flavor given in the
+# deriver inputs, the role flavor is used instead.
+def get_feature_inputs(role):
+    features = [feature for feature in FEATURES if feature in role]
+    shared_inputs = {}
+    for feature in features:
+        for key in SHARED_INPUTS:
+            if key in role[feature]:
+                shared_inputs[key] = role[feature][key]
+    feature_inputs = {}
+    for feature in features:
+        if 'flavor' in role[feature]:
+            sys.stderr.write("Warning: %(feature)s flavor '%(flavor)s' of "
+                             "role '%(role)s' is ignored, the role flavor "
+                             "'%(role_flavor)s' is used.\n" % {
+                                 'feature': feature.upper(),
+                                 'flavor': role[feature]['flavor'],
+                                 'role': role['name'],
+                                 'role_flavor': role['flavor']})
+        feature_inputs[feature] = dict(shared_inputs)
+        feature_inputs[feature].update(role[feature])
+    return feature_inputs
+
+
+# Merges the kernel args of the derivers, the args of the first deriver
+# are kept and the args of the other derivers not set by it are appended
+def merge_kernel_args(kernel_args_list):
+    names = []
+    kernel_args = []
+    for args in kernel_args_list:
+        for arg in args.split():
+            name = arg.split('=', 1)[0]
+            if name not in names:
+                names.append(name)
+                kernel_args.append(arg)
+    return ' '.join(kernel_args)
+
+
+# Derives the parameters of the role for the first node matching the
+# role flavor, with each of the role derivers against the same topology.
+# The details of the derivation of each deriver are filled in the
+# details dict if given, by deriver name.
+def derive_role_parameters(role, inventory, details=None):
+    node_uuids = inventory.get_node_uuids(role['flavor'])
+    if not node_uuids:
+        raise Exception("Unable to determine nodes for flavor "
+                        "'%s'" % role['flavor'])
+    hw_data, topology = inventory.get_node(node_uuids[0])
+    feature_inputs = get_feature_inputs(role)
+    parameters = {}
+    hiera_variables = {}
+    kernel_args_list = []
+    for feature in FEATURES:
+        if feature not in role:
+            continue
+        feature_details = {}
+        feature_parameters, feature_hiera_variables = (
+            derivers.load_deriver(feature).derive_hw_data_parameters(
+                hw_data, feature_inputs[feature], topology, feature_details))
+        if details is not None:
+            details[feature] = feature_details
+        for key, val in feature_parameters.items():
+            parameters.setdefault(key, val)
+        for key, val in feature_hiera_variables.items():
+            hiera_variables.setdefault(key, val)
+        if 'ComputeKernelArgs' in feature_parameters:
+            kernel_args_list.append(feature_parameters['ComputeKernelArgs'])
+    if kernel_args_list:
+        parameters['ComputeKernelArgs'] = merge_kernel_args(kernel_args_list)
+    return node_uuids[0], parameters, hiera_variables
+
+
+# Derives the parameters for all the roles and displays them, or writes
+# them to the heat environment file of each role
+def derive_parameters(user_input, cache=None, backend=None,
+                      output_format=emitters.DEFAULT_FORMAT, output_dir='',
+                      extra_config_pre=False):
+    backend = backend or undercloud.CliBackend()
+    inventory = SharedInventory(backend, cache,
+                                [role['flavor'] for role in user_input['roles']])
+    for role in user_input['roles']:
+        features = [feature for feature in FEATURES if feature in role]
+        details = {}
+        node_uuid, parameters, hiera_variables = derive_role_parameters(
+            role, inventory, details)
+        print("# Role: %(role)s, flavor: %(flavor)s, node: %(node)s, "
+              "derived: %(features)s" % {
+                  'role': role['name'], 'flavor': role['flavor'],
+                  'node': node_uuid,
+                  'features': ', '.join([feature.upper()
+                                         for feature in features])})
+        if output_format == 'text':
+            derivers.load_deriver(features[0]).display_parameters(
+                parameters, hiera_variables, details[features[0]])
+        else:
+            emitter = emitters.Emitter(output_format, output_dir,
+                                       role['name'],
+                                       extra_config_pre=extra_config_pre)
+            path = emitter.emit(parameters, hiera_variables)
+            print('Parameters are written to: %s' % path)
+
+
+# Gets the user inputs from command line arguments
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Derives DPDK and SRIOV parameters for multiple roles')
+    options.add_user_input_argument(parser)
+    options.add_output_options(parser, role_name=False)
+    options.add_backend_option(parser)
+    options.add_cache_options(parser)
+    options.add_timings_options(parser)
+    opts = parser.parse_args(argv[1:])
+    return opts
+
+
+if __name__ == '__main__':
+    backend = None
+    try:
+        opts = parse_opts(sys.argv)
+        if opts.timings:
+            timings.enable(opts.trace_file)
+        if opts.output_format != 'text' and not opts.output_dir:
+            raise Exception("Output directory is required for '%s' "
+                            "output format" % opts.output_format)
+
+        print("Validating user inputs..")
+        if not opts.user_input:
+            raise Exception("Unable to determine params, user "
+                            "input JSON data is missing!")
+
+        user_input = json.loads(opts.user_input)
+        vaildate_user_input(user_input)
+
+        cache = options.get_cache(opts)
+        backend = undercloud.get_backend(opts.backend)
+        derive_parameters(user_input, cache, backend, opts.output_format,
+                          opts.output_dir, opts.extra_config_pre)
+    except Exception as exc:
+        print("Error: %s" % exc)
+    finally:
+        if backend is not None:
+            backend.close()
+        timings.report()
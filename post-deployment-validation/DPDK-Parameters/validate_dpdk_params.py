@@ -2,67 +2,56 @@ import argparse
 import json
 import math
 import os
-import paramiko
 import re
-import subprocess
 import sys
+import time
 import yaml
 from prettytable import PrettyTable
 
-# Gets the profile name for flavor name
-def get_profile_name(flavor_name):
-    cmd = "openstack flavor show " + flavor_name
-    output = subprocess.check_output(cmd,shell=True)
-    properties = ''
-    for line in output.split('\n'):
-        if 'properties' in line:
-            properties = line
-    profile = ''
-    if properties:
-        profile_index = properties.index('capabilities:profile=')
-        if profile_index >=0:
-            profile_start_index = profile_index + len('capabilities:profile=') + 1
-            profile_end_index = properties.index('\'', profile_start_index, len(properties))
-            profile = properties[profile_start_index:profile_end_index]
-    return profile
-
-
-# Gets the first matching node UUID for flavor name
-def get_node_uuid(flavor_name):
-    node_uuid = ''
-    profile_name = get_profile_name(flavor_name)
-    cmd = "openstack overcloud profiles list -f json"
-    output = subprocess.check_output(cmd,shell=True)
-    profiles_list = json.loads(output)
-    for profile in profiles_list:
-        if profile["Current Profile"] == profile_name:
-            node_uuid = profile["Node UUID"]
-            break
-    return node_uuid.strip()
-
-
-# Gets the flavor name for role name
-def get_flavor_name(role_name):
-    flavor_name = ''
-    param_key = 'Overcloud' + role_name + 'Flavor'
-    cmd = "mistral run-action tripleo.parameters.get"
-    output = subprocess.check_output(cmd,shell=True)
-    result = json.loads(output)
-    if result and result.get('result', {}):
-        env = result.get('result', {}).get('mistral_environment_parameters', {})
-        if not env:
-            env = result.get('result', {}).get('environment_parameters', {})
-        if env:
-            flavor_name = env.get(param_key, '')
-    return flavor_name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, os.pardir))
+from derive_common import cpu_codec
+from derive_common import derivers
+from derive_common import fleet
+from derive_common import inventory as derive_inventory
+from derive_common import node_facts
+from derive_common import nodes
+from derive_common import options
+from derive_common import ssh_pool
+from derive_common import timings
+from derive_common import undercloud
+from derive_common.cpuset import CpuSet
+from derive_common.nics import NicIndex
+from derive_common.topology import Topology
+
+# Hugepage sizes in MB with their default_hugepagesz and hugepagesz
+# kernel args. The 2MB hugepages layout is validated when the CPU does
+# not support 1GB hugepages (no pdpe1gb flag) or when it is deployed.
+HUGEPAGE_SIZE_1G = 1024
+HUGEPAGE_SIZE_2M = 2
+HUGEPAGE_KERNEL_ARGS_SIZES = {HUGEPAGE_SIZE_1G: ('1GB', '1G'),
+                              HUGEPAGE_SIZE_2M: ('2M', '2M')}
+
+# Validation checks of each node, in the fleet validation matrix order
+VALIDATION_CHECKS = ['host_cpus', 'dpdk_cpus', 'socket_mem',
+                     'reserved_host_mem', 'nova_cpus', 'isol_cpus',
+                     'kernel_args', 'tuned']
+
+# Node facts collected in a single SSH round trip for the validation
+NODE_FACTS = ['lscpu_cpus', 'lscpu', 'memory_sizes', 'rhosp_release',
+              'tuned_active', 'kolla_config_files', 'ovs_interfaces',
+              'ovs_pmd_cpu_mask', 'ovs_dpdk_lcore_mask', 'ovs_dpdk_socket_mem',
+              'ovs_dpdk_extra', 'dpdk_mapping', 'nova_conf',
+              'nova_libvirt_conf', 'hiera_json', 'hiera_yaml',
+              'tuned_variables', 'grub', 'cmdline']
+
+
 
 
 # Gets the physical and logical cpus info for all numa nodes.
-def get_nodes_cores_info(client):
+def get_nodes_cores_info(facts):
     dict_cpus = {}
-    cmd = "sudo lscpu -p=NODE,CORE,CPU | grep -v ^#"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('lscpu_cpus')
     for line in output.split('\n'):
         if line:
             cpu_info = line.split(',')
@@ -85,57 +74,48 @@ def get_nodes_cores_info(client):
     return dict_cpus
 
 
-# Gets the DPDK NIC's mapping with NIC physical name and driver info for the given MAC.
-def get_dpdk_nics_mapping(client, mac):
-    cmd = "sudo cat /var/lib/os-net-config/dpdk_mapping.yaml"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
-    dpdk_nics_map = yaml.load(output)
-    for dpdk_nic_map in dpdk_nics_map:
-        if dpdk_nic_map['mac_address'] == mac:
-            return dpdk_nic_map
-    else:
-        msg = ("Unable to determine DPDK NIC Mapping for MAC: '%(mac)s'" % {'mac':mac})
-        raise Exception(msg)
+# Gets the NIC index of the DPDK NIC's mapping with NIC physical name,
+# MAC and PCI address, read once for all the DPDK NIC's.
+def get_dpdk_nics_index(facts):
+    output = facts.get_output('dpdk_mapping')
+    dpdk_nics_map = yaml.load(output) or []
+    return NicIndex(dpdk_nics_map)
 
 
 # Gets the DPDK NIC's NUMA info
-def get_dpdk_nics_info(client):
+# The interfaces are listed with the name, type, admin_state, mac_in_use,
+# mtu and status columns
+def get_dpdk_nics_info(facts):
     dpdk_nics_info = []
     dpdk_nics = []
-    cmd = "sudo ovs-vsctl --columns=name,type,admin_state --format=json list interface"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('ovs_interfaces')
     nics = json.loads(output)
     for nic in nics.get('data', []):
         if nic and str(nic[1]) == 'dpdk' and str(nic[2]) == 'up':
-           dpdk_nics.append(str(nic[0]))
+           dpdk_nics.append(nic)
     if dpdk_nics:
-        cmd = "sudo ovs-vsctl --column=mac-in-use,mtu,status --format=json list interface " + ' '.join(dpdk_nics)
-        stdin, stdout, stderr = client.exec_command(cmd)
-        output = str(stdout.read())
-        nics_info = json.loads(output)
-        for nic_info in nics_info.get('data', []):
+        nic_index = get_dpdk_nics_index(facts)
+        for nic_info in dpdk_nics:
             data = {}
-            data['mac'] = nic_info[0]
-            data['mtu'] = nic_info[1]
-            for field in nic_info[2][1]:
+            data['mac'] = nic_info[3]
+            data['mtu'] = nic_info[4]
+            for field in nic_info[5][1]:
                 if field[0] == 'numa_id':
                     data['numa_node'] = int(field[1])
-            dpdk_nic_map = get_dpdk_nics_mapping(client, nic_info[0])
-            data['nic'] = dpdk_nic_map['name']
-            data['pci'] = dpdk_nic_map['pci_address']
+            name = nic_index.get_name_by_mac(nic_info[3])
+            if name is None:
+                msg = ("Unable to determine DPDK NIC Mapping for MAC: '%(mac)s'" % {'mac':nic_info[3]})
+                raise Exception(msg)
+            data['nic'] = name
+            data['pci'] = nic_index.get_pci_address(name)
             dpdk_nics_info.append(data)
     return dpdk_nics_info
 
 
 # Gets the total physical memory.
-def get_physical_memory(client):
+def get_physical_memory(facts):
     mem_total_kb = 0
-    # cmd = "sudo cat /proc/meminfo | grep 'MemTotal' | grep -v ^#"
-    cmd ="sudo dmidecode --type memory | grep 'Size' | grep '[0-9]'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('memory_sizes')
     for line in output.split('\n'):
         if line:
             mem_info = line.split(':')[1].strip()
@@ -146,18 +126,16 @@ def get_physical_memory(client):
             elif mem_unit == 'mb':
                 memory_kb = (int(mem_val[0].strip(' ')) * 1024)
             mem_total_kb += memory_kb
-    return (mem_total_kb / 1024)
+    return (mem_total_kb // 1024)
 
 
 # Gets the numa nodes list
-def get_numa_nodes(client):
+def get_numa_nodes(facts):
     nodes = []
-    cmd = "sudo lscpu -p=NODE | grep -v ^#"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('lscpu_cpus')
     for line in output.split('\n'):
         if line:
-            node = int(line.strip(' '))
+            node = int(line.split(',')[0].strip(' '))
             if node not in nodes:
                 nodes.append(node)
     return nodes
@@ -170,10 +148,12 @@ def roundup_mtu_bytes(mtu):
     return (max_div_val * 1024)
 
 
-# Calculates socket memory for a NUMA node
+# Calculates socket memory for a NUMA node, rounded up to the hugepage
+# size
 def calculate_node_socket_memory(numa_node, dpdk_nics_numa_info,
                                  overhead, packet_size_in_buffer,
-                                 minimum_socket_memory):
+                                 minimum_socket_memory,
+                                 page_size_mb=HUGEPAGE_SIZE_1G):
     distinct_mtu_per_node = []
     socket_memory = 0
 
@@ -194,14 +174,15 @@ def calculate_node_socket_memory(numa_node, dpdk_nics_numa_info,
     else:
         socket_memory += 512
 
-    socket_memory_in_gb = int(socket_memory / 1024)
-    if socket_memory % 1024 > 0:
-        socket_memory_in_gb += 1
-    return (socket_memory_in_gb * 1024)
+    socket_memory_in_pages = int(socket_memory / page_size_mb)
+    if socket_memory % page_size_mb > 0:
+        socket_memory_in_pages += 1
+    return (socket_memory_in_pages * page_size_mb)
 
 
 # Gets the socket memory
-def get_dpdk_socket_memory(client, dpdk_nics_numa_info, numa_nodes, minimum_socket_memory=1500):
+def get_dpdk_socket_memory(facts, dpdk_nics_numa_info, numa_nodes, minimum_socket_memory=1500,
+                           page_size_mb=HUGEPAGE_SIZE_1G):
     dpdk_socket_memory_list = []
     overhead = 800
     packet_size_in_buffer = 4096 * 64
@@ -209,17 +190,15 @@ def get_dpdk_socket_memory(client, dpdk_nics_numa_info, numa_nodes, minimum_sock
         socket_mem = calculate_node_socket_memory(
             node, dpdk_nics_numa_info, overhead,
             packet_size_in_buffer,
-            minimum_socket_memory)
+            minimum_socket_memory, page_size_mb)
         dpdk_socket_memory_list.append(socket_mem)
 
     return "\'"+','.join([str(sm) for sm in dpdk_socket_memory_list])+"\'"
 
 
 # Gets the installed osp release.
-def get_osp_release(client):
-    cmd = 'sudo cat /etc/rhosp-release | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_osp_release(facts):
+    output = facts.get_output('rhosp_release')
     if output:
         return output
     else:
@@ -228,10 +207,8 @@ def get_osp_release(client):
           
 
 # Gets the CPU model
-def get_cpu_model(client):
-    cmd ="sudo lscpu | grep 'Model name'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_cpu_model(facts):
+    output = facts.grep('lscpu', 'Model name')
     if output:
         return output.split(':')[1].strip(' \n')
     else:
@@ -240,10 +217,8 @@ def get_cpu_model(client):
 
 
 # Gets the tuned active profile
-def get_tuned_active_profile(client):
-    cmd ="sudo tuned-adm active"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_tuned_active_profile(facts):
+    output = facts.get_output('tuned_active')
     if output:
         return output.split(':')[1].strip(' \n')
     else:
@@ -252,10 +227,8 @@ def get_tuned_active_profile(client):
 
 
 # Gets the CPU flages
-def get_cpu_flags(client):
-    cmd = "sudo lscpu | grep 'Flags'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_cpu_flags(facts):
+    output = facts.grep('lscpu', 'Flags')
     if output:
         return output.split(':')[1].strip(' \n').split(' ')
     else:
@@ -263,22 +236,20 @@ def get_cpu_flags(client):
         raise Exception(msg)    
 
 
-# Derives kernel_args parameter
-def get_kernel_args(client, hugepage_alloc_perc):
+# Derives kernel_args parameter for the hugepage size
+def get_kernel_args(facts, hugepage_alloc_perc,
+                    page_size_mb=HUGEPAGE_SIZE_1G):
     kernel_args = {}
-    cpu_flags = get_cpu_flags(client)
-    if not is_supported_default_hugepages(cpu_flags):
-        raise Exception("default huge page size 1GB is not supported")
-
-    total_memory = get_physical_memory(client)
-    hugepages = int(float((total_memory / 1024) - 4) * (hugepage_alloc_perc / float(100)))
+    total_memory = get_physical_memory(facts)
+    hugepages = int(float((total_memory // 1024) - 4) * (hugepage_alloc_perc / float(100)) * (HUGEPAGE_SIZE_1G // page_size_mb))
     iommu_info = ''
-    cpu_model = get_cpu_model(client)
+    cpu_model = get_cpu_model(facts)
     if cpu_model.startswith('Intel'):
         kernel_args['intel_iommu'] = 'on'
     kernel_args['iommu'] = 'pt'
-    kernel_args['default_hugepagesz'] = '1GB'
-    kernel_args['hugepagesz'] = '1G'
+    default_size, size = HUGEPAGE_KERNEL_ARGS_SIZES[page_size_mb]
+    kernel_args['default_hugepagesz'] = default_size
+    kernel_args['hugepagesz'] = size
     kernel_args['hugepages'] = str(hugepages)
     return kernel_args
 
@@ -288,23 +259,19 @@ def is_supported_default_hugepages(flags):
     return ('pdpe1gb' in flags)
 
 
+# Gets the hugepage size in MB to validate, 2MB when the CPU does not
+# support 1GB hugepages or when 2MB hugepages are deployed, else 1GB
+def get_hugepage_size(flags, deployed_kernel_args):
+    if (not is_supported_default_hugepages(flags) or
+            deployed_kernel_args.get('default_hugepagesz', '').upper() in
+            ['2M', '2MB']):
+        return HUGEPAGE_SIZE_2M
+    return HUGEPAGE_SIZE_1G
+
+
 # Converts number format cpus into range format
 def convert_number_to_range_list(num_list, array_format = False):
-    num_list = [int(num.strip(' '))
-                for num in num_list.split(",")]
-    num_list.sort()
-    range_list = []
-    range_min = num_list[0]
-    for num in num_list:
-        next_val = num + 1
-        if next_val not in num_list:
-            if range_min != num:
-                range_list.append(str(range_min) + '-' + str(num))
-            else:
-                range_list.append(str(range_min))
-            next_index = num_list.index(num) + 1
-            if next_index < len(num_list):
-                range_min = num_list[next_index]
+    range_list = cpu_codec.number_list_to_range_list(num_list)
 
     if array_format:
         return '['+','.join([("\'"+thread+"\'") for thread in range_list])+']'
@@ -314,179 +281,113 @@ def convert_number_to_range_list(num_list, array_format = False):
 
 # Converts range format cpus into number list format
 def convert_range_to_number_list(range_list):
-    num_list = []                                                               
-    exclude_num_list = []                                                       
-    if isinstance(range_list, str):
-       range_list = range_list.strip('[]').replace('\'', '').replace(' ', '')   
-    if not isinstance(range_list, list):                                        
-        range_list = range_list.split(',')                                      
-    try:                                                                        
-       for val in range_list:                                                   
-           val = val.strip(' ')                                                 
-           if '^' in val:                                                       
-               exclude_num_list.append(int(val[1:]))                            
-           elif '-' in val:                                                     
-               split_list = val.split("-")                                      
-               range_min = int(split_list[0])                                   
-               range_max = int(split_list[1])                                   
-               num_list.extend(range(range_min, (range_max + 1)))               
-           else:                                                                
-               num_list.append(int(val))                                        
-    except ValueError as exc:                                                   
-        err_msg = ("Invalid number in input param "                             
-                   "'range_list': %s" % exc)                                    
-        raise Exception(err_msg)                                                
-                                                                                
-    # here, num_list is a list of integers                                      
-    return [num for num in num_list if num not in exclude_num_list]
-
-
-# gets the instance UUID by node UUID
-def get_instance_uuid(node_uuid):
-    instance_uuid = ''
-    cmd = "ironic --json node-list"
-    output = subprocess.check_output(cmd, shell=True)
-    node_list = json.loads(output)
-    for node in node_list:
-        if node["uuid"] == node_uuid:
-            instance_uuid = node["instance_uuid"] 
-            break
-    return instance_uuid.strip()
-
-
-# gets the host ip address from instance UUID
-def get_host_ip(instance_uuid):
-    cmd = 'nova show ' + instance_uuid + ' | grep "ctlplane network"'
-    output = subprocess.check_output(cmd, shell=True)
-    host_ip = output.replace('ctlplane network', '').strip(' |\n')
-    return host_ip
+    return cpu_codec.range_list_to_number_list(range_list)
+
+
 
 
 # returns whether containers based overcloud deployment.
-def is_containers_based_deployment(client):
+def is_containers_based_deployment(facts):
     containers_based_deployment = False
-    cmd = 'ls -d /var/lib/kolla/config_files/'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    if not str(stderr.read()):
+    if not facts.get_error('kolla_config_files'):
         containers_based_deployment = True
     return containers_based_deployment
 
 
 # gets the PMD cpus from deployed env
-def get_pmd_cpus_from_env(client):
+def get_pmd_cpus_from_env(facts):
     pmd_cpus_list = ''
-    cmd = 'sudo ovs-vsctl --no-wait get Open_vSwitch . other_config:pmd-cpu-mask'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    mask_val = str(stdout.read()).strip('\"\n')
+    mask_val = facts.get_output('ovs_pmd_cpu_mask').strip('\"\n')
     if mask_val:
         pmd_cpus_list = get_cpus_list_from_mask_value(mask_val)
     return pmd_cpus_list
 
 
 # gets the PMD cpus from hiera data
-def get_pmd_cpus_from_hiera(client, containers_based_dep):
+def get_pmd_cpus_from_hiera(facts, containers_based_dep):
     pmd_cpus_list = ''
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         pmd_cpus_list = hiera_json["vswitch::dpdk::pmd_core_list"]
         if pmd_cpus_list:
             pmd_cpus_list = "\'" + pmd_cpus_list + "\'"
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep "vswitch::dpdk::core_list" | grep -v ^#'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        pmd_cpus_list = str(stdout.read()).replace('vswitch::dpdk::core_list:', '').strip(' \"\n')
+        output = facts.grep('hiera_yaml', 'vswitch::dpdk::core_list')
+        pmd_cpus_list = output.replace('vswitch::dpdk::core_list:', '').strip(' \"\n')
     return pmd_cpus_list
 
 
 # gets the host cpus from deployed env
-def get_host_cpus_from_env(client):
+def get_host_cpus_from_env(facts):
     host_cpus_list = ''
-    cmd = 'sudo ovs-vsctl --no-wait get Open_vSwitch . other_config:dpdk-lcore-mask'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    mask_val = str(stdout.read()).strip('\"\n')
+    mask_val = facts.get_output('ovs_dpdk_lcore_mask').strip('\"\n')
     if mask_val:
         host_cpus_list = get_cpus_list_from_mask_value(mask_val)
     return host_cpus_list
  
 
 # gets the DPDK socket memory from deployed env
-def get_dpdk_socket_memory_from_env(client):
+def get_dpdk_socket_memory_from_env(facts):
     dpdk_scoket_mem = ''
-    cmd = 'sudo ovs-vsctl --no-wait get Open_vSwitch . other_config:dpdk-socket-mem'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    dpdk_scoket_mem = str(stdout.read()).strip('\"\n')
+    dpdk_scoket_mem = facts.get_output('ovs_dpdk_socket_mem').strip('\"\n')
     return "\'"+dpdk_scoket_mem+"\'"
 
 
 # gets the DPDK socket memory from hiera data
-def get_dpdk_socket_memory_from_hiera(client, containers_based_dep):
+def get_dpdk_socket_memory_from_hiera(facts, containers_based_dep):
     dpdk_scoket_mem = ''
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         dpdk_scoket_mem = hiera_json["vswitch::dpdk::socket_mem"]
         if dpdk_scoket_mem:
             dpdk_scoket_mem = "\'" + dpdk_scoket_mem + "\'"
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep "vswitch::dpdk::socket_mem" | grep -v ^#'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        dpdk_scoket_mem = str(stdout.read()).replace('vswitch::dpdk::socket_mem:', '').strip(' \n')
+        output = facts.grep('hiera_yaml', 'vswitch::dpdk::socket_mem')
+        dpdk_scoket_mem = output.replace('vswitch::dpdk::socket_mem:', '').strip(' \n')
     return dpdk_scoket_mem
 
 
 # gets the nova reserved host memory from deployed env.
-def get_nova_reserved_host_mem_from_env(client, containers_based_dep):
+def get_nova_reserved_host_mem_from_env(facts, containers_based_dep):
     nova_reserved_host_mem = 0
-    cmd = 'sudo cat /etc/nova/nova.conf | grep "reserved_host_memory_mb" | grep -v ^#'
+    nova_conf = 'nova_conf'
     if containers_based_dep:
-        cmd = 'sudo cat /var/lib/config-data/nova_libvirt/etc/nova/nova.conf | grep "reserved_host_memory_mb" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    mem = str(stdout.read()).replace('reserved_host_memory_mb=', '').strip(' \"\n')
+        nova_conf = 'nova_libvirt_conf'
+    output = facts.grep(nova_conf, 'reserved_host_memory_mb')
+    mem = output.replace('reserved_host_memory_mb=', '').strip(' \"\n')
     nova_reserved_host_mem = int(mem)
     return nova_reserved_host_mem
 
 
 # gets the nova reserved host memory from hiera.
-def get_nova_reserved_host_mem_from_hiera(client, containers_based_dep):
+def get_nova_reserved_host_mem_from_hiera(facts, containers_based_dep):
     nova_reserved_host_mem = 0
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         nova_reserved_host_mem = hiera_json["nova::compute::reserved_host_memory"]
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep "nova::compute::reserved_host_memory" | grep -v ^#' 
-        stdin, stdout, stderr = client.exec_command(cmd)
-        mem = str(stdout.read()).replace('nova::compute::reserved_host_memory:', '').strip(' \"\n')
+        output = facts.grep('hiera_yaml', 'nova::compute::reserved_host_memory')
+        mem = output.replace('nova::compute::reserved_host_memory:', '').strip(' \"\n')
         nova_reserved_host_mem = int(mem)
     return nova_reserved_host_mem
 
 
 # gets the nova cpus from deployed env
-def get_nova_cpus_from_env(client, containers_based_dep):
+def get_nova_cpus_from_env(facts, containers_based_dep):
     nova_cpus = ''
-    cmd = 'sudo cat /etc/nova/nova.conf | grep "vcpu_pin_set" | grep -v ^#'
+    nova_conf = 'nova_conf'
     if containers_based_dep:
-        cmd = 'sudo cat /var/lib/config-data/nova_libvirt/etc/nova/nova.conf | grep "vcpu_pin_set" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    nova_cpus = str(stdout.read()).replace('vcpu_pin_set=', '').strip(' \"\n')
+        nova_conf = 'nova_libvirt_conf'
+    output = facts.grep(nova_conf, 'vcpu_pin_set')
+    nova_cpus = output.replace('vcpu_pin_set=', '').strip(' \"\n')
     return nova_cpus
 
 
 # gets the nova cpus from hiera data
-def get_nova_cpus_from_hiera(client, containers_based_dep):
+def get_nova_cpus_from_hiera(facts, containers_based_dep):
     nova_cpus = ''
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         nova_cpus = hiera_json["nova::compute::vcpu_pin_set"]
         if nova_cpus:
             if isinstance(nova_cpus, str):
@@ -494,9 +395,7 @@ def get_nova_cpus_from_hiera(client, containers_based_dep):
             else:
                 nova_cpus = str([str(nova_cpu) for nova_cpu in nova_cpus])
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep -v ^#'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        for line in str(stdout.read()).split('\n'):
+        for line in facts.get_output('hiera_yaml').split('\n'):
             if 'nova::compute::vcpu_pin_set:' in line and '[' in line:
                 nova_cpus = line.replace('nova::compute::vcpu_pin_set:', '').strip(' ')
             elif 'nova::compute::vcpu_pin_set:' in line and '[' not in line:
@@ -507,11 +406,9 @@ def get_nova_cpus_from_hiera(client, containers_based_dep):
 
 
 # gets the host isolated cpus from deployed env.
-def get_host_isolated_cpus_from_env(client):
+def get_host_isolated_cpus_from_env(facts):
     host_isolated_cpus = ''
-    cmd ='sudo cat /etc/tuned/cpu-partitioning-variables.conf | grep "isolated_cores" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read()).strip(' \"')
+    output = facts.grep('tuned_variables', 'isolated_cores').strip(' \"')
     for line in output.split('\n'):
         if line.startswith('isolated_cores='):
             host_isolated_cpus = line.replace('isolated_cores=', '').strip(' \"\n')
@@ -519,11 +416,9 @@ def get_host_isolated_cpus_from_env(client):
 
 
 # gets the DPDK memory channels from deployed env.
-def get_dpdk_mem_channels_from_env(client):
+def get_dpdk_mem_channels_from_env(facts):
     dpdk_mem_channels = '4'
-    cmd = 'sudo ovs-vsctl --no-wait get Open_vSwitch . other_config:dpdk-extra'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read()).strip('\"\n')
+    output = facts.get_output('ovs_dpdk_extra').strip('\"\n')
     if '-n' in output:
         extra_fields = output.split(' ')
         dpdk_mem_channels = extra_fields[extra_fields.index('-n')+1]
@@ -531,31 +426,26 @@ def get_dpdk_mem_channels_from_env(client):
 
 
 # gets the DPDK memory channels from hiera data.
-def get_dpdk_mem_channels_from_hiera(client, containers_based_dep):
+def get_dpdk_mem_channels_from_hiera(facts, containers_based_dep):
     dpdk_mem_channels = '4'
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         dpdk_mem_channels = hiera_json["vswitch::dpdk::memory_channels"]
         if dpdk_mem_channels:
             dpdk_mem_channels =  dpdk_mem_channels
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep "vswitch::dpdk::memory_channels" | grep -v ^#'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        dpdk_mem_channels = str(stdout.read()).replace('vswitch::dpdk::memory_channels:', '').strip(' \n')
+        output = facts.grep('hiera_yaml', 'vswitch::dpdk::memory_channels')
+        dpdk_mem_channels = output.replace('vswitch::dpdk::memory_channels:', '').strip(' \n')
     return '\"' +dpdk_mem_channels + '\"'
 
 
 # gets the kernel args from deployed env
-def get_kernel_args_from_env(client, containers_based_dep):
+def get_kernel_args_from_env(facts, containers_based_dep):
     kernel_args = {}
-    cmd = 'sudo cat /etc/default/grub | grep "GRUB_CMDLINE_LINUX=" | grep -v ^#'
+    grub_arg = 'GRUB_CMDLINE_LINUX='
     if containers_based_dep:
-        cmd = 'sudo cat /etc/default/grub | grep "TRIPLEO_HEAT_TEMPLATE_KERNEL_ARGS" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    cmd_line = str(stdout.read()).replace('GRUB_CMDLINE_LINUX=', '').strip(' \"\n')
+        grub_arg = 'TRIPLEO_HEAT_TEMPLATE_KERNEL_ARGS'
+    cmd_line = facts.grep('grub', grub_arg).replace('GRUB_CMDLINE_LINUX=', '').strip(' \"\n')
     if cmd_line:
         cmd_args = cmd_line.split(' ')
         for arg in cmd_args:
@@ -567,11 +457,9 @@ def get_kernel_args_from_env(client, containers_based_dep):
 
 
 # gets the kernel args from deployed env
-def get_grub_update_status_from_env(client):
+def get_grub_update_status_from_env(facts):
     grub_update_status = False
-    cmd = 'sudo sudo cat /proc/cmdline | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    cmd_line = str(stdout.read())
+    cmd_line = facts.get_output('cmdline')
     if cmd_line:
         cmd_args = cmd_line.split(' ')
         for arg in cmd_args:
@@ -583,35 +471,24 @@ def get_grub_update_status_from_env(client):
 
 # gets the cpus list from mask value
 def get_cpus_list_from_mask_value(mask_val):
-    cpus_list = []
-    int_mask_val = int(mask_val, 16)
-    bin_mask_val = bin(int_mask_val)
-    bin_mask_val = str(bin_mask_val).replace('0b', '')
-    rev_bin_mask_val = bin_mask_val[::-1]    
-    thread = 0
-    for bin_val in rev_bin_mask_val:
-        if bin_val == '1':
-            cpus_list.append(thread)
-        thread += 1
+    cpus_list = cpu_codec.mask_to_number_list(mask_val)
     return ','.join([str(thread) for thread in cpus_list])
 
 
 # gets the DPDK parameters value from deployed env
-def get_parameters_value_from_env(client,
-                                  containers_based_dep,
-                                  host_ip):
+@timings.timed('validate_dpdk.get_parameters_value_from_env')
+def get_parameters_value_from_env(facts, containers_based_dep):
     deployed_parameters = {}
-    print('Collects the deployed value for parameters from node: %s' % host_ip)
-    pmd_cpus_list = get_pmd_cpus_from_env(client)
-    host_cpus_list = get_host_cpus_from_env(client)
-    dpdk_socket_mem = get_dpdk_socket_memory_from_env(client)
-    nova_reserved_host_mem = get_nova_reserved_host_mem_from_env(client,
+    pmd_cpus_list = get_pmd_cpus_from_env(facts)
+    host_cpus_list = get_host_cpus_from_env(facts)
+    dpdk_socket_mem = get_dpdk_socket_memory_from_env(facts)
+    nova_reserved_host_mem = get_nova_reserved_host_mem_from_env(facts,
                                                                  containers_based_dep)
-    nova_cpus = get_nova_cpus_from_env(client, containers_based_dep)
-    host_isolated_cpus = get_host_isolated_cpus_from_env(client)
-    dpdk_mem_channels = get_dpdk_mem_channels_from_env(client)
-    kernel_args = get_kernel_args_from_env(client, containers_based_dep)
-    tuned = get_tuned_active_profile(client)
+    nova_cpus = get_nova_cpus_from_env(facts, containers_based_dep)
+    host_isolated_cpus = get_host_isolated_cpus_from_env(facts)
+    dpdk_mem_channels = get_dpdk_mem_channels_from_env(facts)
+    kernel_args = get_kernel_args_from_env(facts, containers_based_dep)
+    tuned = get_tuned_active_profile(facts)
     deployed_parameters['NeutronDpdkCoreList'] = '\'' + pmd_cpus_list + '\''
     deployed_parameters['HostCpusList'] = '\'' + host_cpus_list + '\''
     deployed_parameters['NeutronDpdkSocketMemory'] = dpdk_socket_mem
@@ -627,16 +504,16 @@ def get_parameters_value_from_env(client,
 
 
 # gets the DPDK parameters value from deployed env
-def get_parameters_value_from_hiera(client, containers_based_dep, host_ip):
+@timings.timed('validate_dpdk.get_parameters_value_from_hiera')
+def get_parameters_value_from_hiera(facts, containers_based_dep):
     hiera_parameters = {}
-    print('Collects the hiera value for parameters from node: %s' % host_ip)
-    pmd_cpus_list = get_pmd_cpus_from_hiera(client, containers_based_dep)
-    dpdk_socket_mem = get_dpdk_socket_memory_from_hiera(client,
+    pmd_cpus_list = get_pmd_cpus_from_hiera(facts, containers_based_dep)
+    dpdk_socket_mem = get_dpdk_socket_memory_from_hiera(facts,
                                                         containers_based_dep)
-    nova_reserved_host_mem = get_nova_reserved_host_mem_from_hiera(client,
+    nova_reserved_host_mem = get_nova_reserved_host_mem_from_hiera(facts,
                                                                    containers_based_dep)
-    nova_cpus = get_nova_cpus_from_hiera(client, containers_based_dep)
-    dpdk_mem_channels = get_dpdk_mem_channels_from_hiera(client, containers_based_dep)
+    nova_cpus = get_nova_cpus_from_hiera(facts, containers_based_dep)
+    dpdk_mem_channels = get_dpdk_mem_channels_from_hiera(facts, containers_based_dep)
     hiera_parameters['NeutronDpdkCoreList'] =  pmd_cpus_list
     hiera_parameters['NeutronDpdkSocketMemory'] = dpdk_socket_mem
     hiera_parameters['NeutronDpdkMemoryChannels'] =  dpdk_mem_channels
@@ -646,13 +523,10 @@ def get_parameters_value_from_hiera(client, containers_based_dep, host_ip):
 
 
 # displays DPDK NICS NUMA info
-def display_dpdk_nics_numa_info(cpus, dpdk_nics_info):
+def display_dpdk_nics_numa_info(topology, dpdk_nics_info):
     print('DPDK NIC\'s and NUMA node mapping:')
     for dpdk_nic in dpdk_nics_info:
-        numa_node_cpus = []
-        for cpu in cpus:
-            if cpu['numa_node'] == dpdk_nic['numa_node']:
-                numa_node_cpus.append(cpu['cpu'])
+        numa_node_cpus = topology.get_node_cpu_ids(dpdk_nic['numa_node'])
         print('NIC \"%(nic)s\": NUMA node %(node)d, '
               'Physical CPU\'s: %(node_cpus)s' % {"nic": dpdk_nic['nic'],
                                     "node": dpdk_nic['numa_node'],
@@ -661,28 +535,14 @@ def display_dpdk_nics_numa_info(cpus, dpdk_nics_info):
 
 
 # Gets host cpus
-def get_host_cpus_list(cpus):
+def get_host_cpus_list(topology):
     host_cpus_list = []
-    numa_nodes_threads = {}
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        if not cpu['numa_node'] in numa_nodes_threads:
-            numa_nodes_threads[cpu['numa_node']] = []
-        numa_nodes_threads[cpu['numa_node']].extend(
-            cpu['thread_siblings'])
-
-    for numa_node in sorted(numa_nodes_threads.keys()):
-        node = int(numa_node)
-        # Gets least thread in NUMA node
-        numa_node_min = min(numa_nodes_threads[numa_node])
-        for cpu in cpus:
-            if cpu['numa_node'] == node:
-                # Adds threads from core which is having least thread
-                if numa_node_min in cpu['thread_siblings']:
-                    host_cpus_list.extend(cpu['thread_siblings'])
-                    break
-
-    return ','.join([str(thread) for thread in sorted(host_cpus_list)])
+    for node in topology.numa_nodes:
+        # Adds threads from core which is having least thread
+        host_core = topology.node_host_cores[node]
+        host_cpus_list.extend(topology.core_threads[host_core])
+
+    return CpuSet(host_cpus_list)
 
 
 # Gets the numa nodes list which are having DPDK NIC's
@@ -694,41 +554,72 @@ def get_dpdk_nics_numa_nodes(dpdk_nics_numa_info):
     return dpdk_nics_numa_nodes
 
 
-# Validation for DPDK core list (PMD cores)
-def validate_dpdk_core_list(dict_cpus, dpdk_core_list, host_cpus,
-                            numa_nodes, dpdk_nics_numa_nodes, dpdk_nic_numa_cores_count):
+# Gets the throughput-driven PMD core sizing of the deployed DPDK NICs
+# with the derivation sizing for the throughput user inputs, None if they
+# are not given. All the deployed DPDK NICs are given by interface name.
+def get_pmd_sizing(topology, dpdk_nics_numa_info, throughput_input):
+    if not throughput_input:
+        return None
+    deriver = derivers.load_deriver('dpdk')
+    nics_numa_nodes = dict((nics_info['nic'], nics_info['numa_node'])
+                           for nics_info in dpdk_nics_numa_info)
+    dpdk_nics_info = []
+    for dpdk_nic in throughput_input['dpdk_nics']:
+        if dpdk_nic['nic'] not in nics_numa_nodes:
+            raise Exception("Invalid DPDK NIC '%(nic)s', not a deployed "
+                            "DPDK NIC" % {'nic': dpdk_nic['nic']})
+        dpdk_nic_info = {'nic_id': dpdk_nic['nic'],
+                         'numa_node': nics_numa_nodes[dpdk_nic['nic']]}
+        for key in deriver.DPDK_NIC_THROUGHPUT_KEYS:
+            if key in dpdk_nic:
+                dpdk_nic_info[key] = dpdk_nic[key]
+        dpdk_nics_info.append(dpdk_nic_info)
+    for nics_info in dpdk_nics_numa_info:
+        if nics_info['nic'] not in [dpdk_nic['nic_id']
+                                    for dpdk_nic in dpdk_nics_info]:
+            raise Exception("Throughput is missing for the deployed DPDK "
+                            "NIC '%(nic)s'" % {'nic': nics_info['nic']})
+    return deriver.get_user_pmd_sizing(topology, dpdk_nics_info,
+                                       throughput_input)
+
+
+# Validation for DPDK core list (PMD cores), with the physical cores of
+# each DPDK NIC NUMA node from the throughput-driven sizing if given
+def validate_dpdk_core_list(topology, dpdk_core_list, host_cpus,
+                            numa_nodes, dpdk_nics_numa_nodes, dpdk_nic_numa_cores_count,
+                            node_cores_count=None):
     msg = ''
-    dpdk_cores = []
-    dpdk_cpus = dpdk_core_list.strip('\"\' ').split(',')
-    host_cpus = host_cpus.strip('\"\' ').split(',')
-    dup_host_cpus = []
+    dpdk_cores = set()
+    dpdk_cpus = CpuSet.parse(dpdk_core_list)
+    dup_host_cpus = dpdk_cpus & host_cpus
     for dpdk_cpu in dpdk_cpus:
-        if dpdk_cpu in host_cpus:
-            dup_host_cpus.append(dpdk_cpu)
-        for key, cpu in dict_cpus.items():
-            if int(dpdk_cpu) in cpu['thread_siblings']:
-                if key not in dpdk_cores:
-                    dpdk_cores.append(key)
-                for thread in cpu['thread_siblings']:
-                    if str(thread) not in dpdk_cpus:
-                        msg += ('Missing thread siblings for thread: ' + dpdk_cpu + ' in PMD cores,'
-                                '\n thread siblings: ' + str(cpu['thread_siblings'])+'.\n')
+        core = topology.get_thread_core(dpdk_cpu)
+        if core is not None:
+            dpdk_cores.add(core)
+            thread_siblings = list(topology.core_threads[core])
+            for thread in thread_siblings:
+                if thread not in dpdk_cpus:
+                    msg += ('Missing thread siblings for thread: ' + str(dpdk_cpu) + ' in PMD cores,'
+                            '\n thread siblings: ' + str(thread_siblings)+'.\n')
         
     if dup_host_cpus:
-        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus) + '.\n'
+        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus.to_list()) + '.\n'
     if dpdk_cores:
         for node in numa_nodes:
             core_count = 0
             for dpdk_core in dpdk_cores:
-                if node == dpdk_core[0]:
+                if node == topology.core_numa_nodes[dpdk_core]:
                     core_count += 1
             if node in dpdk_nics_numa_nodes:
-                if core_count < dpdk_nic_numa_cores_count:
+                recommended_cores = dpdk_nic_numa_cores_count
+                if node_cores_count is not None:
+                    recommended_cores = node_cores_count[node]
+                if core_count < recommended_cores:
                     msg += ('Number of physical cores for DPDK NIC NUMA node('+ str(node) +') is less than'
-                            '\n recommended cores \'' + str(dpdk_nic_numa_cores_count) +'\'.\n')
-                elif core_count > dpdk_nic_numa_cores_count:
+                            '\n recommended cores \'' + str(recommended_cores) +'\'.\n')
+                elif core_count > recommended_cores:
                     msg += ('Number of physical cores for DPDK NIC NUMA node('+ str(node) +') is greater'
-                            '\n than recommended cores \'' + str(dpdk_nic_numa_cores_count) +'\'.\n')
+                            '\n than recommended cores \'' + str(recommended_cores) +'\'.\n')
             else:
                 if core_count == 0:
                     msg += 'Missing physical cores for NUMA node: \'' + str(node) + '\' in PMD cores.\n'
@@ -739,8 +630,8 @@ def validate_dpdk_core_list(dict_cpus, dpdk_core_list, host_cpus,
 
 # Validation for host cpus list
 def validate_host_cpus(host_cpus_env, host_cpus):
-    msg = 'expected: ' + host_cpus + '.\n'
-    if host_cpus.strip('\'"') == host_cpus_env.strip('\'"'):
+    msg = 'expected: ' + str(host_cpus) + '.\n'
+    if CpuSet.parse(host_cpus_env) == host_cpus:
         msg = 'valid.\n'
     return msg
 
@@ -771,37 +662,31 @@ def validate_nova_reserved_host_memory(nova_reserved_host_mem_env):
 
 
 # Validation for nova cpus
-def validate_nova_cpus(dict_cpus, nova_cpus_env, dpdk_cpus_env, host_cpus, numa_nodes):
+def validate_nova_cpus(topology, nova_cpus_env, dpdk_cpus_env, host_cpus, numa_nodes):
     msg = ''
-    nova_cores = []
-    nova_cpus = convert_range_to_number_list(nova_cpus_env)
-    dpdk_cpus = dpdk_cpus_env.strip('\"\' ').split(',')
-    host_cpus = host_cpus.strip('\"\' ').split(',')
-    dup_dpdk_cpus = []
-    dup_host_cpus = []
+    nova_cores = set()
+    nova_cpus = CpuSet.parse(nova_cpus_env)
+    dup_dpdk_cpus = nova_cpus & CpuSet.parse(dpdk_cpus_env)
+    dup_host_cpus = nova_cpus & host_cpus
     for nova_cpu in nova_cpus:
-        if str(nova_cpu) in host_cpus:
-            dup_host_cpus.append(nova_cpu)
-        if str(nova_cpu) in dpdk_cpus:
-            dup_dpdk_cpus.append(nova_cpu)
-        for key, cpu in dict_cpus.items():
-            if nova_cpu in cpu['thread_siblings']:
-                if key not in nova_cores:
-                    nova_cores.append(key)
-                for thread in cpu['thread_siblings']:
-                    if thread not in nova_cpus:
-                        msg += ('Missing thread siblings for thread: ' + str(nova_cpu) + ' in nova cpus,'
-                                '\n thread siblings: ' + str(cpu['thread_siblings'])+'.\n')
+        core = topology.get_thread_core(nova_cpu)
+        if core is not None:
+            nova_cores.add(core)
+            thread_siblings = list(topology.core_threads[core])
+            for thread in thread_siblings:
+                if thread not in nova_cpus:
+                    msg += ('Missing thread siblings for thread: ' + str(nova_cpu) + ' in nova cpus,'
+                            '\n thread siblings: ' + str(thread_siblings)+'.\n')
 
     if dup_host_cpus:
-        msg += 'Duplicated physical cores in host CPU\'s: ' + str(dup_host_cpus) + '.\n'
+        msg += 'Duplicated physical cores in host CPU\'s: ' + str(dup_host_cpus.to_list()) + '.\n'
     if dup_dpdk_cpus:
-        msg += 'Duplicated physical cores in PMD cores: ' + str(dup_dpdk_cpus) + '.\n'
+        msg += 'Duplicated physical cores in PMD cores: ' + str(dup_dpdk_cpus.to_list()) + '.\n'
     if nova_cores:
         for node in numa_nodes:
             core_count = 0
             for nova_core in nova_cores:
-                if node == nova_core[0]:
+                if node == topology.core_numa_nodes[nova_core]:
                     core_count += 1
             if core_count == 0:
                 msg += 'Missing physical cores for NUMA node: \'' + str(node) + '\' in nova cpus.\n'
@@ -811,35 +696,32 @@ def validate_nova_cpus(dict_cpus, nova_cpus_env, dpdk_cpus_env, host_cpus, numa_
 
 
 # Validation for host isolated cpus
-def validate_isol_cpus(dict_cpus, isol_cpus_env, host_cpus, numa_nodes):
+def validate_isol_cpus(topology, isol_cpus_env, host_cpus, numa_nodes):
     msg = ''
-    isol_cores = []
+    isol_cores = set()
     if not isol_cpus_env.strip('"\''):
         msg = 'Missing host isolated cpus.\n'
         return msg
 
-    isol_cpus = convert_range_to_number_list(isol_cpus_env)
-    host_cpus = host_cpus.strip('\"\' ').split(',')
-    dup_host_cpus = []
+    isol_cpus = CpuSet.parse(isol_cpus_env)
+    dup_host_cpus = isol_cpus & host_cpus
     for isol_cpu in isol_cpus:
-        if str(isol_cpu) in host_cpus:
-            dup_host_cpus.append(isol_cpu)
-        for key, cpu in dict_cpus.items():
-            if isol_cpu in cpu['thread_siblings']:
-                if key not in isol_cores:
-                    isol_cores.append(key)
-                for thread in cpu['thread_siblings']:
-                    if thread not in isol_cpus:
-                        msg += ('Missing thread siblings for thread: ' + str(isol_cpu) + ' in host isolated cpus,'
-                                '\n thread siblings: ' + str(cpu['thread_siblings'])+'.\n')
+        core = topology.get_thread_core(isol_cpu)
+        if core is not None:
+            isol_cores.add(core)
+            thread_siblings = list(topology.core_threads[core])
+            for thread in thread_siblings:
+                if thread not in isol_cpus:
+                    msg += ('Missing thread siblings for thread: ' + str(isol_cpu) + ' in host isolated cpus,'
+                            '\n thread siblings: ' + str(thread_siblings)+'.\n')
 
     if dup_host_cpus:
-        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus) + '.\n'
+        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus.to_list()) + '.\n'
     if isol_cores:
         for node in numa_nodes:
             core_count = 0
             for isol_core in isol_cores:
-                if node == isol_core[0]:
+                if node == topology.core_numa_nodes[isol_core]:
                     core_count += 1
             if core_count == 0:
                 msg += 'Missing physical cores for NUMA node: \'' + str(node) + '\' in host isolated cpus.\n'
@@ -865,9 +747,9 @@ def validate_kernel_args(deployed_kernel_args, derived_kernel_args, grub_update_
     return msg
 
 # Gets osp parameters name in different osp releases.
-def get_osp_params_name(client):
+def get_osp_params_name(facts):
     osp_params = {}
-    osp_release = get_osp_release(client)
+    osp_release = get_osp_release(facts)
     if ('10' in osp_release or '11' in osp_release):
         osp_params['dpdk_cpus'] = 'NeutronDpdkCoreList'
         osp_params['socket_mem'] = 'NeutronDpdkSocketMemory'
@@ -883,36 +765,53 @@ def get_osp_params_name(client):
     return osp_params
 
 
-# Validates the DPDK parameters
-def validate_dpdk_parameters(client, deployed, hiera, node_uuid, dpdk_nic_numa_cores_count,
-                          hugepage_alloc_perc):
+# Validates the DPDK parameters and gets the validation messages, which
+# are displayed along with the DPDK NICs NUMA mapping unless display is
+# False (fleet validation). The PMD cores are validated with the
+# throughput-driven sizing of the DPDK NICs if throughput_input is given.
+@timings.timed('validate_dpdk.validate_dpdk_parameters')
+def validate_dpdk_parameters(facts, deployed, hiera, node_uuid, dpdk_nic_numa_cores_count,
+                          hugepage_alloc_perc, display=True,
+                          throughput_input=None):
     messages = {}
-    osp_params = get_osp_params_name(client)
-
-    dict_cpus = get_nodes_cores_info(client)
-    cpus = list(dict_cpus.values())
-    dpdk_nics_numa_info = get_dpdk_nics_info(client)
-    display_dpdk_nics_numa_info(cpus, dpdk_nics_numa_info)
-    numa_nodes = get_numa_nodes(client)
+    osp_params = get_osp_params_name(facts)
+
+    dict_cpus = get_nodes_cores_info(facts)
+    dpdk_nics_numa_info = get_dpdk_nics_info(facts)
+    topology = Topology(list(dict_cpus.values()), dpdk_nics_numa_info)
+    pmd_sizing = get_pmd_sizing(topology, dpdk_nics_numa_info,
+                                throughput_input)
+    if display:
+        display_dpdk_nics_numa_info(topology, dpdk_nics_numa_info)
+        if pmd_sizing is not None:
+            derivers.load_deriver('dpdk').display_pmd_sizing(pmd_sizing)
+    numa_nodes = get_numa_nodes(facts)
     dpdk_nics_numa_nodes = get_dpdk_nics_numa_nodes(dpdk_nics_numa_info)
-    host_cpus = get_host_cpus_list(cpus)
+    host_cpus = get_host_cpus_list(topology)
     messages['host_cpus'] = validate_host_cpus(deployed['HostCpusList'], host_cpus)
-    messages['dpdk_cpus'] = validate_dpdk_core_list(dict_cpus, deployed['NeutronDpdkCoreList'], host_cpus,
-       numa_nodes, dpdk_nics_numa_nodes, dpdk_nic_numa_cores_count)
-    dpdk_socket_memory = get_dpdk_socket_memory(client, dpdk_nics_numa_info, numa_nodes)
+    messages['dpdk_cpus'] = validate_dpdk_core_list(topology, deployed['NeutronDpdkCoreList'], host_cpus,
+       numa_nodes, dpdk_nics_numa_nodes, dpdk_nic_numa_cores_count,
+       derivers.load_deriver('dpdk').get_node_cores_count(pmd_sizing))
+    page_size_mb = get_hugepage_size(get_cpu_flags(facts),
+                                     deployed['ComputeKernelArgs'])
+    dpdk_socket_memory = get_dpdk_socket_memory(facts, dpdk_nics_numa_info, numa_nodes,
+                                                page_size_mb=page_size_mb)
     messages['socket_mem'] = validate_dpdk_socket_memory(deployed['NeutronDpdkSocketMemory'],
                                                          dpdk_socket_memory)
     messages['reserved_host_mem'] = validate_nova_reserved_host_memory(deployed['NovaReservedHostMemory'])
-    messages['nova_cpus'] = validate_nova_cpus(dict_cpus, deployed['NovaVcpuPinSet'],
+    messages['nova_cpus'] = validate_nova_cpus(topology, deployed['NovaVcpuPinSet'],
                                                deployed['NeutronDpdkCoreList'], host_cpus, numa_nodes) 
-    messages['isol_cpus'] = validate_isol_cpus(dict_cpus, deployed['HostIsolatedCoreList'], host_cpus, numa_nodes)
-    derived_kernel_args = get_kernel_args(client, hugepage_alloc_perc)
-    grub_update_status = get_grub_update_status_from_env(client)
+    messages['isol_cpus'] = validate_isol_cpus(topology, deployed['HostIsolatedCoreList'], host_cpus, numa_nodes)
+    derived_kernel_args = get_kernel_args(facts, hugepage_alloc_perc,
+                                          page_size_mb)
+    grub_update_status = get_grub_update_status_from_env(facts)
     messages['kernel_args'] = validate_kernel_args(deployed['ComputeKernelArgs'],
                                                    derived_kernel_args,
                                                    grub_update_status)
     messages['tuned'] = validate_tuned_status(deployed['tuned'])
-    validation_messages(deployed, hiera, osp_params, messages)
+    if display:
+        validation_messages(deployed, hiera, osp_params, messages)
+    return messages
 
 
 # Displays validation messages
@@ -940,45 +839,163 @@ def validation_messages(deployed, hiera, osp_params, messages):
     print(t)
 
 
-# Gets environment parameters value and validates.
-def validate():
+
+
+# Collects the facts of the node for the validation on up to
+# max_channels concurrent SSH channels, on the pooled SSH connection of
+# the node which is released once they are collected
+def collect_node_facts(host_ip, max_channels=node_facts.DEFAULT_MAX_CHANNELS):
+    client = ssh_pool.acquire(host_ip)
+    try:
+        return node_facts.collect(client, NODE_FACTS, max_channels)
+    finally:
+        ssh_pool.release(host_ip)
+
+
+# Validates the DPDK parameters of the deployed node without displaying
+# them, and gets its validation messages
+def validate_node(node_uuid, host_ip, dpdk_nic_numa_cores_count,
+                  hugepage_alloc_perc, throughput_input, max_channels):
+    try:
+        facts = collect_node_facts(host_ip, max_channels)
+        containers_based_dep = is_containers_based_deployment(facts)
+        deployed = get_parameters_value_from_env(facts, containers_based_dep)
+        messages = validate_dpdk_parameters(
+            facts, deployed, None, node_uuid, dpdk_nic_numa_cores_count,
+            hugepage_alloc_perc, display=False,
+            throughput_input=throughput_input)
+    except Exception as exc:
+        raise Exception('%(ip)s: %(exc)s' % {'ip': host_ip, 'exc': exc})
+    return messages
+
+
+# Validates the DPDK parameters of all the deployed nodes of the flavor
+# concurrently, with an SSH connection per worker, displays the verdict
+# of each node as soon as it is validated and the pass/fail matrix of
+# all the nodes. Returns whether all the nodes passed.
+def validate_fleet(flavor, deployed_hosts, dpdk_nic_numa_cores_count,
+                   hugepage_alloc_perc, throughput_input, max_workers,
+                   max_channels):
+    start = time.time()
+    if not deployed_hosts:
+        raise Exception("Unable to determine deployed nodes for flavor "
+                        "'%s'" % flavor)
+    host_ips = dict(deployed_hosts)
+    node_uuids = [node_uuid for node_uuid, _ in deployed_hosts]
+    print('Validating %(count)d node(s) of flavor %(flavor)s..' % {
+        'count': len(node_uuids), 'flavor': flavor})
+
+    def validate_fleet_node(node_uuid):
+        return validate_node(node_uuid, host_ips[node_uuid],
+                             dpdk_nic_numa_cores_count, hugepage_alloc_perc,
+                             throughput_input, max_channels)
+
+    results = {}
+    for node_uuid, messages, error in fleet.iter_fleet(
+            node_uuids, validate_fleet_node, max_workers):
+        fleet.display_node_verdict(VALIDATION_CHECKS, node_uuid,
+                                   host_ips[node_uuid], messages, error)
+        results[node_uuid] = (node_uuid, host_ips[node_uuid], messages,
+                              error)
+    print('')
+    return fleet.display_validation_matrix(
+        VALIDATION_CHECKS, [results[node_uuid] for node_uuid in node_uuids],
+        time.time() - start)
+
+
+# Gets environment parameters value and validates, with the command line
+# arguments argv (sys.argv by default).
+def validate(argv=None):
    try:
-        opts = parse_opts(sys.argv)
+        opts = parse_opts(argv or sys.argv)
+        if opts.timings:
+            timings.enable(opts.trace_file)
+        ssh_pool.configure(opts.ssh_keepalive, opts.ssh_idle_timeout)
         print("Validating user inputs..")
-        validate_user_input(opts)
+        throughput_input = get_throughput_input(opts)
+        validate_user_input(opts, throughput_input)
         dpdk_nic_numa_cores_count = int(opts.num_phy_cores_per_numa_node_for_pmd)
         hugepage_alloc_perc = float(opts.huge_page_allocation_percentage)
-        flavor = get_flavor_name(opts.role_name)
-        node_uuid = get_node_uuid(flavor)
-        instance_uuid = get_instance_uuid(node_uuid)
-        host_ip = get_host_ip(instance_uuid)
+        backend = undercloud.get_backend(opts.backend)
+        try:
+            if opts.fleet:
+                flavor, deployed_hosts = derive_inventory.get_deployed_hosts(
+                    opts.role_name, backend, options.get_cache(opts))
+            else:
+                flavor = nodes.get_flavor_name(opts.role_name, backend)
+                node_uuid = nodes.get_node_uuid(flavor, None, backend)
+                instance_uuid = nodes.get_instance_uuid(node_uuid, backend)
+                host_ip = nodes.get_host_ip(instance_uuid, backend)
+        finally:
+            backend.close()
+        if opts.fleet:
+            passed = validate_fleet(flavor, deployed_hosts,
+                                    dpdk_nic_numa_cores_count,
+                                    hugepage_alloc_perc, throughput_input,
+                                    opts.max_workers, opts.max_channels)
+            if not passed:
+                sys.exit(1)
+            return
         # SSH access
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.load_system_host_keys()
-        client.connect(host_ip, username='heat-admin')
-        client.invoke_shell()
-        containers_based_dep = is_containers_based_deployment(client)
-        deployed = get_parameters_value_from_env(client,
-                                                 containers_based_dep,
-                                                 host_ip)
-        hiera = get_parameters_value_from_hiera(client,
-                                                containers_based_dep,
-                                                host_ip)
-        validate_dpdk_parameters(client, deployed, hiera, node_uuid, 
-            dpdk_nic_numa_cores_count, hugepage_alloc_perc)
-        client.close()
+        facts = collect_node_facts(host_ip, opts.max_channels)
+        containers_based_dep = is_containers_based_deployment(facts)
+        print('Collects the deployed value for parameters from node: %s' % host_ip)
+        deployed = get_parameters_value_from_env(facts,
+                                                 containers_based_dep)
+        print('Collects the hiera value for parameters from node: %s' % host_ip)
+        hiera = get_parameters_value_from_hiera(facts,
+                                                containers_based_dep)
+        validate_dpdk_parameters(facts, deployed, hiera, node_uuid, 
+            dpdk_nic_numa_cores_count, hugepage_alloc_perc,
+            throughput_input=throughput_input)
    except Exception as exc:
         print("Error: %s" % exc)
-
-
-# Validates the user inputs
-def validate_user_input(inputs):
-    print(json.dumps({"role_name": inputs.role_name,
-                      "num_phy_cores_per_numa_node_for_pmd": int(inputs.num_phy_cores_per_numa_node_for_pmd),
-                      "huge_page_allocation_percentage":int( inputs.huge_page_allocation_percentage)}))
+   finally:
+        timings.report()
+
+
+# Gets the throughput user inputs of the PMD core sizing, in the
+# derivation user inputs format, None if the DPDK NICs are not given
+def get_throughput_input(inputs):
+    if not inputs.dpdk_nics:
+        return None
+    try:
+        dpdk_nics = json.loads(inputs.dpdk_nics)
+    except ValueError:
+        raise Exception("DPDK NIC's throughput is not valid JSON!")
+    throughput_input = {'dpdk_nics': dpdk_nics}
+    if inputs.pmd_core_capacity_mpps is not None:
+        throughput_input['pmd_core_capacity_mpps'] = \
+            inputs.pmd_core_capacity_mpps
+    if inputs.pmd_max_load_percentage is not None:
+        throughput_input['pmd_max_load_percentage'] = \
+            inputs.pmd_max_load_percentage
+    return throughput_input
+
+
+# Validates the user inputs, with the throughput inputs validated like
+# the derivation ones
+def validate_user_input(inputs, throughput_input=None):
+    user_input = {"role_name": inputs.role_name,
+                  "num_phy_cores_per_numa_node_for_pmd": int(inputs.num_phy_cores_per_numa_node_for_pmd),
+                  "huge_page_allocation_percentage":int( inputs.huge_page_allocation_percentage)}
+    if throughput_input is not None:
+        del user_input["num_phy_cores_per_numa_node_for_pmd"]
+        user_input.update(throughput_input)
+    print(json.dumps(user_input))
     if not inputs.role_name:
         raise Exception("Role name is missing in user input!");
+    if throughput_input is not None:
+        dpdk_nics = throughput_input['dpdk_nics']
+        if (type(dpdk_nics) is not list or
+                [dpdk_nic for dpdk_nic in dpdk_nics
+                 if type(dpdk_nic) is not dict or 'nic' not in dpdk_nic]):
+            raise Exception("DPDK NIC's throughput is invalid!")
+        deriver = derivers.load_deriver('dpdk')
+        deriver.vaildate_user_input(throughput_input, batch_mode=True)
+        if not deriver.is_throughput_sizing(throughput_input):
+            raise Exception("DPDK NIC's throughput is missing in user "
+                            "input!")
 
 
 # Gets the user input as dictionary.
@@ -997,6 +1014,63 @@ def parse_opts(argv):
                         metavar='HUGEPAGE ALLOCATION PERCENTAGE',
                         help="""hugepage allocation percentage""",
                         default=50)
+    parser.add_argument('--dpdk_nics',
+                        metavar='DPDK NICS JSON',
+                        help="""throughput of the DPDK NICs in JSON format,
+                        like the derivation dpdk_nics user input with the
+                        interface names, for validating the PMD cores of
+                        each NUMA node with the throughput-driven sizing
+                        instead of the number of physical cores per NUMA
+                        node.""",
+                        default='')
+    parser.add_argument('--pmd_core_capacity_mpps',
+                        metavar='MPPS',
+                        help="""packet rate forwarded by a PMD physical
+                        core for the throughput-driven sizing.""",
+                        type=float,
+                        default=None)
+    parser.add_argument('--pmd_max_load_percentage',
+                        metavar='PERCENTAGE',
+                        help="""maximum load of the PMD cores for the
+                        throughput-driven sizing.""",
+                        type=float,
+                        default=None)
+    options.add_backend_option(parser, '-b')
+    options.add_cache_options(parser, 'inventory index of the role nodes '
+                              'and hosts in fleet mode', ttl=False)
+    parser.add_argument('--fleet',
+                        help="""validates all the deployed nodes of the role
+                        concurrently, instead of the first node.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--max_workers',
+                        metavar='MAX WORKERS',
+                        help="""maximum number of nodes validated
+                        concurrently in fleet mode, each with its SSH
+                        connection.""",
+                        type=int,
+                        default=fleet.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--max_channels',
+                        metavar='MAX CHANNELS',
+                        help="""maximum number of concurrent SSH channels
+                        collecting the node facts on the SSH connection of
+                        each node.""",
+                        type=int,
+                        default=node_facts.DEFAULT_MAX_CHANNELS)
+    parser.add_argument('--ssh_keepalive',
+                        metavar='SECONDS',
+                        help="""keepalive interval of the pooled SSH
+                        connections, 0 disables it.""",
+                        type=int,
+                        default=ssh_pool.DEFAULT_KEEPALIVE)
+    parser.add_argument('--ssh_idle_timeout',
+                        metavar='SECONDS',
+                        help="""closes the pooled SSH connections not used
+                        for the idle timeout, 0 disables it.""",
+                        type=int,
+                        default=ssh_pool.DEFAULT_IDLE_TIMEOUT)
+    options.add_timings_options(parser, 'SSH commands and validation '
+                                'stages')
     opts = parser.parse_args(argv[1:])
     return opts
 
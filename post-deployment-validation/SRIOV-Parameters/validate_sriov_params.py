@@ -2,67 +2,51 @@ import argparse
 import json
 import math
 import os
-import paramiko
 import re
-import subprocess
 import sys
+import time
 import yaml
 from prettytable import PrettyTable
 
-# Gets the profile name for flavor name
-def get_profile_name(flavor_name):
-    cmd = "openstack flavor show " + flavor_name
-    output = subprocess.check_output(cmd,shell=True)
-    properties = ''
-    for line in output.split('\n'):
-        if 'properties' in line:
-            properties = line
-    profile = ''
-    if properties:
-        profile_index = properties.index('capabilities:profile=')
-        if profile_index >=0:
-            profile_start_index = profile_index + len('capabilities:profile=') + 1
-            profile_end_index = properties.index('\'', profile_start_index, len(properties))
-            profile = properties[profile_start_index:profile_end_index]
-    return profile
-
-
-# Gets the first matching node UUID for flavor name
-def get_node_uuid(flavor_name):
-    node_uuid = ''
-    profile_name = get_profile_name(flavor_name)
-    cmd = "openstack overcloud profiles list -f json"
-    output = subprocess.check_output(cmd,shell=True)
-    profiles_list = json.loads(output)
-    for profile in profiles_list:
-        if profile["Current Profile"] == profile_name:
-            node_uuid = profile["Node UUID"]
-            break
-    return node_uuid.strip()
-
-
-# Gets the flavor name for role name
-def get_flavor_name(role_name):
-    flavor_name = ''
-    param_key = 'Overcloud' + role_name + 'Flavor'
-    cmd = "mistral run-action tripleo.parameters.get"
-    output = subprocess.check_output(cmd,shell=True)
-    result = json.loads(output)
-    if result and result.get('result', {}):
-        env = result.get('result', {}).get('mistral_environment_parameters', {})
-        if not env:
-            env = result.get('result', {}).get('environment_parameters', {})
-        if env:
-            flavor_name = env.get(param_key, '')
-    return flavor_name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, os.pardir))
+from derive_common import cpu_codec
+from derive_common import fleet
+from derive_common import inventory as derive_inventory
+from derive_common import node_facts
+from derive_common import nodes
+from derive_common import options
+from derive_common import ssh_pool
+from derive_common import timings
+from derive_common import undercloud
+from derive_common.cpuset import CpuSet
+from derive_common.topology import Topology
+
+# Hugepage sizes in MB with their default_hugepagesz and hugepagesz
+# kernel args. The 2MB hugepages layout is validated when the CPU does
+# not support 1GB hugepages (no pdpe1gb flag) or when it is deployed.
+HUGEPAGE_SIZE_1G = 1024
+HUGEPAGE_SIZE_2M = 2
+HUGEPAGE_KERNEL_ARGS_SIZES = {HUGEPAGE_SIZE_1G: ('1GB', '1G'),
+                              HUGEPAGE_SIZE_2M: ('2M', '2M')}
+
+# Validation checks of each node, in the fleet validation matrix order
+VALIDATION_CHECKS = ['reserved_host_mem', 'nova_cpus', 'isol_cpus',
+                     'kernel_args']
+
+# Node facts collected in a single SSH round trip for the validation
+NODE_FACTS = ['lscpu_cpus', 'lscpu', 'memory_sizes', 'rhosp_release',
+              'kolla_config_files', 'nova_conf', 'nova_libvirt_conf',
+              'hiera_json', 'hiera_yaml', 'tuned_variables', 'grub',
+              'cmdline']
+
+
 
 
 # Gets the physical and logical cpus info for all numa nodes.
-def get_nodes_cores_info(client):
+def get_nodes_cores_info(facts):
     dict_cpus = {}
-    cmd = "sudo lscpu -p=NODE,CORE,CPU | grep -v ^#"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('lscpu_cpus')
     for line in output.split('\n'):
         if line:
             cpu_info = line.split(',')
@@ -86,12 +70,9 @@ def get_nodes_cores_info(client):
 
 
 # Gets the total physical memory.
-def get_physical_memory(client):
+def get_physical_memory(facts):
     mem_total_kb = 0
-    # cmd = "sudo cat /proc/meminfo | grep 'MemTotal' | grep -v ^#"
-    cmd ="sudo dmidecode --type memory | grep 'Size' | grep '[0-9]'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('memory_sizes')
     for line in output.split('\n'):
         if line:
             mem_info = line.split(':')[1].strip()
@@ -102,28 +83,24 @@ def get_physical_memory(client):
             elif mem_unit == 'mb':
                 memory_kb = (int(mem_val[0].strip(' ')) * 1024)
             mem_total_kb += memory_kb
-    return (mem_total_kb / 1024)
+    return (mem_total_kb // 1024)
 
 
 # Gets the numa nodes list
-def get_numa_nodes(client):
+def get_numa_nodes(facts):
     nodes = []
-    cmd = "sudo lscpu -p=NODE | grep -v ^#"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+    output = facts.get_output('lscpu_cpus')
     for line in output.split('\n'):
         if line:
-            node = int(line.strip(' '))
+            node = int(line.split(',')[0].strip(' '))
             if node not in nodes:
                 nodes.append(node)
     return nodes
 
 
 # Gets the installed osp release.
-def get_osp_release(client):
-    cmd = 'sudo cat /etc/rhosp-release | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_osp_release(facts):
+    output = facts.get_output('rhosp_release')
     if output:
         return output
     else:
@@ -132,10 +109,8 @@ def get_osp_release(client):
 
 
 # Gets the CPU model
-def get_cpu_model(client):
-    cmd ="sudo lscpu | grep 'Model name'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_cpu_model(facts):
+    output = facts.grep('lscpu', 'Model name')
     if output:
         return output.split(':')[1].strip(' \n')
     else:
@@ -144,10 +119,8 @@ def get_cpu_model(client):
 
 
 # Gets the CPU flages
-def get_cpu_flags(client):
-    cmd = "sudo lscpu | grep 'Flags'"
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read())
+def get_cpu_flags(facts):
+    output = facts.grep('lscpu', 'Flags')
     if output:
         return output.split(':')[1].strip(' \n').split(' ')
     else:
@@ -155,22 +128,20 @@ def get_cpu_flags(client):
         raise Exception(msg)    
 
 
-# Derives kernel_args parameter
-def get_kernel_args(client, hugepage_alloc_perc):
+# Derives kernel_args parameter for the hugepage size
+def get_kernel_args(facts, hugepage_alloc_perc,
+                    page_size_mb=HUGEPAGE_SIZE_1G):
     kernel_args = {}
-    cpu_flags = get_cpu_flags(client)
-    if not is_supported_default_hugepages(cpu_flags):
-        raise Exception("default huge page size 1GB is not supported")
-
-    total_memory = get_physical_memory(client)
-    hugepages = int(float((total_memory / 1024) - 4) * (hugepage_alloc_perc / float(100)))
+    total_memory = get_physical_memory(facts)
+    hugepages = int(float((total_memory // 1024) - 4) * (hugepage_alloc_perc / float(100)) * (HUGEPAGE_SIZE_1G // page_size_mb))
     iommu_info = ''
-    cpu_model = get_cpu_model(client)
+    cpu_model = get_cpu_model(facts)
     if cpu_model.startswith('Intel'):
         kernel_args['intel_iommu'] = 'on'
     kernel_args['iommu'] = 'pt'
-    kernel_args['default_hugepagesz'] = '1GB'
-    kernel_args['hugepagesz'] = '1G'
+    default_size, size = HUGEPAGE_KERNEL_ARGS_SIZES[page_size_mb]
+    kernel_args['default_hugepagesz'] = default_size
+    kernel_args['hugepagesz'] = size
     kernel_args['hugepages'] = str(hugepages)
     return kernel_args
 
@@ -180,23 +151,19 @@ def is_supported_default_hugepages(flags):
     return ('pdpe1gb' in flags)
 
 
+# Gets the hugepage size in MB to validate, 2MB when the CPU does not
+# support 1GB hugepages or when 2MB hugepages are deployed, else 1GB
+def get_hugepage_size(flags, deployed_kernel_args):
+    if (not is_supported_default_hugepages(flags) or
+            deployed_kernel_args.get('default_hugepagesz', '').upper() in
+            ['2M', '2MB']):
+        return HUGEPAGE_SIZE_2M
+    return HUGEPAGE_SIZE_1G
+
+
 # Converts number format cpus into range format
 def convert_number_to_range_list(num_list, array_format = False):
-    num_list = [int(num.strip(' '))
-                for num in num_list.split(",")]
-    num_list.sort()
-    range_list = []
-    range_min = num_list[0]
-    for num in num_list:
-        next_val = num + 1
-        if next_val not in num_list:
-            if range_min != num:
-                range_list.append(str(range_min) + '-' + str(num))
-            else:
-                range_list.append(str(range_min))
-            next_index = num_list.index(num) + 1
-            if next_index < len(num_list):
-                range_min = num_list[next_index]
+    range_list = cpu_codec.number_list_to_range_list(num_list)
 
     if array_format:
         return '['+','.join([("\'"+thread+"\'") for thread in range_list])+']'
@@ -206,112 +173,60 @@ def convert_number_to_range_list(num_list, array_format = False):
 
 # Converts range format cpus into number list format
 def convert_range_to_number_list(range_list):
-    num_list = []                                                               
-    exclude_num_list = []                                                       
-    if isinstance(range_list, str):
-       range_list = range_list.strip('[]').replace('\'', '').replace(' ', '')   
-    if not isinstance(range_list, list):                                        
-        range_list = range_list.split(',')                                      
-    try:                                                                        
-       for val in range_list:                                                   
-           val = val.strip(' ')                                                 
-           if '^' in val:                                                       
-               exclude_num_list.append(int(val[1:]))                            
-           elif '-' in val:                                                     
-               split_list = val.split("-")                                      
-               range_min = int(split_list[0])                                   
-               range_max = int(split_list[1])                                   
-               num_list.extend(range(range_min, (range_max + 1)))               
-           else:                                                                
-               num_list.append(int(val))                                        
-    except ValueError as exc:                                                   
-        err_msg = ("Invalid number in input param "                             
-                   "'range_list': %s" % exc)                                    
-        raise Exception(err_msg)                                                
-                                                                                
-    # here, num_list is a list of integers                                      
-    return [num for num in num_list if num not in exclude_num_list]
-
-
-# gets the instance UUID by node UUID
-def get_instance_uuid(node_uuid):
-    instance_uuid = ''
-    cmd = "ironic --json node-list"
-    output = subprocess.check_output(cmd, shell=True)
-    node_list = json.loads(output)
-    for node in node_list:
-        if node["uuid"] == node_uuid:
-            instance_uuid = node["instance_uuid"] 
-            break
-    return instance_uuid.strip()
-
-
-# gets the host ip address from instance UUID
-def get_host_ip(instance_uuid):
-    cmd = 'nova show ' + instance_uuid + ' | grep "ctlplane network"'
-    output = subprocess.check_output(cmd, shell=True)
-    host_ip = output.replace('ctlplane network', '').strip(' |\n')
-    return host_ip
+    return cpu_codec.range_list_to_number_list(range_list)
+
+
 
 
 # returns whether containers based overcloud deployment.
-def is_containers_based_deployment(client):
+def is_containers_based_deployment(facts):
     containers_based_deployment = False
-    cmd = 'ls -d /var/lib/kolla/config_files/'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    if not str(stderr.read()):
+    if not facts.get_error('kolla_config_files'):
         containers_based_deployment = True
     return containers_based_deployment
 
 
 # gets the nova reserved host memory from deployed env.
-def get_nova_reserved_host_mem_from_env(client, containers_based_dep):
+def get_nova_reserved_host_mem_from_env(facts, containers_based_dep):
     nova_reserved_host_mem = 0
-    cmd = 'sudo cat /etc/nova/nova.conf | grep "reserved_host_memory_mb" | grep -v ^#'
+    nova_conf = 'nova_conf'
     if containers_based_dep:
-        cmd = 'sudo cat /var/lib/config-data/nova_libvirt/etc/nova/nova.conf | grep "reserved_host_memory_mb" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    mem = str(stdout.read()).replace('reserved_host_memory_mb=', '').strip(' \"\n')
+        nova_conf = 'nova_libvirt_conf'
+    output = facts.grep(nova_conf, 'reserved_host_memory_mb')
+    mem = output.replace('reserved_host_memory_mb=', '').strip(' \"\n')
     nova_reserved_host_mem = int(mem)
     return nova_reserved_host_mem
 
 
 # gets the nova reserved host memory from hiera.
-def get_nova_reserved_host_mem_from_hiera(client, containers_based_dep):
+def get_nova_reserved_host_mem_from_hiera(facts, containers_based_dep):
     nova_reserved_host_mem = 0
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         nova_reserved_host_mem = hiera_json["nova::compute::reserved_host_memory"]
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep "nova::compute::reserved_host_memory" | grep -v ^#' 
-        stdin, stdout, stderr = client.exec_command(cmd)
-        mem = str(stdout.read()).replace('nova::compute::reserved_host_memory:', '').strip(' \"\n')
+        output = facts.grep('hiera_yaml', 'nova::compute::reserved_host_memory')
+        mem = output.replace('nova::compute::reserved_host_memory:', '').strip(' \"\n')
         nova_reserved_host_mem = int(mem)
     return nova_reserved_host_mem
 
 
 # gets the nova cpus from deployed env
-def get_nova_cpus_from_env(client, containers_based_dep):
+def get_nova_cpus_from_env(facts, containers_based_dep):
     nova_cpus = ''
-    cmd = 'sudo cat /etc/nova/nova.conf | grep "vcpu_pin_set" | grep -v ^#'
+    nova_conf = 'nova_conf'
     if containers_based_dep:
-        cmd = 'sudo cat /var/lib/config-data/nova_libvirt/etc/nova/nova.conf | grep "vcpu_pin_set" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    nova_cpus = str(stdout.read()).replace('vcpu_pin_set=', '').strip(' \"\n')
+        nova_conf = 'nova_libvirt_conf'
+    output = facts.grep(nova_conf, 'vcpu_pin_set')
+    nova_cpus = output.replace('vcpu_pin_set=', '').strip(' \"\n')
     return nova_cpus
 
 
 # gets the nova cpus from hiera data
-def get_nova_cpus_from_hiera(client, containers_based_dep):
+def get_nova_cpus_from_hiera(facts, containers_based_dep):
     nova_cpus = ''
-    cmd = ''
     if containers_based_dep:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.json'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        hiera_json = json.loads(str(stdout.read()))
+        hiera_json = json.loads(facts.get_output('hiera_json'))
         nova_cpus = hiera_json["nova::compute::vcpu_pin_set"]
         if nova_cpus:
             if isinstance(nova_cpus, str):
@@ -319,9 +234,7 @@ def get_nova_cpus_from_hiera(client, containers_based_dep):
             else:
                 nova_cpus = str([str(nova_cpu) for nova_cpu in nova_cpus])
     else:
-        cmd = 'sudo cat /etc/puppet/hieradata/service_configs.yaml | grep -v ^#'
-        stdin, stdout, stderr = client.exec_command(cmd)
-        for line in str(stdout.read()).split('\n'):
+        for line in facts.get_output('hiera_yaml').split('\n'):
             if 'nova::compute::vcpu_pin_set:' in line and '[' in line:
                 nova_cpus = line.replace('nova::compute::vcpu_pin_set:', '').strip(' ')
             elif 'nova::compute::vcpu_pin_set:' in line and '[' not in line:
@@ -332,11 +245,9 @@ def get_nova_cpus_from_hiera(client, containers_based_dep):
 
 
 # gets the kernel args from deployed env
-def get_grub_update_status_from_env(client):
+def get_grub_update_status_from_env(facts):
     grub_update_status = False
-    cmd = 'sudo sudo cat /proc/cmdline | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    cmd_line = str(stdout.read())
+    cmd_line = facts.get_output('cmdline')
     if cmd_line:
         cmd_args = cmd_line.split(' ')
         for arg in cmd_args:
@@ -347,11 +258,9 @@ def get_grub_update_status_from_env(client):
 
 
 # gets the host isolated cpus from deployed env.
-def get_host_isolated_cpus_from_env(client):
+def get_host_isolated_cpus_from_env(facts):
     host_isolated_cpus = ''
-    cmd ='sudo cat /etc/tuned/cpu-partitioning-variables.conf | grep "isolated_cores" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    output = str(stdout.read()).strip(' \"')
+    output = facts.grep('tuned_variables', 'isolated_cores').strip(' \"')
     for line in output.split('\n'):
         if line.startswith('isolated_cores='):
             host_isolated_cpus = line.replace('isolated_cores=', '').strip(' \"\n')
@@ -359,13 +268,12 @@ def get_host_isolated_cpus_from_env(client):
 
 
 # gets the kernel args from deployed env
-def get_kernel_args_from_env(client, containers_based_dep):
+def get_kernel_args_from_env(facts, containers_based_dep):
     kernel_args = {}
-    cmd = 'sudo cat /etc/default/grub | grep "GRUB_CMDLINE_LINUX=" | grep -v ^#'
+    grub_arg = 'GRUB_CMDLINE_LINUX='
     if containers_based_dep:
-        cmd = 'sudo cat /etc/default/grub | grep "TRIPLEO_HEAT_TEMPLATE_KERNEL_ARGS" | grep -v ^#'
-    stdin, stdout, stderr = client.exec_command(cmd)
-    cmd_line = str(stdout.read()).replace('GRUB_CMDLINE_LINUX=', '').strip(' \"\n')
+        grub_arg = 'TRIPLEO_HEAT_TEMPLATE_KERNEL_ARGS'
+    cmd_line = facts.grep('grub', grub_arg).replace('GRUB_CMDLINE_LINUX=', '').strip(' \"\n')
     if cmd_line:
         cmd_args = cmd_line.split(' ')
         for arg in cmd_args:
@@ -377,16 +285,15 @@ def get_kernel_args_from_env(client, containers_based_dep):
 
 
 # gets the SRIOV parameters value from deployed env
-def get_parameters_value_from_env(client,
-                                  containers_based_dep,
-                                  host_ip):
+@timings.timed('validate_sriov.get_parameters_value_from_env')
+def get_parameters_value_from_env(facts,
+                                  containers_based_dep):
     deployed_parameters = {}
-    print('Collects the deployed value for parameters from node: %s' % host_ip)
-    nova_reserved_host_mem = get_nova_reserved_host_mem_from_env(client,
+    nova_reserved_host_mem = get_nova_reserved_host_mem_from_env(facts,
                                                                  containers_based_dep)
-    nova_cpus = get_nova_cpus_from_env(client, containers_based_dep)
-    host_isolated_cpus = get_host_isolated_cpus_from_env(client)
-    kernel_args = get_kernel_args_from_env(client, containers_based_dep)
+    nova_cpus = get_nova_cpus_from_env(facts, containers_based_dep)
+    host_isolated_cpus = get_host_isolated_cpus_from_env(facts)
+    kernel_args = get_kernel_args_from_env(facts, containers_based_dep)
     if not '[' in nova_cpus:
         nova_cpus = '\'' + nova_cpus + '\''
     deployed_parameters['NovaVcpuPinSet'] = nova_cpus
@@ -397,42 +304,27 @@ def get_parameters_value_from_env(client,
 
 
 # gets the SRIOV parameters value from deployed env
-def get_parameters_value_from_hiera(client,
-                                    containers_based_dep,
-                                    host_ip):
+@timings.timed('validate_sriov.get_parameters_value_from_hiera')
+def get_parameters_value_from_hiera(facts,
+                                    containers_based_dep):
     hiera_parameters = {}
-    print('Collects the hiera value for parameters from node: %s' % host_ip)
-    nova_reserved_host_mem = get_nova_reserved_host_mem_from_hiera(client,
+    nova_reserved_host_mem = get_nova_reserved_host_mem_from_hiera(facts,
                                                                    containers_based_dep)
-    nova_cpus = get_nova_cpus_from_hiera(client, containers_based_dep)
+    nova_cpus = get_nova_cpus_from_hiera(facts, containers_based_dep)
     hiera_parameters['NovaVcpuPinSet'] = nova_cpus
     hiera_parameters['NovaReservedHostMemory'] = nova_reserved_host_mem
     return hiera_parameters
 
 
 # Gets host cpus
-def get_host_cpus_list(cpus):
+def get_host_cpus_list(topology):
     host_cpus_list = []
-    numa_nodes_threads = {}
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        if not cpu['numa_node'] in numa_nodes_threads:
-            numa_nodes_threads[cpu['numa_node']] = []
-        numa_nodes_threads[cpu['numa_node']].extend(
-            cpu['thread_siblings'])
-
-    for numa_node in sorted(numa_nodes_threads.keys()):
-        node = int(numa_node)
-        # Gets least thread in NUMA node
-        numa_node_min = min(numa_nodes_threads[numa_node])
-        for cpu in cpus:
-            if cpu['numa_node'] == node:
-                # Adds threads from core which is having least thread
-                if numa_node_min in cpu['thread_siblings']:
-                    host_cpus_list.extend(cpu['thread_siblings'])
-                    break
-
-    return ','.join([str(thread) for thread in sorted(host_cpus_list)])
+    for node in topology.numa_nodes:
+        # Adds threads from core which is having least thread
+        host_core = topology.node_host_cores[node]
+        host_cpus_list.extend(topology.core_threads[host_core])
+
+    return CpuSet(host_cpus_list)
 
 
 # Validation for nova reserved host memory
@@ -445,31 +337,28 @@ def validate_nova_reserved_host_memory(nova_reserved_host_mem_env):
 
 
 # Validation for nova cpus
-def validate_nova_cpus(dict_cpus, nova_cpus_env, host_cpus, numa_nodes):
+def validate_nova_cpus(topology, nova_cpus_env, host_cpus, numa_nodes):
     msg = ''
-    nova_cores = []
-    nova_cpus = convert_range_to_number_list(nova_cpus_env)
-    host_cpus = host_cpus.strip('\"\' ').split(',')
-    dup_host_cpus = []
+    nova_cores = set()
+    nova_cpus = CpuSet.parse(nova_cpus_env)
+    dup_host_cpus = nova_cpus & host_cpus
     for nova_cpu in nova_cpus:
-        if str(nova_cpu) in host_cpus:
-            dup_host_cpus.append(nova_cpu)
-        for key, cpu in dict_cpus.items():
-            if nova_cpu in cpu['thread_siblings']:
-                if key not in nova_cores:
-                    nova_cores.append(key)
-                for thread in cpu['thread_siblings']:
-                    if thread not in nova_cpus:
-                        msg += ('Missing thread siblings for thread: ' + str(nova_cpu) + ' in nova cpus,'
-                                '\n thread siblings: ' + str(cpu['thread_siblings'])+'.\n')
+        core = topology.get_thread_core(nova_cpu)
+        if core is not None:
+            nova_cores.add(core)
+            thread_siblings = list(topology.core_threads[core])
+            for thread in thread_siblings:
+                if thread not in nova_cpus:
+                    msg += ('Missing thread siblings for thread: ' + str(nova_cpu) + ' in nova cpus,'
+                            '\n thread siblings: ' + str(thread_siblings)+'.\n')
 
     if dup_host_cpus:
-        msg += 'Duplicated physical cores in host CPU\'s: ' + str(dup_host_cpus) + '.\n'
+        msg += 'Duplicated physical cores in host CPU\'s: ' + str(dup_host_cpus.to_list()) + '.\n'
     if nova_cores:
         for node in numa_nodes:
             core_count = 0
             for nova_core in nova_cores:
-                if node == nova_core[0]:
+                if node == topology.core_numa_nodes[nova_core]:
                     core_count += 1
             if core_count == 0:
                 msg += 'Missing physical cores for NUMA node: \'' + str(node) + '\' in nova cpus.\n'
@@ -479,35 +368,32 @@ def validate_nova_cpus(dict_cpus, nova_cpus_env, host_cpus, numa_nodes):
 
 
 # Validation for host isolated cpus
-def validate_isol_cpus(dict_cpus, isol_cpus_env, host_cpus, numa_nodes):
+def validate_isol_cpus(topology, isol_cpus_env, host_cpus, numa_nodes):
     msg = ''
-    isol_cores = []
+    isol_cores = set()
     if not isol_cpus_env.strip('"\''):
         msg = 'Missing host isolated cpus.\n'
         return msg
 
-    isol_cpus = convert_range_to_number_list(isol_cpus_env)
-    host_cpus = host_cpus.strip('\"\' ').split(',')
-    dup_host_cpus = []
+    isol_cpus = CpuSet.parse(isol_cpus_env)
+    dup_host_cpus = isol_cpus & host_cpus
     for isol_cpu in isol_cpus:
-        if str(isol_cpu) in host_cpus:
-            dup_host_cpus.append(isol_cpu)
-        for key, cpu in dict_cpus.items():
-            if isol_cpu in cpu['thread_siblings']:
-                if key not in isol_cores:
-                    isol_cores.append(key)
-                for thread in cpu['thread_siblings']:
-                    if thread not in isol_cpus:
-                        msg += ('Missing thread siblings for thread: ' + str(isol_cpu) + ' in host isolated cpus,'
-                                '\n thread siblings: ' + str(cpu['thread_siblings'])+'.\n')
+        core = topology.get_thread_core(isol_cpu)
+        if core is not None:
+            isol_cores.add(core)
+            thread_siblings = list(topology.core_threads[core])
+            for thread in thread_siblings:
+                if thread not in isol_cpus:
+                    msg += ('Missing thread siblings for thread: ' + str(isol_cpu) + ' in host isolated cpus,'
+                            '\n thread siblings: ' + str(thread_siblings)+'.\n')
 
     if dup_host_cpus:
-        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus) + '.\n'
+        msg += 'Duplicated in host CPU\'s: ' + str(dup_host_cpus.to_list()) + '.\n'
     if isol_cores:
         for node in numa_nodes:
             core_count = 0
             for isol_core in isol_cores:
-                if node == isol_core[0]:
+                if node == topology.core_numa_nodes[isol_core]:
                     core_count += 1
             if core_count == 0:
                 msg += 'Missing physical cores for NUMA node: \'' + str(node) + '\' in host isolated cpus.\n'
@@ -534,9 +420,9 @@ def validate_kernel_args(deployed_kernel_args, derived_kernel_args, grub_update_
 
 
 # Gets osp parameters name in different osp releases
-def get_osp_params_name(client):
+def get_osp_params_name(facts):
     osp_params = {}
-    osp_release = get_osp_release(client)
+    osp_release = get_osp_release(facts)
     if ('10' in osp_release or '11' in osp_release):
         osp_params['isol_cpus'] = 'HostIsolatedCoreList'
         osp_params['kernel_args'] = 'ComputeKernelArgs'
@@ -546,26 +432,33 @@ def get_osp_params_name(client):
     return osp_params
 
 
-# Validates the SRIOV parameters
-def validate_sriov_parameters(client, deployed, hiera, node_uuid,
-                              hugepage_alloc_perc):
+# Validates the SRIOV parameters and gets the validation messages, which
+# are displayed unless display is False (fleet validation)
+@timings.timed('validate_sriov.validate_sriov_parameters')
+def validate_sriov_parameters(facts, deployed, hiera, node_uuid,
+                              hugepage_alloc_perc, display=True):
     messages = {}
-    osp_params = get_osp_params_name(client)
+    osp_params = get_osp_params_name(facts)
 
-    dict_cpus = get_nodes_cores_info(client)
-    cpus = list(dict_cpus.values())
-    numa_nodes = get_numa_nodes(client)
-    host_cpus = get_host_cpus_list(cpus)
+    dict_cpus = get_nodes_cores_info(facts)
+    topology = Topology(list(dict_cpus.values()))
+    numa_nodes = get_numa_nodes(facts)
+    host_cpus = get_host_cpus_list(topology)
     messages['reserved_host_mem'] = validate_nova_reserved_host_memory(deployed['NovaReservedHostMemory'])
-    messages['nova_cpus'] = validate_nova_cpus(dict_cpus, deployed['NovaVcpuPinSet'],
+    messages['nova_cpus'] = validate_nova_cpus(topology, deployed['NovaVcpuPinSet'],
                                                host_cpus, numa_nodes) 
-    messages['isol_cpus'] = validate_isol_cpus(dict_cpus, deployed['HostIsolatedCoreList'], host_cpus, numa_nodes)
-    derived_kernel_args = get_kernel_args(client, hugepage_alloc_perc)
-    grub_update_status = get_grub_update_status_from_env(client)
+    messages['isol_cpus'] = validate_isol_cpus(topology, deployed['HostIsolatedCoreList'], host_cpus, numa_nodes)
+    page_size_mb = get_hugepage_size(get_cpu_flags(facts),
+                                     deployed['ComputeKernelArgs'])
+    derived_kernel_args = get_kernel_args(facts, hugepage_alloc_perc,
+                                          page_size_mb)
+    grub_update_status = get_grub_update_status_from_env(facts)
     messages['kernel_args'] = validate_kernel_args(deployed['ComputeKernelArgs'],
                                                    derived_kernel_args,
                                                    grub_update_status)
-    validation_messages(deployed, hiera, osp_params, messages)
+    if display:
+        validation_messages(deployed, hiera, osp_params, messages)
+    return messages
 
 
 # Displays validation messages
@@ -588,35 +481,109 @@ def validation_messages(deployed, hiera, osp_params, messages):
     print(t)
 
 
-# Gets environment parameters value and validates.
-def validate():
+
+
+# Collects the facts of the node for the validation on up to
+# max_channels concurrent SSH channels, on the pooled SSH connection of
+# the node which is released once they are collected
+def collect_node_facts(host_ip, max_channels=node_facts.DEFAULT_MAX_CHANNELS):
+    client = ssh_pool.acquire(host_ip)
+    try:
+        return node_facts.collect(client, NODE_FACTS, max_channels)
+    finally:
+        ssh_pool.release(host_ip)
+
+
+# Validates the SRIOV parameters of the deployed node without displaying
+# them, and gets its validation messages
+def validate_node(node_uuid, host_ip, hugepage_alloc_perc, max_channels):
+    try:
+        facts = collect_node_facts(host_ip, max_channels)
+        containers_based_dep = is_containers_based_deployment(facts)
+        deployed = get_parameters_value_from_env(facts, containers_based_dep)
+        messages = validate_sriov_parameters(
+            facts, deployed, None, node_uuid, hugepage_alloc_perc,
+            display=False)
+    except Exception as exc:
+        raise Exception('%(ip)s: %(exc)s' % {'ip': host_ip, 'exc': exc})
+    return messages
+
+
+# Validates the SRIOV parameters of all the deployed nodes of the flavor
+# concurrently, like the DPDK validate_fleet. Returns whether all the
+# nodes passed.
+def validate_fleet(flavor, deployed_hosts, hugepage_alloc_perc, max_workers,
+                   max_channels):
+    start = time.time()
+    if not deployed_hosts:
+        raise Exception("Unable to determine deployed nodes for flavor "
+                        "'%s'" % flavor)
+    host_ips = dict(deployed_hosts)
+    node_uuids = [node_uuid for node_uuid, _ in deployed_hosts]
+    print('Validating %(count)d node(s) of flavor %(flavor)s..' % {
+        'count': len(node_uuids), 'flavor': flavor})
+
+    def validate_fleet_node(node_uuid):
+        return validate_node(node_uuid, host_ips[node_uuid],
+                             hugepage_alloc_perc, max_channels)
+
+    results = {}
+    for node_uuid, messages, error in fleet.iter_fleet(
+            node_uuids, validate_fleet_node, max_workers):
+        fleet.display_node_verdict(VALIDATION_CHECKS, node_uuid,
+                                   host_ips[node_uuid], messages, error)
+        results[node_uuid] = (node_uuid, host_ips[node_uuid], messages,
+                              error)
+    print('')
+    return fleet.display_validation_matrix(
+        VALIDATION_CHECKS, [results[node_uuid] for node_uuid in node_uuids],
+        time.time() - start)
+
+
+# Gets environment parameters value and validates, with the command line
+# arguments argv (sys.argv by default).
+def validate(argv=None):
    try:
-        opts = parse_opts(sys.argv)
+        opts = parse_opts(argv or sys.argv)
+        if opts.timings:
+            timings.enable(opts.trace_file)
+        ssh_pool.configure(opts.ssh_keepalive, opts.ssh_idle_timeout)
         print("Validating user inputs..")
         validate_user_input(opts)
         hugepage_alloc_perc = float(opts.huge_page_allocation_percentage)
-        flavor = get_flavor_name(opts.role_name)
-        node_uuid = get_node_uuid(flavor)
-        instance_uuid = get_instance_uuid(node_uuid)
-        host_ip = get_host_ip(instance_uuid)
+        backend = undercloud.get_backend(opts.backend)
+        try:
+            if opts.fleet:
+                flavor, deployed_hosts = derive_inventory.get_deployed_hosts(
+                    opts.role_name, backend, options.get_cache(opts))
+            else:
+                flavor = nodes.get_flavor_name(opts.role_name, backend)
+                node_uuid = nodes.get_node_uuid(flavor, None, backend)
+                instance_uuid = nodes.get_instance_uuid(node_uuid, backend)
+                host_ip = nodes.get_host_ip(instance_uuid, backend)
+        finally:
+            backend.close()
+        if opts.fleet:
+            passed = validate_fleet(flavor, deployed_hosts, hugepage_alloc_perc,
+                                    opts.max_workers, opts.max_channels)
+            if not passed:
+                sys.exit(1)
+            return
         # SSH access
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        client.load_system_host_keys()
-        client.connect(host_ip, username='heat-admin')
-        client.invoke_shell()
-        containers_based_dep = is_containers_based_deployment(client)
-        deployed = get_parameters_value_from_env(client,
-                                                 containers_based_dep,
-                                                 host_ip)
-        hiera = get_parameters_value_from_hiera(client,
-                                                containers_based_dep,
-                                                host_ip)
-        validate_sriov_parameters(client, deployed, hiera, node_uuid, 
+        facts = collect_node_facts(host_ip, opts.max_channels)
+        containers_based_dep = is_containers_based_deployment(facts)
+        print('Collects the deployed value for parameters from node: %s' % host_ip)
+        deployed = get_parameters_value_from_env(facts,
+                                                 containers_based_dep)
+        print('Collects the hiera value for parameters from node: %s' % host_ip)
+        hiera = get_parameters_value_from_hiera(facts,
+                                                containers_based_dep)
+        validate_sriov_parameters(facts, deployed, hiera, node_uuid, 
                                   hugepage_alloc_perc)
-        client.close()
    except Exception as exc:
         print("Error: %s" % exc)
+   finally:
+        timings.report()
 
 
 # Validates the user inputs
@@ -639,6 +606,42 @@ def parse_opts(argv):
                         metavar='HUGEPAGE ALLOCATION PERCENTAGE',
                         help="""hugepage allocation percentage""",
                         default=50)
+    options.add_backend_option(parser, '-b')
+    options.add_cache_options(parser, 'inventory index of the role nodes '
+                              'and hosts in fleet mode', ttl=False)
+    parser.add_argument('--fleet',
+                        help="""validates all the deployed nodes of the role
+                        concurrently, instead of the first node.""",
+                        action='store_true',
+                        default=False)
+    parser.add_argument('--max_workers',
+                        metavar='MAX WORKERS',
+                        help="""maximum number of nodes validated
+                        concurrently in fleet mode, each with its SSH
+                        connection.""",
+                        type=int,
+                        default=fleet.DEFAULT_MAX_WORKERS)
+    parser.add_argument('--max_channels',
+                        metavar='MAX CHANNELS',
+                        help="""maximum number of concurrent SSH channels
+                        collecting the node facts on the SSH connection of
+                        each node.""",
+                        type=int,
+                        default=node_facts.DEFAULT_MAX_CHANNELS)
+    parser.add_argument('--ssh_keepalive',
+                        metavar='SECONDS',
+                        help="""keepalive interval of the pooled SSH
+                        connections, 0 disables it.""",
+                        type=int,
+                        default=ssh_pool.DEFAULT_KEEPALIVE)
+    parser.add_argument('--ssh_idle_timeout',
+                        metavar='SECONDS',
+                        help="""closes the pooled SSH connections not used
+                        for the idle timeout, 0 disables it.""",
+                        type=int,
+                        default=ssh_pool.DEFAULT_IDLE_TIMEOUT)
+    options.add_timings_options(parser, 'SSH commands and validation '
+                                'stages')
     opts = parser.parse_args(argv[1:])
     return opts
 
@@ -0,0 +1,86 @@
+import argparse
+import os
+import shlex
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from derive_common import derivers
+
+# Runs the DPDK and SRIOV parameters validations in a single process, in
+# the command line order, so that the validations share the pool of the
+# SSH connections of the nodes (see derive_common/ssh_pool.py): a node
+# validated by several validations, like a ComputeOvsDpdkSriov node, is
+# connected and authenticated once. Each validation is given the command
+# line arguments of its validation script.
+
+# Validation scripts by validation name, relative to this directory
+VALIDATORS = {'dpdk': ('DPDK-Parameters', 'validate_dpdk_params.py'),
+              'sriov': ('SRIOV-Parameters', 'validate_sriov_params.py')}
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Loads the validation script module for validation name ('dpdk' or
+# 'sriov'), once
+def load_validator(name):
+    script_dir, script_name = VALIDATORS[name]
+    module_name = os.path.splitext(script_name)[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    return derivers.load_source(module_name,
+                                os.path.join(SCRIPT_DIR, script_dir,
+                                             script_name))
+
+
+# Appends the validation name of the option and its arguments to the
+# validations, keeping the command line order of the DPDK and SRIOV
+# validations
+class ValidationAction(argparse.Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        validations = list(getattr(namespace, self.dest) or [])
+        validations.append((option_string.lstrip('-'), shlex.split(values)))
+        setattr(namespace, self.dest, validations)
+
+
+# Gets the validations from command line arguments
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Validates the DPDK and SRIOV parameters of several '
+                    'roles in a single process, sharing the SSH connections '
+                    'of the nodes')
+    for name in sorted(VALIDATORS):
+        parser.add_argument('--' + name,
+                            metavar='ARGS',
+                            dest='validations',
+                            action=ValidationAction,
+                            help="""arguments of the %s validation script,
+                            like --%s='-r RoleName --fleet'. Repeat the
+                            option to validate several roles.""" % (
+                                name.upper(), name))
+    opts = parser.parse_args(argv[1:])
+    if not opts.validations:
+        parser.error('at least one --dpdk or --sriov validation is required')
+    return opts
+
+
+# Runs the validations in order, with the command line arguments argv
+# (sys.argv by default). Exits with status 1 when a validation failed.
+def validate(argv=None):
+    opts = parse_opts(argv or sys.argv)
+    failed = []
+    for name, args in opts.validations:
+        print("# %(name)s validation: %(args)s" % {'name': name.upper(),
+                                                   'args': ' '.join(args)})
+        try:
+            load_validator(name).validate([VALIDATORS[name][1]] + args)
+        except SystemExit as exc:
+            if exc.code:
+                failed.append(name.upper())
+    if failed:
+        print("Failed validations: %s" % ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    validate()
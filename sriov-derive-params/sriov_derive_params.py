@@ -1,114 +1,85 @@
+import argparse
 import json
-import subprocess
+import os
 import sys
 import yaml
 
-# Gets the profile name for flavor name.
-def get_profile_name(flavor_name):
-    cmd = "openstack flavor show " + flavor_name
-    output = subprocess.check_output(cmd,shell=True)
-    properties = ''
-    for line in output.split('\n'):
-        if 'properties' in line:
-            properties = line
-    profile = ''
-    if properties:
-        profile_index = properties.index('capabilities:profile=')
-        if profile_index >=0:
-            profile_start_index = profile_index + len('capabilities:profile=') + 1
-            profile_end_index = properties.index('\'', profile_start_index, len(properties))
-            profile = properties[profile_start_index:profile_end_index]
-    return profile
-
-
-# Gets the first matching node UUID for flavor name
-def get_node_uuid(flavor_name):
-    node_uuid = ''
-    profile_name = get_profile_name(flavor_name)
-    cmd = "openstack overcloud profiles list -f json"
-    output = subprocess.check_output(cmd,shell=True)
-    profiles_list = json.loads(output)
-    for profile in profiles_list:
-        if profile["Current Profile"] == profile_name:
-            node_uuid = profile["Node UUID"]
-            break
-    return node_uuid.strip()
-
-
-# Gets the hardware data for the give node UUID
-def get_introspection_data(flavor_name):
-    node_uuid = get_node_uuid(flavor_name)
-    cmd = "openstack baremetal introspection data save " + node_uuid
-    output = subprocess.check_output(cmd,shell=True)
-    hw_data = json.loads(output)
-    return hw_data
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from derive_common import batch
+from derive_common import cpu_codec
+from derive_common import emitters
+from derive_common import fleet
+from derive_common import nodes
+from derive_common import options
+from derive_common import timings
+from derive_common import undercloud
+from derive_common.cpuset import CpuSet
+from derive_common.topology import Topology
 
+# Hugepage sizes in MB with their default_hugepagesz and hugepagesz
+# kernel args. 2MB hugepages are used when the CPU does not support 1GB
+# hugepages (no pdpe1gb flag).
+HUGEPAGE_SIZE_1G = 1024
+HUGEPAGE_SIZE_2M = 2
+HUGEPAGE_KERNEL_ARGS_SIZES = {HUGEPAGE_SIZE_1G: ('1GB', '1G'),
+                              HUGEPAGE_SIZE_2M: ('2M', '2M')}
 
 # Gets host cpus
-def get_host_cpus_list(hw_data):
+@timings.timed('sriov.get_host_cpus_list')
+def get_host_cpus_list(topology):
     host_cpus_list = []
-    cpus = hw_data.get('numa_topology', {}).get('cpus', [])
-    # Checks whether numa topology cpus information is not available
-    # in introspection data.
-    if not cpus:
-        msg = 'Introspection data does not have numa_topology.cpus'
-        raise Exception(msg)
-
-    numa_nodes_threads = {}
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        if not cpu['numa_node'] in numa_nodes_threads:
-            numa_nodes_threads[cpu['numa_node']] = []
-        numa_nodes_threads[cpu['numa_node']].extend(
-            cpu['thread_siblings'])
-
-    for numa_node in sorted(numa_nodes_threads.keys()):
-        node = int(numa_node)
-        # Gets least thread in NUMA node
-        numa_node_min = min(numa_nodes_threads[numa_node])
-        for cpu in cpus:
-            if cpu['numa_node'] == node:
-                # Adds threads from core which is having least thread
-                if numa_node_min in cpu['thread_siblings']:
-                    host_cpus_list.extend(cpu['thread_siblings'])
-                    break
-
-    return ','.join([str(thread) for thread in host_cpus_list])
+    for node in topology.numa_nodes:
+        # Adds threads from core which is having least thread
+        host_core = topology.node_host_cores[node]
+        host_cpus_list.extend(topology.core_threads[host_core])
+
+    return CpuSet(host_cpus_list)
 
 
 # Gets nova cpus
-def get_nova_cpus_list(hw_data, host_cpus):
-    nova_cpus_list = []
-    cpus = hw_data.get('numa_topology', {}).get('cpus', {})
-    threads = []
-    # Creates a list for all available threads in each NUMA nodes
-    for cpu in cpus:
-        threads.extend(cpu['thread_siblings'])
-    exclude_cpus_list = host_cpus.split(',')
-    for thread in threads:
-        if not str(thread) in exclude_cpus_list:
-            nova_cpus_list.append(thread)
-    
-    return ','.join([str(thread) for thread in nova_cpus_list])
-
-
-# Derives kernel_args parameter
-def get_kernel_args(hw_data, hugepage_alloc_perc):
-    if not is_supported_default_hugepages(hw_data):
-        raise Exception("default huge page size 1GB is not supported")
+@timings.timed('sriov.get_nova_cpus_list')
+def get_nova_cpus_list(topology, host_cpus):
+    return CpuSet(topology.threads) - host_cpus
 
+
+# Derives kernel_args parameter. 2MB hugepages are derived when the CPU
+# does not support 1GB hugepages.
+@timings.timed('sriov.get_kernel_args')
+def get_kernel_args(hw_data, hugepage_alloc_perc):
+    page_size_mb = get_hugepage_size(hw_data)
     total_memory = hw_data.get('inventory', {}).get('memory', {}).get('physical_mb', 0)
-    hugepages = int(float((total_memory / 1024) - 4) * (float(hugepage_alloc_perc) / float(100)))
+    hugepages = int(float((total_memory // 1024) - 4) * (float(hugepage_alloc_perc) / float(100)) * (HUGEPAGE_SIZE_1G // page_size_mb))
     iommu_info = ''
     cpu_model = hw_data.get('inventory', {}).get('cpu', '').get('model_name', '')
     if cpu_model.startswith('Intel'):
         iommu_info = ' intel_iommu=on'
-    kernel_args = ('default_hugepagesz=1GB hugepagesz=1G '
-                   'hugepages=%(hugepages)d' % {'hugepages': hugepages})
+    default_size, size = HUGEPAGE_KERNEL_ARGS_SIZES[page_size_mb]
+    kernel_args = ('default_hugepagesz=%(default_size)s hugepagesz=%(size)s '
+                   'hugepages=%(hugepages)d' % {'default_size': default_size,
+                                                'size': size,
+                                                'hugepages': hugepages})
     kernel_args += iommu_info
     return kernel_args
 
-    return kernel_args
+
+# Gets the hugepage size in MB, 1GB when the CPU supports it, else 2MB
+def get_hugepage_size(hw_data):
+    if is_supported_default_hugepages(hw_data):
+        return HUGEPAGE_SIZE_1G
+    return HUGEPAGE_SIZE_2M
+
+
+# Warns about the 2MB hugepages fallback, 512 times more hugepages
+# have to be mapped with the TLB entries, increasing the TLB misses of
+# the guests
+def display_hugepage_size_warning(page_size_mb):
+    if page_size_mb == HUGEPAGE_SIZE_2M:
+        sys.stderr.write('Warning: default huge page size 1GB is not '
+                         'supported (no pdpe1gb CPU flag), 2MB huge pages '
+                         'are derived instead. 2MB huge pages need 512 '
+                         'times more TLB entries than 1GB huge pages, '
+                         'expect more TLB misses in the guests.\n')
 
 
 # Checks default 1GB hugepages support
@@ -119,21 +90,7 @@ def is_supported_default_hugepages(hw_data):
 
 # Converts number format cpus into range format
 def convert_number_to_range_list(num_list, array_format = False):
-    num_list = [int(num.strip(' '))
-                for num in num_list.split(",")]
-    num_list.sort()
-    range_list = []
-    range_min = num_list[0]
-    for num in num_list:
-        next_val = num + 1
-        if next_val not in num_list:
-            if range_min != num:
-                range_list.append(str(range_min) + '-' + str(num))
-            else:
-                range_list.append(str(range_min))
-            next_index = num_list.index(num) + 1
-            if next_index < len(num_list):
-                range_min = num_list[next_index]
+    range_list = cpu_codec.number_list_to_range_list(num_list)
 
     if array_format:
         return '['+','.join([("\'"+thread+"\'") for thread in range_list])+']'
@@ -142,10 +99,11 @@ def convert_number_to_range_list(num_list, array_format = False):
 
 
 # Validates the user inputs
-def vaildate_user_input(user_input):
-    print(json.dumps(user_input))
+def vaildate_user_input(user_input, batch_mode=False):
+    if not batch_mode:
+        print(json.dumps(user_input))
 
-    if not 'flavor' in user_input.keys():
+    if not batch_mode and not 'flavor' in user_input.keys():
         raise Exception("Flavor is missing in user input!");
 
     for key in user_input.keys():
@@ -154,56 +112,171 @@ def vaildate_user_input(user_input):
             raise Exception("Invalid user input '%(key)s'" % {'key': key})
 
 
-if __name__ == '__main__':
+# Derives the SRIOV parameters and hiera variables for the given
+# node hardware data and CPU topology. The details dict, if given, is
+# filled with the intermediate values of the derivation.
+def derive_sriov_parameters(hw_data, topology, hugepage_alloc_perc,
+                            details=None):
     parameters = {}
     hiera_variables = {}
+    host_cpus = get_host_cpus_list(topology)
+    nova_cpus = get_nova_cpus_list(topology, host_cpus)
+    host_mem = 4096
+    isol_cpus = convert_number_to_range_list(nova_cpus)
+    page_size_mb = get_hugepage_size(hw_data)
+    display_hugepage_size_warning(page_size_mb)
+    kernel_args = get_kernel_args(hw_data, hugepage_alloc_perc)
+    parameters['NovaVcpuPinSet'] = convert_number_to_range_list(nova_cpus, True)
+    parameters['NovaReservedHostMemory'] = host_mem
+    parameters['HostIsolatedCoreList'] = isol_cpus
+    parameters['ComputeKernelArgs'] = kernel_args
+
+    hiera_variables['nova::compute::reserved_host_memory'] = host_mem
+    hiera_variables['nova::compute::vcpu_pin_set'] = parameters['NovaVcpuPinSet']
+    if details is not None:
+        details.update({'topology': topology,
+                        'host_cpus': host_cpus,
+                        'nova_cpus': nova_cpus,
+                        'page_size_mb': page_size_mb})
+    return parameters, hiera_variables
+
+
+# Derives the SRIOV parameters for the given node introspection data,
+# using the already parsed CPU topology of the node if given, and fills
+# the details dict if given
+@timings.timed('sriov.derive_hw_data_parameters')
+def derive_hw_data_parameters(hw_data, user_input, topology=None,
+                              details=None):
+    hugepage_alloc_perc = user_input.get(
+        "huge_page_allocation_percentage", 50)
+    if topology is None:
+        topology = Topology.from_introspection(hw_data)
+    return derive_sriov_parameters(hw_data, topology, hugepage_alloc_perc,
+                                   details)
+
+
+# Displays the derived SRIOV parameters and hiera variables. The details
+# of the derivation are taken like the DPDK deriver, nothing is displayed
+# from them.
+def display_parameters(parameters, hiera_variables, details=None):
+    # prints the derived SRIOV parameters
+    for key, val in parameters.items():
+        if key == "NovaVcpuPinSet":
+            print('%(key)s: %(val)s' % {"key": key, "val": val})
+        elif key == "NovaReservedHostMemory":
+             print('%(key)s: %(val)d' % {"key": key, "val": val})
+        else:
+            print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
+    print('')
+
+    # prints overriding role-specific parameters using hiera variables
+    print('# Overrides role-specific parameters using hiera variables')
+    print('# Optional this section, copy if any parameters are needed to override for this role')
+    print('# Copy required parameters to the <RoleName>ExtraConfig section')
+    for key, val in hiera_variables.items():
+        if key == "nova::compute::vcpu_pin_set":
+            print('%(key)s: %(val)s' % {"key": key, "val": val})
+        elif key == "nova::compute::reserved_host_memory":
+             print('%(key)s: %(val)d' % {"key": key, "val": val})
+        else:
+            print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
+    print('')
+
+
+# Displays the derived parameters, or writes them to the heat
+# environment file when a structured output format is used
+def output_parameters(parameters, hiera_variables, emitter=None, name=None,
+                      details=None):
+    if emitter is None:
+        display_parameters(parameters, hiera_variables, details)
+    else:
+        path = emitter.emit(parameters, hiera_variables, name)
+        print('Parameters are written to: %s' % path)
+
+
+# Derives the SRIOV parameters for the first node matching the flavor
+def derive_parameters(user_input, cache=None, backend=None,
+                      emitter=None):
+    hugepage_alloc_perc = user_input.get(
+        "huge_page_allocation_percentage", 50)
+
+    print("Deriving SRIOV parameters based on "
+          "flavor: %s" % user_input['flavor'])
+    hw_data = nodes.get_introspection_data(user_input['flavor'], cache,
+                                           backend)
+    topology = Topology.from_introspection(hw_data)
+    parameters, hiera_variables = derive_sriov_parameters(
+        hw_data, topology, hugepage_alloc_perc)
+    output_parameters(parameters, hiera_variables, emitter)
+
+
+# Derives the SRIOV parameters for each saved introspection data in
+# the batch path (directory, tar archive or JSON lines file) using a pool
+# of processes, without accessing undercloud. The parameters of each
+# node are written as a JSON line as soon as they are derived, and to
+# the heat environment file of each node with the emitter.
+def derive_batch_parameters(user_input, path, processes, emitter=None):
+    summary, failed = batch.derive_batch(path, derive_hw_data_parameters,
+                                         user_input, processes,
+                                         emitter=emitter)
+    sys.stderr.write(summary + '\n')
+
+
+# Gets the user inputs from command line arguments
+def parse_opts(argv):
+    parser = argparse.ArgumentParser(
+        description='Derives SRIOV parameters')
+    options.add_user_input_argument(parser)
+    options.add_fleet_options(parser)
+    options.add_batch_options(parser)
+    options.add_output_options(parser)
+    options.add_backend_option(parser)
+    options.add_cache_options(parser)
+    options.add_timings_options(parser)
+    opts = parser.parse_args(argv[1:])
+    return opts
+
+
+if __name__ == '__main__':
+    backend = None
     try:
-        print("Validating user inputs..")        
-        if len(sys.argv) != 2:
+        opts = parse_opts(sys.argv)
+        if opts.timings:
+            timings.enable(opts.trace_file)
+        emitter = None
+        if opts.output_format != 'text':
+            emitter = emitters.Emitter(opts.output_format, opts.output_dir,
+                                       opts.role_name, 'sriov',
+                                       opts.extra_config_pre)
+        if opts.batch:
+            user_input = json.loads(opts.user_input or '{}')
+            vaildate_user_input(user_input, batch_mode=True)
+            derive_batch_parameters(user_input, opts.batch, opts.processes,
+                                    emitter)
+            sys.exit(0)
+
+        print("Validating user inputs..")
+        if not opts.user_input:
             raise Exception("Unable to determine params, user "
                             "input JSON data is missing!");
 
-        user_input = json.loads(sys.argv[1])
+        user_input = json.loads(opts.user_input)
         vaildate_user_input(user_input)
 
-        hugepage_alloc_perc = user_input.get(
-            "huge_page_allocation_percentage", 50)
-
-        print("Deriving SRIOV parameters based on "
-              "flavor: %s" % user_input['flavor'])
-        hw_data = get_introspection_data(user_input['flavor'])
-        host_cpus = get_host_cpus_list(hw_data)
-        nova_cpus = get_nova_cpus_list(hw_data, host_cpus)
-        host_mem = 4096
-        isol_cpus = convert_number_to_range_list(nova_cpus)
-        kernel_args = get_kernel_args(hw_data, hugepage_alloc_perc)
-        parameters['NovaVcpuPinSet'] = convert_number_to_range_list(nova_cpus, True)
-        parameters['NovaReservedHostMemory'] = host_mem
-        parameters['HostIsolatedCoreList'] = isol_cpus
-        parameters['ComputeKernelArgs'] = kernel_args
-        # prints the derived SRIOV parameters
-        for key, val in parameters.items():
-            if key == "NovaVcpuPinSet":
-                print('%(key)s: %(val)s' % {"key": key, "val": val})
-            elif key == "NovaReservedHostMemory":
-                 print('%(key)s: %(val)d' % {"key": key, "val": val})
-            else:
-                print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
-        print('')
-
-        hiera_variables['nova::compute::reserved_host_memory'] = host_mem
-        hiera_variables['nova::compute::vcpu_pin_set'] = parameters['NovaVcpuPinSet']
-        # prints overriding role-specific parameters using hiera variables
-        print('# Overrides role-specific parameters using hiera variables')
-        print('# Optional this section, copy if any parameters are needed to override for this role')
-        print('# Copy required parameters to the <RoleName>ExtraConfig section')
-        for key, val in hiera_variables.items():
-            if key == "nova::compute::vcpu_pin_set":
-                print('%(key)s: %(val)s' % {"key": key, "val": val})
-            elif key == "nova::compute::reserved_host_memory":
-                 print('%(key)s: %(val)d' % {"key": key, "val": val})
-            else:
-                print('%(key)s: \"%(val)s\"' % {"key": key, "val": val})
-        print('')
+        cache = options.get_cache(opts)
+        backend = undercloud.get_backend(opts.backend,
+                                         pool_size=opts.max_workers)
+        if opts.fleet:
+            fleet.derive_fleet_parameters('SRIOV', user_input,
+                                          derive_hw_data_parameters,
+                                          output_parameters,
+                                          opts.max_workers, cache, backend,
+                                          emitter)
+        else:
+            derive_parameters(user_input, cache, backend, emitter)
     except Exception as exc:
         print("Error: %s" % exc)
+    finally:
+        if backend is not None:
+            backend.close()
+        timings.report()